@@ -11,6 +11,8 @@ Day 20: 智能文本相似度工具
 - 支持中文、英文、数字混合文本
 - 返回详细的操作步骤
 - 可视化对齐结果
+- 快速距离计算 (Myers 位并行 / Ukkonen 带状截断)
+- 大规模模糊匹配 (BK 树 / 长度过滤 / 多进程批量)
 
 编辑距离应用场景：
 - 拼写检查
@@ -23,8 +25,264 @@ Day 20: 智能文本相似度工具
 日期: 2026-02-02
 """
 
-from typing import List, Tuple, Dict
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from bisect import insort
 import json
+import os
+
+
+def _trim_common_affix(s1: str, s2: str) -> Tuple[str, str]:
+    """去掉公共前缀和后缀，它们不影响编辑距离"""
+    start = 0
+    limit = min(len(s1), len(s2))
+    while start < limit and s1[start] == s2[start]:
+        start += 1
+    end = 0
+    limit -= start
+    while end < limit and s1[-1 - end] == s2[-1 - end]:
+        end += 1
+    return s1[start:len(s1) - end], s2[start:len(s2) - end]
+
+
+def _pattern_masks(pattern: str) -> Dict[str, int]:
+    """位并行算法的字符位掩码表: 字符 -> 它在 pattern 中出现位置的位集合"""
+    peq: Dict[str, int] = {}
+    for i, ch in enumerate(pattern):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    return peq
+
+
+def _myers_distance(pattern: str, text: str, max_distance: Optional[int] = None,
+                    peq: Optional[Dict[str, int]] = None) -> int:
+    """
+    Myers/Hyyrö 位并行编辑距离
+
+    用 Python 大整数的每一位表示 DP 列中相邻两格的差值 (+1/-1/0)，
+    每读入 text 的一个字符只需常数次位运算。pattern 应为较短的非空字符串，
+    同一 pattern 反复比较时可传入预先计算的 peq。
+    给定 max_distance 时，一旦剩余字符不足以把距离降回阈值内就提前返回 max_distance + 1。
+    """
+    m = len(pattern)
+    if peq is None:
+        peq = _pattern_masks(pattern)
+
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    remaining = len(text)
+
+    for ch in text:
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+
+        remaining -= 1
+        if max_distance is not None and score - remaining > max_distance:
+            return max_distance + 1
+
+    return score
+
+
+def _banded_distance(s1: str, s2: str, max_distance: int) -> int:
+    """
+    Ukkonen 带状编辑距离
+
+    只计算主对角线两侧 max_distance 宽的带，两行滚动；
+    某一行的最小值超过阈值时立即返回 max_distance + 1。要求 len(s1) <= len(s2)。
+    """
+    m, n = len(s1), len(s2)
+    k = max_distance
+    over = k + 1
+    prev = [j if j <= k else over for j in range(n + 1)]
+    cur = [over] * (n + 1)
+
+    for i in range(1, m + 1):
+        lo = max(1, i - k)
+        hi = min(n, i + k)
+        # 带左侧相邻格可能残留两行前的数据
+        cur[lo - 1] = (i if i <= k else over) if lo == 1 else over
+        row_min = cur[lo - 1]
+        ch = s1[i - 1]
+        left = cur[lo - 1]
+        for j in range(lo, hi + 1):
+            value = prev[j - 1] if ch == s2[j - 1] else prev[j - 1] + 1
+            if prev[j] + 1 < value:
+                value = prev[j] + 1
+            if left + 1 < value:
+                value = left + 1
+            if value > over:
+                value = over
+            cur[j] = left = value
+            if value < row_min:
+                row_min = value
+        if row_min > k:
+            return over
+        prev, cur = cur, prev
+
+    return prev[n]
+
+
+# 短于这个长度的 pattern 用位并行，更长且阈值很小时用带状 DP
+BANDED_MIN_LENGTH = 256
+
+
+def levenshtein(s1: str, s2: str, max_distance: Optional[int] = None) -> int:
+    """
+    只计算编辑距离 (不保留 DP 表)
+
+    Args:
+        s1: 字符串1
+        s2: 字符串2
+        max_distance: 距离上限；实际距离超过时返回 max_distance + 1
+
+    Returns:
+        int: 编辑距离
+    """
+    if s1 == s2:
+        return 0
+    s1, s2 = _trim_common_affix(s1, s2)
+    if len(s1) > len(s2):
+        s1, s2 = s2, s1
+
+    if max_distance is not None:
+        if len(s2) - len(s1) > max_distance:
+            return max_distance + 1
+        if not s1:
+            return len(s2)
+        if len(s1) >= BANDED_MIN_LENGTH and 2 * max_distance + 1 < len(s1) // 8:
+            return _banded_distance(s1, s2, max_distance)
+        return _myers_distance(s1, s2, max_distance)
+
+    if not s1:
+        return len(s2)
+    return _myers_distance(s1, s2)
+
+
+class BKTree:
+    """
+    BK 树 (Burkhard-Keller Tree)
+
+    利用编辑距离的三角不等式组织词典：查询半径为 r 时，
+    只需访问与当前节点距离在 [d - r, d + r] 内的子树。适合同一词典被反复查询。
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.root: Optional[list] = None  # [word, {distance: child}]
+        self.size = 0
+        self.max_length = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str):
+        """插入一个词 (重复的词会被忽略)"""
+        self.max_length = max(self.max_length, len(word))
+        if self.root is None:
+            self.root = [word, {}]
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            d = levenshtein(word, node[0])
+            if d == 0:
+                return
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = [word, {}]
+                self.size += 1
+                return
+            node = child
+
+    def search(self, query: str, max_distance: int) -> List[Tuple[str, int]]:
+        """返回与 query 距离不超过 max_distance 的所有 (词, 距离)"""
+        results = []
+        if self.root is None:
+            return results
+        stack = [self.root]
+        while stack:
+            word, children = stack.pop()
+            d = levenshtein(query, word)
+            if d <= max_distance:
+                results.append((word, d))
+            for key, child in children.items():
+                if d - max_distance <= key <= d + max_distance:
+                    stack.append(child)
+        return results
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def _bucket_by_length(candidates: Iterable[str]) -> Dict[int, List[str]]:
+    """按长度分桶 (去重)，长度差本身就是编辑距离的下界"""
+    buckets: Dict[int, List[str]] = {}
+    for candidate in dict.fromkeys(candidates):
+        buckets.setdefault(len(candidate), []).append(candidate)
+    return buckets
+
+
+def _top_k(query: str, buckets: Dict[int, List[str]], k: int,
+           max_distance: Optional[int] = None) -> List[Tuple[int, str]]:
+    """
+    在长度分桶的候选中找距离最小的 k 个
+
+    按长度差从小到大访问各桶，当前第 k 名的距离作为截断阈值逐步收紧，
+    长度差超过阈值的桶整体跳过。
+    """
+    if k <= 0:
+        return []
+    best: List[Tuple[int, str]] = []
+    limit = max_distance if max_distance is not None else float("inf")
+    length = len(query)
+    # 查询串固定作为 pattern，位掩码表只需构建一次
+    peq = _pattern_masks(query)
+
+    for size in sorted(buckets, key=lambda s: abs(s - length)):
+        if abs(size - length) > limit:
+            break
+        for candidate in buckets[size]:
+            cutoff = None if limit == float("inf") else int(limit)
+            d = _myers_distance(query, candidate, cutoff, peq) if query else size
+            if d > limit:
+                continue
+            if len(best) < k or (d, candidate) < best[-1]:
+                insort(best, (d, candidate))
+                if len(best) > k:
+                    best.pop()
+                if len(best) == k:
+                    limit = min(limit, best[-1][0])
+    return best
+
+
+def _top_k_job(query: str, candidates: List[str], k: int,
+               max_distance: Optional[int]) -> List[Tuple[int, str]]:
+    """子进程任务: 对一段候选做 top-k (模块级函数以便 pickle)"""
+    return _top_k(query, _bucket_by_length(candidates), k, max_distance)
+
+
+_WORKER_BUCKETS: Dict[int, List[str]] = {}
+
+
+def _init_batch_worker(candidates: List[str]):
+    """子进程初始化: 每个进程只接收并分桶一次候选集"""
+    global _WORKER_BUCKETS
+    _WORKER_BUCKETS = _bucket_by_length(candidates)
+
+
+def _batch_job(queries: List[str], k: int,
+               max_distance: Optional[int]) -> List[List[Tuple[int, str]]]:
+    """子进程任务: 一批查询对进程内的候选集做 top-k"""
+    return [_top_k(query, _WORKER_BUCKETS, k, max_distance) for query in queries]
 
 
 class LevenshteinDistance:
@@ -35,18 +293,28 @@ class LevenshteinDistance:
         self.distance = 0
         self.operations = []
     
-    def compute(self, s1: str, s2: str, show_steps: bool = False) -> int:
+    def compute(self, s1: str, s2: str, show_steps: bool = False,
+                max_distance: Optional[int] = None) -> int:
         """
         计算两个字符串之间的编辑距离
         
+        不需要操作步骤时走快速路径 (位并行/带状 DP，不分配完整矩阵)。
+        
         Args:
             s1: 源字符串
             s2: 目标字符串
             show_steps: 是否显示操作步骤
+            max_distance: 距离上限，超过时提前结束并返回 max_distance + 1
+                (仅在 show_steps 为 False 时生效)
             
         Returns:
             int: 编辑距离
         """
+        if not show_steps:
+            self.distance = levenshtein(s1, s2, max_distance)
+            self.operations = []
+            return self.distance
+        
         m, n = len(s1), len(s2)
         
         # 创建DP表
@@ -133,6 +401,86 @@ class LevenshteinDistance:
             return 100.0
         return (1 - self.distance / max_len) * 100
     
+    def best_matches(self, query: str, candidates: Union[Iterable[str], BKTree], k: int = 5,
+                     max_distance: Optional[int] = None,
+                     workers: int = 1) -> List[Tuple[str, int]]:
+        """
+        在候选集中查找与 query 编辑距离最小的 k 个
+        
+        Args:
+            query: 查询字符串
+            candidates: 候选字符串，或预先构建好的 BKTree (适合反复查询同一词典)
+            k: 返回的数量
+            max_distance: 只返回距离不超过该值的候选
+            workers: 候选集很大时拆分到多个进程并行计算
+            
+        Returns:
+            List[Tuple[str, int]]: 按 (距离, 字符串) 排序的 (候选, 距离)
+        """
+        if isinstance(candidates, BKTree):
+            if max_distance is not None:
+                found = candidates.search(query, max_distance)
+            else:
+                # 逐步扩大半径，直到找到足够的候选
+                radius = 1
+                found = candidates.search(query, radius)
+                while len(found) < min(k, len(candidates)) and \
+                        radius < candidates.max_length + len(query):
+                    radius *= 2
+                    found = candidates.search(query, radius)
+            ranked = sorted((d, word) for word, d in found)[:k]
+            return [(word, d) for d, word in ranked]
+        
+        candidates = list(dict.fromkeys(candidates))
+        if workers > 1 and len(candidates) > workers:
+            size = -(-len(candidates) // workers)
+            chunks = [candidates[i:i + size] for i in range(0, len(candidates), size)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                parts = executor.map(_top_k_job, [query] * len(chunks), chunks,
+                                     [k] * len(chunks), [max_distance] * len(chunks))
+                ranked = sorted(item for part in parts for item in part)[:k]
+        else:
+            ranked = _top_k(query, _bucket_by_length(candidates), k, max_distance)
+        return [(word, d) for d, word in ranked]
+    
+    def best_matches_batch(self, queries: List[str], candidates: Iterable[str], k: int = 5,
+                           max_distance: Optional[int] = None, workers: Optional[int] = None,
+                           batch_size: int = 64) -> Dict[str, List[Tuple[str, int]]]:
+        """
+        批量模糊匹配: 每个查询返回 best_matches 的结果
+        
+        候选集只在每个子进程初始化时传输并分桶一次，查询按 batch_size 分批分发。
+        
+        Args:
+            queries: 查询字符串列表
+            candidates: 候选字符串
+            k: 每个查询返回的数量
+            max_distance: 距离上限
+            workers: 进程数，默认 CPU 核数；为 1 时在当前进程执行
+            batch_size: 每个任务包含的查询数
+            
+        Returns:
+            Dict[str, List[Tuple[str, int]]]: 查询 -> (候选, 距离) 列表
+        """
+        candidates = list(dict.fromkeys(candidates))
+        workers = workers or os.cpu_count() or 1
+        batches = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+        
+        if workers == 1 or len(batches) == 1:
+            buckets = _bucket_by_length(candidates)
+            results = [[_top_k(q, buckets, k, max_distance) for q in batch] for batch in batches]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                     initargs=(candidates,)) as executor:
+                results = list(executor.map(_batch_job, batches, [k] * len(batches),
+                                            [max_distance] * len(batches)))
+        
+        matches = {}
+        for batch, ranked_batch in zip(batches, results):
+            for query, ranked in zip(batch, ranked_batch):
+                matches[query] = [(word, d) for d, word in ranked]
+        return matches
+    
     def get_alignment(self, s1: str, s2: str) -> Tuple[str, str]:
         """
         获取两个字符串的对齐结果
@@ -249,21 +597,43 @@ def demo():
     print(f"  对齐结果:")
     print(f"    {aligned1}")
     print(f"    {aligned2}")
-    
+
+    # 测试用例6: 大规模模糊匹配
+    print("\n【测试6: 实体名模糊匹配】")
+    import random
+    import time
+    rng = random.Random(20)
+    syllables = ["zhang", "wang", "li", "zhao", "chen", "liu", "yang", "huang", "wu", "zhou"]
+    names = list({"".join(rng.choice(syllables) for _ in range(rng.randint(2, 3)))
+                  for _ in range(20000)})
+    tree = BKTree(names)
+    for query in ["zhanglwang", "chenliuyng", "wuzhouu"]:
+        start = time.time()
+        matches = calculator.best_matches(query, names, k=3)
+        linear_ms = (time.time() - start) * 1000
+        start = time.time()
+        tree_matches = calculator.best_matches(query, tree, k=3, max_distance=2)
+        tree_ms = (time.time() - start) * 1000
+        print(f"  '{query}': {matches}")
+        print(f"    长度过滤 {linear_ms:.1f}ms, BK 树 (距离≤2) {tree_ms:.1f}ms, 结果 {len(tree_matches)} 个")
+
     # 性能测试
     print("\n【性能测试】")
-    import time
     test_cases = [
         ("a" * 100, "a" * 99 + "b"),
         ("hello world", "hello python"),
         ("这是一段测试文本", "这是一段演示文本"),
+        ("abcdefgh" * 250, "abcdefgh" * 120 + "xy" + "abcdefgh" * 130),
     ]
     for s1, s2 in test_cases:
+        start = time.time()
+        full = calculator.compute(s1, s2, show_steps=True)
+        full_ms = (time.time() - start) * 1000
         start = time.time()
         dist = calculator.compute(s1, s2)
         elapsed = (time.time() - start) * 1000
         print(f"  '{s1[:20]}...' vs '{s2[:20]}...'")
-        print(f"    距离: {dist}, 耗时: {elapsed:.2f}ms")
+        print(f"    距离: {dist}, 耗时: {elapsed:.2f}ms (完整矩阵 {full} / {full_ms:.2f}ms)")
     
     print("\n" + "=" * 60)
     print("编辑距离是衡量两个字符串差异的核心算法！")
@@ -8,11 +8,13 @@ JSON Schema 验证器 - Day 14
 - 递归验证嵌套对象
 - 详细的错误报告
 - 支持自定义校验规则
+- Schema编译为验证器闭包 (预编译正则、$ref缓存、fail-fast、批量验证)
 """
 
 import json
+import time
 import re
-from typing import Any, Dict, List, Optional, Callable
+from typing import Any, Dict, Iterable, List, Optional, Callable, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
@@ -50,6 +52,20 @@ class ValidationResult:
         self.valid = False
 
 
+# 内置 format 正则
+FORMAT_PATTERNS: Dict[str, str] = {
+    "date-time": r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:\d{2})$",
+    "date": r"^\d{4}-\d{2}-\d{2}$",
+    "time": r"^\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:\d{2})?$",
+    "email": r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$",
+    "hostname": r"^[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*$",
+    "ipv4": r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$",
+    "ipv6": r"^(?:(?:[0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,7}:|(?:[0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,5}(?::[0-9a-fA-F]{1,4}){1,2}|(?:[0-9a-fA-F]{1,4}:){1,4}(?::[0-9a-fA-F]{1,4}){1,3}|(?:[0-9a-fA-F]{1,4}:){1,3}(?::[0-9a-fA-F]{1,4}){1,4}|(?:[0-9a-fA-F]{1,4}:){1,2}(?::[0-9a-fA-F]{1,4}){1,5}|[0-9a-fA-F]{1,4}:(?:(?::[0-9a-fA-F]{1,4}){1,6})|:(?:(?::[0-9a-fA-F]{1,4}){1,7}|:)|fe80:(?::[0-9a-fA-F]{0,4}){0,4}%[0-9a-zA-Z]{1,}|::(?:ffff(?::0{1,4}){0,1}:){0,1}(?:(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3}(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])|(?:[0-9a-fA-F]{1,4}:){1,4}:(?:(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3}(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9]))$",
+    "uri": r"^[a-zA-Z][a-zA-Z0-9+.-]*:[^\s]*$",
+    "uri-reference": r"^(?:[a-zA-Z][a-zA-Z0-9+.-]*:[^\s]*|#[^\s]*|/[^\s]*|\\[^\\s]*|[^\s]*)$",
+}
+
+
 class JSONSchemaValidator:
     """JSON Schema 验证器"""
     
@@ -65,7 +81,24 @@ class JSONSchemaValidator:
         result = ValidationResult(valid=True)
         self._validate_recursive(data, schema, [], result, "")
         return result
-    
+
+    def compile(self, schema: Dict, fail_fast: bool = False) -> "CompiledSchema":
+        """将Schema编译为可复用的验证器闭包树
+
+        同一Schema需要验证大量数据时，先编译一次再反复调用，
+        避免每次都重新解释Schema字典。
+        """
+        return SchemaCompiler(schema, self.custom_validators).compile(fail_fast)
+
+    def validate_many(
+        self,
+        items: Iterable[Any],
+        schema: Dict,
+        fail_fast: bool = False
+    ) -> List[ValidationResult]:
+        """使用同一Schema批量验证数据 (只编译一次)"""
+        return self.compile(schema, fail_fast).validate_many(items)
+
     def _validate_recursive(
         self, 
         data: Any, 
@@ -385,20 +418,8 @@ class JSONSchemaValidator:
         schema_path: str
     ):
         """验证字符串格式"""
-        patterns = {
-            "date-time": r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:\d{2})$",
-            "date": r"^\d{4}-\d{2}-\d{2}$",
-            "time": r"^\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:\d{2})?$",
-            "email": r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$",
-            "hostname": r"^[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*$",
-            "ipv4": r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$",
-            "ipv6": r"^(?:(?:[0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,7}:|(?:[0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,5}(?::[0-9a-fA-F]{1,4}){1,2}|(?:[0-9a-fA-F]{1,4}:){1,4}(?::[0-9a-fA-F]{1,4}){1,3}|(?:[0-9a-fA-F]{1,4}:){1,3}(?::[0-9a-fA-F]{1,4}){1,4}|(?:[0-9a-fA-F]{1,4}:){1,2}(?::[0-9a-fA-F]{1,4}){1,5}|[0-9a-fA-F]{1,4}:(?:(?::[0-9a-fA-F]{1,4}){1,6})|:(?:(?::[0-9a-fA-F]{1,4}){1,7}|:)|fe80:(?::[0-9a-fA-F]{0,4}){0,4}%[0-9a-zA-Z]{1,}|::(?:ffff(?::0{1,4}){0,1}:){0,1}(?:(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3}(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])|(?:[0-9a-fA-F]{1,4}:){1,4}:(?:(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3}(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9]))$",
-            "uri": r"^[a-zA-Z][a-zA-Z0-9+.-]*:[^\s]*$",
-            "uri-reference": r"^(?:[a-zA-Z][a-zA-Z0-9+.-]*:[^\s]*|#[^\s]*|/[^\s]*|\\[^\\s]*|[^\s]*)$",
-        }
-        
-        if format_type in patterns:
-            if not re.match(patterns[format_type], data):
+        if format_type in FORMAT_PATTERNS:
+            if not re.match(FORMAT_PATTERNS[format_type], data):
                 result.add_error(ValidationError(
                     path,
                     f"String does not match format '{format_type}'",
@@ -406,6 +427,642 @@ class JSONSchemaValidator:
                 ))
 
 
+# ==================== Schema 编译 ====================
+
+# 编译期预先构建的 format 正则
+COMPILED_FORMATS: Dict[str, "re.Pattern"] = {
+    name: re.compile(pattern) for name, pattern in FORMAT_PATTERNS.items()
+}
+
+# 各类型的判定函数 (bool 不算 number/integer)
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "null": lambda v: v is None,
+    "boolean": lambda v: isinstance(v, bool),
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool))
+                         or (isinstance(v, float) and v.is_integer()),
+    "string": lambda v: isinstance(v, str),
+}
+
+# 路径以 (父节点, 片段) 的链表形式传递，只有出错时才拼接成字符串
+PathNode = Optional[Tuple[Any, str]]
+NodeValidator = Callable[[Any, PathNode, "_ErrorSink"], None]
+
+
+def _render_path(node: PathNode) -> str:
+    """将惰性路径链表渲染为 a.b.[0] 形式的字符串"""
+    if node is None:
+        return "(root)"
+    parts = []
+    while node is not None:
+        node, segment = node
+        parts.append(segment)
+    parts.reverse()
+    return ".".join(parts)
+
+
+class _StopValidation(Exception):
+    """fail-fast/探测模式下用于提前终止验证"""
+
+
+class _ErrorSink:
+    """收集全部验证错误"""
+    __slots__ = ("errors",)
+
+    def __init__(self):
+        self.errors: List[ValidationError] = []
+
+    def add(self, path: PathNode, message: str, schema_path: str):
+        self.errors.append(ValidationError(_render_path(path), message, schema_path))
+
+
+class _FailFastSink(_ErrorSink):
+    """记录第一个错误后立即终止"""
+    __slots__ = ()
+
+    def add(self, path: PathNode, message: str, schema_path: str):
+        _ErrorSink.add(self, path, message, schema_path)
+        raise _StopValidation
+
+
+class _ProbeSink(_ErrorSink):
+    """只关心是否有效 (anyOf/oneOf/not 分支)，不构建任何错误对象"""
+    __slots__ = ()
+
+    def add(self, path: PathNode, message: str, schema_path: str):
+        raise _StopValidation
+
+
+_PROBE = _ProbeSink()
+
+
+def _accept(data: Any, path: PathNode, sink: _ErrorSink):
+    """空Schema: 接受任何数据"""
+
+
+def _probe(validator: NodeValidator, data: Any, path: PathNode) -> bool:
+    """以探测模式运行验证器，返回是否有效"""
+    try:
+        validator(data, path, _PROBE)
+        return True
+    except _StopValidation:
+        return False
+
+
+class CompiledSchema:
+    """编译后的Schema，可反复用于验证数据"""
+
+    def __init__(self, root: NodeValidator, fail_fast: bool = False):
+        self._root = root
+        self.fail_fast = fail_fast
+
+    def validate(self, data: Any) -> ValidationResult:
+        """验证数据，fail_fast 模式下只返回第一个错误"""
+        sink = _FailFastSink() if self.fail_fast else _ErrorSink()
+        try:
+            self._root(data, None, sink)
+        except _StopValidation:
+            pass
+        return ValidationResult(valid=not sink.errors, errors=sink.errors)
+
+    def is_valid(self, data: Any) -> bool:
+        """只判断是否有效，不构建错误信息 (最快路径)"""
+        return _probe(self._root, data, None)
+
+    def validate_many(self, items: Iterable[Any]) -> List[ValidationResult]:
+        """批量验证"""
+        validate = self.validate
+        return [validate(item) for item in items]
+
+
+class SchemaCompiler:
+    """将Schema字典编译为验证器闭包树
+
+    - 正则 (pattern/patternProperties/format) 在编译期预编译
+    - 本地 $ref (#/definitions/...、#/$defs/...) 解析后按引用缓存，支持递归Schema;
+      不经过子数据 (items/properties 等) 就回到自身的 $ref 环报告为错误
+    - anyOf/oneOf/not 以探测模式运行分支，不产生中间 ValidationResult
+
+    与解释执行的 validate() 相比，关键字按 Draft-07 语义作用:
+    字符串/数值/数组/对象约束只要数据类型匹配就生效，不要求声明 type;
+    pattern 使用 search 语义; bool 不视为 number/integer。
+    """
+
+    def __init__(self, schema: Any, custom_validators: Optional[Dict[str, Callable]] = None):
+        self.root_schema = schema
+        self.custom_validators = custom_validators or {}
+        self._ref_cache: Dict[str, List[Optional[NodeValidator]]] = {}
+        # 自上次进入子数据以来、仍作用于同一数据的 $ref 链
+        self._inplace_refs: List[str] = []
+
+    def compile(self, fail_fast: bool = False) -> CompiledSchema:
+        return CompiledSchema(self._compile(self.root_schema, "#"), fail_fast)
+
+    # ---------- $ref ----------
+
+    def _resolve_pointer(self, ref: str) -> Any:
+        """解析本地 JSON Pointer 引用"""
+        if not ref.startswith("#"):
+            raise KeyError(ref)
+        target = self.root_schema
+        pointer = ref[1:]
+        if not pointer:
+            return target
+        for token in pointer.lstrip("/").split("/"):
+            token = token.replace("~1", "/").replace("~0", "~")
+            if isinstance(target, list):
+                target = target[int(token)]
+            else:
+                target = target[token]
+        return target
+
+    def _compile_ref(self, ref: str, schema_path: str) -> NodeValidator:
+        if ref in self._inplace_refs:
+            # 环上没有消耗数据，展开只会无限递归
+            chain = self._inplace_refs[self._inplace_refs.index(ref):] + [ref]
+            message = f"$ref cycle: {' -> '.join(chain)}"
+
+            def cyclic(data, path, sink):
+                sink.add(path, message, schema_path)
+            return cyclic
+        cell = self._ref_cache.get(ref)
+        if cell is None:
+            try:
+                target = self._resolve_pointer(ref)
+            except (KeyError, IndexError, ValueError, TypeError):
+                message = f"$ref cannot be resolved: {ref}"
+
+                def unresolved(data, path, sink):
+                    sink.add(path, message, schema_path)
+                return unresolved
+            # 先占位再编译，递归引用通过 cell 间接调用
+            cell = [None]
+            self._ref_cache[ref] = cell
+            self._inplace_refs.append(ref)
+            try:
+                cell[0] = self._compile(target, ref)
+            finally:
+                self._inplace_refs.pop()
+        if cell[0] is not None:
+            return cell[0]
+
+        def deferred(data, path, sink):
+            cell[0](data, path, sink)
+        return deferred
+
+    # ---------- 编译 ----------
+
+    def _compile_child(self, schema: Any, schema_path: str) -> NodeValidator:
+        """编译作用于子数据 (数组元素、属性值等) 的子Schema，递归引用在此处断开 $ref 环"""
+        saved, self._inplace_refs = self._inplace_refs, []
+        try:
+            return self._compile(schema, schema_path)
+        finally:
+            self._inplace_refs = saved
+
+    def _compile(self, schema: Any, schema_path: str) -> NodeValidator:
+        if schema is True or schema == {}:
+            return _accept
+        if schema is False:
+            def reject(data, path, sink):
+                sink.add(path, "Schema is false, no value is allowed", schema_path)
+            return reject
+
+        # Draft-07: $ref 存在时忽略同级关键字
+        if "$ref" in schema:
+            return self._compile_ref(schema["$ref"], schema_path)
+
+        checks: List[NodeValidator] = []
+        checks.extend(self._compile_combinators(schema, schema_path))
+        checks.extend(self._compile_generic(schema, schema_path))
+        checks.extend(self._compile_string(schema, schema_path))
+        checks.extend(self._compile_number(schema, schema_path))
+        checks.extend(self._compile_array(schema, schema_path))
+        checks.extend(self._compile_object(schema, schema_path))
+
+        if not checks:
+            return _accept
+        if len(checks) == 1:
+            return checks[0]
+        checks_tuple = tuple(checks)
+
+        def node(data, path, sink):
+            for check in checks_tuple:
+                check(data, path, sink)
+        return node
+
+    def _compile_combinators(self, schema: Dict, sp: str) -> List[NodeValidator]:
+        checks: List[NodeValidator] = []
+
+        if "anyOf" in schema:
+            branches = [self._compile(s, f"{sp}/anyOf/{i}") for i, s in enumerate(schema["anyOf"])]
+            message = f"Data must match any of the schemas (tried {len(branches)})"
+
+            def check_any_of(data, path, sink):
+                for branch in branches:
+                    if _probe(branch, data, path):
+                        return
+                sink.add(path, message, sp)
+            checks.append(check_any_of)
+
+        if "oneOf" in schema:
+            branches = [self._compile(s, f"{sp}/oneOf/{i}") for i, s in enumerate(schema["oneOf"])]
+
+            def check_one_of(data, path, sink):
+                matches = 0
+                for branch in branches:
+                    if _probe(branch, data, path):
+                        matches += 1
+                        if matches > 1:
+                            break
+                if matches == 0:
+                    sink.add(path, "Data must match exactly one schema (0 matches)", sp)
+                elif matches > 1:
+                    sink.add(path, "Data matches more than one schema (should match exactly one)", sp)
+            checks.append(check_one_of)
+
+        if "allOf" in schema:
+            checks.extend(self._compile(s, f"{sp}/allOf/{i}") for i, s in enumerate(schema["allOf"]))
+
+        if "not" in schema:
+            negated = self._compile(schema["not"], f"{sp}/not")
+
+            def check_not(data, path, sink):
+                if _probe(negated, data, path):
+                    sink.add(path, "Data must not match the 'not' schema", sp)
+            checks.append(check_not)
+
+        if "if" in schema and ("then" in schema or "else" in schema):
+            condition = self._compile(schema["if"], f"{sp}/if")
+            then_branch = self._compile(schema.get("then", True), f"{sp}/then")
+            else_branch = self._compile(schema.get("else", True), f"{sp}/else")
+
+            def check_if(data, path, sink):
+                if _probe(condition, data, path):
+                    then_branch(data, path, sink)
+                else:
+                    else_branch(data, path, sink)
+            checks.append(check_if)
+
+        return checks
+
+    def _compile_generic(self, schema: Dict, sp: str) -> List[NodeValidator]:
+        checks: List[NodeValidator] = []
+
+        if "type" in schema:
+            expected = schema["type"]
+            names = expected if isinstance(expected, list) else [expected]
+            predicates = tuple(_TYPE_CHECKS[name] for name in names if name in _TYPE_CHECKS)
+            label = " or ".join(names)
+            if len(predicates) == 1:
+                predicate = predicates[0]
+
+                def check_type(data, path, sink):
+                    if not predicate(data):
+                        sink.add(path, f"Expected {label}, got {type(data).__name__}", sp)
+            else:
+                def check_type(data, path, sink):
+                    for predicate in predicates:
+                        if predicate(data):
+                            return
+                    sink.add(path, f"Expected {label}, got {type(data).__name__}", sp)
+            checks.append(check_type)
+
+        if "enum" in schema:
+            options = list(schema["enum"])
+            try:
+                hashed = frozenset(options)
+            except TypeError:
+                hashed = None
+
+            def check_enum(data, path, sink):
+                if hashed is not None:
+                    try:
+                        if data in hashed:
+                            return
+                    except TypeError:
+                        pass
+                if data not in options:
+                    sink.add(path, f"Value must be one of {options}, got {data}", sp)
+            checks.append(check_enum)
+
+        if "const" in schema:
+            const = schema["const"]
+
+            def check_const(data, path, sink):
+                if data != const:
+                    sink.add(path, f"Value must be exactly {const}, got {data}", sp)
+            checks.append(check_const)
+
+        return checks
+
+    def _compile_string(self, schema: Dict, sp: str) -> List[NodeValidator]:
+        rules: List[Callable[[str, PathNode, _ErrorSink], None]] = []
+
+        if "minLength" in schema:
+            min_length = schema["minLength"]
+
+            def min_len(data, path, sink):
+                if len(data) < min_length:
+                    sink.add(path, f"String length {len(data)} < minLength {min_length}", sp)
+            rules.append(min_len)
+
+        if "maxLength" in schema:
+            max_length = schema["maxLength"]
+
+            def max_len(data, path, sink):
+                if len(data) > max_length:
+                    sink.add(path, f"String length {len(data)} > maxLength {max_length}", sp)
+            rules.append(max_len)
+
+        if "pattern" in schema:
+            source = schema["pattern"]
+            search = re.compile(source).search
+
+            def pattern(data, path, sink):
+                if search(data) is None:
+                    sink.add(path, f"String does not match pattern: {source}", sp)
+            rules.append(pattern)
+
+        if "format" in schema:
+            format_type = schema["format"]
+            custom = self.custom_validators.get(format_type)
+            compiled = COMPILED_FORMATS.get(format_type)
+            if custom is not None:
+                def check_format(data, path, sink):
+                    if not custom(data):
+                        sink.add(path, f"String does not match format '{format_type}'", sp)
+                rules.append(check_format)
+            elif compiled is not None:
+                match = compiled.match
+
+                def check_format(data, path, sink):
+                    if match(data) is None:
+                        sink.add(path, f"String does not match format '{format_type}'", sp)
+                rules.append(check_format)
+
+        return [self._guard(str, rules)] if rules else []
+
+    def _compile_number(self, schema: Dict, sp: str) -> List[NodeValidator]:
+        rules: List[NodeValidator] = []
+        bounds = [
+            ("minimum", lambda v, b: v < b, "<"),
+            ("maximum", lambda v, b: v > b, ">"),
+            ("exclusiveMinimum", lambda v, b: v <= b, "<="),
+            ("exclusiveMaximum", lambda v, b: v >= b, ">="),
+        ]
+        for keyword, violates, op in bounds:
+            if keyword in schema:
+                rules.append(self._bound_rule(keyword, schema[keyword], violates, op, sp))
+
+        if "multipleOf" in schema:
+            divisor = schema["multipleOf"]
+
+            def multiple_of(data, path, sink):
+                if data % divisor != 0:
+                    sink.add(path, f"Value {data} is not a multiple of {divisor}", sp)
+            rules.append(multiple_of)
+
+        if not rules:
+            return []
+        rules_tuple = tuple(rules)
+
+        def check_number(data, path, sink):
+            if isinstance(data, (int, float)) and not isinstance(data, bool):
+                for rule in rules_tuple:
+                    rule(data, path, sink)
+        return [check_number]
+
+    @staticmethod
+    def _bound_rule(keyword: str, bound: Any, violates: Callable, op: str, sp: str) -> NodeValidator:
+        def rule(data, path, sink):
+            if violates(data, bound):
+                sink.add(path, f"Value {data} {op} {keyword} {bound}", sp)
+        return rule
+
+    def _compile_array(self, schema: Dict, sp: str) -> List[NodeValidator]:
+        rules: List[NodeValidator] = []
+
+        if "minItems" in schema:
+            min_items = schema["minItems"]
+
+            def check_min_items(data, path, sink):
+                if len(data) < min_items:
+                    sink.add(path, f"Array length {len(data)} < minItems {min_items}", sp)
+            rules.append(check_min_items)
+
+        if "maxItems" in schema:
+            max_items = schema["maxItems"]
+
+            def check_max_items(data, path, sink):
+                if len(data) > max_items:
+                    sink.add(path, f"Array length {len(data)} > maxItems {max_items}", sp)
+            rules.append(check_max_items)
+
+        if schema.get("uniqueItems"):
+            def check_unique(data, path, sink):
+                seen = set()
+                for item in data:
+                    key = json.dumps(item, sort_keys=True)
+                    if key in seen:
+                        sink.add(path, "Array items must be unique", sp)
+                        return
+                    seen.add(key)
+            rules.append(check_unique)
+
+        items = schema.get("items")
+        if isinstance(items, (dict, bool)):
+            item_validator = self._compile_child(items, f"{sp}/items")
+            if item_validator is not _accept:
+                def check_items(data, path, sink):
+                    for i, item in enumerate(data):
+                        item_validator(item, (path, f"[{i}]"), sink)
+                rules.append(check_items)
+        elif isinstance(items, list):
+            tuple_validators = [self._compile_child(s, f"{sp}/items/{i}") for i, s in enumerate(items)]
+            additional = schema.get("additionalItems", True)
+            extra_validator = self._compile_child(additional, f"{sp}/additionalItems")
+            expected = len(tuple_validators)
+
+            def check_tuple(data, path, sink):
+                if len(data) < expected:
+                    sink.add(path, f"Array length {len(data)} < items length {expected}", sp)
+                for i, (validator, item) in enumerate(zip(tuple_validators, data)):
+                    validator(item, (path, f"[{i}]"), sink)
+                if extra_validator is not _accept:
+                    for i in range(expected, len(data)):
+                        extra_validator(data[i], (path, f"[{i}]"), sink)
+            rules.append(check_tuple)
+
+        if "contains" in schema:
+            contained = self._compile_child(schema["contains"], f"{sp}/contains")
+
+            def check_contains(data, path, sink):
+                for i, item in enumerate(data):
+                    if _probe(contained, item, (path, f"[{i}]")):
+                        return
+                sink.add(path, "Array does not contain a matching item", sp)
+            rules.append(check_contains)
+
+        return [self._guard(list, rules)] if rules else []
+
+    def _compile_object(self, schema: Dict, sp: str) -> List[NodeValidator]:
+        rules: List[NodeValidator] = []
+
+        if "minProperties" in schema:
+            min_props = schema["minProperties"]
+
+            def check_min_props(data, path, sink):
+                if len(data) < min_props:
+                    sink.add(path, f"Object has {len(data)} properties, min is {min_props}", sp)
+            rules.append(check_min_props)
+
+        if "maxProperties" in schema:
+            max_props = schema["maxProperties"]
+
+            def check_max_props(data, path, sink):
+                if len(data) > max_props:
+                    sink.add(path, f"Object has {len(data)} properties, max is {max_props}", sp)
+            rules.append(check_max_props)
+
+        if "required" in schema:
+            required = tuple(schema["required"])
+
+            def check_required(data, path, sink):
+                for name in required:
+                    if name not in data:
+                        sink.add((path, name), f"Missing required property '{name}'", sp)
+            rules.append(check_required)
+
+        properties = schema.get("properties", {})
+        if properties:
+            prop_validators = tuple(
+                (name, self._compile_child(s, f"{sp}/properties/{name}"))
+                for name, s in properties.items()
+            )
+            prop_validators = tuple((n, v) for n, v in prop_validators if v is not _accept)
+            if prop_validators:
+                def check_properties(data, path, sink):
+                    for name, validator in prop_validators:
+                        if name in data:
+                            validator(data[name], (path, name), sink)
+                rules.append(check_properties)
+
+        pattern_validators = tuple(
+            (re.compile(p).search, self._compile_child(s, f"{sp}/patternProperties/{p}"))
+            for p, s in schema.get("patternProperties", {}).items()
+        )
+        if pattern_validators:
+            def check_pattern_props(data, path, sink):
+                for search, validator in pattern_validators:
+                    for name in data:
+                        if search(name) is not None:
+                            validator(data[name], (path, name), sink)
+            rules.append(check_pattern_props)
+
+        if "additionalProperties" in schema:
+            additional = schema["additionalProperties"]
+            known = frozenset(properties)
+            searches = tuple(search for search, _ in pattern_validators)
+
+            def is_additional(name):
+                if name in known:
+                    return False
+                for search in searches:
+                    if search(name) is not None:
+                        return False
+                return True
+
+            if additional is False:
+                def check_additional(data, path, sink):
+                    for name in data:
+                        if is_additional(name):
+                            sink.add((path, name), f"Additional property '{name}' not allowed", sp)
+                rules.append(check_additional)
+            else:
+                extra_validator = self._compile_child(additional, f"{sp}/additionalProperties")
+                if extra_validator is not _accept:
+                    def check_additional(data, path, sink):
+                        for name in data:
+                            if is_additional(name):
+                                extra_validator(data[name], (path, name), sink)
+                    rules.append(check_additional)
+
+        if "propertyNames" in schema:
+            name_validator = self._compile_child(schema["propertyNames"], f"{sp}/propertyNames")
+
+            def check_property_names(data, path, sink):
+                for name in data:
+                    name_validator(name, (path, name), sink)
+            rules.append(check_property_names)
+
+        for dep_property, deps in schema.get("dependencies", {}).items():
+            rules.append(self._dependency_rule(dep_property, deps, sp))
+
+        return [self._guard(dict, rules)] if rules else []
+
+    def _dependency_rule(self, dep_property: str, deps: Any, sp: str) -> NodeValidator:
+        if isinstance(deps, list):
+            dep_names = tuple(deps)
+
+            def check_dep_names(data, path, sink):
+                if dep_property in data:
+                    for dep in dep_names:
+                        if dep not in data:
+                            sink.add(path, f"Property '{dep}' is required when '{dep_property}' is present", sp)
+            return check_dep_names
+
+        dep_validator = self._compile(deps, f"{sp}/dependencies/{dep_property}")
+
+        def check_dep_schema(data, path, sink):
+            if dep_property in data:
+                dep_validator(data, path, sink)
+        return check_dep_schema
+
+    @staticmethod
+    def _guard(kind: type, rules: List[NodeValidator]) -> NodeValidator:
+        """只在数据类型匹配时才执行的一组规则"""
+        rules_tuple = tuple(rules)
+        if len(rules_tuple) == 1:
+            rule = rules_tuple[0]
+
+            def guarded_single(data, path, sink):
+                if isinstance(data, kind):
+                    rule(data, path, sink)
+            return guarded_single
+
+        def guarded(data, path, sink):
+            if isinstance(data, kind):
+                for rule in rules_tuple:
+                    rule(data, path, sink)
+        return guarded
+
+
+def benchmark_validation(schema: Dict, payloads: List[Any], rounds: int = 3) -> Dict[str, float]:
+    """对比解释执行与编译执行的吞吐量 (条/秒，取多轮最好成绩)"""
+    validator = JSONSchemaValidator()
+    compiled = validator.compile(schema)
+    compiled_fail_fast = validator.compile(schema, fail_fast=True)
+
+    runners = {
+        "interpreted": lambda: [validator.validate(p, schema) for p in payloads],
+        "compiled": lambda: compiled.validate_many(payloads),
+        "compiled_fail_fast": lambda: compiled_fail_fast.validate_many(payloads),
+        "compiled_is_valid": lambda: [compiled.is_valid(p) for p in payloads],
+    }
+    throughput = {}
+    for name, run in runners.items():
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        throughput[name] = len(payloads) / best if best > 0 else float("inf")
+    return throughput
+
+
 def demo():
     """演示JSON Schema验证器"""
     validator = JSONSchemaValidator()
@@ -509,7 +1166,34 @@ def demo():
     print(f"   有效: {result.valid}")
     for error in result.errors:
         print(f"   ✗ {error}")
-    
+
+    # 编译Schema + $ref
+    print("\n[4] 编译Schema ($ref 递归 + fail-fast):")
+    tree_schema = {
+        "$ref": "#/definitions/node",
+        "definitions": {
+            "node": {
+                "type": "object",
+                "properties": {
+                    "value": {"type": "integer"},
+                    "children": {"type": "array", "items": {"$ref": "#/definitions/node"}}
+                },
+                "required": ["value"]
+            }
+        }
+    }
+    tree = {"value": 1, "children": [{"value": 2}, {"value": "x", "children": [{}]}]}
+    compiled = validator.compile(tree_schema)
+    for error in compiled.validate(tree).errors:
+        print(f"   ✗ {error}")
+    first = validator.compile(tree_schema, fail_fast=True).validate(tree)
+    print(f"   fail-fast 只报告: {first.errors[0]}")
+
+    print("\n[5] 吞吐量基准 (条/秒):")
+    payloads = [valid_user, invalid_user] * 5000
+    for name, rate in benchmark_validation(user_schema, payloads).items():
+        print(f"   {name:<20} {rate:>12,.0f}")
+
     print("\n" + "=" * 60)
     print("验证完成!")
     print("=" * 60)
@@ -20,10 +20,13 @@ Version: 1.0.0
 import os
 import re
 import json
+import queue
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Callable
 from dataclasses import dataclass, field
 from enum import Enum
 import fnmatch
@@ -96,6 +99,64 @@ class SearchOptions:
     max_depth: Optional[int] = None
 
 
+# 内容匹配每次读取的字符数
+CONTENT_CHUNK_SIZE = 64 * 1024
+# 正则匹配时相邻分块保留的重叠字符数，跨度更长的匹配不保证能命中
+REGEX_OVERLAP = 4096
+# 遍历以 I/O 等待为主（尤其是网络文件系统），线程数可以明显多于 CPU 核数
+DEFAULT_WALK_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# 遍历线程发往生成器的消息类型
+_MATCH, _SPAWN, _DONE = range(3)
+
+
+def _compile_name_pattern(pattern: Optional[str],
+                          case_sensitive: bool) -> Optional[Callable[[str], object]]:
+    """把通配符模式预编译为正则，避免每个文件都重新解析模式"""
+    if not pattern:
+        return None
+    flags = 0 if case_sensitive else re.IGNORECASE
+    return re.compile(fnmatch.translate(pattern), flags).match
+
+
+class ContentMatcher:
+    """流式内容匹配: 分块读取文件，命中即返回，不把整个文件读入内存"""
+    
+    def __init__(self, pattern: str, use_regex: bool = False, case_sensitive: bool = False):
+        self.case_sensitive = case_sensitive
+        if use_regex:
+            self._regex = re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+            self._needle = None
+            self._overlap = REGEX_OVERLAP
+        else:
+            self._regex = None
+            self._needle = pattern if case_sensitive else pattern.lower()
+            # 保留 len-1 个字符即可覆盖所有跨块的子串
+            self._overlap = max(len(self._needle) - 1, 0)
+    
+    def _search(self, text: str) -> bool:
+        if self._regex is not None:
+            return self._regex.search(text) is not None
+        return self._needle in text
+    
+    def matches(self, path: str) -> bool:
+        try:
+            with open(path, 'r', errors='ignore') as f:
+                tail = ''
+                while True:
+                    chunk = f.read(CONTENT_CHUNK_SIZE)
+                    if not chunk:
+                        return False
+                    if self._needle is not None and not self.case_sensitive:
+                        chunk = chunk.lower()
+                    window = tail + chunk
+                    if self._search(window):
+                        return True
+                    tail = window[-self._overlap:] if self._overlap else ''
+        except (UnicodeDecodeError, OSError):
+            return False
+
+
 class FileSearcher:
     FILE_TYPE_MAPPINGS = {
         FileType.TEXT: {'txt', 'md', 'rst', 'log', 'json', 'yaml', 'yml', 'xml', 'html', 'htm', 'css'},
@@ -117,43 +178,104 @@ class FileSearcher:
         self.base_path = Path(base_path).resolve()
         self.results: List[Dict] = []
         
-    def search(self, options: SearchOptions) -> List[Dict]:
+    def search(self, options: SearchOptions, workers: Optional[int] = None) -> List[Dict]:
         self.results = []
         
         print(f"{Colors.info('🔍 开始搜索...')}")
         print(f"{Colors.DIM}搜索目录: {self.base_path}{Colors.RESET}\n")
         
-        self._search_recursive(self.base_path, options, current_depth=0)
+        self.results.extend(self.iter_search(options, workers))
+        # 并发遍历的产出顺序不固定，汇总时按相对路径排序保证输出稳定
+        self.results.sort(key=lambda r: r['relative_path'])
         self._print_summary(options)
         return self.results
     
-    def _search_recursive(self, path: Path, options: SearchOptions, current_depth: int):
-        if options.max_depth is not None and current_depth > options.max_depth:
-            return
-            
+    def iter_search(self, options: SearchOptions, workers: Optional[int] = None) -> Iterator[Dict]:
+        """
+        并发遍历目录树，边找边产出匹配结果
+        
+        每个目录作为一个任务提交到线程池，子目录在扫描后继续提交，
+        匹配结果经队列立即交给调用方，第一个命中无需等待整棵树遍历完成。
+        提前关闭生成器会停止尚未开始的目录任务。
+        """
+        name_match = _compile_name_pattern(options.name_pattern, options.case_sensitive)
+        matcher = None
+        if options.content_pattern:
+            matcher = ContentMatcher(options.content_pattern, options.content_regex,
+                                     options.case_sensitive)
+        
+        messages: queue.Queue = queue.Queue()
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=workers or DEFAULT_WALK_WORKERS,
+                                      thread_name_prefix='fsfind')
+        
+        def scan(path: str, depth: int):
+            try:
+                subdirs = self._scan_directory(path, options, name_match, matcher,
+                                               lambda info: messages.put((_MATCH, info)), stop)
+                if options.max_depth is not None and depth + 1 > options.max_depth:
+                    subdirs = []
+                if stop.is_set():
+                    subdirs = []
+                # 先登记子任务数再提交，保证消费者看到子任务的 _DONE 之前已计入
+                messages.put((_SPAWN, len(subdirs)))
+                for subdir in subdirs:
+                    executor.submit(scan, subdir, depth + 1)
+            except RuntimeError:
+                # 消费者已关闭生成器，线程池拒绝新任务
+                pass
+            finally:
+                messages.put((_DONE, None))
+        
+        outstanding = 1
+        executor.submit(scan, str(self.base_path), 0)
         try:
-            for item in path.iterdir():
-                if not options.include_hidden and item.name.startswith('.'):
-                    continue
-                    
-                if item.is_dir() and item.name in self.DEFAULT_EXCLUDE_DIRS:
-                    continue
-                    
-                if self._should_exclude(item.name, options.exclude_patterns):
-                    continue
+            while outstanding:
+                kind, payload = messages.get()
+                if kind == _MATCH:
+                    yield payload
+                elif kind == _SPAWN:
+                    outstanding += payload
+                else:
+                    outstanding -= 1
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _scan_directory(self, path: str, options: SearchOptions,
+                        name_match: Optional[Callable[[str], object]],
+                        matcher: Optional['ContentMatcher'],
+                        emit: Callable[[Dict], None], stop: threading.Event) -> List[str]:
+        """扫描单个目录，匹配的文件交给 emit，返回需要继续遍历的子目录"""
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if stop.is_set():
+                        break
+                    name = entry.name
+                    if not options.include_hidden and name.startswith('.'):
+                        continue
+                    if self._should_exclude(name, options.exclude_patterns):
+                        continue
                     
-                if item.is_file():
-                    if self._matches_options(item, options):
-                        file_info = self._get_file_info(item)
-                        self.results.append(file_info)
+                    try:
+                        # 不跟随目录符号链接，避免链接成环时无限遍历
+                        if entry.is_dir(follow_symlinks=False):
+                            if name not in self.DEFAULT_EXCLUDE_DIRS:
+                                subdirs.append(entry.path)
+                        elif entry.is_file():
+                            file_info = self._match_entry(entry, options, name_match, matcher)
+                            if file_info is not None:
+                                emit(file_info)
+                    except OSError:
+                        continue
                         
-                elif item.is_dir():
-                    self._search_recursive(item, options, current_depth + 1)
-                    
         except PermissionError:
             print(f"{Colors.warning('⚠️  权限不足，跳过:')} {path}")
-        except Exception as e:
+        except OSError as e:
             print(f"{Colors.error('❌ 错误:')} {e}")
+        return subdirs
     
     def _should_exclude(self, name: str, patterns: List[str]) -> bool:
         for pattern in patterns:
@@ -161,59 +283,47 @@ class FileSearcher:
                 return True
         return False
     
-    def _matches_options(self, file_path: Path, options: SearchOptions) -> bool:
-        if options.name_pattern:
-            match_fn = fnmatch.fnmatch if not options.case_sensitive else lambda f, p: fnmatch.fnmatch(f.lower(), p.lower())
-            if not match_fn(file_path.name, options.name_pattern):
-                return False
-        
-        if options.content_pattern:
-            if not self._matches_content(file_path, options.content_pattern, options.content_regex):
-                return False
+    def _match_entry(self, entry: os.DirEntry, options: SearchOptions,
+                     name_match: Optional[Callable[[str], object]],
+                     matcher: Optional['ContentMatcher']) -> Optional[Dict]:
+        """按从廉价到昂贵的顺序检查条件: 文件名 → 类型 → 大小/时间 → 内容"""
+        if name_match and not name_match(entry.name):
+            return None
         
         if options.file_type != FileType.ALL:
-            ext = file_path.suffix.lstrip('.').lower()
+            ext = os.path.splitext(entry.name)[1].lstrip('.').lower()
             valid_exts = self.FILE_TYPE_MAPPINGS.get(options.file_type, set())
             if ext not in valid_exts:
-                return False
+                return None
         
-        file_size = file_path.stat().st_size
-        if options.min_size and file_size < options.min_size:
-            return False
-        if options.max_size and file_size > options.max_size:
-            return False
+        # DirEntry 缓存 stat 结果，后续生成文件信息时不再重复系统调用
+        stat = entry.stat()
+        if options.min_size and stat.st_size < options.min_size:
+            return None
+        if options.max_size and stat.st_size > options.max_size:
+            return None
         
         if options.min_mtime or options.max_mtime:
-            mtime = datetime.fromtimestamp(file_path.stat().st_mtime)
+            mtime = datetime.fromtimestamp(stat.st_mtime)
             if options.min_mtime and mtime < options.min_mtime:
-                return False
+                return None
             if options.max_mtime and mtime > options.max_mtime:
-                return False
+                return None
         
-        return True
-    
-    def _matches_content(self, file_path: Path, pattern: str, use_regex: bool) -> bool:
-        try:
-            content = file_path.read_text(errors='ignore')
-            
-            if use_regex:
-                flags = 0 if options.case_sensitive else re.IGNORECASE
-                return bool(re.search(pattern, content, flags))
-            else:
-                return pattern.lower() in content.lower()
-                
-        except (UnicodeDecodeError, PermissionError):
-            return False
+        if matcher and not matcher.matches(entry.path):
+            return None
+        
+        return self._get_file_info(entry, stat)
     
-    def _get_file_info(self, file_path: Path) -> Dict:
-        stat = file_path.stat()
-        mime_type, _ = mimetypes.guess_type(str(file_path))
+    def _get_file_info(self, entry: os.DirEntry, stat: os.stat_result) -> Dict:
+        mime_type, _ = mimetypes.guess_type(entry.name)
+        base_prefix = os.path.join(str(self.base_path), '')
         
         return {
-            'path': str(file_path),
-            'relative_path': str(file_path.relative_to(self.base_path)),
-            'name': file_path.name,
-            'extension': file_path.suffix.lstrip('.'),
+            'path': entry.path,
+            'relative_path': entry.path[len(base_prefix):],
+            'name': entry.name,
+            'extension': os.path.splitext(entry.name)[1].lstrip('.'),
             'size': stat.st_size,
             'size_human': self._format_size(stat.st_size),
             'mtime': datetime.fromtimestamp(stat.st_mtime).isoformat(),
@@ -322,6 +432,7 @@ def create_argument_parser() -> argparse.ArgumentParser:
   {Colors.info('$ fsfind -e "__pycache__"')}    # 排除特定目录
   {Colors.info('$ fsfind --max-size 1M')}       # 查找小于1MB的文件
   {Colors.info('$ fsfind -o results.json -f json')}  # 导出结果
+  {Colors.info('$ fsfind -c "TODO" --stream -j 16')}  # 16线程并发，边找边输出
         """
     )
     
@@ -340,6 +451,9 @@ def create_argument_parser() -> argparse.ArgumentParser:
     parser.add_argument('-e', '--exclude', action='append', default=[], help='排除的模式')
     parser.add_argument('--include-hidden', action='store_true', help='包含隐藏文件')
     parser.add_argument('--max-depth', type=int, help='最大搜索深度')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help=f'并发遍历线程数 (默认: {DEFAULT_WALK_WORKERS})')
+    parser.add_argument('--stream', action='store_true', help='找到即输出路径，不等待搜索结束')
     
     parser.add_argument('path', nargs='?', default='.', help='搜索起始路径')
     
@@ -370,7 +484,14 @@ def main():
     )
     
     searcher = FileSearcher(args.path)
-    results = searcher.search(options)
+    if args.stream:
+        searcher.results = []
+        for file_info in searcher.iter_search(options, args.workers):
+            print(file_info['relative_path'], flush=True)
+            searcher.results.append(file_info)
+        results = searcher.results
+    else:
+        results = searcher.search(options, args.workers)
     
     if args.output and results:
         searcher.export_results(args.output, args.format)
@@ -6,11 +6,13 @@
 
 功能特性:
 - LCS (最长公共子序列) 差异检测
-- Myers 差分算法 (git diff 默认算法)
+- Myers 差分算法 (git diff 默认算法，线性空间)
+- Patience / Histogram 差分算法
 - 多种输出格式: 统一格式(unified)、并排格式(side-by-side)、命令行格式(console)
 - 统计摘要: 插入/删除/修改行数统计
 - 忽略空白行和注释行 (支持多种编程语言)
 - 批量比较多个文件
+- 目录比较: 按相对路径配对，大小/哈希相同的文件跳过，多进程并行
 - 输出格式: 终端高亮、HTML、JSON、Markdown
 
 作者: AI Assistant
@@ -22,9 +24,14 @@ import os
 import json
 import difflib
 import re
+import bisect
+import time
+import random
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Iterator
 from collections import defaultdict
 
 
@@ -32,6 +39,8 @@ class DiffAlgorithm(Enum):
     """差分算法类型"""
     LCS = "lcs"           # 最长公共子序列
     MYERS = "myers"       # Myers差分算法 (默认)
+    PATIENCE = "patience" # Patience差分 (以唯一行为锚点)
+    HISTOGRAM = "histogram" # Histogram差分 (git --histogram)
     SEQUENCE = "sequence" # Python difflib.SequenceMatcher
 
 
@@ -102,7 +111,7 @@ class IgnorePatterns:
             r'^\s*//.*$',
             r'^\s*/\*[\s\S]*?\*/\s*$',
             r'^\s*\*.*$',                   # Javadoc风格
-        },
+        ],
         'c': [
             r'^\s*//.*$',
             r'^\s*/\*[\s\S]*?\*/\s*$',
@@ -142,6 +151,272 @@ class IgnorePatterns:
         return False
 
 
+# 直方图算法中出现次数超过该值的行不作为锚点，避免在重复行上退化
+HISTOGRAM_MAX_CHAIN = 64
+
+# 输出差异块时保留的上下文行数 (与 git diff 一致)
+DEFAULT_CONTEXT_LINES = 3
+
+
+def intern_lines(lines_a: List[str], lines_b: List[str]) -> Tuple[List[int], List[int]]:
+    """把行映射为整数 ID，后续比较只做整数比较"""
+    ids: Dict[str, int] = {}
+    a = [ids.setdefault(line, len(ids)) for line in lines_a]
+    b = [ids.setdefault(line, len(ids)) for line in lines_b]
+    return a, b
+
+
+def _middle_snake(a: List[int], b: List[int], alo: int, ahi: int,
+                  blo: int, bhi: int) -> Tuple[int, int, int, int]:
+    """Myers 中间蛇：同时从两端搜索 D-path，返回重叠处蛇的起止点 (相对 alo/blo)"""
+    n, m = ahi - alo, bhi - blo
+    delta = n - m
+    odd = delta & 1
+    max_d = (n + m + 1) // 2
+    offset = max_d + 1
+    vf = [0] * (2 * max_d + 3)
+    vb = [0] * (2 * max_d + 3)
+    
+    for d in range(max_d + 1):
+        # 正向
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and vf[offset + k - 1] < vf[offset + k + 1]):
+                x = vf[offset + k + 1]
+            else:
+                x = vf[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            vf[offset + k] = x
+            if odd and -(d - 1) <= delta - k <= d - 1 and x + vb[offset + delta - k] >= n:
+                return x0, y0, x, y
+        
+        # 反向 (在倒序序列上搜索，对角线 delta - k 对应正向的 k)
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and vb[offset + k - 1] < vb[offset + k + 1]):
+                x = vb[offset + k + 1]
+            else:
+                x = vb[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[ahi - 1 - x] == b[bhi - 1 - y]:
+                x += 1
+                y += 1
+            vb[offset + k] = x
+            if not odd and -d <= delta - k <= d and x + vf[offset + delta - k] >= n:
+                return n - x, m - y, n - x0, m - y0
+    
+    raise AssertionError("middle snake not found")
+
+
+def _trim_range(a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+                matches: List[Tuple[int, int]]) -> Tuple[int, int, int, int]:
+    """去掉区间的公共前缀和后缀，并记录为匹配"""
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        matches.append((alo, blo))
+        alo += 1
+        blo += 1
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+        matches.append((ahi, bhi))
+    return alo, ahi, blo, bhi
+
+
+def _myers_range(a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+                 matches: List[Tuple[int, int]]):
+    """线性空间 Myers 算法 (分治 + 中间蛇)，用显式栈代替递归"""
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        alo, ahi, blo, bhi = _trim_range(a, b, *stack.pop(), matches)
+        if alo == ahi or blo == bhi:
+            continue
+        x0, y0, x1, y1 = _middle_snake(a, b, alo, ahi, blo, bhi)
+        matches.extend((alo + x0 + t, blo + y0 + t) for t in range(x1 - x0))
+        stack.append((alo + x1, ahi, blo + y1, bhi))
+        stack.append((alo, alo + x0, blo, blo + y0))
+
+
+def _patience_anchors(a: List[int], b: List[int], alo: int, ahi: int,
+                      blo: int, bhi: int) -> List[Tuple[int, int]]:
+    """两边都只出现一次的行，按最长递增子序列选出互不交叉的锚点"""
+    counts: Dict[int, int] = {}
+    position_a: Dict[int, int] = {}
+    for i in range(alo, ahi):
+        counts[a[i]] = counts.get(a[i], 0) + 1
+        position_a[a[i]] = i
+    counts_b: Dict[int, int] = {}
+    position_b: Dict[int, int] = {}
+    for j in range(blo, bhi):
+        if counts.get(b[j]) == 1:
+            counts_b[b[j]] = counts_b.get(b[j], 0) + 1
+            position_b[b[j]] = j
+    
+    pairs = sorted((position_a[line], position_b[line]) for line, c in counts_b.items() if c == 1)
+    if not pairs:
+        return []
+    
+    # 耐心排序求 b 下标的最长递增子序列
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pos = bisect.bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[pos] = j
+            tail_index[pos] = index
+        previous[index] = tail_index[pos - 1] if pos > 0 else -1
+    
+    anchors = []
+    index = tail_index[-1]
+    while index >= 0:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _patience_range(a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+                    matches: List[Tuple[int, int]]):
+    """Patience 算法：以唯一行为锚点切分，没有锚点的区间退回 Myers"""
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        alo, ahi, blo, bhi = _trim_range(a, b, *stack.pop(), matches)
+        if alo == ahi or blo == bhi:
+            continue
+        anchors = _patience_anchors(a, b, alo, ahi, blo, bhi)
+        if not anchors:
+            _myers_range(a, b, alo, ahi, blo, bhi, matches)
+            continue
+        i, j = alo, blo
+        for ai, bj in anchors:
+            matches.append((ai, bj))
+            stack.append((i, ai, j, bj))
+            i, j = ai + 1, bj + 1
+        stack.append((i, ahi, j, bhi))
+
+
+def _histogram_range(a: List[int], b: List[int], alo: int, ahi: int, blo: int, bhi: int,
+                     matches: List[Tuple[int, int]]):
+    """直方图算法 (git --histogram)：以出现次数最少的公共行扩展出匹配区域再切分"""
+    stack = [(alo, ahi, blo, bhi)]
+    while stack:
+        alo, ahi, blo, bhi = _trim_range(a, b, *stack.pop(), matches)
+        if alo == ahi or blo == bhi:
+            continue
+        
+        occurrences: Dict[int, List[int]] = defaultdict(list)
+        for i in range(alo, ahi):
+            occurrences[a[i]].append(i)
+        
+        best = None   # (出现次数, -区域长度, a起点, b起点, 长度)
+        j = blo
+        while j < bhi:
+            chain = occurrences.get(b[j])
+            if not chain or len(chain) > HISTOGRAM_MAX_CHAIN or (best and len(chain) > best[0]):
+                j += 1
+                continue
+            next_j = j + 1
+            for i in chain:
+                sa, sb = i, j
+                while sa > alo and sb > blo and a[sa - 1] == b[sb - 1]:
+                    sa -= 1
+                    sb -= 1
+                ea, eb = i + 1, j + 1
+                while ea < ahi and eb < bhi and a[ea] == b[eb]:
+                    ea += 1
+                    eb += 1
+                candidate = (len(chain), -(ea - sa), sa, sb, ea - sa)
+                if best is None or candidate < best:
+                    best = candidate
+                next_j = max(next_j, eb)
+            j = next_j
+        
+        if best is None:
+            _myers_range(a, b, alo, ahi, blo, bhi, matches)
+            continue
+        _, _, sa, sb, length = best
+        matches.extend((sa + t, sb + t) for t in range(length))
+        stack.append((sa + length, ahi, sb + length, bhi))
+        stack.append((alo, sa, blo, sb))
+
+
+_RANGE_DIFFS = {
+    'myers': _myers_range,
+    'patience': _patience_range,
+    'histogram': _histogram_range,
+}
+
+
+def diff_opcodes(lines_a: List[str], lines_b: List[str],
+                 algorithm: str = 'myers') -> List[Tuple[str, int, int, int, int]]:
+    """计算差异操作码，格式与 difflib.SequenceMatcher.get_opcodes() 相同
+    
+    Args:
+        lines_a: 原始行列表
+        lines_b: 新行列表
+        algorithm: myers / patience / histogram
+        
+    Returns:
+        [(tag, i1, i2, j1, j2), ...]，tag 为 equal/replace/delete/insert
+    """
+    a, b = intern_lines(lines_a, lines_b)
+    matches: List[Tuple[int, int]] = []
+    _RANGE_DIFFS[algorithm](a, b, 0, len(a), 0, len(b), matches)
+    matches.sort()
+    matches.append((len(a), len(b)))
+    
+    opcodes = []
+    i = j = 0
+    for ai, bj in matches:
+        if i < ai and j < bj:
+            opcodes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            opcodes.append(('delete', i, ai, j, j))
+        elif j < bj:
+            opcodes.append(('insert', i, i, j, bj))
+        if ai < len(a):
+            if opcodes and opcodes[-1][0] == 'equal':
+                tag, i1, _, j1, _ = opcodes[-1]
+                opcodes[-1] = ('equal', i1, ai + 1, j1, bj + 1)
+            else:
+                opcodes.append(('equal', ai, ai + 1, bj, bj + 1))
+        i, j = ai + 1, bj + 1
+    return opcodes
+
+
+def group_opcodes(opcodes: List[Tuple[str, int, int, int, int]],
+                  context: int = DEFAULT_CONTEXT_LINES) -> List[List[Tuple[str, int, int, int, int]]]:
+    """按上下文行数把操作码分组为差异块 (同 difflib.get_grouped_opcodes)"""
+    if not opcodes:
+        return []
+    codes = list(opcodes)
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+    
+    groups = []
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > context * 2:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        groups.append(group)
+    return groups
+
+
 class SmartDiff:
     """智能文本差异比较器"""
     
@@ -225,6 +500,10 @@ class SmartDiff:
         # 根据算法选择比较方法
         if self.algorithm == DiffAlgorithm.LCS:
             hunks = self._compare_lcs(lines_a, lines_b)
+        elif self.algorithm == DiffAlgorithm.PATIENCE:
+            hunks = self._compare_patience(lines_a, lines_b)
+        elif self.algorithm == DiffAlgorithm.HISTOGRAM:
+            hunks = self._compare_histogram(lines_a, lines_b)
         elif self.algorithm == DiffAlgorithm.SEQUENCE:
             hunks = self._compare_sequence(lines_a, lines_b)
         else:  # MYERS (default)
@@ -245,53 +524,82 @@ class SmartDiff:
     
     def _compare_myers(self, lines_a: List[str], lines_b: List[str]) -> List[DiffHunk]:
         """使用 Myers 算法比较 (类似 git diff)"""
-        # 标准化行 (去除换行符用于比较)
+        return self._compare_with(lines_a, lines_b, 'myers')
+    
+    def _compare_patience(self, lines_a: List[str], lines_b: List[str]) -> List[DiffHunk]:
+        """使用 Patience 算法比较 (git diff --patience)"""
+        return self._compare_with(lines_a, lines_b, 'patience')
+    
+    def _compare_histogram(self, lines_a: List[str], lines_b: List[str]) -> List[DiffHunk]:
+        """使用 Histogram 算法比较 (git diff --histogram)"""
+        return self._compare_with(lines_a, lines_b, 'histogram')
+    
+    def _compare_with(self, lines_a: List[str], lines_b: List[str], algorithm: str) -> List[DiffHunk]:
+        """计算操作码并直接生成带上下文的差异块"""
         a = [line.rstrip('\n') for line in lines_a]
         b = [line.rstrip('\n') for line in lines_b]
         
-        # 使用 difflib 生成 unified diff
-        diff = difflib.unified_diff(a, b, fromfile='a', tofile='b', lineterm='')
-        diff_lines = list(diff)
+        opcodes = diff_opcodes(a, b, algorithm)
+        return [self._build_hunk_from_opcodes(group, a, b) for group in group_opcodes(opcodes)]
+    
+    def _build_hunk_from_opcodes(self, group: List[Tuple[str, int, int, int, int]],
+                                 a: List[str], b: List[str]) -> DiffHunk:
+        """把一组操作码转换为差异块，行号与 unified diff 的块头一致"""
+        i1, i2 = group[0][1], group[-1][2]
+        j1, j2 = group[0][3], group[-1][4]
+        hunk = DiffHunk(
+            old_start=i1 + 1 if i2 > i1 else i1,
+            old_lines=i2 - i1,
+            new_start=j1 + 1 if j2 > j1 else j1,
+            new_lines=j2 - j1,
+            lines=[]
+        )
         
-        return self._parse_unified_diff(diff_lines)
+        for tag, oi1, oi2, oj1, oj2 in group:
+            if tag == 'equal':
+                for offset in range(oi2 - oi1):
+                    hunk.lines.append(DiffLine(
+                        line_number=oi1 + offset + 1,
+                        line_type=LineType.UNCHANGED,
+                        content=a[oi1 + offset],
+                        old_line_number=oi1 + offset + 1,
+                        new_line_number=oj1 + offset + 1
+                    ))
+                continue
+            for i in range(oi1, oi2):
+                hunk.lines.append(DiffLine(
+                    line_number=i + 1,
+                    line_type=LineType.DELETED,
+                    content=a[i],
+                    old_line_number=i + 1
+                ))
+            for j in range(oj1, oj2):
+                hunk.lines.append(DiffLine(
+                    line_number=j + 1,
+                    line_type=LineType.INSERTED,
+                    content=b[j],
+                    new_line_number=j + 1
+                ))
+        
+        return hunk
     
     def _compare_lcs(self, lines_a: List[str], lines_b: List[str]) -> List[DiffHunk]:
-        """使用 LCS 算法比较"""
+        """使用 LCS 算法比较，输出包含全部行的单个差异块
+        
+        Myers 的最短编辑脚本即最长公共子序列，用线性空间实现代替 m×n 动态规划表。
+        """
         a = [line.rstrip('\n') for line in lines_a]
         b = [line.rstrip('\n') for line in lines_b]
         
-        # 计算 LCS
-        m, n = len(a), len(b)
-        dp = [[0] * (n + 1) for _ in range(m + 1)]
-        
-        for i in range(1, m + 1):
-            for j in range(1, n + 1):
-                if a[i-1] == b[j-1]:
-                    dp[i][j] = dp[i-1][j-1] + 1
-                else:
-                    dp[i][j] = max(dp[i-1][j], dp[i][j-1])
-        
-        # 回溯找出差异
-        hunks = []
-        i, j = m, n
         changes = []
+        for tag, i1, i2, j1, j2 in diff_opcodes(a, b, 'myers'):
+            if tag == 'equal':
+                changes.extend(('unchanged', i1 + k + 1, j1 + k + 1, a[i1 + k]) for k in range(i2 - i1))
+                continue
+            changes.extend(('deleted', i + 1, j1, a[i]) for i in range(i1, i2))
+            changes.extend(('inserted', i2, j + 1, b[j]) for j in range(j1, j2))
         
-        while i > 0 or j > 0:
-            if i > 0 and j > 0 and a[i-1] == b[j-1]:
-                changes.append(('unchanged', i, j, a[i-1]))
-                i -= 1
-                j -= 1
-            elif j > 0 and (i == 0 or dp[i][j-1] >= dp[i-1][j]):
-                changes.append(('inserted', i, j-1, b[j-1]))
-                j -= 1
-            else:
-                changes.append(('deleted', i-1, j, a[i-1]))
-                i -= 1
-        
-        changes.reverse()
-        hunks.append(self._build_hunk_from_changes(changes, len(lines_a), len(lines_b)))
-        
-        return hunks
+        return [self._build_hunk_from_changes(changes, len(lines_a), len(lines_b))]
     
     def _compare_sequence(self, lines_a: List[str], lines_b: List[str]) -> List[DiffHunk]:
         """使用 Python SequenceMatcher 比较"""
@@ -334,63 +642,6 @@ class SmartDiff:
         
         return hunks
     
-    def _parse_unified_diff(self, diff_lines: List[str]) -> List[DiffHunk]:
-        """解析 unified diff 格式"""
-        hunks = []
-        current_hunk = None
-        
-        for line in diff_lines:
-            if line.startswith('---'):
-                continue
-            if line.startswith('+++'):
-                continue
-            
-            if line.startswith('@@'):
-                if current_hunk:
-                    hunks.append(current_hunk)
-                
-                # 解析 @@ -old,len +new,len @@
-                match = re.match(r'@@ -(\d+),?(\d*) \+(\d+),?(\d*) @@', line)
-                if match:
-                    old_start = int(match.group(1))
-                    old_lines = int(match.group(2)) if match.group(2) else 1
-                    new_start = int(match.group(3))
-                    new_lines = int(match.group(4)) if match.group(4) else 1
-                    
-                    current_hunk = DiffHunk(
-                        old_start=old_start,
-                        old_lines=old_lines,
-                        new_start=new_start,
-                        new_lines=new_lines,
-                        lines=[]
-                    )
-            elif current_hunk is not None:
-                if line.startswith('-'):
-                    current_hunk.lines.append(DiffLine(
-                        line_number=current_hunk.old_start + len([l for l in current_hunk.lines if l.line_type == LineType.INSERTED]),
-                        line_type=LineType.DELETED,
-                        content=line[1:],
-                        old_line_number=current_hunk.old_start + len([l for l in current_hunk.lines if l.line_type == LineType.DELETED])
-                    ))
-                elif line.startswith('+'):
-                    current_hunk.lines.append(DiffLine(
-                        line_number=current_hunk.new_start + len([l for l in current_hunk.lines if l.line_type == LineType.INSERTED]),
-                        line_type=LineType.INSERTED,
-                        content=line[1:],
-                        new_line_number=current_hunk.new_start + len([l for l in current_hunk.lines if l.line_type == LineType.INSERTED])
-                    ))
-                else:
-                    current_hunk.lines.append(DiffLine(
-                        line_number=0,
-                        line_type=LineType.UNCHANGED,
-                        content=line[1:]
-                    ))
-        
-        if current_hunk:
-            hunks.append(current_hunk)
-        
-        return hunks
-    
     def _build_hunk_from_changes(self, changes: List[Tuple], 
                                   total_old: int, total_new: int) -> DiffHunk:
         """从变化列表构建差异块"""
@@ -702,9 +953,12 @@ def interactive_diff():
     print("1. Myers (默认, 类似 git diff)")
     print("2. LCS (最长公共子序列)")
     print("3. SequenceMatcher")
-    algo_choice = input("请选择 (1-3): ").strip() or "1"
+    print("4. Patience")
+    print("5. Histogram")
+    algo_choice = input("请选择 (1-5): ").strip() or "1"
     
-    algo_map = {1: DiffAlgorithm.MYERS, 2: DiffAlgorithm.LCS, 3: DiffAlgorithm.SEQUENCE}
+    algo_map = {1: DiffAlgorithm.MYERS, 2: DiffAlgorithm.LCS, 3: DiffAlgorithm.SEQUENCE,
+                4: DiffAlgorithm.PATIENCE, 5: DiffAlgorithm.HISTOGRAM}
     algorithm = algo_map.get(int(algo_choice), DiffAlgorithm.MYERS)
     
     # 选择输出格式
@@ -753,6 +1007,25 @@ def interactive_diff():
         print(f"❌ 错误: {e}")
 
 
+FILE_HASH_CHUNK = 1 << 20     # 计算文件哈希时每次读取的字节数
+
+
+def file_digest(path: str) -> str:
+    """分块计算文件的 BLAKE2b 摘要"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(FILE_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def files_identical(file_a: str, file_b: str) -> bool:
+    """先比较大小，大小相同再比较哈希"""
+    if os.path.getsize(file_a) != os.path.getsize(file_b):
+        return False
+    return file_digest(file_a) == file_digest(file_b)
+
+
 def batch_compare(files: List[Tuple[str, str]], output_dir: str = "diff_reports"):
     """批量比较多个文件对
     
@@ -761,11 +1034,15 @@ def batch_compare(files: List[Tuple[str, str]], output_dir: str = "diff_reports"
         output_dir: 输出目录
     """
     os.makedirs(output_dir, exist_ok=True)
+    diff_tool = SmartDiff()
     
     for i, (file_a, file_b) in enumerate(files, 1):
         print(f"\n比较 {i}/{len(files)}: {file_a} ↔ {file_b}")
         
-        diff_tool = SmartDiff()
+        if files_identical(file_a, file_b):
+            print("✅ 文件完全相同 (大小与哈希一致)，跳过")
+            continue
+        
         result = diff_tool.compare_files(file_a, file_b)
         
         # 生成多种格式的报告
@@ -786,6 +1063,159 @@ def batch_compare(files: List[Tuple[str, str]], output_dir: str = "diff_reports"
         print(f"\n📄 报告已生成: {json_path}, {html_path}")
 
 
+@dataclass
+class DirectoryDiffSummary:
+    """目录差异统计"""
+    dir_a: str
+    dir_b: str
+    report_path: str
+    added: int = 0             # 仅存在于新目录
+    removed: int = 0           # 仅存在于旧目录
+    identical: int = 0         # 大小与哈希一致，未做行级比较
+    changed: int = 0
+    binary: int = 0            # 内容不同但无法按文本比较
+    errors: int = 0
+    inserted_lines: int = 0
+    deleted_lines: int = 0
+    elapsed: float = 0.0
+
+
+def scan_tree(root: str) -> Dict[str, int]:
+    """递归扫描目录，返回 {相对路径: 文件大小}，相对路径统一使用 /"""
+    files: Dict[str, int] = {}
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(root, rel_dir)) as entries:
+                for entry in entries:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(rel_path)
+                    elif entry.is_file(follow_symlinks=False):
+                        files[rel_path] = entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+    return files
+
+
+def _diff_pair_job(job: Tuple[str, str, str, bool, str, str]) -> Dict[str, Any]:
+    """子进程任务：比较一对文件，有差异时把 unified diff 写到报告目录
+    
+    只返回统计信息，差异文本不经过主进程，内存占用与文件数无关。
+    """
+    rel_path, path_a, path_b, same_size, files_dir, algorithm = job
+    record: Dict[str, Any] = {'path': rel_path}
+    try:
+        if same_size and file_digest(path_a) == file_digest(path_b):
+            record['status'] = 'identical'
+            return record
+        
+        try:
+            with open(path_a, 'r', encoding='utf-8') as f:
+                lines_a = f.readlines()
+            with open(path_b, 'r', encoding='utf-8') as f:
+                lines_b = f.readlines()
+        except UnicodeDecodeError:
+            record['status'] = 'binary'
+            return record
+        
+        diff_tool = SmartDiff(DiffAlgorithm(algorithm))
+        result = diff_tool.compare_lines(lines_a, lines_b, f"a/{rel_path}", f"b/{rel_path}")
+        if result.identical:
+            # 仅行尾换行不同等情况
+            record['status'] = 'identical'
+            return record
+        
+        report = os.path.join(files_dir, rel_path + '.diff')
+        os.makedirs(os.path.dirname(report), exist_ok=True)
+        with open(report, 'w', encoding='utf-8') as f:
+            f.write(diff_tool.format_output(result, OutputFormat.UNIFIED) + '\n')
+        
+        record.update(
+            status='changed',
+            inserted=result.stats['inserted'],
+            deleted=result.stats['deleted'],
+            hunks=result.stats['hunks'],
+            report=report
+        )
+    except OSError as e:
+        record.update(status='error', error=str(e))
+    return record
+
+
+def compare_directories(dir_a: str, dir_b: str, output_dir: str = "diff_reports",
+                        algorithm: DiffAlgorithm = DiffAlgorithm.MYERS,
+                        workers: Optional[int] = None) -> DirectoryDiffSummary:
+    """按相对路径配对比较两个目录
+    
+    大小与哈希相同的文件直接跳过；其余文件对在进程池中比较，
+    每个文件的结果一完成就追加写入 output_dir/index.jsonl，差异写到 output_dir/files/。
+    
+    Args:
+        dir_a: 旧目录
+        dir_b: 新目录
+        output_dir: 报告目录
+        algorithm: 差分算法
+        workers: 进程数 (默认 CPU 核数)
+        
+    Returns:
+        DirectoryDiffSummary: 统计摘要
+    """
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    files_dir = os.path.join(output_dir, 'files')
+    summary = DirectoryDiffSummary(dir_a=dir_a, dir_b=dir_b,
+                                   report_path=os.path.join(output_dir, 'index.jsonl'))
+    
+    tree_a = scan_tree(dir_a)
+    tree_b = scan_tree(dir_b)
+    
+    with open(summary.report_path, 'w', encoding='utf-8') as index:
+        def write(record: Dict[str, Any]):
+            counter = 'errors' if record['status'] == 'error' else record['status']
+            setattr(summary, counter, getattr(summary, counter) + 1)
+            summary.inserted_lines += record.get('inserted', 0)
+            summary.deleted_lines += record.get('deleted', 0)
+            index.write(json.dumps(record, ensure_ascii=False) + '\n')
+        
+        for rel_path in sorted(tree_a.keys() - tree_b.keys()):
+            write({'path': rel_path, 'status': 'removed'})
+        for rel_path in sorted(tree_b.keys() - tree_a.keys()):
+            write({'path': rel_path, 'status': 'added'})
+        
+        jobs = (
+            (rel_path, os.path.join(dir_a, rel_path), os.path.join(dir_b, rel_path),
+             tree_a[rel_path] == tree_b[rel_path], files_dir, algorithm.value)
+            for rel_path in sorted(tree_a.keys() & tree_b.keys())
+        )
+        for record in _run_bounded(_diff_pair_job, jobs, workers or os.cpu_count() or 1):
+            write(record)
+    
+    summary.elapsed = time.perf_counter() - start
+    return summary
+
+
+def _run_bounded(func, jobs, workers: int) -> Iterator[Dict[str, Any]]:
+    """在进程池中执行任务，同时在途的任务数有上限，结果按完成顺序产出"""
+    if workers <= 1:
+        for job in jobs:
+            yield func(job)
+        return
+    
+    window = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for job in jobs:
+            pending.add(executor.submit(func, job))
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+
+
 def compare_string(a: str, b: str, algorithm: DiffAlgorithm = DiffAlgorithm.MYERS) -> Dict[str, Any]:
     """直接比较两个字符串
     
@@ -811,9 +1241,82 @@ def compare_string(a: str, b: str, algorithm: DiffAlgorithm = DiffAlgorithm.MYER
     }
 
 
+def generate_benchmark_files(num_lines: int = 20000, edit_ratio: float = 0.01,
+                             seed: int = 42) -> Tuple[List[str], List[str]]:
+    """生成一对类似源码的大文件 (含空行、括号等重复行)，第二个文件随机增删改部分行"""
+    rng = random.Random(seed)
+    common = ['', '}', '    return result', '    pass', '']
+    lines_a = []
+    for i in range(num_lines):
+        if rng.random() < 0.15:
+            lines_a.append(rng.choice(common) + '\n')
+        else:
+            lines_a.append(f"    value_{i} = compute({rng.randint(0, 10 ** 6)})\n")
+    
+    lines_b = []
+    for line in lines_a:
+        roll = rng.random()
+        if roll < edit_ratio / 3:
+            continue                                   # 删除
+        if roll < edit_ratio * 2 / 3:
+            lines_b.append(line.rstrip('\n') + '  # changed\n')   # 修改
+            continue
+        lines_b.append(line)
+        if roll < edit_ratio:
+            lines_b.append(f"    inserted_{rng.randint(0, 10 ** 6)}()\n")  # 插入
+    return lines_a, lines_b
+
+
+def benchmark_algorithms(num_lines: int = 20000, edit_ratio: float = 0.01,
+                         seed: int = 42) -> List[Dict[str, Any]]:
+    """在生成的大文件上比较各算法的耗时和编辑量
+    
+    LCS 模式改用线性空间实现后与 Myers 结果相同，不单独计时；
+    旧的 m×n 动态规划表大小仅作为参考列出。
+    """
+    lines_a, lines_b = generate_benchmark_files(num_lines, edit_ratio, seed)
+    print(f"📏 基准文件: {len(lines_a)} 行 vs {len(lines_b)} 行, "
+          f"旧 LCS 动态规划表需要 {len(lines_a) * len(lines_b):,} 个单元格")
+    
+    results = []
+    for algorithm in (DiffAlgorithm.MYERS, DiffAlgorithm.PATIENCE,
+                      DiffAlgorithm.HISTOGRAM, DiffAlgorithm.SEQUENCE):
+        diff_tool = SmartDiff(algorithm)
+        start = time.perf_counter()
+        result = diff_tool.compare_lines(lines_a, lines_b)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'algorithm': algorithm.value,
+            'seconds': round(elapsed, 4),
+            'inserted': result.stats['inserted'],
+            'deleted': result.stats['deleted'],
+            'hunks': result.stats['hunks']
+        })
+        print(f"  {algorithm.value:<10} {elapsed:8.3f}s  +{result.stats['inserted']} "
+              f"-{result.stats['deleted']}  块数 {result.stats['hunks']}")
+    return results
+
+
 if __name__ == "__main__":
     # 命令行参数解析
-    if len(sys.argv) >= 3:
+    if len(sys.argv) >= 4 and sys.argv[1] == '--dir':
+        # 目录比较: --dir <目录A> <目录B> [报告目录] [进程数]
+        output_dir = sys.argv[4] if len(sys.argv) > 4 else "diff_reports"
+        workers = int(sys.argv[5]) if len(sys.argv) > 5 else None
+        summary = compare_directories(sys.argv[2], sys.argv[3], output_dir, workers=workers)
+        print(f"📁 {summary.dir_a} → {summary.dir_b}  ({summary.elapsed:.2f}s)")
+        print(f"  相同: {summary.identical}  修改: {summary.changed}  二进制: {summary.binary}")
+        print(f"  新增文件: {summary.added}  删除文件: {summary.removed}  错误: {summary.errors}")
+        print(f"  +{summary.inserted_lines} -{summary.deleted_lines} 行")
+        print(f"📄 报告索引: {summary.report_path}")
+    
+    elif len(sys.argv) >= 2 and sys.argv[1] == '--benchmark':
+        # 基准测试: --benchmark [行数] [修改比例]
+        num_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+        edit_ratio = float(sys.argv[3]) if len(sys.argv) > 3 else 0.01
+        benchmark_algorithms(num_lines, edit_ratio)
+    
+    elif len(sys.argv) >= 3:
         # 快速比较模式
         file_a = sys.argv[1]
         file_b = sys.argv[2]
@@ -821,7 +1324,8 @@ if __name__ == "__main__":
         algo = sys.argv[3] if len(sys.argv) > 3 else 'myers'
         format_type = sys.argv[4] if len(sys.argv) > 4 else 'console'
         
-        algo_map = {'myers': DiffAlgorithm.MYERS, 'lcs': DiffAlgorithm.LCS, 
+        algo_map = {'myers': DiffAlgorithm.MYERS, 'lcs': DiffAlgorithm.LCS,
+                   'patience': DiffAlgorithm.PATIENCE, 'histogram': DiffAlgorithm.HISTOGRAM,
                    'sequence': DiffAlgorithm.SEQUENCE}
         fmt_map = {'console': OutputFormat.CONSOLE, 'unified': OutputFormat.UNIFIED,
                   'side': OutputFormat.SIDE_BY_SIDE, 'html': OutputFormat.HTML,
@@ -841,13 +1345,17 @@ if __name__ == "__main__":
     python smart_diff.py <文件A> <文件B> [算法] [格式]
     python smart_diff.py              # 交互模式
     python smart_diff.py --batch      # 批量模式
+    python smart_diff.py --dir <目录A> <目录B> [报告目录] [进程数]  # 目录比较
+    python smart_diff.py --benchmark [行数] [修改比例]  # 算法基准测试
 
 参数:
     文件A, 文件B: 要比较的两个文件路径
     
 算法选项:
-    myers     - Myers差分算法 (默认, 类似 git diff)
-    lcs       - 最长公共子序列
+    myers     - Myers差分算法 (默认, 类似 git diff, 线性空间)
+    patience  - Patience差分 (以唯一行为锚点, 适合代码移动)
+    histogram - Histogram差分 (git diff --histogram)
+    lcs       - 最长公共子序列 (输出全部行)
     sequence  - Python SequenceMatcher
 
 输出格式:
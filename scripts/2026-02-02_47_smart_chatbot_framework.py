@@ -6,15 +6,46 @@ Smart Chatbot Framework
 支持多种聊天API、上下文管理、对话历史、插件扩展
 """
 
+import re
 import json
+import math
 import time
+import asyncio
+import random
 import hashlib
-from typing import Dict, List, Optional, Any, Callable
+import weakref
+import threading
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Callable, Iterator, AsyncIterator
 from dataclasses import dataclass, field
 from enum import Enum
 from abc import ABC, abstractmethod
 
 
+# 每条消息在提示中的固定开销（角色、分隔符等）
+MESSAGE_TOKEN_OVERHEAD = 4
+# 中日韩字符与全角符号，大致一个字符一个 token
+_CJK_PATTERN = re.compile(r'[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]')
+# 摘要消息的前缀
+SUMMARY_PREFIX = "以下是较早对话的摘要:\n"
+# 流结束标记
+_STREAM_END = object()
+# MinHash 使用的梅森素数
+_MINHASH_PRIME = (1 << 61) - 1
+# shingle 哈希缓存的上限
+_SHINGLE_CACHE_SIZE = 50000
+
+
+def estimate_tokens(text: str) -> int:
+    """近似 token 数：中日韩字符按 1 个计，其余按 4 个字符 1 个计"""
+    if not text:
+        return 0
+    other = len(_CJK_PATTERN.sub("", text))
+    return (len(text) - other) + math.ceil(other / 4)
+
+
 class MessageRole(Enum):
     """消息角色"""
     SYSTEM = "system"
@@ -30,6 +61,15 @@ class Message:
     content: str
     timestamp: float = field(default_factory=time.time)
     metadata: Dict = field(default_factory=dict)
+    _token_cache: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def token_count(self) -> int:
+        """近似 token 数，按内容缓存，内容被替换后重新计算"""
+        cache = self._token_cache
+        if cache is None or cache[0] is not self.content:
+            cache = self._token_cache = (self.content, estimate_tokens(self.content) + MESSAGE_TOKEN_OVERHEAD)
+        return cache[1]
 
     def to_dict(self) -> Dict:
         return {
@@ -52,7 +92,7 @@ class Message:
 class ChatProvider(ABC):
     """聊天提供商基类"""
 
-    @abstra\method
+    @abstractmethod
     def chat(self, messages: List[Message], **kwargs) -> Message:
         """发送聊天请求"""
         pass
@@ -62,6 +102,19 @@ class ChatProvider(ABC):
         """获取提供商名称"""
         pass
 
+    def stream(self, messages: List[Message], **kwargs) -> Iterator[str]:
+        """流式聊天，逐块产出文本；默认一次性产出完整回复"""
+        yield self.chat(messages, **kwargs).content
+
+    async def astream(self, messages: List[Message], **kwargs) -> AsyncIterator[str]:
+        """异步流式聊天，默认在线程中迭代 stream()，不阻塞事件循环"""
+        iterator = iter(self.stream(messages, **kwargs))
+        while True:
+            chunk = await asyncio.to_thread(next, iterator, _STREAM_END)
+            if chunk is _STREAM_END:
+                break
+            yield chunk
+
 
 class OpenAIProvider(ChatProvider):
     """OpenAI API提供商"""
@@ -73,7 +126,7 @@ class OpenAIProvider(ChatProvider):
         import openai
         self.client = openai.OpenAI(api_key=api_key, base_url=base_url)
 
-    def chat(self, messages: List[Message], (*kwargs) -> Message:
+    def chat(self, messages: List[Message], **kwargs) -> Message:
         response = self.client.chat.completions.create(
             model=self.model,
             messages=[m.to_dict() for m in messages],
@@ -85,6 +138,17 @@ class OpenAIProvider(ChatProvider):
             metadata={"model": self.model}
         )
 
+    def stream(self, messages: List[Message], **kwargs) -> Iterator[str]:
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[m.to_dict() for m in messages],
+            stream=True,
+            **kwargs
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
     def get_name(self) -> str:
         return f"OpenAI ({self.model})"
 
@@ -103,7 +167,7 @@ class AnthropicProvider(ChatProvider):
         response = self.client.messages.create(
             model=self.model,
             messages=[{"role": m.role.value, "content": m.content} for m in messages],
-            (*kwargs
+            **kwargs
         )
         return Message(
             role=MessageRole.ASSISTANT,
@@ -111,23 +175,640 @@ class AnthropicProvider(ChatProvider):
             metadata={"model": self.model}
         )
 
+    def stream(self, messages: List[Message], **kwargs) -> Iterator[str]:
+        with self.client.messages.stream(
+            model=self.model,
+            messages=[{"role": m.role.value, "content": m.content} for m in messages],
+            **kwargs
+        ) as response:
+            yield from response.text_stream
+
     def get_name(self) -> str:
         return f"Anthropic ({self.model})"
 
 
+class MockStreamingProvider(ChatProvider):
+    """模拟流式提供商：首 token 延迟加逐 token 延迟，用于基准测试"""
+
+    def __init__(self, first_token_delay: float = 0.2, token_delay: float = 0.01,
+                 reply_tokens: int = 40):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.reply_tokens = reply_tokens
+
+    def _chunks(self, messages: List[Message]) -> List[str]:
+        last_msg = messages[-1].content if messages else ""
+        return [f"收到消息: {last_msg[:50]}。"] + [f" 片段{i}" for i in range(1, self.reply_tokens)]
+
+    def chat(self, messages: List[Message], **kwargs) -> Message:
+        chunks = self._chunks(messages)
+        time.sleep(self.first_token_delay + self.token_delay * (len(chunks) - 1))
+        return Message(role=MessageRole.ASSISTANT, content="".join(chunks))
+
+    def stream(self, messages: List[Message], **kwargs) -> Iterator[str]:
+        for i, chunk in enumerate(self._chunks(messages)):
+            time.sleep(self.first_token_delay if i == 0 else self.token_delay)
+            yield chunk
+
+    async def astream(self, messages: List[Message], **kwargs) -> AsyncIterator[str]:
+        for i, chunk in enumerate(self._chunks(messages)):
+            await asyncio.sleep(self.first_token_delay if i == 0 else self.token_delay)
+            yield chunk
+
+    def get_name(self) -> str:
+        return "MockStreaming"
+
+
+class StreamFilter:
+    """流式后置处理器：feed 返回可以立即输出的文本，flush 返回剩余部分"""
+
+    def feed(self, text: str) -> str:
+        return text
+
+    def flush(self) -> str:
+        return ""
+
+
+class _BufferedFilter(StreamFilter):
+    """插件不支持增量处理时，收集完整回复后再调用 post_process"""
+
+    def __init__(self, plugin: 'ChatPlugin'):
+        self.plugin = plugin
+        self.parts: List[str] = []
+
+    def feed(self, text: str) -> str:
+        self.parts.append(text)
+        return ""
+
+    def flush(self) -> str:
+        message = Message(role=MessageRole.ASSISTANT, content="".join(self.parts))
+        return self.plugin.post_process(message).content
+
+
+def _feed_filters(filters: List[StreamFilter], text: str, start: int = 0) -> str:
+    """让文本依次经过 filters[start:]"""
+    for stream_filter in filters[start:]:
+        if not text:
+            break
+        text = stream_filter.feed(text)
+    return text
+
+
+def _flush_filters(filters: List[StreamFilter]) -> str:
+    """依次冲刷各个过滤器，前一个的剩余部分仍要经过后面的过滤器"""
+    return "".join(_feed_filters(filters, f.flush(), i + 1) for i, f in enumerate(filters))
+
+
+def normalize_text(text: str) -> str:
+    """缓存键的文本归一化：NFKC、忽略大小写、合并空白"""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def _shingles(text: str, size: int = 3) -> frozenset:
+    """字符 n-gram 集合，对中英文都适用"""
+    if len(text) <= size:
+        return frozenset([text])
+    return frozenset(text[i:i + size] for i in range(len(text) - size + 1))
+
+
+@dataclass
+class _CacheQuery:
+    """一次查询的缓存键"""
+    key: str                 # 完整消息列表（及参数）的哈希
+    context_key: str         # 除最后一条用户消息外的上下文哈希
+    question: str            # 归一化后的最后一条用户消息，相似匹配只比较它
+
+
+@dataclass
+class _CacheEntry:
+    """缓存条目"""
+    query: _CacheQuery
+    message: Message
+    created: float
+    shingles: frozenset = frozenset()
+    band_keys: List[tuple] = field(default_factory=list)
+    vector: Optional[List[float]] = None
+
+
+class ResponseCache:
+    """
+    回复缓存：精确匹配 + 可选的相似匹配
+
+    精确匹配使用归一化消息列表的哈希。开启相似匹配后，上下文相同且最后一个
+    用户问题足够相似的请求也会命中：默认比较字符 shingle 的 Jaccard 相似度，
+    用 MinHash LSH 分桶找候选，查询开销与缓存大小无关；传入 embedder 时改为
+    在同一上下文的条目中线性比较余弦相似度。条目按 TTL 过期，超过 max_entries
+    时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: Optional[float] = 3600,
+                 similarity_threshold: Optional[float] = None,
+                 embedder: Optional[Callable[[str], List[float]]] = None,
+                 num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.embedder = embedder
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(0x5EED)
+        self._perms = [(rng.randrange(1, _MINHASH_PRIME), rng.randrange(0, _MINHASH_PRIME))
+                       for _ in range(num_perm)]
+
+        self._entries: 'OrderedDict[str, _CacheEntry]' = OrderedDict()
+        self._band_index: Dict[tuple, set] = {}
+        self._groups: Dict[str, set] = {}
+        self._shingle_hashes: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "similar_hits": 0, "misses": 0, "coalesced": 0,
+                      "evictions": 0, "expirations": 0}
+
+    def make_query(self, messages: List[Message], kwargs: Dict) -> _CacheQuery:
+        """计算消息列表的缓存键"""
+        params = json.dumps(kwargs, sort_keys=True, default=str)
+        normalized = [(m.role.value, normalize_text(m.content)) for m in messages]
+        question = ""
+        context = normalized
+        if normalized and normalized[-1][0] == MessageRole.USER.value:
+            question = normalized[-1][1]
+            context = normalized[:-1]
+        context_key = hashlib.sha256(json.dumps([context, params], ensure_ascii=False).encode()).hexdigest()
+        key = hashlib.sha256(f"{context_key}\0{question}".encode()).hexdigest()
+        return _CacheQuery(key=key, context_key=context_key, question=question)
+
+    def _hash_vector(self, shingle: str) -> tuple:
+        """单个 shingle 在各个哈希函数下的取值；常见 shingle 反复出现，缓存起来"""
+        vector = self._shingle_hashes.get(shingle)
+        if vector is None:
+            if len(self._shingle_hashes) >= _SHINGLE_CACHE_SIZE:
+                self._shingle_hashes.clear()
+            h = zlib.crc32(shingle.encode())
+            vector = self._shingle_hashes[shingle] = tuple((a * h + b) % _MINHASH_PRIME
+                                                           for a, b in self._perms)
+        return vector
+
+    def _signature(self, shingles: frozenset) -> List[int]:
+        return list(map(min, zip(*(self._hash_vector(s) for s in shingles))))
+
+    def _band_keys(self, context_key: str, shingles: frozenset) -> List[tuple]:
+        signature = self._signature(shingles)
+        return [(context_key, band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+                for band in range(self.bands)]
+
+    def _embed(self, text: str) -> List[float]:
+        vector = list(self.embedder(text))
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def _expired(self, entry: _CacheEntry, now: float) -> bool:
+        return self.ttl is not None and now - entry.created > self.ttl
+
+    def _remove(self, key: str):
+        """删除条目及其相似索引（调用方持有锁）"""
+        entry = self._entries.pop(key)
+        for band_key in entry.band_keys:
+            bucket = self._band_index.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._band_index[band_key]
+        group = self._groups.get(entry.query.context_key)
+        if group is not None:
+            group.discard(key)
+            if not group:
+                del self._groups[entry.query.context_key]
+
+    def _similar(self, query: _CacheQuery, now: float) -> Optional[_CacheEntry]:
+        """在同一上下文中找最相似且达到阈值的条目（调用方持有锁）"""
+        if not query.question:
+            return None
+        best, best_score = None, self.similarity_threshold
+
+        if self.embedder is not None:
+            vector = self._embed(query.question)
+            candidates = self._groups.get(query.context_key, ())
+            for key in candidates:
+                entry = self._entries[key]
+                score = sum(a * b for a, b in zip(vector, entry.vector))
+                if score >= best_score and not self._expired(entry, now):
+                    best, best_score = entry, score
+            return best
+
+        shingles = _shingles(query.question)
+        candidates = set()
+        for band_key in self._band_keys(query.context_key, shingles):
+            candidates |= self._band_index.get(band_key, set())
+        for key in candidates:
+            entry = self._entries[key]
+            common = len(shingles & entry.shingles)
+            score = common / (len(shingles) + len(entry.shingles) - common)
+            if score >= best_score and not self._expired(entry, now):
+                best, best_score = entry, score
+        return best
+
+    def get(self, query: _CacheQuery, record: bool = True) -> Optional[Message]:
+        """查找缓存，命中时返回回复的副本；record 为 False 时不计入统计"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(query.key)
+            if entry is not None and self._expired(entry, now):
+                self._remove(query.key)
+                self.stats["expirations"] += 1
+                entry = None
+            kind = "exact"
+            if entry is None and self.similarity_threshold is not None:
+                entry = self._similar(query, now)
+                kind = "similar"
+            if entry is None:
+                if record:
+                    self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(entry.query.key)
+            if record:
+                self.stats["hits" if kind == "exact" else "similar_hits"] += 1
+            return _copy_message(entry.message, kind)
+
+    def put(self, query: _CacheQuery, message: Message):
+        """写入缓存，超过容量时淘汰最久未使用的条目"""
+        entry = _CacheEntry(query=query, message=_copy_message(message), created=time.time())
+        if self.similarity_threshold is not None and query.question:
+            if self.embedder is not None:
+                entry.vector = self._embed(query.question)
+            else:
+                entry.shingles = _shingles(query.question)
+                entry.band_keys = self._band_keys(query.context_key, entry.shingles)
+
+        with self._lock:
+            if query.key in self._entries:
+                self._remove(query.key)
+            self._entries[query.key] = entry
+            for band_key in entry.band_keys:
+                self._band_index.setdefault(band_key, set()).add(query.key)
+            if entry.vector is not None:
+                self._groups.setdefault(query.context_key, set()).add(query.key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+            # 顺带清理队首已过期的条目
+            while self._entries:
+                oldest = next(iter(self._entries))
+                if not self._expired(self._entries[oldest], entry.created):
+                    break
+                self._remove(oldest)
+                self.stats["expirations"] += 1
+
+    def record_coalesced(self):
+        """记录一次被单飞合并的请求"""
+        with self._lock:
+            self.stats["coalesced"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._band_index.clear()
+            self._groups.clear()
+
+    def get_stats(self) -> Dict:
+        """命中率等统计；被合并的并发请求也算作命中"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        # 被合并的请求在 get 时已计入 misses
+        served = stats["hits"] + stats["similar_hits"] + stats["coalesced"]
+        total = stats["hits"] + stats["similar_hits"] + stats["misses"]
+        stats["hit_rate"] = round(served / total, 4) if total else 0.0
+        return stats
+
+
+def _copy_message(message: Message, cache: Optional[str] = None) -> Message:
+    """复制回复，避免插件原地修改缓存中的内容"""
+    metadata = dict(message.metadata)
+    if cache:
+        metadata["cache"] = cache
+    return Message(role=message.role, content=message.content, metadata=metadata)
+
+
+class _Flight:
+    """正在进行中的请求，相同请求的其他调用方等待它的结果"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[Message] = None
+        self.error: Optional[BaseException] = None
+
+
+class CachedProvider(ChatProvider):
+    """
+    带缓存的提供商包装器
+
+    命中缓存时直接返回；未命中时，同一时刻相同的请求只有第一个真正调用提供商，
+    其余调用方（线程或协程）等待并共享它的结果。流式接口命中时一次性产出完整回复。
+    """
+
+    def __init__(self, provider: ChatProvider, cache: Optional[ResponseCache] = None):
+        self.provider = provider
+        self.cache = cache or ResponseCache()
+        self._inflight: Dict[str, _Flight] = {}
+        self._async_inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def get_name(self) -> str:
+        return f"Cached {self.provider.get_name()}"
+
+    def get_stats(self) -> Dict:
+        return self.cache.get_stats()
+
+    def _join(self, key: str) -> tuple:
+        """加入或发起一次请求，返回 (flight, 是否为发起者)"""
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._inflight[key] = _Flight()
+            return flight, True
+
+    def _land(self, key: str, flight: _Flight):
+        with self._lock:
+            self._inflight.pop(key, None)
+        flight.event.set()
+
+    def _recheck(self, query: _CacheQuery, flight: _Flight) -> Optional[Message]:
+        """
+        成为发起者后再查一次缓存
+
+        上一个发起者可能恰好在本次未命中之后、加入之前写入了缓存；命中时直接结束
+        这次请求，避免重复调用提供商。
+        """
+        cached = self.cache.get(query, record=False)
+        if cached is not None:
+            flight.result = cached
+            self._land(query.key, flight)
+            self.cache.record_coalesced()
+        return cached
+
+    def chat(self, messages: List[Message], **kwargs) -> Message:
+        query = self.cache.make_query(messages, kwargs)
+        cached = self.cache.get(query)
+        if cached is not None:
+            return cached
+
+        flight, leader = self._join(query.key)
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            self.cache.record_coalesced()
+            return _copy_message(flight.result, "coalesced")
+
+        cached = self._recheck(query, flight)
+        if cached is not None:
+            return cached
+
+        try:
+            response = self.provider.chat(messages, **kwargs)
+            self.cache.put(query, response)
+            flight.result = response
+            return _copy_message(response)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            self._land(query.key, flight)
+
+    def stream(self, messages: List[Message], **kwargs) -> Iterator[str]:
+        query = self.cache.make_query(messages, kwargs)
+        cached = self.cache.get(query)
+        if cached is not None:
+            yield cached.content
+            return
+
+        flight, leader = self._join(query.key)
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.result is not None:
+                self.cache.record_coalesced()
+                yield flight.result.content
+                return
+            # 发起者中途放弃了流，自行请求
+            yield from self.provider.stream(messages, **kwargs)
+            return
+
+        cached = self._recheck(query, flight)
+        if cached is not None:
+            yield cached.content
+            return
+
+        parts = []
+        try:
+            for chunk in self.provider.stream(messages, **kwargs):
+                parts.append(chunk)
+                yield chunk
+            response = Message(role=MessageRole.ASSISTANT, content="".join(parts))
+            self.cache.put(query, response)
+            flight.result = response
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            self._land(query.key, flight)
+
+    async def astream(self, messages: List[Message], **kwargs) -> AsyncIterator[str]:
+        query = self.cache.make_query(messages, kwargs)
+        cached = self.cache.get(query)
+        if cached is not None:
+            yield cached.content
+            return
+
+        future = self._async_inflight.get(query.key)
+        if future is not None:
+            result = await asyncio.shield(future)
+            if result is not None:
+                self.cache.record_coalesced()
+                yield result.content
+                return
+            # 发起者中途放弃了流，自行请求
+            async for chunk in self.provider.astream(messages, **kwargs):
+                yield chunk
+            return
+
+        future = self._async_inflight[query.key] = asyncio.get_running_loop().create_future()
+        parts = []
+        try:
+            async for chunk in self.provider.astream(messages, **kwargs):
+                parts.append(chunk)
+                yield chunk
+            response = Message(role=MessageRole.ASSISTANT, content="".join(parts))
+            self.cache.put(query, response)
+            future.set_result(response)
+        except Exception as e:
+            # 等待者一同失败，不各自重试，避免在出错或限流时涌向上游
+            future.set_exception(e)
+            future.exception()  # 没有等待者时不产生未取回异常的告警
+            raise
+        finally:
+            self._async_inflight.pop(query.key, None)
+            if not future.done():
+                future.set_result(None)
+
+
+def extractive_summary(previous: str, messages: List[Message], max_tokens: int) -> str:
+    """本地抽取式摘要：每条消息保留首句，超出预算时丢弃最早的内容"""
+    lines = previous.split("\n") if previous else []
+    for msg in messages:
+        if msg.role == MessageRole.SYSTEM:
+            continue
+        first = re.split(r'(?<=[。！？.!?])\s*|\n', msg.content.strip(), maxsplit=1)[0]
+        if len(first) > 80:
+            first = first[:80] + "..."
+        lines.append(f"{msg.role.value}: {first}")
+
+    # 从最新的一行往前累加，保留预算内的部分
+    kept = []
+    total = 0
+    for line in reversed(lines):
+        cost = estimate_tokens(line) + 1
+        if total + cost > max_tokens:
+            break
+        kept.append(line)
+        total += cost
+    return "\n".join(reversed(kept))
+
+
+class ProviderSummarizer:
+    """用聊天提供商生成摘要，可替换 ContextWindow 的默认抽取式摘要"""
+
+    def __init__(self, provider: 'ChatProvider'):
+        self.provider = provider
+
+    def __call__(self, previous: str, messages: List[Message], max_tokens: int) -> str:
+        transcript = "\n".join(f"{m.role.value}: {m.content}" for m in messages)
+        prompt = [
+            Message(role=MessageRole.SYSTEM,
+                    content=f"把已有摘要和新对话合并成一份不超过 {max_tokens} token 的摘要，保留事实、决定和未完成的问题。"),
+            Message(role=MessageRole.USER, content=f"已有摘要:\n{previous or '(无)'}\n\n新对话:\n{transcript}")
+        ]
+        return self.provider.chat(prompt).content
+
+
+@dataclass
+class _ContextState:
+    """单个对话的上下文窗口状态"""
+    seen: int = 0                # 已计入 token 的消息数
+    start: int = 0               # 窗口起点，之前的消息已折叠进摘要
+    window_tokens: int = 0       # history[start:seen] 的 token 总数
+    summarized_upto: int = 0     # 摘要覆盖到的位置
+    summary: str = ""
+    summary_message: Optional[Message] = None
+
+
+class ContextWindow:
+    """
+    按 token 预算打包对话历史
+
+    最近的消息原样保留，窗口之外的旧消息折叠进滚动摘要。每条消息的 token 数
+    只在进入窗口时计算一次；超出预算时一次收缩到 low_water 比例，之后若干轮
+    不需要再滑动。摘要只在窗口滑动时用新移出的消息增量更新，其余轮次复用缓存，
+    每轮构建提示的开销只与窗口大小有关，与对话总长度无关。
+    """
+
+    def __init__(self, max_tokens: int = 4000, summary_tokens: int = 500,
+                 low_water: float = 0.75, max_messages: Optional[int] = None,
+                 summarizer: Optional[Callable[[str, List[Message], int], str]] = None):
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.low_water = low_water
+        self.max_messages = max_messages
+        self.summarizer = summarizer or extractive_summary
+        self._states: Dict[str, _ContextState] = {}
+
+    def reset(self, conversation_id: str):
+        """丢弃对话的窗口状态和摘要"""
+        self._states.pop(conversation_id, None)
+
+    def build(self, conversation_id: str, history: List[Message],
+              system_messages: List[Message], user_msg: Message) -> List[Message]:
+        """构建本轮发送给提供商的消息列表"""
+        state = self._states.get(conversation_id)
+        if state is None or len(history) < state.seen:
+            # 新对话，或历史被清空/替换
+            state = self._states[conversation_id] = _ContextState()
+
+        for msg in history[state.seen:]:
+            state.window_tokens += msg.token_count
+        state.seen = len(history)
+
+        fixed = sum(m.token_count for m in system_messages) + user_msg.token_count
+        budget = self.max_tokens - fixed - self.summary_tokens
+        over_count = self.max_messages is not None and state.seen - state.start > self.max_messages
+        if state.window_tokens > budget or over_count:
+            target_tokens = budget * self.low_water
+            target_count = (self.max_messages * self.low_water
+                            if self.max_messages is not None else float("inf"))
+            while state.start < state.seen and (state.window_tokens > target_tokens
+                                                or state.seen - state.start > target_count):
+                state.window_tokens -= history[state.start].token_count
+                state.start += 1
+
+        if state.start > state.summarized_upto:
+            # 摘要消息的前缀和固定开销也计入 summary_tokens
+            summary_budget = self.summary_tokens - estimate_tokens(SUMMARY_PREFIX) - MESSAGE_TOKEN_OVERHEAD
+            state.summary = self.summarizer(
+                state.summary, history[state.summarized_upto:state.start], max(summary_budget, 0))
+            state.summarized_upto = state.start
+            state.summary_message = Message(
+                role=MessageRole.SYSTEM,
+                content=f"{SUMMARY_PREFIX}{state.summary}",
+                metadata={"summary": True, "covers": state.start}
+            )
+
+        messages = list(system_messages)
+        if state.summary_message is not None:
+            messages.append(state.summary_message)
+        messages.extend(history[state.start:])
+        messages.append(user_msg)
+        return messages
+
+    def get_stats(self, conversation_id: str) -> Dict:
+        """获取对话的窗口统计"""
+        state = self._states.get(conversation_id) or _ContextState()
+        return {
+            "window_messages": state.seen - state.start,
+            "window_tokens": state.window_tokens,
+            "summarized_messages": state.summarized_upto,
+            "summary_tokens": state.summary_message.token_count if state.summary_message else 0
+        }
+
+
 class Chatbot:
     """智能聊天机器人"""
 
-    def __init__(self, provider: ChatProvider, system_prompt: str = None):
+    def __init__(self, provider: ChatProvider, system_prompt: str = None,
+                 context_window: Optional[ContextWindow] = None):
         self.provider = provider
         self.conversations: Dict[str, List[Message]] = {}
         self.system_prompt = system_prompt
         self.plugins: List['ChatPlugin'] = []
+        self.context_window = context_window
+        self._system_message: Optional[Message] = None
+
+    def _system_messages(self) -> List[Message]:
+        """系统提示消息，提示词不变时复用同一个对象（及其 token 缓存）"""
+        if not self.system_prompt:
+            return []
+        if self._system_message is None or self._system_message.content != self.system_prompt:
+            self._system_message = Message(role=MessageRole.SYSTEM, content=self.system_prompt)
+        return [self._system_message]
 
     def create_conversation(self, conversation_id: str = None) -> str:
         """创建新对话"""
         conv_id = conversation_id or hashlib.md5(f"{time.time()}".encode()).hexdigest()
         self.conversations[conv_id] = []
+        if self.context_window is not None:
+            self.context_window.reset(conv_id)
         return conv_id
 
     def add_message(self, conversation_id: str, message: Message):
@@ -136,55 +817,121 @@ class Chatbot:
             self.create_conversation(conversation_id)
         self.conversations[conversation_id].append(message)
 
-    def chat(self, conversation_id: str, user_message: str, 
-             use_history: bool = True, max_history: int = 20) -> str:
-        """发送消息"""
+    def _prepare_turn(self, conversation_id: str, user_message: str,
+                      use_history: bool, max_history: int) -> tuple:
+        """构建本轮的消息列表，返回 (历史, 用户消息, 发送的消息)"""
         if conversation_id not in self.conversations:
             self.create_conversation(conversation_id)
 
-        # 构建消息列表
-        messages = []
-        if self.system_prompt:
-            messages.append(Message(role=MessageRole.SYSTEM, content=self.system_prompt))
-
-        # 添加历史消息
-        if use_history:
-            history = self.conversations[conversation_id][-max_history:]
-            messages.extend(history)
-
-        # 添加用户消息
+        history = self.conversations[conversation_id]
         user_msg = Message(role=MessageRole.USER, content=user_message)
-        messages.append(user_msg)
+
+        # 构建消息列表
+        if use_history and self.context_window is not None:
+            messages = self.context_window.build(conversation_id, history,
+                                                 self._system_messages(), user_msg)
+        else:
+            messages = self._system_messages()
+            if use_history:
+                messages.extend(history[-max_history:])
+            messages.append(user_msg)
 
         # 执行插件前置处理
         for plugin in self.plugins:
             messages = plugin.pre_process(messages)
 
+        return history, user_msg, messages
+
+    def chat(self, conversation_id: str, user_message: str, 
+             use_history: bool = True, max_history: int = 20) -> str:
+        """
+        发送消息
+
+        设置了 context_window 时按 token 预算打包历史，max_history 不再生效；
+        否则沿用最近 max_history 条消息。
+        """
+        history, user_msg, messages = self._prepare_turn(
+            conversation_id, user_message, use_history, max_history)
+
         # 发送请求
         response = self.provider.chat(messages)
 
-        # 添加到历史
-        self.conversations[conversation_id].append(user_msg)
-        self.conversations[conversation_id].append(response)
-
         # 执行插件后置处理
-        response = plugin.post_process(response) if (plugin := self.plugins[-1]) else response
+        for plugin in self.plugins:
+            response = plugin.post_process(response)
+
+        # 添加到历史
+        history.append(user_msg)
+        history.append(response)
 
         return response.content
 
+    def chat_stream(self, conversation_id: str, user_message: str,
+                    use_history: bool = True, max_history: int = 20) -> Iterator[str]:
+        """
+        流式发送消息，逐块产出经插件处理后的文本
+
+        回复完整产出后才写入历史；中途停止迭代则本轮不计入历史。
+        """
+        history, user_msg, messages = self._prepare_turn(
+            conversation_id, user_message, use_history, max_history)
+        filters = [plugin.stream_filter() for plugin in self.plugins]
+
+        parts = []
+        for chunk in self.provider.stream(messages):
+            text = _feed_filters(filters, chunk)
+            if text:
+                parts.append(text)
+                yield text
+        tail = _flush_filters(filters)
+        if tail:
+            parts.append(tail)
+            yield tail
+
+        history.append(user_msg)
+        history.append(Message(role=MessageRole.ASSISTANT, content="".join(parts)))
+
+    async def achat_stream(self, conversation_id: str, user_message: str,
+                           use_history: bool = True, max_history: int = 20) -> AsyncIterator[str]:
+        """chat_stream 的异步版本，使用提供商的 astream"""
+        history, user_msg, messages = self._prepare_turn(
+            conversation_id, user_message, use_history, max_history)
+        filters = [plugin.stream_filter() for plugin in self.plugins]
+
+        parts = []
+        async for chunk in self.provider.astream(messages):
+            text = _feed_filters(filters, chunk)
+            if text:
+                parts.append(text)
+                yield text
+        tail = _flush_filters(filters)
+        if tail:
+            parts.append(tail)
+            yield tail
+
+        history.append(user_msg)
+        history.append(Message(role=MessageRole.ASSISTANT, content="".join(parts)))
+
     def get_history(self, conversation_id: str) -> List[Message]:
         """获取对话历史"""
         return self.conversations.get(conversation_id, [])
 
     def clear_history(self, conversation_id: str):
-        """清空对话历史"" b6fW'6FB6Vb6fW'6F36Vb6fW'6F56fW'6FEРFVbFEVv6VbVvt6EVvr"".k{Xh.Kb"""
+        """清空对话历史"""
+        if conversation_id in self.conversations:
+            self.conversations[conversation_id] = []
+        if self.context_window is not None:
+            self.context_window.reset(conversation_id)
+
+    def add_plugin(self, plugin: 'ChatPlugin'):
+        """添加插件"""
         self.plugins.append(plugin)
 
 
 class ChatPlugin(ABC):
     """聊天插件基类"""
 
-    @abstra\method
+    @abstractmethod
     def pre_process(self, messages: List[Message]) -> List[Message]:
         """前置处理"""
         pass
@@ -194,6 +941,10 @@ class ChatPlugin(ABC):
         """后置处理"""
         pass
 
+    def stream_filter(self) -> StreamFilter:
+        """流式后置处理器，每轮回复新建一个；默认收集完整回复后调用 post_process"""
+        return _BufferedFilter(self)
+
 
 class MemoryPlugin(ChatPlugin):
     """记忆插件 - 总结对话内容"""
@@ -210,6 +961,28 @@ class MemoryPlugin(ChatPlugin):
             response.content = response.content[:self.max_summary_length] + "..."
         return response
 
+    def stream_filter(self) -> StreamFilter:
+        return _TruncateFilter(self.max_summary_length)
+
+
+class _TruncateFilter(StreamFilter):
+    """流式截断：超过长度后输出省略号并丢弃其余内容"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.emitted = 0
+        self.truncated = False
+
+    def feed(self, text: str) -> str:
+        if self.truncated:
+            return ""
+        room = self.limit - self.emitted
+        if len(text) <= room:
+            self.emitted += len(text)
+            return text
+        self.truncated = True
+        return text[:room] + "..."
+
 
 class SensitivityPlugin(ChatPlugin):
     """敏感词过滤插件"""
@@ -225,17 +998,65 @@ class SensitivityPlugin(ChatPlugin):
             response.content = response.content.replace(word, "***")
         return response
 
+    def stream_filter(self) -> StreamFilter:
+        return _ReplaceFilter(self.sensitive_words)
+
+
+class _ReplaceFilter(StreamFilter):
+    """流式敏感词替换：每个词一级依次处理，与 post_process 逐词 replace 的结果一致"""
+
+    def __init__(self, words: List[str], replacement: str = "***"):
+        self.stages = [_WordReplaceFilter(w, replacement) for w in words if w]
+
+    def feed(self, text: str) -> str:
+        return _feed_filters(self.stages, text)
+
+    def flush(self) -> str:
+        return _flush_filters(self.stages)
+
+
+class _WordReplaceFilter(StreamFilter):
+    """单个词的流式替换：替换缓冲区中完整出现的词，可能是词开头的尾部原样保留到下一块"""
+
+    def __init__(self, word: str, replacement: str):
+        self.word = word
+        self.replacement = replacement
+        self.buffer = ""
+
+    def feed(self, text: str) -> str:
+        buffer = self.buffer + text
+        parts = []
+        pos = 0
+        while True:
+            index = buffer.find(self.word, pos)
+            if index < 0:
+                break
+            parts.append(buffer[pos:index])
+            parts.append(self.replacement)
+            pos = index + len(self.word)
+        cut = max(pos, len(buffer) - len(self.word) + 1)
+        parts.append(buffer[pos:cut])
+        self.buffer = buffer[cut:]
+        return "".join(parts)
+
+    def flush(self) -> str:
+        output, self.buffer = self.buffer, ""
+        return output
+
 
 class ConversationManager:
     """对话管理器 - 管理多个机器人"""
 
     def __init__(self):
         self.bots: Dict[str, Chatbot] = {}
+        # 每个对话一把锁；没有协程持有或等待时自动回收
+        self._locks: 'weakref.WeakValueDictionary[tuple, asyncio.Lock]' = weakref.WeakValueDictionary()
 
     def create_bot(self, bot_id: str, provider: ChatProvider, 
-                   system_prompt: str = None) -> Chatbot:
+                   system_prompt: str = None,
+                   context_window: Optional[ContextWindow] = None) -> Chatbot:
         """创建机器人"""
-        bot = Chatbot(provider, system_prompt)
+        bot = Chatbot(provider, system_prompt, context_window)
         self.bots[bot_id] = bot
         return bot
 
@@ -248,6 +1069,86 @@ class ConversationManager:
         if bot_id in self.bots:
             del self.bots[bot_id]
 
+    def _conversation_lock(self, bot_id: str, conversation_id: str) -> asyncio.Lock:
+        key = (bot_id, conversation_id)
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    async def astream(self, bot_id: str, conversation_id: str, user_message: str,
+                      **kwargs) -> AsyncIterator[str]:
+        """
+        异步流式对话
+
+        同一对话的请求按到达顺序串行，保证历史一致；不同对话在同一事件循环中并发。
+        """
+        bot = self.bots.get(bot_id)
+        if bot is None:
+            raise KeyError(f"Unknown bot: {bot_id}")
+        async with self._conversation_lock(bot_id, conversation_id):
+            async for chunk in bot.achat_stream(conversation_id, user_message, **kwargs):
+                yield chunk
+
+    async def achat(self, bot_id: str, conversation_id: str, user_message: str, **kwargs) -> str:
+        """异步对话，返回完整回复"""
+        return "".join([chunk async for chunk in self.astream(bot_id, conversation_id, user_message, **kwargs)])
+
+
+def benchmark_streaming(sessions: int = 100, turns: int = 2,
+                        provider: Optional[ChatProvider] = None) -> Dict:
+    """
+    流式与并发基准
+
+    对比非流式回复与流式首个 token 的等待时间，并用 ConversationManager
+    在单个事件循环中同时服务 sessions 个会话，每个会话 turns 轮。
+    """
+    provider = provider or MockStreamingProvider()
+
+    bot = Chatbot(provider)
+    conv_id = bot.create_conversation()
+    start = time.perf_counter()
+    bot.chat(conv_id, "你好")
+    full_reply = time.perf_counter() - start
+
+    start = time.perf_counter()
+    chunks = bot.chat_stream(conv_id, "你好")
+    next(chunks)
+    first_token = time.perf_counter() - start
+    for _ in chunks:
+        pass
+
+    async def serve() -> tuple:
+        manager = ConversationManager()
+        manager.create_bot("bench", provider)
+        ttfts = []
+
+        async def session(index: int):
+            for turn in range(turns):
+                turn_start = time.perf_counter()
+                first = None
+                async for _ in manager.astream("bench", f"session-{index}", f"问题 {turn}"):
+                    if first is None:
+                        first = time.perf_counter() - turn_start
+                ttfts.append(first)
+
+        serve_start = time.perf_counter()
+        await asyncio.gather(*(session(i) for i in range(sessions)))
+        return time.perf_counter() - serve_start, sorted(ttfts)
+
+    elapsed, ttfts = asyncio.run(serve())
+    return {
+        "full_reply_s": round(full_reply, 4),
+        "first_token_s": round(first_token, 4),
+        "sessions": sessions,
+        "turns": turns,
+        "concurrent_elapsed_s": round(elapsed, 3),
+        "sequential_estimate_s": round(full_reply * sessions * turns, 3),
+        "ttft_p50_s": round(ttfts[len(ttfts) // 2], 4),
+        "ttft_p99_s": round(ttfts[min(len(ttfts) - 1, int(len(ttfts) * 0.99))], 4)
+    }
+
 
 # 演示
 def demo():
@@ -279,11 +1180,10 @@ def demo():
     conv_id = bot.create_conversation()
 
     # 发送消息
-    questions 9
-{
+    questions = [
         "你好!",
         "今天天气怎么样?",
-        *请说一个包含'坏词'的句子测试过滤",
+        "请说一个包含'坏词'的句子测试过滤",
         "总结一下我们的对话"
     ]
 
@@ -297,6 +1197,77 @@ def demo():
     for msg in bot.get_history(conv_id):
         print(f"  [{msg.role.value}] {msg.content[:60]}...")
 
+    # 长对话：按 token 预算打包历史，旧消息折叠为滚动摘要
+    print("\n" + "=" * 60)
+    print("长对话上下文打包 (2000 轮, 预算 2000 token):")
+    sizes = []
+
+    class MeasuringProvider(MockProvider):
+        def chat(self, messages: List[Message], **kwargs) -> Message:
+            sizes.append(sum(m.token_count for m in messages))
+            return super().chat(messages, **kwargs)
+
+    long_bot = Chatbot(MeasuringProvider(), "你是一个友好的助手",
+                       context_window=ContextWindow(max_tokens=2000, summary_tokens=300))
+    long_conv = long_bot.create_conversation()
+    start = time.perf_counter()
+    for i in range(2000):
+        long_bot.chat(long_conv, f"第 {i} 个问题: 请解释一下这个话题的细节。" + "补充说明" * (i % 7))
+    elapsed = time.perf_counter() - start
+    stats = long_bot.context_window.get_stats(long_conv)
+    print(f"  每轮耗时: {elapsed / 2000 * 1000:.3f}ms, 提示最大 {max(sizes)} token")
+    print(f"  窗口 {stats['window_messages']} 条消息, 已摘要 {stats['summarized_messages']} 条, "
+          f"摘要 {stats['summary_tokens']} token")
+
+    # 流式输出：插件在流上增量处理
+    print("\n" + "=" * 60)
+    print("流式输出 (敏感词跨块也能过滤):")
+    stream_bot = Chatbot(MockStreamingProvider(first_token_delay=0.05, token_delay=0.005, reply_tokens=8))
+    stream_bot.add_plugin(SensitivityPlugin(["片段3"]))
+    stream_conv = stream_bot.create_conversation()
+    print("  🤖 ", end="")
+    for chunk in stream_bot.chat_stream(stream_conv, "讲个故事"):
+        print(chunk, end="", flush=True)
+    print()
+
+    # 互相包含的敏感词：流式结果必须与 post_process 一致
+    overlap = SensitivityPlugin(["坏词", "坏"])
+    chunks = ["这是坏", "词语"]
+    stream_filter = overlap.stream_filter()
+    streamed = "".join(stream_filter.feed(c) for c in chunks) + stream_filter.flush()
+    expected = overlap.post_process(Message(MessageRole.ASSISTANT, "".join(chunks))).content
+    assert streamed == expected, (streamed, expected)
+    print(f"  重叠敏感词 {chunks} -> {streamed}")
+
+    print("\n流式与并发基准 (100 个会话 x 2 轮):")
+    result = benchmark_streaming(sessions=100, turns=2)
+    print(f"  非流式完整回复: {result['full_reply_s'] * 1000:.0f}ms, "
+          f"流式首 token: {result['first_token_s'] * 1000:.0f}ms")
+    print(f"  并发耗时 {result['concurrent_elapsed_s']:.2f}s "
+          f"(串行约 {result['sequential_estimate_s']:.0f}s), "
+          f"首 token p50 {result['ttft_p50_s'] * 1000:.0f}ms / p99 {result['ttft_p99_s'] * 1000:.0f}ms")
+
+    # 回复缓存：相同或相近的 FAQ 问题不再重复调用提供商
+    print("\n" + "=" * 60)
+    print("回复缓存 (精确 + 相似匹配, 并发相同请求合并):")
+    cached = CachedProvider(MockStreamingProvider(first_token_delay=0.05, token_delay=0.002),
+                            ResponseCache(max_entries=500, ttl=600, similarity_threshold=0.7))
+    faq_bot = Chatbot(cached, "你是客服助手")
+    for q in ["如何重置密码?", "如何重置密码？", "  如何重置密码?  ", "请问如何重置密码?", "如何修改收货地址?"]:
+        start = time.perf_counter()
+        faq_bot.chat(faq_bot.create_conversation(), q)
+        print(f"  {q!r}: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    async def burst():
+        async def one():
+            return "".join([chunk async for chunk in cached.astream([Message(MessageRole.USER, "退款多久到账?")])])
+        return await asyncio.gather(*[one() for _ in range(20)])
+
+    start = time.perf_counter()
+    asyncio.run(burst())
+    print(f"  20 个并发相同请求: {(time.perf_counter() - start) * 1000:.0f}ms")
+    print(f"  统计: {cached.get_stats()}")
+
     print("\n演示完成!")
 
 
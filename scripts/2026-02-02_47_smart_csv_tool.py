@@ -3,6 +3,8 @@
 Smart CSV Tool - 智能CSV数据处理工具
 =====================================
 功能强大的CSV数据处理和分析工具，支持筛选、统计、转换和导出。
+大文件可使用列式存储模式 (ColumnarCSVTool / --columnar)，
+超出内存的文件可使用流式查询管道 (CSVStream / --stream)。
 
 作者: AI Assistant
 日期: 2026-02-02
@@ -11,11 +13,24 @@ Smart CSV Tool - 智能CSV数据处理工具
 import csv
 import json
 import argparse
+import heapq
+import itertools
+import operator
+import os
 import sys
+import tempfile
+from array import array
 from collections import defaultdict
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 from datetime import datetime
 
+# 可选: NumPy 用于列式模式的向量化计算
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 
 class SmartCSVTool:
     """智能CSV处理工具类"""
@@ -73,7 +88,8 @@ class SmartCSVTool:
                 types[col] = "string"
         return types
     
-    def _is_number(self, value: str) -> bool:
+    @staticmethod
+    def _is_number(value: str) -> bool:
         """检查值是否为数字"""
         try:
             float(value)
@@ -81,7 +97,8 @@ class SmartCSVTool:
         except ValueError:
             return False
     
-    def _is_date(self, value: str) -> bool:
+    @staticmethod
+    def _is_date(value: str) -> bool:
         """检查值是否为日期"""
         date_formats = [
             '%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y',
@@ -114,34 +131,33 @@ class SmartCSVTool:
             value: 匹配的值
             operator: 操作符 (==, !=, >, <, >=, <=, contains, startswith, endswith)
         """
-        results = []
-        for row in self.data:
-            row_value = row.get(column, '')
-            match = False
-            
-            if operator == "==":
-                match = row_value == value
-            elif operator == "!=":
-                match = row_value != value
-            elif operator == ">":
-                match = self._is_number(row_value) and self._is_number(value) and float(row_value) > float(value)
+        return [row for row in self.data if self._match_value(row.get(column, ''), value, operator)]
+    
+    @staticmethod
+    def _match_value(row_value: str, value: str, operator: str) -> bool:
+        """判断单个值是否满足筛选条件"""
+        if operator == "==":
+            return row_value == value
+        elif operator == "!=":
+            return row_value != value
+        elif operator in (">", "<", ">=", "<="):
+            if not (SmartCSVTool._is_number(row_value) and SmartCSVTool._is_number(value)):
+                return False
+            left, right = float(row_value), float(value)
+            if operator == ">":
+                return left > right
             elif operator == "<":
-                match = self._is_number(row_value) and self._is_number(value) and float(row_value) < float(value)
+                return left < right
             elif operator == ">=":
-                match = self._is_number(row_value) and self._is_number(value) and float(row_value) >= float(value)
-            elif operator == "<=":
-                match = self._is_number(row_value) and self._is_number(value) and float(row_value) <= float(value)
-            elif operator == "contains":
-                match = value in row_value
-            elif operator == "startswith":
-                match = row_value.startswith(value)
-            elif operator == "endswith":
-                match = row_value.endswith(value)
-            
-            if match:
-                results.append(row)
-        
-        return results
+                return left >= right
+            return left <= right
+        elif operator == "contains":
+            return value in row_value
+        elif operator == "startswith":
+            return row_value.startswith(value)
+        elif operator == "endswith":
+            return row_value.endswith(value)
+        return False
     
     def statistics(self, columns: Optional[List[str]] = None) -> Dict[str, Any]:
         """计算数值列的统计信息
@@ -351,6 +367,987 @@ class SmartCSVTool:
         print()
 
 
+# ==================== 列式存储 ====================
+
+NAN = float("nan")
+
+_NUMERIC_OPERATORS = {
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+
+
+def _parse_number(value: str) -> Optional[float]:
+    """解析数值，失败返回None"""
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class NumericColumn:
+    """数值列: array('d') 存储，缺失值为 NaN
+    
+    与规范格式不一致的原始文本 (如 "1.50"、"007") 记录在稀疏的 overrides 中，
+    导出时按原文输出。
+    """
+    
+    kind = "numeric"
+    
+    def __init__(self, name: str, is_integer: bool = False):
+        self.name = name
+        self.is_integer = is_integer
+        self.values = array('d')
+        self.overrides: Dict[int, str] = {}
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def append(self, raw: str) -> None:
+        if not raw:
+            self.values.append(NAN)
+            return
+        value = float(raw)
+        if self._format(value) != raw:
+            self.overrides[len(self.values)] = raw
+        self.values.append(value)
+    
+    def _format(self, value: float) -> str:
+        if value != value:
+            return ''
+        return str(int(value)) if self.is_integer else repr(value)
+    
+    def get(self, index: int) -> str:
+        text = self.overrides.get(index) if self.overrides else None
+        return text if text is not None else self._format(self.values[index])
+    
+    def take(self, indices) -> List[str]:
+        """批量取出文本值"""
+        if NUMPY_AVAILABLE:
+            picked = self.as_numpy()[indices].tolist()
+        else:
+            picked = [self.values[i] for i in indices]
+        fmt = self._format
+        texts = [fmt(x) for x in picked]
+        if self.overrides:
+            overrides = self.overrides
+            for pos, i in enumerate(indices):
+                text = overrides.get(int(i))
+                if text is not None:
+                    texts[pos] = text
+        return texts
+    
+    def nbytes(self) -> int:
+        return (self.values.itemsize * len(self.values)
+                + sum(len(text) for text in self.overrides.values()))
+    
+    def as_numpy(self):
+        """零拷贝的 NumPy 视图"""
+        return np.frombuffer(self.values, dtype=np.float64)
+    
+    def numbers(self, indices=None):
+        """返回非缺失的数值 (NumPy 可用时返回 ndarray)"""
+        if NUMPY_AVAILABLE:
+            values = self.as_numpy() if indices is None else self.as_numpy()[indices]
+            return values[~np.isnan(values)]
+        source = self.values if indices is None else (self.values[i] for i in indices)
+        return [x for x in source if x == x]
+    
+    def match_indices(self, value: str, op: str, matcher: Callable[[str, str, str], bool]):
+        if op in _NUMERIC_OPERATORS:
+            target = _parse_number(value)
+            if target is None:
+                return []
+            compare = _NUMERIC_OPERATORS[op]
+            if NUMPY_AVAILABLE:
+                return np.flatnonzero(compare(self.as_numpy(), target))
+            return [i for i, x in enumerate(self.values) if compare(x, target)]
+        if op in ("==", "!="):
+            # 先按数值 (或缺失) 缩小候选，再核对原文，语义与逐行字符串比较一致
+            target = _parse_number(value) if value else NAN
+            if value and target is None:
+                equal = []
+            elif NUMPY_AVAILABLE:
+                values = self.as_numpy()
+                candidates = np.flatnonzero(np.isnan(values) if target != target else values == target)
+                equal = [i for i in candidates.tolist() if self.get(i) == value]
+            else:
+                equal = [i for i, x in enumerate(self.values)
+                         if (x == target or (x != x and target != target)) and self.get(i) == value]
+            if op == "==":
+                return equal
+            if NUMPY_AVAILABLE:
+                mask = np.ones(len(self), dtype=bool)
+                mask[equal] = False
+                return np.flatnonzero(mask)
+            excluded = set(equal)
+            return [i for i in range(len(self)) if i not in excluded]
+        return [i for i in range(len(self)) if matcher(self.get(i), value, op)]
+    
+    def group_indices(self) -> Dict[str, Any]:
+        groups = defaultdict(list)
+        for i in range(len(self)):
+            groups[self.get(i)].append(i)
+        return dict(groups)
+    
+    def argsort(self, reverse: bool = False):
+        # 缺失值视为最小 (与按字符串排序时空串在前一致)
+        if NUMPY_AVAILABLE:
+            keys = self.as_numpy().copy()
+            keys[np.isnan(keys)] = -np.inf
+            return np.argsort(-keys if reverse else keys, kind='stable')
+        keys = [x if x == x else float('-inf') for x in self.values]
+        return sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+
+
+class CategoryColumn:
+    """字典编码列: 低基数字符串存为整数编码 + 类别表"""
+    
+    kind = "category"
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.codes = array('i')
+        self.categories: List[str] = []
+        self._lookup: Dict[str, int] = {}
+        self._category_numbers: Optional[List[Optional[float]]] = None
+    
+    def __len__(self) -> int:
+        return len(self.codes)
+    
+    def append(self, raw: str) -> None:
+        code = self._lookup.get(raw)
+        if code is None:
+            code = len(self.categories)
+            self._lookup[raw] = code
+            self.categories.append(raw)
+        self.codes.append(code)
+    
+    def get(self, index: int) -> str:
+        return self.categories[self.codes[index]]
+    
+    def take(self, indices) -> List[str]:
+        categories = self.categories
+        if NUMPY_AVAILABLE:
+            return [categories[code] for code in self.as_numpy()[indices].tolist()]
+        codes = self.codes
+        return [categories[codes[i]] for i in indices]
+    
+    def nbytes(self) -> int:
+        return self.codes.itemsize * len(self.codes) + sum(len(c.encode('utf-8')) for c in self.categories)
+    
+    def as_numpy(self):
+        return np.frombuffer(self.codes, dtype=np.int32)
+    
+    def _codes_in(self, hits: List[int]):
+        if NUMPY_AVAILABLE:
+            codes = self.as_numpy()
+            if len(hits) == 1:
+                return np.flatnonzero(codes == hits[0])
+            return np.flatnonzero(np.isin(codes, hits))
+        hit_set = set(hits)
+        return [i for i, code in enumerate(self.codes) if code in hit_set]
+    
+    def numbers(self, indices=None):
+        # 每个类别只解析一次
+        if self._category_numbers is None:
+            self._category_numbers = [_parse_number(c) if c else None for c in self.categories]
+        lookup = self._category_numbers
+        source = self.codes if indices is None else (self.codes[i] for i in indices)
+        values = [lookup[code] for code in source]
+        return [x for x in values if x is not None]
+    
+    def match_indices(self, value: str, op: str, matcher: Callable[[str, str, str], bool]):
+        # 条件只在类别表上求值一次，再按编码选行
+        hits = [code for code, category in enumerate(self.categories) if matcher(category, value, op)]
+        if not hits:
+            return []
+        return self._codes_in(hits)
+    
+    def group_indices(self) -> Dict[str, Any]:
+        # 编码按首次出现顺序分配，因此分组顺序与逐行分组一致
+        if NUMPY_AVAILABLE:
+            codes = self.as_numpy()
+            counts = np.bincount(codes, minlength=len(self.categories))
+            order = np.argsort(codes, kind='stable')
+            buckets = np.split(order, np.cumsum(counts)[:-1])
+        else:
+            buckets = [[] for _ in self.categories]
+            for i, code in enumerate(self.codes):
+                buckets[code].append(i)
+        return {self.categories[code]: bucket for code, bucket in enumerate(buckets) if len(bucket)}
+    
+    def argsort(self, reverse: bool = False):
+        # 只对类别排序，再按排名排序编码
+        ranks = [0] * len(self.categories)
+        for rank, code in enumerate(sorted(range(len(self.categories)), key=self.categories.__getitem__)):
+            ranks[code] = rank
+        if NUMPY_AVAILABLE:
+            keys = np.asarray(ranks, dtype=np.int64)[self.as_numpy()]
+            return np.argsort(-keys if reverse else keys, kind='stable')
+        keys = [ranks[code] for code in self.codes]
+        return sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+
+
+class StringColumn:
+    """高基数字符串列"""
+    
+    kind = "string"
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.values: List[str] = []
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def append(self, raw: str) -> None:
+        self.values.append(raw)
+    
+    def get(self, index: int) -> str:
+        return self.values[index]
+    
+    def take(self, indices) -> List[str]:
+        values = self.values
+        return [values[i] for i in indices]
+    
+    def nbytes(self) -> int:
+        return sum(sys.getsizeof(v) for v in self.values)
+    
+    def numbers(self, indices=None):
+        source = self.values if indices is None else (self.values[i] for i in indices)
+        values = [_parse_number(v) for v in source if v]
+        return [x for x in values if x is not None]
+    
+    def match_indices(self, value: str, op: str, matcher: Callable[[str, str, str], bool]):
+        return [i for i, v in enumerate(self.values) if matcher(v, value, op)]
+    
+    def group_indices(self) -> Dict[str, Any]:
+        groups = defaultdict(list)
+        for i, v in enumerate(self.values):
+            groups[v].append(i)
+        return dict(groups)
+    
+    def argsort(self, reverse: bool = False):
+        return sorted(range(len(self.values)), key=self.values.__getitem__, reverse=reverse)
+
+
+Column = Union[NumericColumn, CategoryColumn, StringColumn]
+
+
+class ColumnarCSVTool(SmartCSVTool):
+    """列式存储的CSV工具
+    
+    加载时先做一遍类型推断，再把每列存为紧凑的类型化数组:
+    数值列为 array('d')，低基数字符串列做字典编码，其余保持字符串列表。
+    筛选、分组、聚合和排序直接在列上进行 (安装了 NumPy 时向量化执行)，
+    统计时不再逐行把字符串解析为浮点数。
+    
+    注意: 数值列按数值而不是字符串排序 (行式模式下 "100" 排在 "85" 前面)。
+    """
+    
+    CHUNK_ROWS = 65536
+    
+    def __init__(self, file_path: str, category_limit: int = 4096):
+        """初始化列式CSV工具
+        
+        Args:
+            file_path: CSV文件路径
+            category_limit: 字典编码的最大不同值数量
+        """
+        self.file_path = file_path
+        self.category_limit = category_limit
+        self.headers: List[str] = []
+        self.columns: Dict[str, Column] = {}
+        self.row_count = 0
+        self._load_csv()
+    
+    def _load_csv(self) -> None:
+        """两遍加载: 第一遍推断类型，第二遍写入类型化列"""
+        try:
+            plans = self._infer_column_plans()
+            with open(self.file_path, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                columns = [plans[name] for name in self.headers]
+                width = len(columns)
+                for row in reader:
+                    if not row:
+                        continue  # 与 DictReader 一样跳过空行
+                    if len(row) < width:
+                        row = row + [''] * (width - len(row))
+                    for column, raw in zip(columns, row):
+                        column.append(raw)
+            self.columns = plans
+            self.row_count = len(columns[0]) if columns else 0
+        except FileNotFoundError:
+            print(f"错误: 文件 '{self.file_path}' 不存在")
+            sys.exit(1)
+        except Exception as e:
+            print(f"错误: 读取CSV文件失败 - {e}")
+            sys.exit(1)
+    
+    def _infer_column_plans(self) -> Dict[str, Column]:
+        """类型推断: 判断每列是否数值/整数，并统计基数"""
+        with open(self.file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            self.headers = next(reader, [])
+            width = len(self.headers)
+            numeric = [True] * width
+            integer = [True] * width
+            distinct: List[Optional[set]] = [set() for _ in range(width)]
+            rows = 0
+            for row in reader:
+                if not row:
+                    continue
+                rows += 1
+                for i in range(width):
+                    raw = row[i] if i < len(row) else ''
+                    if distinct[i] is not None:
+                        distinct[i].add(raw)
+                        if len(distinct[i]) > self.category_limit:
+                            distinct[i] = None
+                    if not raw or not numeric[i]:
+                        continue
+                    number = _parse_number(raw)
+                    if number is None:
+                        numeric[i] = False
+                    elif integer[i] and not (number.is_integer() and abs(number) < 2 ** 53):
+                        integer[i] = False
+        
+        plans: Dict[str, Column] = {}
+        for i, name in enumerate(self.headers):
+            values = distinct[i]
+            has_values = values is None or any(values)
+            if numeric[i] and has_values:
+                plans[name] = NumericColumn(name, is_integer=integer[i])
+            elif values is not None and len(values) <= max(1, rows // 2):
+                plans[name] = CategoryColumn(name)
+            else:
+                plans[name] = StringColumn(name)
+        return plans
+    
+    # ---------- 行视图 ----------
+    
+    @property
+    def data(self) -> List[Dict[str, str]]:
+        """按需物化全部行 (兼容行式接口，大文件慎用)"""
+        return list(self.iter_rows())
+    
+    def iter_rows(self, indices=None, columns: Optional[List[str]] = None):
+        """逐行生成字典，按块从各列批量取值，不物化整张表"""
+        names = columns if columns is not None else self.headers
+        if indices is None:
+            indices = range(self.row_count)
+        for start in range(0, len(indices), self.CHUNK_ROWS):
+            yield from self._take_rows(indices[start:start + self.CHUNK_ROWS], names)
+    
+    def _take_rows(self, indices, names: List[str]) -> List[Dict[str, str]]:
+        if NUMPY_AVAILABLE:
+            indices = np.asarray(indices, dtype=np.intp)
+        blank = [''] * len(indices)
+        values = [self.columns[name].take(indices) if name in self.columns else blank
+                  for name in names]
+        return [dict(zip(names, row)) for row in zip(*values)]
+    
+    def _rows(self, indices) -> List[Dict[str, str]]:
+        return list(self.iter_rows(indices))
+    
+    # ---------- 查询 ----------
+    
+    def info(self) -> Dict[str, Any]:
+        """获取CSV文件基本信息 (含列存储方式与内存占用)"""
+        info = {
+            "file_path": self.file_path,
+            "total_rows": self.row_count,
+            "total_columns": len(self.headers),
+            "columns": self.headers,
+            "column_types": self._guess_column_types(),
+        }
+        info["storage"] = {name: column.kind for name, column in self.columns.items()}
+        info["memory_bytes"] = sum(column.nbytes() for column in self.columns.values())
+        return info
+    
+    def _guess_column_types(self) -> Dict[str, str]:
+        """列类型来自加载时的推断结果，日期只检查前100个值"""
+        types = {}
+        for name in self.headers:
+            column = self.columns[name]
+            if column.kind == "numeric":
+                types[name] = "numeric"
+                continue
+            values = [column.get(i) for i in range(min(100, self.row_count))]
+            if any(values) and all(self._is_date(v) for v in values if v):
+                types[name] = "date"
+            else:
+                types[name] = "string"
+        return types
+    
+    def filter(self, condition: Callable[[Dict[str, str]], bool]) -> List[Dict[str, str]]:
+        """根据条件函数筛选 (需逐行构建字典，优先使用 filter_by_column)"""
+        return [row for row in self.iter_rows() if condition(row)]
+    
+    def filter_indices(self, column: str, value: str, operator: str = "=="):
+        """返回满足条件的行号 (列式筛选，不构建行)"""
+        if column not in self.columns:
+            return [i for i in range(self.row_count) if self._match_value('', value, operator)]
+        return self.columns[column].match_indices(value, operator, self._match_value)
+    
+    def filter_by_column(self, column: str, value: str, operator: str = "==") -> List[Dict[str, str]]:
+        """根据列值筛选数据 (列式执行，只物化命中的行)"""
+        return self._rows(self.filter_indices(column, value, operator))
+    
+    def statistics(self, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """计算数值列的统计信息 (直接读取类型化数组)"""
+        if columns is None:
+            columns = [name for name in self.headers if self.columns[name].kind == "numeric"]
+        
+        stats = {}
+        for col in columns:
+            if col not in self.columns:
+                continue
+            values = self.columns[col].numbers()
+            if len(values):
+                stats[col] = self._summarize(values)
+        return stats
+    
+    def _summarize(self, values) -> Dict[str, Any]:
+        """计算一组数值的统计量"""
+        n = len(values)
+        if NUMPY_AVAILABLE and isinstance(values, np.ndarray):
+            total = float(values.sum())
+            mean_val = total / n
+            return {
+                "count": n,
+                "sum": round(total, 2),
+                "mean": round(mean_val, 2),
+                "min": float(values.min()),
+                "max": float(values.max()),
+                "median": float(np.median(values)),
+                "std": round(float(values.std(ddof=1)), 2) if n > 1 else 0
+            }
+        total = sum(values)
+        mean_val = total / n
+        sorted_vals = sorted(values)
+        mid = n // 2
+        return {
+            "count": n,
+            "sum": round(total, 2),
+            "mean": round(mean_val, 2),
+            "min": sorted_vals[0],
+            "max": sorted_vals[-1],
+            "median": sorted_vals[mid] if n % 2 else (sorted_vals[mid-1] + sorted_vals[mid]) / 2,
+            "std": self._standard_deviation(values, mean_val) if n > 1 else 0
+        }
+    
+    def group_indices(self, column: str) -> Dict[str, Any]:
+        """按列分组，返回 {分组值: 行号}"""
+        if column not in self.columns:
+            return {'N/A': range(self.row_count)} if self.row_count else {}
+        return self.columns[column].group_indices()
+    
+    def group_by(self, column: str) -> Dict[str, List[Dict[str, str]]]:
+        """按列分组数据"""
+        return {key: self._rows(indices) for key, indices in self.group_indices(column).items()}
+    
+    def aggregate(self, group_column: str, agg_columns: List[str],
+                  agg_func: str = "sum") -> List[Dict[str, Any]]:
+        """分组聚合计算 (按分组行号直接在数值列上计算)"""
+        groups = self.group_indices(group_column)
+        results = [{group_column: key, "count": len(indices)} for key, indices in groups.items()]
+        
+        for col in agg_columns:
+            column = self.columns.get(col)
+            if column is None:
+                continue
+            vectorized = self._bincount_aggregate(group_column, column, agg_func)
+            for result, indices in zip(results, groups.values()):
+                if vectorized is not None:
+                    value = vectorized.get(result[group_column])
+                    if value is not None:
+                        result[f"{col}_{agg_func}"] = value
+                    continue
+                values = column.numbers(indices)
+                if not len(values):
+                    continue
+                if agg_func == "sum":
+                    result[f"{col}_sum"] = round(float(sum(values)), 2)
+                elif agg_func == "avg":
+                    result[f"{col}_avg"] = round(float(sum(values)) / len(values), 2)
+                elif agg_func == "count":
+                    result[f"{col}_count"] = len(values)
+                elif agg_func == "min":
+                    result[f"{col}_min"] = float(min(values))
+                elif agg_func == "max":
+                    result[f"{col}_max"] = float(max(values))
+        
+        return results
+    
+    def _bincount_aggregate(self, group_column: str, column: Column,
+                            agg_func: str) -> Optional[Dict[str, Any]]:
+        """字典编码分组 + 数值列的 sum/avg/count 用 bincount 一次算完"""
+        group = self.columns.get(group_column)
+        if not (NUMPY_AVAILABLE and isinstance(group, CategoryColumn)
+                and isinstance(column, NumericColumn) and agg_func in ("sum", "avg", "count")):
+            return None
+        values = column.as_numpy()
+        valid = ~np.isnan(values)
+        codes = group.as_numpy()[valid]
+        size = len(group.categories)
+        counts = np.bincount(codes, minlength=size)
+        sums = np.bincount(codes, weights=values[valid], minlength=size)
+        output = {}
+        for code, category in enumerate(group.categories):
+            if not counts[code]:
+                continue
+            if agg_func == "sum":
+                output[category] = round(float(sums[code]), 2)
+            elif agg_func == "avg":
+                output[category] = round(float(sums[code]) / int(counts[code]), 2)
+            else:
+                output[category] = int(counts[code])
+        return output
+    
+    def sort_indices(self, column: str, reverse: bool = False):
+        """返回排序后的行号 (列上 argsort，不构建行)"""
+        if column not in self.columns:
+            return range(self.row_count)
+        return self.columns[column].argsort(reverse)
+    
+    def sort(self, column: str, reverse: bool = False) -> List[Dict[str, str]]:
+        """按列排序数据 (列上 argsort 后物化行)"""
+        return self._rows(self.sort_indices(column, reverse))
+    
+    def select_columns(self, columns: List[str]) -> List[Dict[str, str]]:
+        """选择指定的列"""
+        return list(self.iter_rows(columns=columns))
+    
+    def rename_column(self, old_name: str, new_name: str) -> None:
+        """重命名列 (只改列名，不触碰数据)"""
+        if old_name not in self.headers:
+            print(f"错误: 列 '{old_name}' 不存在")
+            return
+        
+        self.headers = [new_name if col == old_name else col for col in self.headers]
+        column = self.columns.pop(old_name)
+        column.name = new_name
+        self.columns = {name: self.columns.get(name, column) for name in self.headers}
+    
+    def add_column(self, column_name: str, default_value: str = "") -> None:
+        """添加新列 (存为单类别的字典编码列)"""
+        if column_name in self.headers:
+            print(f"警告: 列 '{column_name}' 已存在")
+            return
+        
+        column = CategoryColumn(column_name)
+        column.categories.append(default_value)
+        column._lookup[default_value] = 0
+        column.codes = array('i', bytes(array('i').itemsize * self.row_count))
+        self.headers.append(column_name)
+        self.columns[column_name] = column
+    
+    def export_json(self, output_path: str, data: Optional[List[Dict[str, str]]] = None) -> None:
+        """导出为JSON格式 (data为None时逐行写出，不物化整张表)"""
+        if data is not None:
+            super().export_json(output_path, data)
+            return
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write('[')
+            for i, row in enumerate(self.iter_rows()):
+                f.write(',\n  ' if i else '\n  ')
+                f.write(json.dumps(row, ensure_ascii=False))
+            f.write('\n]' if self.row_count else ']')
+        print(f"已导出到: {output_path}")
+    
+    def export_csv(self, output_path: str, data: Optional[List[Dict[str, str]]] = None,
+                   columns: Optional[List[str]] = None) -> None:
+        """导出为CSV格式 (data为None时逐行写出)"""
+        if data is not None:
+            super().export_csv(output_path, data, columns)
+            return
+        cols = columns if columns else self.headers
+        with open(output_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=cols)
+            writer.writeheader()
+            writer.writerows(self.iter_rows(columns=cols))
+        print(f"已导出到: {output_path}")
+    
+    def preview(self, n: int = 5) -> None:
+        """预览数据"""
+        print(f"\n{'='*60}")
+        print(f"文件: {self.file_path}")
+        print(f"总行数: {self.row_count}, 总列数: {len(self.headers)}")
+        print(f"列名: {', '.join(self.headers)}")
+        print(f"{'='*60}")
+        print("\n前5行预览:")
+        for i, row in enumerate(self.iter_rows(range(min(n, self.row_count)))):
+            print(f"行{i+1}: {row}")
+        print()
+
+
+# ==================== 流式查询 ====================
+
+RowChunks = Iterator[List[Dict[str, str]]]
+
+
+class CSVStream:
+    """惰性流式查询管道
+    
+    filter / select_columns / sort 只记录处理阶段，直到导出、聚合或迭代时
+    才按块读取文件并逐块执行，内存只与块大小 (以及分组数量) 有关。
+    超过内存预算的排序会把有序段写入临时文件，再做多路归并 (外部排序)。
+    
+    示例:
+        (CSVStream("big.csv")
+            .filter_by_column("city", "北京")
+            .select_columns(["name", "score"])
+            .export_csv("beijing.csv"))
+    """
+    
+    def __init__(self, file_path: str, chunk_rows: int = 50000,
+                 headers: Optional[List[str]] = None,
+                 stages: Optional[List[Callable[[RowChunks], RowChunks]]] = None):
+        """初始化流式查询
+        
+        Args:
+            file_path: CSV文件路径
+            chunk_rows: 每次读取和处理的行数
+        """
+        self.file_path = file_path
+        self.chunk_rows = chunk_rows
+        self.stages = stages or []
+        self.headers = headers if headers is not None else self._read_headers()
+    
+    def _read_headers(self) -> List[str]:
+        try:
+            with open(self.file_path, 'r', encoding='utf-8', newline='') as f:
+                return next(csv.reader(f), [])
+        except FileNotFoundError:
+            print(f"错误: 文件 '{self.file_path}' 不存在")
+            sys.exit(1)
+    
+    def _derive(self, stage: Callable[[RowChunks], RowChunks],
+                headers: Optional[List[str]] = None) -> "CSVStream":
+        """返回追加了一个阶段的新管道 (原管道保持不变，可复用)"""
+        return CSVStream(self.file_path, self.chunk_rows,
+                         list(headers if headers is not None else self.headers),
+                         self.stages + [stage])
+    
+    def _read_chunks(self) -> RowChunks:
+        """按块读取原始行"""
+        with open(self.file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            headers = next(reader, [])
+            width = len(headers)
+            chunk: List[Dict[str, str]] = []
+            for row in reader:
+                if not row:
+                    continue  # 与 DictReader 一样跳过空行
+                if len(row) < width:
+                    row = row + [''] * (width - len(row))
+                chunk.append(dict(zip(headers, row)))
+                if len(chunk) >= self.chunk_rows:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+    
+    def chunks(self) -> RowChunks:
+        """执行管道，按块产出结果行"""
+        stream = self._read_chunks()
+        for stage in self.stages:
+            stream = stage(stream)
+        return stream
+    
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        for chunk in self.chunks():
+            yield from chunk
+    
+    # ---------- 惰性阶段 ----------
+    
+    def filter(self, condition: Callable[[Dict[str, str]], bool]) -> "CSVStream":
+        """根据条件函数筛选"""
+        def stage(chunks: RowChunks) -> RowChunks:
+            for chunk in chunks:
+                kept = [row for row in chunk if condition(row)]
+                if kept:
+                    yield kept
+        return self._derive(stage)
+    
+    def filter_by_column(self, column: str, value: str, operator: str = "==") -> "CSVStream":
+        """根据列值筛选 (操作符同 SmartCSVTool.filter_by_column)"""
+        match = SmartCSVTool._match_value
+        return self.filter(lambda row: match(row.get(column, ''), value, operator))
+    
+    def select_columns(self, columns: List[str]) -> "CSVStream":
+        """选择指定的列"""
+        def stage(chunks: RowChunks) -> RowChunks:
+            for chunk in chunks:
+                yield [{col: row.get(col, '') for col in columns} for row in chunk]
+        return self._derive(stage, headers=columns)
+    
+    def sort(self, column: str, reverse: bool = False, numeric: bool = False,
+             memory_rows: int = 200000) -> "CSVStream":
+        """排序，超过 memory_rows 行时溢写到磁盘做外部归并排序
+        
+        Args:
+            column: 排序依据的列名
+            reverse: 是否降序
+            numeric: 按数值排序 (缺失或非数值视为最小)，默认按字符串排序
+            memory_rows: 内存中最多缓存的行数
+        """
+        if numeric:
+            def key(row: Dict[str, str]) -> float:
+                value = _parse_number(row.get(column, '') or 'x')
+                return value if value is not None else float('-inf')
+        else:
+            def key(row: Dict[str, str]) -> str:
+                return row.get(column, '')
+        headers = list(self.headers)
+        chunk_rows = self.chunk_rows
+        
+        def stage(chunks: RowChunks) -> RowChunks:
+            yield from _external_sort(chunks, key, reverse, memory_rows, headers, chunk_rows)
+        return self._derive(stage)
+    
+    # ---------- 终止操作 ----------
+    
+    def head(self, n: int = 5) -> List[Dict[str, str]]:
+        """取前n行 (读到足够行数即停止)"""
+        return list(itertools.islice(iter(self), n))
+    
+    def count(self) -> int:
+        """统计结果行数"""
+        return sum(len(chunk) for chunk in self.chunks())
+    
+    def info(self) -> Dict[str, Any]:
+        """基本信息，格式同 SmartCSVTool.info (总行数需要完整读一遍)"""
+        return {
+            "file_path": self.file_path,
+            "total_rows": self.count(),
+            "total_columns": len(self.headers),
+            "columns": self.headers,
+            "column_types": self._guess_column_types(),
+        }
+    
+    def _guess_column_types(self) -> Dict[str, str]:
+        """按前100行猜测列类型，规则同 SmartCSVTool"""
+        sample = self.head(100)
+        types = {}
+        for col in self.headers:
+            values = [row.get(col, '') for row in sample]
+            if all(SmartCSVTool._is_number(v) for v in values if v):
+                types[col] = "numeric"
+            elif all(SmartCSVTool._is_date(v) for v in values if v):
+                types[col] = "date"
+            else:
+                types[col] = "string"
+        return types
+    
+    def statistics(self, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """单遍统计数值列，格式同 SmartCSVTool.statistics
+        
+        每列只保留计数、总和、最值和 Welford 方差累加器；中位数需要保存全部数值，
+        流式统计不提供。
+        """
+        if columns is None:
+            columns = [col for col, type_ in self._guess_column_types().items() if type_ == "numeric"]
+        
+        # 列 -> [数量, 总和, 最小, 最大, 均值, 离差平方和]
+        accs: Dict[str, List[float]] = {}
+        is_number = SmartCSVTool._is_number
+        for chunk in self.chunks():
+            for row in chunk:
+                for col in columns:
+                    val = row.get(col, '')
+                    if not (val and is_number(val)):
+                        continue
+                    number = float(val)
+                    acc = accs.get(col)
+                    if acc is None:
+                        accs[col] = [1, number, number, number, number, 0.0]
+                        continue
+                    acc[0] += 1
+                    acc[1] += number
+                    if number < acc[2]:
+                        acc[2] = number
+                    if number > acc[3]:
+                        acc[3] = number
+                    delta = number - acc[4]
+                    acc[4] += delta / acc[0]
+                    acc[5] += delta * (number - acc[4])
+        
+        stats = {}
+        for col in columns:
+            acc = accs.get(col)
+            if acc is None:
+                continue
+            n, total, low, high, _, m2 = acc
+            stats[col] = {
+                "count": n,
+                "sum": round(total, 2),
+                "mean": round(total / n, 2),
+                "min": low,
+                "max": high,
+                "std": round((m2 / (n - 1)) ** 0.5, 2) if n > 1 else 0
+            }
+        return stats
+    
+    def preview(self, n: int = 5) -> None:
+        """预览前n行 (不统计总行数，避免读完整个文件)"""
+        print(f"\n{'='*60}")
+        print(f"文件: {self.file_path}")
+        print(f"总列数: {len(self.headers)}")
+        print(f"列名: {', '.join(self.headers)}")
+        print(f"{'='*60}")
+        print(f"\n前{n}行预览:")
+        for i, row in enumerate(self.head(n)):
+            print(f"行{i+1}: {row}")
+        print()
+    
+    def group_by(self, column: str) -> "GroupedCSVStream":
+        """按列分组，之后调用 aggregate 单遍聚合"""
+        return GroupedCSVStream(self, column)
+    
+    def aggregate(self, group_column: str, agg_columns: List[str],
+                  agg_func: str = "sum") -> List[Dict[str, Any]]:
+        """单遍分组聚合，结果格式同 SmartCSVTool.aggregate"""
+        return self.group_by(group_column).aggregate(agg_columns, agg_func)
+    
+    def export_csv(self, output_path: str, columns: Optional[List[str]] = None) -> int:
+        """流式导出为CSV，返回写出的行数"""
+        cols = columns if columns else self.headers
+        written = 0
+        with open(output_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=cols, extrasaction='ignore')
+            writer.writeheader()
+            for chunk in self.chunks():
+                writer.writerows(chunk)
+                written += len(chunk)
+        print(f"已导出到: {output_path}")
+        return written
+    
+    def export_json(self, output_path: str) -> int:
+        """流式导出为JSON数组，返回写出的行数"""
+        written = 0
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write('[')
+            for chunk in self.chunks():
+                for row in chunk:
+                    f.write(',\n  ' if written else '\n  ')
+                    f.write(json.dumps(row, ensure_ascii=False))
+                    written += 1
+            f.write('\n]' if written else ']')
+        print(f"已导出到: {output_path}")
+        return written
+
+
+class GroupedCSVStream:
+    """分组后的流式查询，每组只保留计数/求和/最值等累加器"""
+    
+    def __init__(self, stream: CSVStream, column: str):
+        self.stream = stream
+        self.column = column
+    
+    def aggregate(self, agg_columns: List[str], agg_func: str = "sum") -> List[Dict[str, Any]]:
+        """单遍聚合 (sum, avg, count, min, max)"""
+        # 分组值 -> [行数, {列: [数量, 总和, 最小, 最大]}]
+        groups: Dict[str, List[Any]] = {}
+        column = self.column
+        is_number = SmartCSVTool._is_number
+        for chunk in self.stream.chunks():
+            for row in chunk:
+                key = row.get(column, 'N/A')
+                state = groups.get(key)
+                if state is None:
+                    state = groups[key] = [0, {}]
+                state[0] += 1
+                for col in agg_columns:
+                    val = row.get(col, '')
+                    if not (val and is_number(val)):
+                        continue
+                    number = float(val)
+                    acc = state[1].get(col)
+                    if acc is None:
+                        state[1][col] = [1, number, number, number]
+                    else:
+                        acc[0] += 1
+                        acc[1] += number
+                        if number < acc[2]:
+                            acc[2] = number
+                        if number > acc[3]:
+                            acc[3] = number
+        
+        results = []
+        for key, (count, accs) in groups.items():
+            result = {column: key, "count": count}
+            for col in agg_columns:
+                acc = accs.get(col)
+                if acc is None:
+                    continue
+                n, total, low, high = acc
+                if agg_func == "sum":
+                    result[f"{col}_sum"] = round(total, 2)
+                elif agg_func == "avg":
+                    result[f"{col}_avg"] = round(total / n, 2)
+                elif agg_func == "count":
+                    result[f"{col}_count"] = n
+                elif agg_func == "min":
+                    result[f"{col}_min"] = low
+                elif agg_func == "max":
+                    result[f"{col}_max"] = high
+            results.append(result)
+        return results
+
+
+def _external_sort(chunks: RowChunks, key: Callable[[Dict[str, str]], Any], reverse: bool,
+                   memory_rows: int, headers: List[str], chunk_rows: int) -> RowChunks:
+    """外部归并排序: 内存放不下时把有序段写入临时CSV，再用 heapq.merge 归并"""
+    buffer: List[Dict[str, str]] = []
+    with tempfile.TemporaryDirectory(prefix="smart_csv_sort_") as tmp_dir:
+        runs: List[str] = []
+        for chunk in chunks:
+            buffer.extend(chunk)
+            if len(buffer) >= memory_rows:
+                runs.append(_write_sorted_run(buffer, key, reverse, headers, tmp_dir, len(runs)))
+                buffer = []
+        
+        if not runs:
+            buffer.sort(key=key, reverse=reverse)
+            for start in range(0, len(buffer), chunk_rows):
+                yield buffer[start:start + chunk_rows]
+            return
+        if buffer:
+            runs.append(_write_sorted_run(buffer, key, reverse, headers, tmp_dir, len(runs)))
+            buffer = []
+        
+        files = [open(path, 'r', encoding='utf-8', newline='') for path in runs]
+        try:
+            readers = [csv.DictReader(f, fieldnames=headers) for f in files]
+            merged = heapq.merge(*readers, key=key, reverse=reverse)
+            while True:
+                chunk = list(itertools.islice(merged, chunk_rows))
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            for f in files:
+                f.close()
+
+
+def _write_sorted_run(rows: List[Dict[str, str]], key: Callable[[Dict[str, str]], Any],
+                      reverse: bool, headers: List[str], tmp_dir: str, index: int) -> str:
+    """把一段排好序的行写入临时文件"""
+    rows.sort(key=key, reverse=reverse)
+    path = os.path.join(tmp_dir, f"run_{index:05d}.csv")
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=headers, extrasaction='ignore')
+        writer.writerows(rows)
+    return path
+
+
 def demo():
     """演示函数"""
     print("Smart CSV Tool 演示")
@@ -405,12 +1402,91 @@ def demo():
     tool.export_json("filtered_output.json", filtered)
     tool.export_csv("filtered_output.csv", filtered)
     
+    # 列式模式
+    print("\n6. 列式模式 (类型化数组 + 字典编码):")
+    columnar = ColumnarCSVTool(sample_file)
+    columnar_info = columnar.info()
+    print(f"   - 列存储: {columnar_info['storage']}")
+    print(f"   - 内存占用: {columnar_info['memory_bytes']} 字节")
+    print(f"   - 分数>=85: {columnar.filter_by_column('score', '85', '>=')}")
+    for result in columnar.aggregate("city", ["score"], "avg"):
+        print(f"   - {result}")
+    
+    # 流式管道
+    print("\n7. 流式查询管道 (按块读取，排序可溢写磁盘):")
+    pipeline = CSVStream(sample_file, chunk_rows=2).filter_by_column("score", "80", ">")
+    for result in pipeline.aggregate("city", ["score"], "max"):
+        print(f"   - {result}")
+    top = pipeline.select_columns(["name", "score"]).sort("score", reverse=True, numeric=True, memory_rows=2)
+    print(f"   - 按分数降序: {top.head(3)}")
+    
     # 清理
-    import os
     os.remove(sample_file)
     print("\n演示完成！")
 
 
+def _print_info(info: Dict[str, Any]) -> None:
+    print(f"文件: {info['file_path']}")
+    print(f"总行数: {info['total_rows']}")
+    print(f"总列数: {info['total_columns']}")
+    print(f"列名: {info['columns']}")
+    print(f"列类型: {info['column_types']}")
+
+
+def _print_stats(stats: Dict[str, Any]) -> None:
+    print("\n统计结果:")
+    for col, stat in stats.items():
+        print(f"  {col}:")
+        for k, v in stat.items():
+            print(f"    - {k}: {v}")
+
+
+def run_stream(args: argparse.Namespace) -> None:
+    """以流式管道执行命令行参数中的信息/预览/统计/筛选/选择/排序/聚合/导出"""
+    pipeline = CSVStream(args.file, chunk_rows=args.chunk_rows)
+    
+    # 与非流式模式一样，信息/预览/统计针对整个文件
+    if args.info:
+        _print_info(pipeline.info())
+    if args.preview:
+        pipeline.preview()
+    if args.stats:
+        _print_stats(pipeline.statistics(args.stats))
+    if (args.info or args.preview or args.stats) and not (
+            args.filter or args.group or args.select or args.sort or args.export):
+        return
+    
+    if args.filter:
+        col, val = args.filter.split("=", 1)
+        pipeline = pipeline.filter_by_column(col.strip(), val.strip(), args.filter_op)
+    
+    if args.group:
+        if not args.agg:
+            print("错误: 流式模式下分组需要配合 --agg 使用")
+            return
+        results = pipeline.aggregate(args.group, args.agg[1:], args.agg[0])
+        print(f"\n聚合结果:")
+        for result in results:
+            print(f"  {result}")
+        return
+    
+    if args.select:
+        pipeline = pipeline.select_columns(args.select)
+    if args.sort:
+        pipeline = pipeline.sort(args.sort, args.reverse, memory_rows=args.memory_rows)
+    
+    if args.export and args.output:
+        if args.export == "json":
+            count = pipeline.export_json(args.output)
+        else:
+            count = pipeline.export_csv(args.output)
+        print(f"共写出 {count} 行")
+    else:
+        print(f"\n结果预览 (前10行):")
+        for row in pipeline.head(10):
+            print(row)
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(
@@ -424,6 +1500,8 @@ def main():
   %(prog)s data.csv --group city              # 按城市分组
   %(prog)s data.csv --export json output.json # 导出为JSON
   %(prog)s data.csv --preview                 # 预览数据
+  %(prog)s big.csv --columnar --stats score   # 列式模式处理大文件
+  %(prog)s huge.csv --stream --filter city=北京 --export csv out.csv
         """
     )
     
@@ -442,6 +1520,10 @@ def main():
     parser.add_argument("--export", choices=["json", "csv"], help="导出格式")
     parser.add_argument("--output", help="输出文件路径")
     parser.add_argument("--preview", action="store_true", help="预览数据")
+    parser.add_argument("--columnar", action="store_true", help="使用列式存储 (大文件更快更省内存)")
+    parser.add_argument("--stream", action="store_true", help="流式处理 (文件大于内存时使用)")
+    parser.add_argument("--chunk-rows", type=int, default=50000, help="流式处理每块行数")
+    parser.add_argument("--memory-rows", type=int, default=200000, help="流式排序内存中最多缓存的行数")
     parser.add_argument("--demo", action="store_true", help="运行演示")
     
     args = parser.parse_args()
@@ -451,17 +1533,17 @@ def main():
         demo()
         return
     
+    # 流式处理
+    if args.stream:
+        run_stream(args)
+        return
+    
     # 加载CSV工具
-    tool = SmartCSVTool(args.file)
+    tool = ColumnarCSVTool(args.file) if args.columnar else SmartCSVTool(args.file)
     
     # 显示信息
     if args.info:
-        info = tool.info()
-        print(f"文件: {info['file_path']}")
-        print(f"总行数: {info['total_rows']}")
-        print(f"总列数: {info['total_columns']}")
-        print(f"列名: {info['columns']}")
-        print(f"列类型: {info['column_types']}")
+        _print_info(tool.info())
     
     # 预览
     if args.preview:
@@ -483,12 +1565,7 @@ def main():
     
     # 统计
     if args.stats:
-        stats = tool.statistics(args.stats)
-        print("\n统计结果:")
-        for col, stat in stats.items():
-            print(f"  {col}:")
-            for k, v in stat.items():
-                print(f"    - {k}: {v}")
+        _print_stats(tool.statistics(args.stats))
     
     # 分组
     if args.group:
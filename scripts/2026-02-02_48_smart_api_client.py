@@ -13,22 +13,35 @@
 - 📁 历史管理: 保存/加载请求历史
 - 🔄 环境变量: 多环境配置管理
 - 📈 性能测试: 并发请求、压力测试
+- ⚡ 异步批量: keep-alive 连接池、并发上限、gzip 压缩
 - 🎨 彩色输出: 终端高亮显示
 """
 
 import json
 import time
+import gzip
+import zlib
 import base64
+import asyncio
 import hmac
 import hashlib
 import urllib.parse
 from datetime import datetime
-from typing import Any, Optional, Dict, List, Callable
+from typing import Any, Optional, Dict, List, Callable, Iterable
 from dataclasses import dataclass, field
 from enum import Enum
 import http.client
 import ssl
 import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# 异步客户端默认的总并发数与单主机连接数
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_PER_HOST = 20
+# 请求体小于该字节数时不压缩，gzip 头部开销不划算
+GZIP_MIN_SIZE = 1024
 
 
 class HttpMethod(Enum):
@@ -122,12 +135,16 @@ def color_text(text: str, color: str = Colors.RESET, bold: bool = False) -> str:
 class SmartAPIClient:
     """智能API客户端"""
     
-    def __init__(self, base_url: str = "", timeout: int = 30):
+    def __init__(self, base_url: str = "", timeout: int = 30,
+                 compress_requests: bool = False, accept_compressed: bool = False):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
         self.session_headers: Dict[str, str] = {}
         self.history: List[Dict] = []
         self.environment: Dict[str, str] = {}
+        # gzip: 压缩不小于 GZIP_MIN_SIZE 的请求体 / 声明并解压压缩的响应
+        self.compress_requests = compress_requests
+        self.accept_compressed = accept_compressed
         
     def set_header(self, key: str, value: str):
         """设置请求头"""
@@ -172,8 +189,8 @@ class SmartAPIClient:
         return full_url
     
     def _build_headers(self, config: RequestConfig) -> Dict[str, str]:
-        """构建请求头"""
-        headers = self.session_headers.copy()
+        """构建请求头（不含 set_api_key 写入的内部标记）"""
+        headers = {k: v for k, v in self.session_headers.items() if not k.startswith("_api_key_")}
         headers.update(config.headers)
         
         # API Key处理
@@ -185,17 +202,87 @@ class SmartAPIClient:
         
         return headers
     
-    def _make_request(self, config: RequestConfig) -> Response:
-        """发送HTTP请求"""
-        url = self._build_url(config.url, config.params)
+    def _query_api_key(self, config: RequestConfig) -> Optional[tuple]:
+        """需要放在查询参数中的API Key，返回 (参数名, 值)"""
+        if config.auth_type == AuthType.API_KEY and config.auth_creds.get("location") == "query":
+            return config.auth_creds.get("key_name", "api_key"), config.auth_creds.get("key_value", "")
+        if self.session_headers.get("_api_key_location") == "query":
+            return self.session_headers.get("_api_key_name", "api_key"), self.session_headers.get("_api_key_value", "")
+        return None
+    
+    def _prepare_request(self, config: RequestConfig) -> tuple:
+        """准备URL、请求头和请求体字节，同步与异步请求共用"""
+        params = config.params
+        api_key = self._query_api_key(config)
+        if api_key:
+            params = {**params, api_key[0]: api_key[1]}
+        url = self._build_url(config.url, params)
         headers = self._build_headers(config)
         
-        # 处理API Key查询参数
-        if config.auth_type == AuthType.API_KEY:
-            if config.auth_creds.get("location") == "query":
-                params = config.params.copy()
-                params[config.auth_creds.get("key_name", "api_key")] = config.auth_creds.get("key_value", "")
-                url = self._build_url(config.url, params)
+        body = None
+        if config.json_data is not None:
+            body = json.dumps(config.json_data, ensure_ascii=False).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        elif config.data is not None:
+            body = config.data
+            if isinstance(config.data, dict):
+                body = urllib.parse.urlencode(config.data)
+                headers.setdefault("Content-Type", "application/x-www-form-urlencoded")
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+        
+        if self.accept_compressed:
+            headers.setdefault("Accept-Encoding", "gzip, deflate")
+        if (body and self.compress_requests and len(body) >= GZIP_MIN_SIZE
+                and "Content-Encoding" not in headers):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        
+        return url, headers, body
+    
+    def _build_response(self, status: int, headers: Dict[str, str], raw: bytes,
+                        elapsed: float, url: str) -> Response:
+        """解压、解码响应体并构建 Response"""
+        encoding = next((v for k, v in headers.items() if k.lower() == "content-encoding"), "").lower()
+        if raw and encoding == "gzip":
+            raw = gzip.decompress(raw)
+        elif raw and encoding == "deflate":
+            try:
+                raw = zlib.decompress(raw)
+            except zlib.error:
+                raw = zlib.decompress(raw, -zlib.MAX_WBITS)
+        response_text = raw.decode("utf-8", errors="ignore")
+        
+        # 解析JSON
+        json_data = None
+        if response_text.strip().startswith(("{", "[")):
+            try:
+                json_data = json.loads(response_text)
+            except json.JSONDecodeError:
+                pass
+        
+        # 提取cookies
+        cookies = {}
+        if "Set-Cookie" in headers:
+            for cookie in headers["Set-Cookie"].split(","):
+                cookie = cookie.strip()
+                if "=" in cookie:
+                    name, value = cookie.split("=", 1)
+                    cookies[name.strip()] = value.split(";")[0].strip()
+        
+        return Response(
+            status_code=status,
+            headers=headers,
+            text=response_text,
+            json_data=json_data,
+            elapsed_time=elapsed,
+            url=url,
+            cookies=cookies
+        )
+    
+    def _make_request(self, config: RequestConfig) -> Response:
+        """发送HTTP请求"""
+        url, headers, body = self._prepare_request(config)
         
         # 创建SSL上下文
         ssl_context = None
@@ -210,7 +297,9 @@ class SmartAPIClient:
             # 解析主机和路径
             parsed = urllib.parse.urlparse(url)
             host = parsed.netloc
-            path = parsed.path + parsed.query
+            path = parsed.path or "/"
+            if parsed.query:
+                path = f"{path}?{parsed.query}"
             
             # 创建连接
             if parsed.scheme == "https":
@@ -218,17 +307,6 @@ class SmartAPIClient:
             else:
                 conn = http.client.HTTPConnection(host, timeout=config.timeout)
             
-            # 准备请求体
-            body = None
-            if config.json_data is not None:
-                body = json.dumps(config.json_data)
-                headers.setdefault("Content-Type", "application/json")
-            elif config.data is not None:
-                body = config.data
-                if isinstance(config.data, dict):
-                    body = urllib.parse.urlencode(config.data)
-                    headers.setdefault("Content-Type", "application/x-www-form-urlencoded")
-            
             # 发送请求
             conn.request(config.method.value, path, body=body, headers=headers)
             response = conn.getresponse()
@@ -236,37 +314,11 @@ class SmartAPIClient:
             elapsed = time.time() - start_time
             
             # 读取响应
-            response_text = response.read().decode("utf-8", errors="ignore")
+            raw = response.read()
             response_headers = dict(response.getheaders())
-            
-            # 解析JSON
-            json_data = None
-            if response_text.strip().startswith(("{", "[")):
-                try:
-                    json_data = json.loads(response_text)
-                except json.JSONDecodeError:
-                    pass
-            
-            # 提取cookies
-            cookies = {}
-            if "Set-Cookie" in response_headers:
-                for cookie in response_headers["Set-Cookie"].split(","):
-                    cookie = cookie.strip()
-                    if "=" in cookie:
-                        name, value = cookie.split("=", 1)
-                        cookies[name.strip()] = value.split(";")[0].strip()
-            
             conn.close()
             
-            return Response(
-                status_code=response.status,
-                headers=response_headers,
-                text=response_text,
-                json_data=json_data,
-                elapsed_time=elapsed,
-                url=url,
-                cookies=cookies
-            )
+            return self._build_response(response.status, response_headers, raw, elapsed, url)
             
         except Exception as e:
             elapsed = time.time() - start_time
@@ -279,9 +331,9 @@ class SmartAPIClient:
                 url=url
             )
     
-    def request(self, method: HttpMethod, url: str, **kwargs) -> Response:
-        """发送请求的便捷方法"""
-        config = RequestConfig(
+    def _config_from_kwargs(self, method: HttpMethod, url: str, kwargs: Dict) -> RequestConfig:
+        """把便捷方法的关键字参数转换为请求配置"""
+        return RequestConfig(
             method=method,
             url=url,
             headers=kwargs.get("headers", {}),
@@ -292,8 +344,9 @@ class SmartAPIClient:
             verify_ssl=kwargs.get("verify_ssl", True),
             follow_redirects=kwargs.get("follow_redirects", True)
         )
-        
-        response = self._make_request(config)
+    
+    def _record_history(self, method: HttpMethod, response: Response):
+        """记录请求历史"""
         self.history.append({
             "timestamp": datetime.now().isoformat(),
             "method": method.value,
@@ -301,7 +354,12 @@ class SmartAPIClient:
             "status": response.status_code,
             "elapsed": response.elapsed_time
         })
-        
+    
+    def request(self, method: HttpMethod, url: str, **kwargs) -> Response:
+        """发送请求的便捷方法"""
+        config = self._config_from_kwargs(method, url, kwargs)
+        response = self._make_request(config)
+        self._record_history(method, response)
         return response
     
     def get(self, url: str, **kwargs) -> Response:
@@ -341,6 +399,229 @@ class SmartAPIClient:
             print(f"{Colors.YELLOW}⚠{Colors.RESET} 历史文件不存在")
 
 
+class AsyncSmartAPIClient(SmartAPIClient):
+    """
+    异步API客户端
+    
+    基于 asyncio 流实现 HTTP/1.1，按 (协议, 主机, 端口) 复用 keep-alive 连接。
+    max_connections 限制同时在途的请求数，max_per_host 限制每个主机的连接数。
+    认证、请求头、gzip 等设置与同步客户端共用。
+    连接绑定在创建它的事件循环上，用完请 await aclose() 或使用 async with。
+    """
+    
+    def __init__(self, base_url: str = "", timeout: int = 30,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 max_per_host: int = DEFAULT_MAX_PER_HOST,
+                 compress_requests: bool = False, accept_compressed: bool = True):
+        super().__init__(base_url, timeout, compress_requests, accept_compressed)
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._host_slots: Dict[tuple, asyncio.Semaphore] = {}
+        self._idle: Dict[tuple, List[tuple]] = {}
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+    
+    async def aclose(self):
+        """关闭所有空闲连接"""
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+    
+    async def _open_connection(self, key: tuple, timeout: float) -> tuple:
+        """从连接池取出空闲连接，没有则新建，返回 (reader, writer, 是否复用)"""
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer, True
+            writer.close()
+        
+        scheme, host, port, verify_ssl = key
+        ssl_context = None
+        if scheme == "https":
+            ssl_context = ssl.create_default_context()
+            if not verify_ssl:
+                ssl_context.check_hostname = False
+                ssl_context.verify_mode = ssl.CERT_NONE
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=ssl_context), timeout)
+        return reader, writer, False
+    
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader, method: str) -> tuple:
+        """读取一个响应，返回 (状态码, 响应头, 响应体, 连接可否复用, 收到响应头的时间)"""
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by server")
+        version, status, *_ = status_line.decode("latin-1").split(" ", 2)
+        status = int(status)
+        
+        headers: Dict[str, str] = {}
+        lowered: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip(), value.strip()
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+            lowered[name.lower()] = headers[name]
+        headers_at = time.perf_counter()
+        
+        connection = lowered.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            body = b""
+        elif "chunked" in lowered.get("transfer-encoding", "").lower():
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0].strip(), 16)
+                if size == 0:
+                    # 跳过 trailer
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b"".join(chunks)
+        elif "content-length" in lowered:
+            body = await reader.readexactly(int(lowered["content-length"]))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        
+        return status, headers, body, keep_alive, headers_at
+    
+    async def _send(self, method: str, url: str, headers: Dict[str, str],
+                    body: Optional[bytes], timeout: float, verify_ssl: bool) -> tuple:
+        """在连接池上发送请求，服务器关闭了复用的空闲连接时重试一次"""
+        parsed = urllib.parse.urlsplit(url)
+        scheme = parsed.scheme or "http"
+        port = parsed.port or (443 if scheme == "https" else 80)
+        key = (scheme, parsed.hostname, port, verify_ssl)
+        target = parsed.path or "/"
+        if parsed.query:
+            target = f"{target}?{parsed.query}"
+        
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {parsed.netloc}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        if body is not None or method in ("POST", "PUT", "PATCH"):
+            lines.append(f"Content-Length: {len(body or b'')}")
+        payload = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b"")
+        
+        slot = self._host_slots.get(key)
+        if slot is None:
+            slot = self._host_slots[key] = asyncio.Semaphore(self.max_per_host)
+        
+        async with slot:
+            while True:
+                reader, writer, reused = await self._open_connection(key, timeout)
+                try:
+                    writer.write(payload)
+                    await writer.drain()
+                    status, response_headers, raw, keep_alive, headers_at = await asyncio.wait_for(
+                        self._read_response(reader, method), timeout)
+                except ConnectionError:
+                    # 只有尚未收到状态行时才重试，避免重复提交已被处理的请求
+                    writer.close()
+                    if reused:
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                
+                if keep_alive:
+                    self._idle.setdefault(key, []).append((reader, writer))
+                else:
+                    writer.close()
+                return status, response_headers, raw, headers_at
+    
+    async def _make_request_async(self, config: RequestConfig) -> Response:
+        """异步发送HTTP请求"""
+        url, headers, body = self._prepare_request(config)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+        
+        async with self._semaphore:
+            start_time = time.perf_counter()
+            try:
+                status, response_headers, raw, headers_at = await self._send(
+                    config.method.value, url, headers, body, config.timeout, config.verify_ssl)
+                return self._build_response(status, response_headers, raw, headers_at - start_time, url)
+            except Exception as e:
+                return Response(
+                    status_code=0,
+                    headers={},
+                    text=str(e) or type(e).__name__,
+                    json_data=None,
+                    elapsed_time=time.perf_counter() - start_time,
+                    url=url
+                )
+    
+    async def request(self, method: HttpMethod, url: str, **kwargs) -> Response:
+        """发送请求的便捷方法"""
+        config = self._config_from_kwargs(method, url, kwargs)
+        response = await self._make_request_async(config)
+        self._record_history(method, response)
+        return response
+    
+    async def get(self, url: str, **kwargs) -> Response:
+        return await self.request(HttpMethod.GET, url, **kwargs)
+    
+    async def post(self, url: str, **kwargs) -> Response:
+        return await self.request(HttpMethod.POST, url, **kwargs)
+    
+    async def put(self, url: str, **kwargs) -> Response:
+        return await self.request(HttpMethod.PUT, url, **kwargs)
+    
+    async def patch(self, url: str, **kwargs) -> Response:
+        return await self.request(HttpMethod.PATCH, url, **kwargs)
+    
+    async def delete(self, url: str, **kwargs) -> Response:
+        return await self.request(HttpMethod.DELETE, url, **kwargs)
+    
+    async def head(self, url: str, **kwargs) -> Response:
+        return await self.request(HttpMethod.HEAD, url, **kwargs)
+    
+    async def options(self, url: str, **kwargs) -> Response:
+        return await self.request(HttpMethod.OPTIONS, url, **kwargs)
+    
+    async def gather(self, configs: Iterable[RequestConfig],
+                     on_response: Optional[Callable[[int, Response], None]] = None) -> List[Response]:
+        """
+        并发发送一批请求，结果按输入顺序返回
+        
+        只启动 max_connections 个工作协程从输入中取任务，
+        上万个请求也不会一次性创建上万个协程。on_response 在每个请求完成时调用。
+        """
+        configs = list(configs)
+        results: List[Optional[Response]] = [None] * len(configs)
+        pending = iter(enumerate(configs))
+        
+        async def worker():
+            for index, config in pending:
+                response = await self._make_request_async(config)
+                self._record_history(config.method, response)
+                results[index] = response
+                if on_response:
+                    on_response(index, response)
+        
+        await asyncio.gather(*(worker() for _ in range(min(self.max_connections, len(configs)))))
+        return results
+    
+    async def map(self, method: HttpMethod, urls: Iterable[str], **kwargs) -> List[Response]:
+        """对一组URL使用相同参数并发请求，结果按输入顺序返回"""
+        return await self.gather(self._config_from_kwargs(method, url, kwargs) for url in urls)
+
+
 class ResponseFormatter:
     """响应格式化器"""
     
@@ -618,6 +899,74 @@ def demo_api_testing():
     print(color_text("\n✨ 演示完成!\n", Colors.GREEN + Colors.BOLD))
 
 
+class _BatchDemoHandler(BaseHTTPRequestHandler):
+    """批量请求演示用的本地服务：模拟 10ms 延迟，支持 keep-alive 与 gzip"""
+    
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        time.sleep(0.01)
+        body = json.dumps({"path": self.path, "items": list(range(50))}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _BatchDemoServer(ThreadingHTTPServer):
+    """监听队列不小于客户端并发连接数，避免并发建连时被拒绝后重试"""
+    
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def demo_async_batch(count: int = 2000):
+    """异步批量请求演示：本地服务上对比同步逐个请求与异步并发请求"""
+    print(color_text("\n⚡ 异步批量请求演示", Colors.BOLD + Colors.CYAN))
+    print(color_text("="*50, Colors.CYAN))
+    
+    server = _BatchDemoServer(("127.0.0.1", 0), _BatchDemoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    try:
+        sync_count = min(count, 100)
+        client = SmartAPIClient(base_url=base_url)
+        client.set_bearer_token("demo-token-12345")
+        start = time.perf_counter()
+        for i in range(sync_count):
+            client.get(f"/items/{i}")
+        sync_elapsed = time.perf_counter() - start
+        print(f"  同步: {sync_count} 个请求 {sync_elapsed:.2f}s "
+              f"({sync_count / sync_elapsed:.0f} req/s)")
+        
+        async def fetch_all():
+            async with AsyncSmartAPIClient(base_url=base_url, max_connections=100,
+                                           max_per_host=100) as async_client:
+                async_client.set_bearer_token("demo-token-12345")
+                return await async_client.map(HttpMethod.GET, (f"/items/{i}" for i in range(count)))
+        
+        start = time.perf_counter()
+        responses = asyncio.run(fetch_all())
+        async_elapsed = time.perf_counter() - start
+        ok = sum(1 for r in responses if r.is_success and r.json_data)
+        print(f"  异步: {count} 个请求 {async_elapsed:.2f}s "
+              f"({count / async_elapsed:.0f} req/s), 成功 {ok}")
+        print(f"  加速: {(count / async_elapsed) / (sync_count / sync_elapsed):.1f}x")
+    finally:
+        server.shutdown()
+    
+    print(color_text("\n✨ 演示完成!\n", Colors.GREEN + Colors.BOLD))
+
+
 def interactive_mode():
     """交互式模式"""
     print(color_text("\n🌐 智能API客户端 - 交互模式", Colors.BOLD + Colors.CYAN))
@@ -725,6 +1074,8 @@ def main():
             demo_api_testing()
         elif command == '--interactive':
             interactive_mode()
+        elif command == '--batch':
+            demo_async_batch(int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
         elif command == '--help':
             print("""
 用法: python smart_api_client.py [命令]
@@ -732,11 +1083,13 @@ def main():
 命令:
   --demo        运行功能演示
   --interactive  启动交互模式
+  --batch [N]   异步批量请求演示 (本地服务, 默认 2000 个请求)
   --help        显示此帮助信息
 
 示例:
   python smart_api_client.py --demo
   python smart_api_client.py --interactive
+  python smart_api_client.py --batch 10000
             """)
         else:
             print(f"未知命令: {command}")
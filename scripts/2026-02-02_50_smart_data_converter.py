@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 智能数据转换器 - Smart Data Converter
-支持多种数据格式（CSV/JSON/XML/YAML/TOML）之间的转换
+支持多种数据格式（CSV/JSON/JSONL/XML/YAML/TOML）之间的转换
+大文件批量转换支持流式转换与多进程并行
 日期: 2026-02-02
 """
 
@@ -12,7 +13,8 @@ import yaml
 import toml
 import os
 import re
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional
 from dataclasses import dataclass
 from enum import Enum
 
@@ -20,6 +22,7 @@ from enum import Enum
 class DataFormat(Enum):
     """支持的数据格式"""
     JSON = "json"
+    JSONL = "jsonl"
     CSV = "csv"
     XML = "xml"
     YAML = "yaml"
@@ -40,6 +43,30 @@ class SmartDataConverter:
     # CSV分隔符候选
     CSV_DELIMITERS = [',', ';', '\t', '|', ':']
     
+    # 扩展名 -> 格式
+    EXTENSION_FORMATS = {
+        '.json': DataFormat.JSON,
+        '.jsonl': DataFormat.JSONL,
+        '.ndjson': DataFormat.JSONL,
+        '.csv': DataFormat.CSV,
+        '.tsv': DataFormat.CSV,
+        '.xml': DataFormat.XML,
+        '.yaml': DataFormat.YAML,
+        '.yml': DataFormat.YAML,
+        '.toml': DataFormat.TOML,
+    }
+    
+    # 格式检测只读取文件开头的字节数
+    SNIFF_BYTES = 64 * 1024
+    
+    # 可逐行/逐元素流式转换的格式对
+    STREAMING_CONVERTERS = {
+        (DataFormat.CSV, DataFormat.JSONL): "stream_csv_to_jsonl",
+        (DataFormat.JSONL, DataFormat.CSV): "stream_jsonl_to_csv",
+        (DataFormat.XML, DataFormat.JSON): "stream_xml_to_json",
+        (DataFormat.XML, DataFormat.JSONL): "stream_xml_to_jsonl",
+    }
+    
     def __init__(self):
         self.conversion_history = []
     
@@ -290,6 +317,8 @@ class SmartDataConverter:
             # 解析输入数据
             if from_format == DataFormat.JSON:
                 data = json.loads(content)
+            elif from_format == DataFormat.JSONL:
+                data = [json.loads(line) for line in content.splitlines() if line.strip()]
             elif from_format == DataFormat.YAML:
                 data = yaml.safe_load(content)
             elif from_format == DataFormat.TOML:
@@ -307,8 +336,18 @@ class SmartDataConverter:
             
             # 转换为目标格式
             if to_format == DataFormat.JSON:
-                result = ConversionResult(success=True, 
-                                         data=json.dumps(data, ensure_ascii=False, indent=2))
+                text = json.dumps(data, ensure_ascii=False, indent=2)
+                if output_path:
+                    with open(output_path, 'w', encoding='utf-8') as f:
+                        f.write(text)
+                result = ConversionResult(success=True, data=text)
+            elif to_format == DataFormat.JSONL:
+                records = data if isinstance(data, list) else [data]
+                text = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+                if output_path:
+                    with open(output_path, 'w', encoding='utf-8') as f:
+                        f.write(text)
+                result = ConversionResult(success=True, data=text)
             elif to_format == DataFormat.YAML:
                 result = self.json_to_yaml(data, output_path)
             elif to_format == DataFormat.TOML:
@@ -363,32 +402,239 @@ class SmartDataConverter:
             result[child.tag] = value
         return result
     
-    def batch_convert(self, files: List[str], to_format: DataFormat,
-                      output_dir: str = "./output") -> List[ConversionResult]:
-        """批量转换"""
-        os.makedirs(output_dir, exist_ok=True)
-        results = []
-        
-        for file_path in files:
-            if not os.path.exists(file_path):
-                results.append(ConversionResult(success=False, data=None,
-                                               error=f"File not found: {file_path}"))
-                continue
+    def detect_file_format(self, file_path: str) -> DataFormat:
+        """检测文件格式: 优先看扩展名，否则只嗅探文件开头"""
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext in self.EXTENSION_FORMATS:
+            return self.EXTENSION_FORMATS[ext]
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            prefix = f.read(self.SNIFF_BYTES)
+        return self._sniff_format(prefix)
+    
+    def _sniff_format(self, prefix: str) -> DataFormat:
+        """根据内容前缀猜测格式 (不解析整个文件)"""
+        text = prefix.lstrip('\ufeff').lstrip()
+        if not text:
+            return DataFormat.JSON
+        if text.startswith('<'):
+            return DataFormat.XML
+        if text.startswith('['):
+            # TOML 的表头 [section] 也以 [ 开头
+            first_line = text.split('\n', 1)[0].strip()
+            if re.match(r'^\[[\w.\-"\']+\]$', first_line) and not first_line.startswith('["'):
+                return DataFormat.TOML
+            return DataFormat.JSON
+        if text.startswith('{'):
+            lines = [line for line in text.split('\n')[:3] if line.strip()]
+            # 完整读到的前两行都能独立解析为JSON => JSON Lines
+            if len(lines) >= 2:
+                try:
+                    json.loads(lines[0])
+                    json.loads(lines[1])
+                    return DataFormat.JSONL
+                except ValueError:
+                    pass
+            return DataFormat.JSON
+        lines = [line for line in text.split('\n')[:20] if line.strip() and not line.lstrip().startswith('#')]
+        if lines and lines[0].startswith('---'):
+            return DataFormat.YAML
+        if lines and all(re.match(r'^\s*(\[[^\]]+\]|[\w.\-"]+\s*=)', line) for line in lines[:5]):
+            return DataFormat.TOML
+        if lines and all(re.match(r'^\s*(- |[\w\-"\']+\s*:(\s|$))', line) for line in lines[:5]):
+            return DataFormat.YAML
+        return DataFormat.CSV
+    
+    def stream_csv_to_jsonl(self, input_path: str, output_path: str) -> ConversionResult:
+        """CSV → JSON Lines，逐行转换"""
+        try:
+            rows = 0
+            with open(input_path, 'r', newline='', encoding='utf-8') as src:
+                delimiter = self._detect_csv_delimiter(src.readline())
+                src.seek(0)
+                reader = csv.DictReader(src, delimiter=delimiter)
+                with open(output_path, 'w', encoding='utf-8') as dst:
+                    for row in reader:
+                        dst.write(json.dumps(row, ensure_ascii=False))
+                        dst.write('\n')
+                        rows += 1
+            return ConversionResult(success=True, data=f"JSONL saved to {output_path} ({rows} rows)")
+        except Exception as e:
+            return ConversionResult(success=False, data=None,
+                                   error=str(e))
+    
+    def stream_jsonl_to_csv(self, input_path: str, output_path: str,
+                            delimiter: str = ',') -> ConversionResult:
+        """JSON Lines → CSV: 第一遍收集字段，第二遍逐行写出，内存与行数无关"""
+        try:
+            fields = set()
+            for record in self._iter_jsonl(input_path):
+                fields.update(record.keys())
+            if not fields:
+                return ConversionResult(success=False, data=None,
+                                       error="Empty data")
             
+            rows = 0
+            with open(output_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=sorted(fields),
+                                       delimiter=delimiter)
+                writer.writeheader()
+                for record in self._iter_jsonl(input_path):
+                    writer.writerow(record)
+                    rows += 1
+            return ConversionResult(success=True, data=f"CSV saved to {output_path} ({rows} rows)")
+        except Exception as e:
+            return ConversionResult(success=False, data=None,
+                                   error=str(e))
+    
+    def _iter_jsonl(self, input_path: str) -> Iterator[Dict]:
+        """逐行读取JSON Lines"""
+        with open(input_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    
+    def _iter_xml_children(self, input_path: str) -> Iterator[ET.Element]:
+        """iterparse 逐个产出根元素的直接子元素，处理完即清理"""
+        depth = 0
+        root = None
+        for event, elem in ET.iterparse(input_path, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 1:
+                yield elem
+                # 释放已处理的子树
+                elem.clear()
+                root.remove(elem)
+    
+    def _xml_element_value(self, elem) -> Any:
+        """与 _xml_to_dict 相同的取值规则"""
+        value = self._xml_to_dict(elem)
+        if elem.text and not value:
+            value = elem.text.strip()
+        return value
+    
+    def stream_xml_to_json(self, input_path: str, output_path: str) -> ConversionResult:
+        """XML → JSON，输出结构同 xml_to_json
+        
+        与 xml_to_json 一样，重复的同名子元素只保留最后一个，
+        因此内存只与不同标签的数量有关。需要保留每条记录时使用 stream_xml_to_jsonl。
+        """
+        try:
+            data: Dict[str, Any] = {}
+            for child in self._iter_xml_children(input_path):
+                data[child.tag] = self._xml_element_value(child)
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            return ConversionResult(success=True, data=f"JSON saved to {output_path}")
+        except Exception as e:
+            return ConversionResult(success=False, data=None,
+                                   error=str(e))
+    
+    def stream_xml_to_jsonl(self, input_path: str, output_path: str) -> ConversionResult:
+        """XML → JSON Lines，根元素的每个子元素输出为一行 {tag: value}"""
+        try:
+            rows = 0
+            with open(output_path, 'w', encoding='utf-8') as f:
+                for child in self._iter_xml_children(input_path):
+                    f.write(json.dumps({child.tag: self._xml_element_value(child)},
+                                       ensure_ascii=False))
+                    f.write('\n')
+                    rows += 1
+            return ConversionResult(success=True, data=f"JSONL saved to {output_path} ({rows} rows)")
+        except Exception as e:
+            return ConversionResult(success=False, data=None,
+                                   error=str(e))
+    
+    def convert_file(self, file_path: str, to_format: DataFormat,
+                     output_path: str) -> ConversionResult:
+        """转换单个文件: 可流式的格式对走流式转换，其余整体读入后转换"""
+        if not os.path.exists(file_path):
+            return ConversionResult(success=False, data=None,
+                                   error=f"File not found: {file_path}")
+        try:
+            from_format = self.detect_file_format(file_path)
+        except Exception as e:
+            return ConversionResult(success=False, data=None,
+                                   error=str(e))
+        
+        streaming = self.STREAMING_CONVERTERS.get((from_format, to_format))
+        if streaming:
+            return getattr(self, streaming)(file_path, output_path)
+        
+        try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-            
-            from_format = self.detect_format(content)
-            output_path = os.path.join(output_dir, 
-                os.path.splitext(os.path.basename(file_path))[0] + 
-                f".{to_format.value}")
-            
-            result = self.convert(content, from_format, to_format, output_path)
-            results.append(result)
+        except Exception as e:
+            return ConversionResult(success=False, data=None,
+                                   error=str(e))
+        return self.convert(content, from_format, to_format, output_path)
+    
+    def batch_convert(self, files: List[str], to_format: DataFormat,
+                      output_dir: str = "./output",
+                      workers: Optional[int] = None,
+                      progress: Optional[Callable[[int, int, str, ConversionResult], None]] = None
+                      ) -> List[ConversionResult]:
+        """批量转换
+        
+        Args:
+            files: 输入文件列表
+            to_format: 目标格式
+            output_dir: 输出目录
+            workers: 并行进程数，None为CPU核数，1为在当前进程顺序执行
+            progress: 进度回调 (已完成数, 总数, 文件路径, 结果)，按完成顺序调用
+        
+        Returns:
+            与输入文件顺序一致的转换结果
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        jobs = [
+            (file_path, os.path.join(output_dir,
+                os.path.splitext(os.path.basename(file_path))[0] +
+                f".{to_format.value}"))
+            for file_path in files
+        ]
+        results: List[Optional[ConversionResult]] = [None] * len(jobs)
+        workers = workers or os.cpu_count() or 1
+        
+        if workers == 1 or len(jobs) <= 1:
+            for i, (file_path, output_path) in enumerate(jobs):
+                results[i] = self.convert_file(file_path, to_format, output_path)
+                if progress:
+                    progress(i + 1, len(jobs), file_path, results[i])
+            return results
+        
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = {
+                pool.submit(_convert_file_job, file_path, to_format.value, output_path): i
+                for i, (file_path, output_path) in enumerate(jobs)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    results[i] = ConversionResult(success=False, data=None,
+                                                  error=str(e))
+                if progress:
+                    progress(done, len(jobs), jobs[i][0], results[i])
         
         return results
 
 
+def _convert_file_job(file_path: str, to_format: str, output_path: str) -> ConversionResult:
+    """进程池任务: 在子进程中转换单个文件"""
+    return SmartDataConverter().convert_file(file_path, DataFormat(to_format), output_path)
+
+
+def print_progress(done: int, total: int, file_path: str, result: ConversionResult):
+    """batch_convert 的默认进度输出"""
+    status = "✓" if result.success else f"✗ {result.error}"
+    print(f"[{done}/{total}] {os.path.basename(file_path)} {status}")
+
 def demo():
     """演示"""
     print("=== 智能数据转换器演示 ===\n")
@@ -440,6 +686,21 @@ def demo():
     print(f"CSV内容检测结果: {detected.value}")
     print()
     
+    # 批量流式转换
+    import tempfile
+    print("6. 批量流式转换 (CSV → JSONL, 进程池):")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = []
+        for i in range(3):
+            path = os.path.join(tmp_dir, f"part_{i}.csv")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(csv_content)
+            files.append(path)
+        converter.batch_convert(files, DataFormat.JSONL,
+                                os.path.join(tmp_dir, "out"),
+                                workers=2, progress=print_progress)
+    print()
+    
     print("=== 演示完成 ===")
 
 
@@ -453,6 +714,6 @@ if __name__ == "__main__":
         print("  python smart_data_converter.py --demo  # 运行演示")
         print("  python converter.py input.json csv output.csv  # 格式转换")
         print()
-        print("支持的格式: json, csv, xml, yaml, toml")
+        print("支持的格式: json, jsonl, csv, xml, yaml, toml")
         print()
         demo()
@@ -8,9 +8,9 @@
 - 多数据库支持 (SQLite/MySQL/PostgreSQL/MongoDB)
 - 智能查询生成 (自然语言转 SQL)
 - 数据备份与恢复
-- 性能分析与优化建议
+- 性能分析与优化建议 (查询指纹剖析、执行计划、经回放验证的索引建议)
 - ER 图生成
-- 数据导入导出 (CSV/JSON/SQL)
+- 数据导入导出 (CSV/JSON/SQL)，大文件批量流式导入
 
 使用方式:
     python smart_database_tool.py --help
@@ -27,8 +27,18 @@ import subprocess
 import sys
 import os
 import re
+import itertools
+import gzip
+import io
+import shutil
+import time
+import bisect
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 import sqlparse
 from collections import defaultdict
@@ -42,9 +52,329 @@ class DatabaseType:
     MONGODB = "mongodb"
 
 
+@dataclass
+class ImportStats:
+    """批量导入统计"""
+    table: str
+    rows: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+    
+    def __str__(self) -> str:
+        return f"{self.rows} 行, {self.seconds:.2f} 秒, {self.rows_per_sec:,.0f} 行/秒"
+
+
+# ==================== 查询剖析 ====================
+
+# 延迟直方图的桶上界 (毫秒)，最后一个桶收纳所有更慢的查询
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+_SQL_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?:e[-+]?\d+)?\b", re.I)
+_SQL_PARAM = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+|\?")
+_SQL_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+
+
+def normalize_query(query: str) -> str:
+    """
+    将 SQL 归一化为查询指纹
+
+    去掉注释，字面量和各种占位符统一替换为 ?，IN 列表与多行 VALUES 折叠为 (...)，
+    空白压缩并转为小写，使只有参数不同的查询落到同一个指纹。
+    """
+    sql = _SQL_COMMENT.sub(" ", query)
+    sql = _SQL_STRING.sub("?", sql)
+    sql = _SQL_NUMBER.sub("?", sql)
+    sql = _SQL_PARAM.sub("?", sql)
+    sql = _SQL_PARAM_LIST.sub("(...)", sql)
+    sql = " ".join(sql.split()).rstrip(";").strip()
+    return sql.lower()
+
+
+@dataclass
+class QueryStats:
+    """单个查询指纹的统计"""
+    fingerprint: str
+    sample_query: str
+    sample_params: Optional[tuple] = None
+    calls: int = 0
+    total_ms: float = 0.0
+    min_ms: float = float("inf")
+    max_ms: float = 0.0
+    rows: int = 0
+    vm_steps: int = 0
+    histogram: List[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS_MS))
+    plan: Optional[List[str]] = None
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    def percentile(self, q: float) -> float:
+        """由直方图估算分位数 (返回所在桶的上界，不超过观测到的最大值)"""
+        if not self.calls:
+            return 0.0
+        target = q / 100 * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.histogram):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.mean_ms, 3),
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "vm_steps": self.vm_steps,
+            "histogram": {
+                ("+inf" if bound == float("inf") else f"<={bound}ms"): count
+                for bound, count in zip(LATENCY_BUCKETS_MS, self.histogram) if count
+            },
+            "plan": self.plan,
+        }
+
+
+class QueryProfiler:
+    """
+    查询剖析器
+
+    按指纹聚合每次查询的耗时直方图、返回/影响行数和 SQLite 虚拟机步数；
+    某个指纹首次出现慢于阈值的执行时，通过 explain 回调记录其执行计划。
+    """
+
+    # SQLite 进度回调的间隔 (虚拟机指令数)，越小越精确、开销越大
+    PROGRESS_STEP = 1000
+
+    def __init__(self, slow_ms: float = 10.0,
+                 explain: Optional[Callable[[str, Optional[tuple]], List[str]]] = None):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.stats: Dict[str, QueryStats] = {}
+        self.ticks = 0
+
+    def tick(self) -> int:
+        """sqlite3 进度回调，返回 0 表示继续执行"""
+        self.ticks += 1
+        return 0
+
+    def record(self, query: str, params: Optional[tuple], elapsed_ms: float,
+               rows: int, ticks: int = 0):
+        """记录一次查询执行"""
+        fingerprint = normalize_query(query)
+        stats = self.stats.get(fingerprint)
+        if stats is None:
+            stats = self.stats[fingerprint] = QueryStats(fingerprint, query, params)
+
+        stats.calls += 1
+        stats.total_ms += elapsed_ms
+        stats.min_ms = min(stats.min_ms, elapsed_ms)
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        stats.rows += rows
+        stats.vm_steps += ticks * self.PROGRESS_STEP
+        stats.histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+        if elapsed_ms >= self.slow_ms and stats.plan is None and self.explain:
+            # 以首次慢执行作为回放样本
+            stats.sample_query, stats.sample_params = query, params
+            try:
+                stats.plan = self.explain(query, params)
+            except Exception as e:
+                stats.plan = [f"EXPLAIN 失败: {e}"]
+
+    def top(self, limit: int = 20, key: str = "total_ms") -> List[QueryStats]:
+        """按总耗时 (或其它属性) 排序的指纹"""
+        return sorted(self.stats.values(), key=lambda s: getattr(s, key), reverse=True)[:limit]
+
+    def slow_queries(self) -> List[QueryStats]:
+        """出现过慢执行 (已记录执行计划) 的指纹"""
+        return [s for s in self.top(len(self.stats)) if s.plan is not None]
+
+    def reset(self):
+        self.stats.clear()
+
+
+@dataclass
+class IndexRecommendation:
+    """索引建议及其回放验证结果"""
+    table: str
+    columns: List[str]
+    fingerprints: List[str] = field(default_factory=list)
+    covering: bool = False
+    before_ms: Optional[float] = None
+    after_ms: Optional[float] = None
+    verified: Optional[bool] = None
+
+    @property
+    def name(self) -> str:
+        return f"idx_{self.table}_{'_'.join(self.columns)}"
+
+    @property
+    def sql(self) -> str:
+        return f"CREATE INDEX {self.name} ON {self.table}({', '.join(self.columns)})"
+
+    @property
+    def speedup(self) -> Optional[float]:
+        if self.before_ms is None or not self.after_ms:
+            return None
+        return self.before_ms / self.after_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        kind = "覆盖索引" if self.covering else ("复合索引" if len(self.columns) > 1 else "索引")
+        return {
+            "table": self.table,
+            "columns": self.columns,
+            "reason": f"{len(self.fingerprints)} 类慢查询全表扫描或临时排序，建议{kind}",
+            "suggestion": self.sql,
+            "fingerprints": self.fingerprints,
+            "before_ms": self.before_ms,
+            "after_ms": self.after_ms,
+            "speedup": round(self.speedup, 2) if self.speedup else None,
+            "verified": self.verified,
+        }
+
+
+_SQL_KEYWORDS = {
+    "and", "or", "not", "select", "from", "where", "case", "when", "then", "else", "end",
+    "exists", "null", "on", "using", "as", "join", "inner", "left", "right", "outer", "cross",
+    "full", "natural", "group", "order", "by", "limit", "offset", "having", "union", "all",
+    "distinct", "asc", "desc", "in", "is", "like", "between", "glob", "set", "values",
+}
+_FROM_CLAUSE = re.compile(
+    r"\bfrom\s+(.*?)(?=\bwhere\b|\bgroup\s+by\b|\border\s+by\b|\blimit\b|\bhaving\b|\bunion\b"
+    r"|\b(?:inner|left|right|cross|full|natural|outer|join)\b|\)|$)", re.S)
+_JOIN_TABLE = re.compile(r"\bjoin\s+(\w+)(?:\s+(?:as\s+)?(\w+))?")
+_WHERE_CLAUSE = re.compile(r"\b(?:where|on|having)\b(.*?)(?=\bgroup\s+by\b|\border\s+by\b|\blimit\b"
+                           r"|\b(?:inner|left|right|cross|full|natural|join|where)\b|$)", re.S)
+_PREDICATE = re.compile(r"(?:(\w+)\.)?([a-z_]\w*)\s*(<>|!=|<=|>=|=|<|>|\bin\b|\blike\b|\bbetween\b|\bis\b|\bglob\b)")
+_COLUMN_EQUALS_COLUMN = re.compile(r"(?:(\w+)\.)?([a-z_]\w*)\s*=\s*(?:(\w+)\.)?([a-z_]\w*)\b(?!\s*[.(])")
+_ORDER_CLAUSE = re.compile(r"\b(order|group)\s+by\s+(.*?)(?=\blimit\b|\boffset\b|\bhaving\b|\border\s+by\b|\)|$)", re.S)
+_COLUMN_REF = re.compile(r"^(?:(\w+)\.)?([a-z_]\w*)(?:\s+(?:asc|desc))?$")
+_SELECT_LIST = re.compile(r"^\s*select\s+(?:distinct\s+)?(.*?)\s+from\b", re.S)
+_AGGREGATE_REF = re.compile(r"^\w+\(\s*(?:distinct\s+)?(?:(\w+)\.)?([a-z_]\w*|\*)\s*\)(?:\s+(?:as\s+)?\w+)?$")
+_SELECT_ITEM = re.compile(r"^(?:(\w+)\.)?([a-z_]\w*)(?:\s+(?:as\s+)?\w+)?$")
+
+EQUALITY_OPERATORS = {"=", "in", "is"}
+RANGE_OPERATORS = {"<", ">", "<=", ">=", "between", "like", "glob"}
+
+
+def parse_query_access(fingerprint: str) -> Dict[str, Any]:
+    """
+    从查询指纹中提取访问模式
+
+    Returns:
+        {"tables": 别名->表名, "equality"/"range"/"join"/"order_by": [(限定名, 列名)],
+         "select": [(限定名, 列名)] 或 None (包含 * 或表达式时无法覆盖)}
+    """
+    sql = re.sub(r"[\"`\[\]]", "", fingerprint)
+    access = {"tables": {}, "equality": [], "range": [], "join": [], "order_by": [], "select": None}
+
+    for match in _FROM_CLAUSE.finditer(sql):
+        for item in match.group(1).split(","):
+            parts = item.split()
+            if not parts or parts[0].startswith("("):
+                continue
+            table = parts[0]
+            alias = parts[-1] if len(parts) > 1 and parts[-1] not in _SQL_KEYWORDS else table
+            access["tables"][alias] = table
+            access["tables"].setdefault(table, table)
+    for table, alias in _JOIN_TABLE.findall(sql):
+        access["tables"][alias if alias and alias not in _SQL_KEYWORDS else table] = table
+        access["tables"].setdefault(table, table)
+
+    for match in _WHERE_CLAUSE.finditer(sql):
+        clause = match.group(1)
+        for qualifier, column, left_q, right in _COLUMN_EQUALS_COLUMN.findall(clause):
+            if column not in _SQL_KEYWORDS and right not in _SQL_KEYWORDS:
+                access["join"] += [(qualifier, column), (left_q, right)]
+        for qualifier, column, op in _PREDICATE.findall(clause):
+            if column in _SQL_KEYWORDS:
+                continue
+            if op in EQUALITY_OPERATORS:
+                access["equality"].append((qualifier, column))
+            elif op in RANGE_OPERATORS:
+                access["range"].append((qualifier, column))
+
+    for kind, clause in _ORDER_CLAUSE.findall(sql):
+        if kind == "group" and access["order_by"]:
+            continue
+        refs = [_COLUMN_REF.match(item.strip()) for item in clause.split(",")]
+        if refs and all(refs):
+            access["order_by"] = [m.groups() for m in refs]
+
+    select = _SELECT_LIST.match(sql)
+    if select:
+        columns = []
+        for item in select.group(1).split(","):
+            item = item.strip()
+            m = _SELECT_ITEM.match(item) or _AGGREGATE_REF.match(item)
+            if not m:
+                columns = None
+                break
+            if m.group(2) != "*":
+                columns.append(m.groups()[:2])
+        access["select"] = columns
+    return access
+
+
+# 会破坏回滚的事务控制语句
+_TRANSACTION_KEYWORDS = {"BEGIN", "START", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE", "VACUUM"}
+# MySQL 中会隐式提交的 DDL
+_DDL_KEYWORDS = {"CREATE", "ALTER", "DROP", "TRUNCATE", "RENAME"}
+
+# 不修改数据、执行后无需提交的语句 (WITH 可能包含 DELETE/UPDATE，按写操作处理)
+_READ_KEYWORDS = {"SELECT", "SHOW", "EXPLAIN", "DESCRIBE", "DESC", "VALUES"}
+
+# MySQL DATA_TYPE 与 PostgreSQL format_type 中的整数类型名
+_INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
+
+
+def _replay_workload(connection, workload: List[Tuple[str, Optional[tuple], int]],
+                     repeat: int = 3) -> float:
+    """
+    在给定连接上回放查询负载，返回加权耗时 (毫秒)
+
+    每条查询先预热一次，再取 repeat 次中最快的一次，乘以其在负载中的调用次数。
+    副本上无法执行的查询 (例如引用了剖析时已回滚的表) 跳过。
+    """
+    total = 0.0
+    for query, params, calls in workload:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, params or ()).fetchall()
+        except sqlite3.Error:
+            continue
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cursor.execute(query, params or ()).fetchall()
+            best = min(best, time.perf_counter() - start)
+        total += best * 1000 * calls
+    return total
+
+
 class SmartDatabaseTool:
     """智能数据库工具主类"""
     
+    # 批量导入期间使用的 SQLite PRAGMA (导入结束后恢复原值)
+    SQLITE_BULK_PRAGMAS = {
+        "journal_mode": "MEMORY",
+        "synchronous": "OFF",
+        "cache_size": -262144,  # 约 256MB
+        "temp_store": "MEMORY",
+    }
+    
     def __init__(self, db_url: str):
         """
         初始化数据库连接
@@ -59,6 +389,7 @@ class SmartDatabaseTool:
         self.db_url = db_url
         self.db_type = self._parse_db_type(db_url)
         self.connection = None
+        self.profiler: Optional[QueryProfiler] = None
         self._connect()
     
     def _parse_db_type(self, db_url: str) -> str:
@@ -259,17 +590,24 @@ class SmartDatabaseTool:
     
     # ==================== 查询执行 ====================
     
-    def execute_query(self, query: str, params: tuple = None) -> Tuple[List[Dict], List[str]]:
+    def execute_query(self, query: str, params: tuple = None,
+                      commit: bool = True) -> Tuple[List[Dict], List[str]]:
         """
         执行 SQL 查询
         
         Args:
             query: SQL 查询语句
             params: 查询参数
+            commit: 执行后是否提交
             
         Returns:
             (查询结果列表, 列名列表)
         """
+        profiler = self.profiler
+        if profiler:
+            ticks = profiler.ticks
+            start = time.perf_counter()
+        
         cursor = self.connection.cursor()
         
         if params:
@@ -284,9 +622,80 @@ class SmartDatabaseTool:
             columns = []
             rows = []
         
-        self.connection.commit()
+        # 返回结果集的也可能是写操作 (INSERT ... RETURNING 等)，不能按 description 判断；
+        # SQLite 只在确有未提交事务时提交，MySQL/PostgreSQL 按语句首个关键字跳过纯读查询
+        if commit:
+            if self.db_type == DatabaseType.SQLITE:
+                needs_commit = self.connection.in_transaction
+            else:
+                keyword = re.match(r"\s*(\w*)", query).group(1).upper()
+                needs_commit = keyword not in _READ_KEYWORDS
+            if needs_commit:
+                self.connection.commit()
+        
+        if profiler:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            affected = len(rows) if columns else max(cursor.rowcount, 0)
+            profiler.record(query, params, elapsed_ms, affected, profiler.ticks - ticks)
+        
         return rows, columns
     
+    def iter_query(self, query: str, params: tuple = None, batch_size: int = 1000,
+                   as_tuples: bool = False) -> Tuple[Iterator, List[str]]:
+        """
+        流式执行查询，按 fetchmany 批次逐行产出结果
+        
+        MySQL 使用 SSCursor、PostgreSQL 使用服务端命名游标，结果不会一次性加载到内存。
+        
+        Args:
+            query: SQL 查询语句
+            params: 查询参数
+            batch_size: 每次 fetchmany 的行数
+            as_tuples: 返回元组行而不是字典 (更快、更省内存)
+            
+        Returns:
+            (行迭代器, 列名列表)
+        """
+        cursor = self._streaming_cursor(batch_size)
+        if as_tuples and self.db_type == DatabaseType.SQLITE:
+            cursor.row_factory = None
+        
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        
+        # 命名游标在第一次 fetch 之后才有 description
+        first_batch = cursor.fetchmany(batch_size) if cursor.description or \
+            self.db_type == DatabaseType.POSTGRESQL else []
+        columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        
+        def generate():
+            try:
+                batch = first_batch
+                while batch:
+                    if as_tuples:
+                        yield from batch
+                    else:
+                        for row in batch:
+                            yield dict(zip(columns, row))
+                    batch = cursor.fetchmany(batch_size)
+            finally:
+                cursor.close()
+        
+        return generate(), columns
+    
+    def _streaming_cursor(self, batch_size: int):
+        """创建不缓存整个结果集的游标"""
+        if self.db_type == DatabaseType.MYSQL:
+            import pymysql.cursors
+            return self.connection.cursor(pymysql.cursors.SSCursor)
+        if self.db_type == DatabaseType.POSTGRESQL:
+            cursor = self.connection.cursor(name=f"smart_stream_{id(self)}_{time.monotonic_ns()}")
+            cursor.itersize = batch_size
+            return cursor
+        return self.connection.cursor()
+    
     def execute_file(self, filepath: str) -> Tuple[int, float]:
         """
         执行 SQL 文件
@@ -367,60 +776,101 @@ class SmartDatabaseTool:
     
     # ==================== 数据导入导出 ====================
     
+    # 流式导出支持的格式
+    EXPORT_FORMATS = ("csv", "json", "jsonl", "sql")
+    
     def export_table(self, table_name: str, format: str = "csv", 
-                     output_path: str = None) -> str:
+                     output_path: str = None, compress: bool = False,
+                     batch_size: int = 10000, workers: int = 1,
+                     key_column: Optional[str] = None) -> str:
         """
-        导出表数据
+        导出表数据 (边读取边写出，内存占用与表大小无关)
         
         Args:
             table_name: 表名
-            format: 导出格式 (csv/json/sql)
-            output_path: 输出路径
+            format: 导出格式 (csv/json/jsonl/sql)
+            output_path: 输出路径 (为目录时在其中生成默认文件名)
+            compress: 是否 gzip 压缩 (输出路径以 .gz 结尾时自动开启)
+            batch_size: 每次 fetchmany 的行数
+            workers: 并行进程数，大于1时按主键范围分区并行导出
+            key_column: 分区使用的整数主键列，默认自动检测
             
         Returns:
             输出文件路径
         """
+        if format not in self.EXPORT_FORMATS:
+            raise ValueError(f"不支持的格式: {format}")
+        
+        default_name = f"{table_name}_export.{format}" + (".gz" if compress else "")
         if not output_path:
-            output_path = f"{table_name}_export.{format}"
+            output_path = default_name
+        elif os.path.isdir(output_path):
+            output_path = os.path.join(output_path, default_name)
+        compress = compress or output_path.endswith(".gz")
+        
+        if workers > 1 and format != "sql":
+            key_column = key_column or self._get_integer_primary_key(table_name)
+            if key_column:
+                return self._export_partitioned(table_name, format, output_path, compress,
+                                                 batch_size, workers, key_column)
+            print(f"⚠️  表 {table_name} 没有单列整数主键，无法分区，改为单进程导出")
         
         if format == "csv":
-            return self._export_to_csv(table_name, output_path)
+            return self._export_to_csv(table_name, output_path, compress, batch_size)
         elif format == "json":
-            return self._export_to_json(table_name, output_path)
-        elif format == "sql":
-            return self._export_to_sql(table_name, output_path)
-        else:
-            raise ValueError(f"不支持的格式: {format}")
+            return self._export_to_json(table_name, output_path, compress, batch_size)
+        elif format == "jsonl":
+            return self._export_to_jsonl(table_name, output_path, compress, batch_size)
+        return self._export_to_sql(table_name, output_path, compress, batch_size)
     
-    def _export_to_csv(self, table_name: str, output_path: str) -> str:
+    def _export_to_csv(self, table_name: str, output_path: str,
+                       compress: bool = False, batch_size: int = 10000) -> str:
         """导出为 CSV 格式"""
-        rows, columns = self.execute_query(f"SELECT * FROM {table_name}")
+        rows, columns = self.iter_query(f"SELECT * FROM {table_name}",
+                                        batch_size=batch_size, as_tuples=True)
         
-        with open(output_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=columns)
-            writer.writeheader()
-            writer.writerows(rows)
+        with _open_export_file(output_path, compress) as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            _write_export_rows(f, "csv", columns, rows)
         
         return output_path
     
-    def _export_to_json(self, table_name: str, output_path: str) -> str:
-        """导出为 JSON 格式"""
-        rows, columns = self.execute_query(f"SELECT * FROM {table_name}")
+    def _export_to_json(self, table_name: str, output_path: str,
+                        compress: bool = False, batch_size: int = 10000) -> str:
+        """导出为 JSON 格式 (逐行写出数组元素)"""
+        rows, columns = self.iter_query(f"SELECT * FROM {table_name}",
+                                        batch_size=batch_size, as_tuples=True)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(rows, f, ensure_ascii=False, indent=2)
+        with _open_export_file(output_path, compress) as f:
+            f.write("[")
+            count = _write_export_rows(f, "json", columns, rows)
+            f.write("\n]" if count else "]")
+        
+        return output_path
+    
+    def _export_to_jsonl(self, table_name: str, output_path: str,
+                         compress: bool = False, batch_size: int = 10000) -> str:
+        """导出为 JSON Lines 格式"""
+        rows, columns = self.iter_query(f"SELECT * FROM {table_name}",
+                                        batch_size=batch_size, as_tuples=True)
+        
+        with _open_export_file(output_path, compress) as f:
+            _write_export_rows(f, "jsonl", columns, rows)
         
         return output_path
     
-    def _export_to_sql(self, table_name: str, output_path: str) -> str:
+    def _export_to_sql(self, table_name: str, output_path: str,
+                       compress: bool = False, batch_size: int = 10000) -> str:
         """导出为 SQL 格式"""
-        rows, columns = self.execute_query(f"SELECT * FROM {table_name}")
+        rows, columns = self.iter_query(f"SELECT * FROM {table_name}",
+                                        batch_size=batch_size, as_tuples=True)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
+        with _open_export_file(output_path, compress) as f:
             f.write(f"-- Export of {table_name} at {datetime.now()}\n")
             for row in rows:
                 values = []
-                for val in row.values():
+                for val in row:
                     if val is None:
                         values.append("NULL")
                     elif isinstance(val, str):
@@ -431,85 +881,256 @@ class SmartDatabaseTool:
         
         return output_path
     
+    def _get_integer_primary_key(self, table_name: str) -> Optional[str]:
+        """检测表的单列整数主键 (用于范围分区)"""
+        if self.db_type == DatabaseType.SQLITE:
+            cursor = self.connection.cursor()
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            pk_columns = [row[1] for row in cursor.fetchall() if row[5]]
+            if len(pk_columns) == 1:
+                return pk_columns[0]
+            # 没有显式主键时使用 rowid
+            return "rowid"
+        cursor = self.connection.cursor()
+        if self.db_type == DatabaseType.MYSQL:
+            cursor.execute("""
+                SELECT k.COLUMN_NAME, c.DATA_TYPE
+                FROM information_schema.KEY_COLUMN_USAGE k
+                JOIN information_schema.COLUMNS c
+                  ON c.TABLE_SCHEMA = k.TABLE_SCHEMA AND c.TABLE_NAME = k.TABLE_NAME
+                 AND c.COLUMN_NAME = k.COLUMN_NAME
+                WHERE k.TABLE_SCHEMA = DATABASE() AND k.TABLE_NAME = %s
+                  AND k.CONSTRAINT_NAME = 'PRIMARY'
+            """, (table_name,))
+        elif self.db_type == DatabaseType.POSTGRESQL:
+            cursor.execute("""
+                SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+                FROM pg_index i
+                JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                WHERE i.indrelid = %s::regclass AND i.indisprimary
+            """, (table_name,))
+        else:
+            return None
+        pk_columns = cursor.fetchall()
+        if len(pk_columns) == 1 and pk_columns[0][1].split()[0].lower() in _INTEGER_TYPES:
+            return pk_columns[0][0]
+        return None
+    
+    def _export_partitioned(self, table_name: str, format: str, output_path: str,
+                            compress: bool, batch_size: int, workers: int,
+                            key_column: str) -> str:
+        """按主键范围分区，多进程并行导出各分区后按顺序拼接"""
+        key = self._quote_identifier(key_column) if key_column != "rowid" else key_column
+        rows, _ = self.execute_query(f"SELECT MIN({key}), MAX({key}) FROM {table_name}")
+        low, high = list(rows[0].values()) if rows else (None, None)
+        columns = self.iter_query(f"SELECT * FROM {table_name} LIMIT 0")[1]
+        
+        if low is None or not isinstance(low, int) or not isinstance(high, int):
+            return self.export_table(table_name, format, output_path, compress, batch_size)
+        
+        step = (high - low) // workers + 1
+        ph = self._placeholder()
+        ranges = [(low + i * step, min(low + (i + 1) * step, high + 1)) for i in range(workers)]
+        ranges = [(a, b) for a, b in ranges if a < b]
+        
+        part_paths = [f"{output_path}.part{i}" for i in range(len(ranges))]
+        jobs = [
+            (self.db_url, f"SELECT * FROM {table_name} WHERE {key} >= {ph} AND {key} < {ph} ORDER BY {key}",
+             (start, end), format, columns, part_path, compress, batch_size)
+            for (start, end), part_path in zip(ranges, part_paths)
+        ]
+        
+        try:
+            with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+                counts = list(pool.map(_export_partition_job, *zip(*jobs)))
+            
+            # gzip 支持多个成员直接拼接，因此分区文件可按字节顺序合并
+            with open(output_path, "wb") as out:
+                def write_text(text: str):
+                    if text:
+                        out.write(gzip.compress(text.encode("utf-8")) if compress else text.encode("utf-8"))
+                
+                if format == "csv":
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerow(columns)
+                    write_text(buffer.getvalue())
+                elif format == "json":
+                    write_text("[")
+                written = 0
+                for count, part_path in zip(counts, part_paths):
+                    if not count:
+                        continue
+                    if format == "json" and written:
+                        # 每个分区的第一个元素自带换行缩进，只需补逗号
+                        write_text(",")
+                    with open(part_path, "rb") as part:
+                        shutil.copyfileobj(part, out)
+                    written += count
+                if format == "json":
+                    write_text("\n]" if written else "]")
+        finally:
+            for part_path in part_paths:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+        
+        return output_path
+    
     def import_data(self, table_name: str, filepath: str, 
-                    format: str = "csv", create_table: bool = False):
+                    format: str = "csv", create_table: bool = False,
+                    batch_size: int = 10000, indexes: Optional[List[Union[str, List[str]]]] = None,
+                    defer_indexes: bool = True,
+                    progress: Optional[Callable[[int], None]] = None) -> "ImportStats":
         """
-        导入数据
+        导入数据 (批量流式导入，内存占用与文件大小无关)
         
         Args:
             table_name: 目标表名
             filepath: 数据文件路径
-            format: 数据格式 (csv/json/sql)
+            format: 数据格式 (csv/json/jsonl/sql)
             create_table: 是否自动创建表
+            batch_size: 每批 executemany 的行数
+            indexes: 导入完成后创建的索引 (列名或列名列表)
+            defer_indexes: SQLite 下先删除表上已有索引，导入后重建
+            progress: 进度回调，参数为已导入行数
+            
+        Returns:
+            导入统计 (行数、耗时、每秒行数)
         """
+        options = {
+            "batch_size": batch_size,
+            "indexes": indexes,
+            "defer_indexes": defer_indexes,
+            "progress": progress,
+        }
         if format == "csv":
-            self._import_from_csv(table_name, filepath, create_table)
-        elif format == "json":
-            self._import_from_json(table_name, filepath, create_table)
+            return self._import_from_csv(table_name, filepath, create_table, **options)
+        elif format in ("json", "jsonl"):
+            return self._import_from_json(table_name, filepath, create_table, **options)
         elif format == "sql":
-            self._import_from_sql(filepath)
+            return self._import_from_sql(filepath)
         else:
             raise ValueError(f"不支持的格式: {format}")
     
-    def _import_from_csv(self, table_name: str, filepath: str, create_table: bool):
-        """从 CSV 导入"""
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
+    def _import_from_csv(self, table_name: str, filepath: str, create_table: bool,
+                         **options) -> "ImportStats":
+        """从 CSV 导入 (逐批读取，不整体加载文件)"""
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            columns = next(reader, None)
+            if not columns:
+                return ImportStats(table=table_name)
+            width = len(columns)
+            # 与 DictReader 一样跳过空行
+            rows = (
+                tuple(row) if len(row) == width else tuple((row + [None] * width)[:width])
+                for row in reader if row
+            )
+            
+            # 只预读一小段样本用于推断列类型，样本行随后照常导入
+            sample = list(itertools.islice(rows, self.TYPE_SAMPLE_ROWS))
             if create_table:
-                self._create_table_from_csv(table_name, reader.fieldnames, list(reader))
+                self._create_table_from_csv(table_name, columns,
+                                            [dict(zip(columns, row)) for row in sample])
             
-            cursor = self.connection.cursor()
-            for row in reader:
-                placeholders = ', '.join(['?' for _ in row])
-                columns = ', '.join(row.keys())
-                cursor.execute(
-                    f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})",
-                    list(row.values())
-                )
-        self.connection.commit()
+            if self.db_type == DatabaseType.POSTGRESQL:
+                f.seek(0)
+                return self._copy_csv_to_postgresql(table_name, columns, f, **options)
+            
+            return self._bulk_insert(table_name, columns,
+                                     itertools.chain(sample, rows), **options)
     
     def _create_table_from_csv(self, table_name: str, columns: List[str], sample_rows: List[Dict]):
-        """从 CSV 创建表"""
+        """从 CSV 创建表 (根据样本行推断 INTEGER/REAL/TEXT)"""
         if not sample_rows:
             return
         
-        # 推断列类型
-        type_mapping = {
-            int: "INTEGER",
-            float: "REAL",
-            str: "TEXT"
-        }
-        
         col_defs = []
         for col in columns:
-            sample_val = sample_rows[0].get(col, "")
-            col_type = type_mapping.get(type(sample_val), "TEXT")
-            col_defs.append(f"{col} {col_type}")
+            values = [row.get(col) for row in sample_rows]
+            col_defs.append(f"{self._quote_identifier(col)} {self._infer_column_type(values)}")
         
-        create_sql = f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(col_defs)})"
-        self.connection.execute(create_sql)
+        create_sql = f"CREATE TABLE IF NOT EXISTS {self._quote_identifier(table_name)} ({', '.join(col_defs)})"
+        self.connection.cursor().execute(create_sql)
         self.connection.commit()
     
-    def _import_from_json(self, table_name: str, filepath: str, create_table: bool):
-        """从 JSON 导入"""
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if not data:
-            return
+    @staticmethod
+    def _infer_column_type(values: List[Optional[str]]) -> str:
+        """根据字符串样本推断列类型"""
+        col_type = "INTEGER"
+        seen = False
+        for value in values:
+            if value is None or value == "":
+                continue
+            seen = True
+            try:
+                int(value)
+                continue
+            except ValueError:
+                pass
+            try:
+                float(value)
+                col_type = "REAL"
+            except ValueError:
+                return "TEXT"
+        return col_type if seen else "TEXT"
+    
+    def _import_from_json(self, table_name: str, filepath: str, create_table: bool,
+                          **options) -> "ImportStats":
+        """从 JSON 数组或 JSON Lines 导入 (增量解析)"""
+        records = self._iter_json_records(filepath)
+        first = next(records, None)
+        if first is None:
+            return ImportStats(table=table_name)
         
         if create_table:
-            self._create_table_from_json(table_name, data[0])
+            self._create_table_from_json(table_name, first)
         
-        cursor = self.connection.cursor()
-        for row in data:
-            placeholders = ', '.join(['?' for _ in row])
-            columns = ', '.join(row.keys())
-            cursor.execute(
-                f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})",
-                list(row.values())
-            )
-        self.connection.commit()
+        # 列以第一条记录为准
+        columns = list(first.keys())
+        rows = (tuple(record.get(col) for col in columns)
+                for record in itertools.chain([first], records))
+        return self._bulk_insert(table_name, columns, rows, **options)
+    
+    def _iter_json_records(self, filepath: str, chunk_size: int = 1 << 20):
+        """增量读取 JSON 数组 ([{...}, ...]) 或 JSON Lines，每次只解码一条记录"""
+        decoder = json.JSONDecoder()
+        with open(filepath, 'r', encoding='utf-8') as f:
+            buffer = f.read(chunk_size)
+            pos = 0
+            eof = not buffer
+            
+            def skip(chars: str):
+                nonlocal buffer, pos, eof
+                while True:
+                    while pos < len(buffer) and buffer[pos] in chars:
+                        pos += 1
+                    if pos < len(buffer) or eof:
+                        return
+                    buffer, pos = f.read(chunk_size), 0
+                    eof = not buffer
+            
+            skip(" \t\r\n\ufeff")
+            in_array = pos < len(buffer) and buffer[pos] == '['
+            if in_array:
+                pos += 1
+            separators = " \t\r\n," if in_array else " \t\r\n"
+            
+            while True:
+                skip(separators)
+                if pos >= len(buffer) or (in_array and buffer[pos] == ']'):
+                    return
+                while True:
+                    try:
+                        record, end = decoder.raw_decode(buffer, pos)
+                        break
+                    except json.JSONDecodeError:
+                        # 记录跨越了块边界，继续读入
+                        more = f.read(chunk_size)
+                        if not more:
+                            raise
+                        buffer, pos = buffer[pos:] + more, 0
+                pos = end
+                yield record
     
     def _create_table_from_json(self, table_name: str, sample: Dict):
         """从 JSON 创建表"""
@@ -518,15 +1139,151 @@ class SmartDatabaseTool:
             col_type = "INTEGER" if isinstance(val, int) else \
                       "REAL" if isinstance(val, float) else \
                       "TEXT"
-            col_defs.append(f"{key} {col_type}")
+            col_defs.append(f"{self._quote_identifier(key)} {col_type}")
         
-        create_sql = f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(col_defs)})"
-        self.connection.execute(create_sql)
+        create_sql = f"CREATE TABLE IF NOT EXISTS {self._quote_identifier(table_name)} ({', '.join(col_defs)})"
+        self.connection.cursor().execute(create_sql)
         self.connection.commit()
     
-    def _import_from_sql(self, filepath: str):
+    def _import_from_sql(self, filepath: str) -> "ImportStats":
         """从 SQL 文件导入"""
-        self.execute_file(filepath)
+        affected, elapsed = self.execute_file(filepath)
+        return ImportStats(table="", rows=max(affected, 0), seconds=elapsed)
+    
+    # ==================== 批量导入引擎 ====================
+    
+    # 建表时用于推断列类型的样本行数
+    TYPE_SAMPLE_ROWS = 1000
+    
+    def _quote_identifier(self, name: str) -> str:
+        """引用表名/列名"""
+        if self.db_type == DatabaseType.MYSQL:
+            return "`" + name.replace("`", "``") + "`"
+        return '"' + name.replace('"', '""') + '"'
+    
+    def _placeholder(self) -> str:
+        """参数占位符 (sqlite3 为 ?，pymysql/psycopg2 为 %s)"""
+        return "?" if self.db_type == DatabaseType.SQLITE else "%s"
+    
+    def _bulk_insert(self, table_name: str, columns: List[str], rows,
+                     batch_size: int = 10000,
+                     indexes: Optional[List[Union[str, List[str]]]] = None,
+                     defer_indexes: bool = True,
+                     progress: Optional[Callable[[int], None]] = None) -> "ImportStats":
+        """分批 executemany 写入，整个导入在一个显式事务中完成"""
+        stats = ImportStats(table=table_name)
+        start = time.perf_counter()
+        
+        # INSERT 语句只构建一次
+        quoted_table = self._quote_identifier(table_name)
+        column_list = ', '.join(self._quote_identifier(c) for c in columns)
+        placeholders = ', '.join([self._placeholder()] * len(columns))
+        insert_sql = f"INSERT INTO {quoted_table} ({column_list}) VALUES ({placeholders})"
+        
+        with self._bulk_load_session(table_name, defer_indexes) as cursor:
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                cursor.executemany(insert_sql, batch)
+                stats.rows += len(batch)
+                stats.batches += 1
+                if progress:
+                    progress(stats.rows)
+        
+        self._create_indexes(table_name, indexes or [])
+        stats.seconds = time.perf_counter() - start
+        return stats
+    
+    @contextmanager
+    def _bulk_load_session(self, table_name: str, defer_indexes: bool):
+        """
+        批量导入会话: 调整 SQLite PRAGMA、暂时移除索引、开启事务，结束后恢复
+        
+        只移除普通索引，UNIQUE 索引保留以便导入时照常检查唯一性。索引的移除和重建
+        都在导入事务内完成，重建失败时整个导入回滚，原有索引随之恢复。
+        """
+        if self.db_type == DatabaseType.SQLITE and self.connection.in_transaction:
+            self.connection.commit()
+        
+        saved_pragmas: Dict[str, Any] = {}
+        dropped_indexes: List[str] = []
+        cursor = self.connection.cursor()
+        
+        if self.db_type == DatabaseType.SQLITE:
+            for pragma, value in self.SQLITE_BULK_PRAGMAS.items():
+                saved_pragmas[pragma] = cursor.execute(f"PRAGMA {pragma}").fetchone()[0]
+                cursor.execute(f"PRAGMA {pragma} = {value}")
+            cursor.execute("BEGIN")
+            if defer_indexes:
+                index_list = cursor.execute(
+                    f"PRAGMA index_list({self._quote_identifier(table_name)})"
+                ).fetchall()
+                for _, name, unique, origin, *_ in index_list:
+                    if unique or origin != "c":
+                        continue
+                    row = cursor.execute(
+                        "SELECT sql FROM sqlite_master WHERE type='index' AND name=?", (name,)
+                    ).fetchone()
+                    if row and row[0]:
+                        cursor.execute(f"DROP INDEX {self._quote_identifier(name)}")
+                        dropped_indexes.append(row[0])
+        
+        try:
+            yield cursor
+            for index_sql in dropped_indexes:
+                cursor.execute(index_sql)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            for pragma, value in saved_pragmas.items():
+                try:
+                    cursor.execute(f"PRAGMA {pragma} = {value}")
+                except sqlite3.Error as e:
+                    print(f"⚠️  恢复 PRAGMA {pragma} 失败: {e}")
+    
+    def _create_indexes(self, table_name: str, indexes: List[Union[str, List[str]]]):
+        """导入完成后再建索引 (比边插入边维护索引快得多)"""
+        if not indexes:
+            return
+        cursor = self.connection.cursor()
+        for index in indexes:
+            columns = [index] if isinstance(index, str) else list(index)
+            name = f"idx_{table_name}_{'_'.join(columns)}"
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self._quote_identifier(name)} "
+                f"ON {self._quote_identifier(table_name)} "
+                f"({', '.join(self._quote_identifier(c) for c in columns)})"
+            )
+        self.connection.commit()
+    
+    def _copy_csv_to_postgresql(self, table_name: str, columns: List[str], f,
+                                indexes: Optional[List[Union[str, List[str]]]] = None,
+                                progress: Optional[Callable[[int], None]] = None,
+                                **_) -> "ImportStats":
+        """PostgreSQL: 使用 COPY FROM STDIN 直接流式导入 CSV 文件"""
+        start = time.perf_counter()
+        cursor = self.connection.cursor()
+        column_list = ', '.join(self._quote_identifier(c) for c in columns)
+        try:
+            cursor.copy_expert(
+                f"COPY {self._quote_identifier(table_name)} ({column_list}) "
+                f"FROM STDIN WITH (FORMAT csv, HEADER true)",
+                f
+            )
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        
+        stats = ImportStats(table=table_name, rows=max(cursor.rowcount, 0), batches=1)
+        if progress:
+            progress(stats.rows)
+        self._create_indexes(table_name, indexes or [])
+        stats.seconds = time.perf_counter() - start
+        return stats
     
     # ==================== 备份恢复 ====================
     
@@ -608,67 +1365,315 @@ class SmartDatabaseTool:
     
     # ==================== 性能分析 ====================
     
-    def analyze_performance(self) -> Dict[str, Any]:
-        """分析数据库性能"""
-        analysis = {
-            "slow_queries": [],
-            "missing_indexes": [],
-            "table_stats": [],
-            "recommendations": []
-        }
+    def enable_profiling(self, slow_ms: float = 10.0) -> QueryProfiler:
+        """
+        开启查询剖析
+        
+        之后经 execute_query / safe_query 执行的查询都会按指纹记录耗时直方图和行数，
+        慢于 slow_ms 的指纹会记录一次执行计划。
         
+        Args:
+            slow_ms: 慢查询阈值 (毫秒)
+            
+        Returns:
+            剖析器实例
+        """
+        self.profiler = QueryProfiler(slow_ms, explain=self._explain_query_plan)
         if self.db_type == DatabaseType.SQLITE:
-            analysis = self._analyze_sqlite_performance()
+            self.connection.set_progress_handler(self.profiler.tick, QueryProfiler.PROGRESS_STEP)
+        return self.profiler
+    
+    def profile_workload(self, statements: List[str]) -> int:
+        """
+        执行一组 SQL 负载供剖析，不改动数据库
         
-        return analysis
+        所有语句在同一个事务中执行，结束后整体回滚。事务控制语句会破坏回滚，
+        MySQL 的 DDL 会隐式提交，这些语句都跳过。
+        
+        Args:
+            statements: SQL 语句列表
+            
+        Returns:
+            实际执行的语句数
+        """
+        if not self.profiler:
+            raise ValueError("请先调用 enable_profiling()")
+        
+        skipped_keywords = set(_TRANSACTION_KEYWORDS)
+        if self.db_type == DatabaseType.MYSQL:
+            skipped_keywords |= _DDL_KEYWORDS
+        
+        if self.db_type == DatabaseType.SQLITE and self.connection.in_transaction:
+            self.connection.commit()
+        executed = 0
+        try:
+            if self.db_type == DatabaseType.SQLITE:
+                self.connection.execute("BEGIN")
+            for statement in statements:
+                keyword = re.match(r"\s*(\w*)", statement).group(1).upper()
+                if keyword in skipped_keywords:
+                    print(f"⚠️  跳过 (无法回滚): {statement[:80]}")
+                    continue
+                self.execute_query(statement, commit=False)
+                executed += 1
+        finally:
+            self.connection.rollback()
+        return executed
     
-    def _analyze_sqlite_performance(self) -> Dict[str, Any]:
-        """SQLite 性能分析"""
+    def disable_profiling(self) -> Optional[QueryProfiler]:
+        """关闭查询剖析，返回已收集数据的剖析器"""
+        profiler, self.profiler = self.profiler, None
+        if profiler and self.db_type == DatabaseType.SQLITE:
+            self.connection.set_progress_handler(None, 0)
+        return profiler
+    
+    def _explain_query_plan(self, query: str, params: tuple = None) -> List[str]:
+        """获取查询的执行计划 (每个步骤一行)"""
+        prefix = "EXPLAIN QUERY PLAN " if self.db_type == DatabaseType.SQLITE else "EXPLAIN "
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(prefix + query, params or ())
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        if self.db_type == DatabaseType.SQLITE:
+            return [row[3] for row in rows]
+        return [" | ".join(str(v) for v in row) for row in rows]
+    
+    def analyze_performance(self, verify: bool = True) -> Dict[str, Any]:
+        """
+        分析数据库性能
+        
+        基于剖析器记录的真实查询负载：列出耗时最高的指纹和慢查询执行计划，
+        并为 SQLite 给出索引建议，verify 为 True 时在数据库副本上回放负载验证每条建议。
+        """
         analysis = {
             "slow_queries": [],
             "missing_indexes": [],
             "table_stats": [],
+            "query_profile": [],
             "recommendations": []
         }
         
-        cursor = self.connection.cursor()
+        if self.db_type == DatabaseType.SQLITE:
+            analysis["table_stats"] = self._sqlite_table_stats()
+        
+        if not self.profiler or not self.profiler.stats:
+            analysis["recommendations"].append(
+                "尚未记录查询负载: 先调用 enable_profiling() (或使用 --workload) 再分析"
+            )
+            return analysis
+        
+        analysis["query_profile"] = [s.to_dict() for s in self.profiler.top()]
+        analysis["slow_queries"] = [s.to_dict() for s in self.profiler.slow_queries()]
+        
+        if self.db_type == DatabaseType.SQLITE:
+            suggestions = self.recommend_indexes()
+            if verify and suggestions:
+                workload = self.verify_index_recommendations(suggestions)
+                analysis["workload"] = workload
+                suggestions = [r for r in suggestions if r.verified]
+            analysis["missing_indexes"] = [r.to_dict() for r in suggestions]
+        
+        if analysis["slow_queries"]:
+            analysis["recommendations"].append(
+                f"{len(analysis['slow_queries'])} 类查询慢于 {self.profiler.slow_ms}ms，请查看其执行计划"
+            )
+        if analysis["missing_indexes"]:
+            analysis["recommendations"].append(
+                f"建议创建 {len(analysis['missing_indexes'])} 个索引" +
+                (" (已通过回放验证)" if verify else "")
+            )
         
-        # 获取表统计信息
+        return analysis
+    
+    def _sqlite_table_stats(self) -> List[Dict[str, Any]]:
+        """SQLite 表统计"""
+        cursor = self.connection.cursor()
         cursor.execute("""
             SELECT name FROM sqlite_master 
             WHERE type='table' AND name NOT LIKE 'sqlite_%'
         """)
         
+        stats = []
         for (table_name,) in cursor.fetchall():
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+            cursor.execute(f"SELECT COUNT(*) FROM {self._quote_identifier(table_name)}")
             count = cursor.fetchone()[0]
+            indexes = self._sqlite_indexes(table_name)
             
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            columns = cursor.fetchall()
-            
-            analysis["table_stats"].append({
+            stats.append({
                 "name": table_name,
                 "row_count": count,
-                "columns": len(columns),
-                "has_autoindex": any(c[1].startswith("sqlite_") for c in columns)
+                "columns": len(self._sqlite_table_columns(table_name)),
+                "indexes": len(indexes),
+                "has_autoindex": any(name.startswith("sqlite_autoindex") for name in indexes)
             })
+        return stats
+    
+    def _sqlite_table_columns(self, table: str) -> List[Tuple[str, str, int]]:
+        """SQLite 表的 (列名, 类型, 主键序号) 列表"""
+        cursor = self.connection.cursor()
+        cursor.execute(f"PRAGMA table_info({self._quote_identifier(table)})")
+        return [(row[1].lower(), (row[2] or "").upper(), row[5]) for row in cursor.fetchall()]
+    
+    def _sqlite_indexes(self, table: str) -> Dict[str, List[str]]:
+        """SQLite 表上已有索引: 索引名 -> 列名列表"""
+        cursor = self.connection.cursor()
+        cursor.execute(f"PRAGMA index_list({self._quote_identifier(table)})")
+        indexes = {}
+        for row in cursor.fetchall():
+            name = row[1]
+            cursor.execute(f"PRAGMA index_info({self._quote_identifier(name)})")
+            indexes[name] = [(info[2] or "").lower() for info in cursor.fetchall()]
+        return indexes
+    
+    # 覆盖索引最多包含的列数，超过后只建议键列
+    MAX_INDEX_COLUMNS = 5
+    
+    def recommend_indexes(self) -> List[IndexRecommendation]:
+        """
+        根据慢查询的访问模式推荐索引 (SQLite)
         
-        # 分析查询建议
-        for table in analysis["table_stats"]:
-            if table["row_count"] > 10000 and not table["has_autoindex"]:
-                analysis["missing_indexes"].append({
-                    "table": table["name"],
-                    "reason": "大表缺少索引",
-                    "suggestion": f"CREATE INDEX idx_{table['name']}_id ON {table['name']}(id)"
-                })
+        只分析执行计划中出现全表扫描 (SCAN) 或临时 B 树排序的指纹。键列顺序为:
+        等值/连接列，然后是第一个范围列；没有范围条件时接 ORDER BY / GROUP BY 列，
+        使索引同时消除排序；若 SELECT 列都来自该表且总列数不多，则追加为覆盖索引。
+        """
+        if not self.profiler:
+            return []
         
-        # 生成优化建议
-        if analysis["missing_indexes"]:
-            analysis["recommendations"].append(
-                f"建议为 {len(analysis['missing_indexes'])} 个大表创建索引"
-            )
+        schema = {}
         
-        return analysis
+        def columns_of(table):
+            if table not in schema:
+                schema[table] = self._sqlite_table_columns(table)
+            return schema[table]
+        
+        candidates: Dict[Tuple[str, Tuple[str, ...]], IndexRecommendation] = {}
+        
+        for stats in self.profiler.slow_queries():
+            plan = " ".join(stats.plan or [])
+            access = parse_query_access(stats.fingerprint)
+            aliases = access["tables"]
+            
+            def resolve(ref):
+                qualifier, column = ref
+                if qualifier:
+                    table = aliases.get(qualifier)
+                    return (table, column) if table and column in {c[0] for c in columns_of(table)} else None
+                owners = [t for t in set(aliases.values()) if column in {c[0] for c in columns_of(t)}]
+                return (owners[0], column) if len(owners) == 1 else None
+            
+            resolved = {kind: [r for r in map(resolve, access[kind]) if r]
+                        for kind in ("equality", "join", "range", "order_by")}
+            order_tables = {t for t, _ in resolved["order_by"]}
+            order_usable = len(order_tables) == 1 and len(resolved["order_by"]) == len(access["order_by"])
+            select = None
+            if access["select"] is not None:
+                select = [r for r in map(resolve, access["select"])]
+                select = select if all(select) else None
+            
+            for table in set(aliases.values()):
+                names = {table} | {a for a, t in aliases.items() if t == table}
+                scanned = any(re.search(rf"\bSCAN (?:TABLE )?{re.escape(n)}\b(?! USING)", plan)
+                              for n in names)
+                temp_sort = "TEMP B-TREE" in plan and table in order_tables
+                if not (scanned or temp_sort):
+                    continue
+                
+                key = []
+                for t, column in resolved["equality"] + resolved["join"]:
+                    if t == table and column not in key:
+                        key.append(column)
+                ranges = [c for t, c in resolved["range"] if t == table and c not in key]
+                if ranges:
+                    key.append(ranges[0])
+                elif order_usable and table in order_tables:
+                    key += [c for _, c in resolved["order_by"] if c not in key]
+                if not key:
+                    continue
+                
+                # 单独的 INTEGER PRIMARY KEY 就是 rowid，本身已有序
+                rowid = [c for c, type_, pk in columns_of(table) if pk == 1 and type_ == "INTEGER"]
+                if key == rowid[:1]:
+                    continue
+                
+                columns, covering = list(key), False
+                if select is not None and select and all(t == table for t, _ in select):
+                    # rowid 隐含在每个索引里，无需重复
+                    extra = [c for _, c in select if c not in columns and c not in rowid]
+                    if extra and len(columns) + len(extra) <= self.MAX_INDEX_COLUMNS:
+                        columns += extra
+                        covering = True
+                
+                rec = candidates.setdefault((table, tuple(columns)),
+                                            IndexRecommendation(table, columns, covering=covering))
+                rec.fingerprints.append(stats.fingerprint)
+        
+        # 已有索引能覆盖的、或是另一条建议前缀的候选都去掉
+        existing = {}
+        recommendations = []
+        for (table, columns), rec in candidates.items():
+            if table not in existing:
+                existing[table] = list(self._sqlite_indexes(table).values())
+            if any(idx[:len(columns)] == list(columns) for idx in existing[table]):
+                continue
+            longer = [other for (t, cols), other in candidates.items()
+                      if t == table and len(cols) > len(columns) and cols[:len(columns)] == columns]
+            if longer:
+                longer[0].fingerprints.extend(f for f in rec.fingerprints
+                                              if f not in longer[0].fingerprints)
+                continue
+            recommendations.append(rec)
+        return recommendations
+    
+    def verify_index_recommendations(self, recommendations: List[IndexRecommendation],
+                                     repeat: int = 3, min_speedup: float = 1.2) -> Dict[str, float]:
+        """
+        在数据库副本上回放负载，验证每条索引建议 (SQLite)
+        
+        副本通过 backup API 写入临时文件，原库不受影响。每条建议单独建索引、回放其
+        相关查询、再删除索引；加速比达到 min_speedup 的标记为 verified。最后同时
+        建立所有通过验证的索引回放完整负载。
+        
+        Returns:
+            {"before_ms": 完整负载基线耗时, "after_ms": 建立已验证索引后的耗时}
+        """
+        if self.db_type != DatabaseType.SQLITE:
+            raise ValueError("索引回放验证目前只支持 SQLite")
+        if not self.profiler:
+            raise ValueError("没有可回放的查询负载，请先调用 enable_profiling()")
+        
+        # 只回放读查询，写操作会改变副本数据，结果不可比
+        samples = {
+            fp: (s.sample_query, s.sample_params, s.calls)
+            for fp, s in self.profiler.stats.items()
+            if fp.startswith(("select", "with"))
+        }
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            replica = sqlite3.connect(os.path.join(tmp_dir, "replay.db"))
+            try:
+                self.connection.backup(replica)
+                before_ms = _replay_workload(replica, list(samples.values()), repeat)
+                
+                for rec in recommendations:
+                    workload = [samples[fp] for fp in rec.fingerprints if fp in samples]
+                    if not workload:
+                        continue
+                    rec.before_ms = _replay_workload(replica, workload, repeat)
+                    replica.execute(rec.sql)
+                    rec.after_ms = _replay_workload(replica, workload, repeat)
+                    replica.execute(f"DROP INDEX {rec.name}")
+                    rec.verified = (rec.speedup or 0) >= min_speedup
+                
+                for rec in recommendations:
+                    if rec.verified:
+                        replica.execute(rec.sql)
+                after_ms = _replay_workload(replica, list(samples.values()), repeat)
+            finally:
+                replica.close()
+        
+        return {"before_ms": round(before_ms, 3), "after_ms": round(after_ms, 3)}
     
     # ==================== ER 图生成 ====================
     
@@ -756,6 +1761,49 @@ class SmartDatabaseTool:
             return [], f"❌ 查询失败: {str(e)}"
 
 
+# ==================== 流式导出辅助函数 ====================
+
+def _open_export_file(path: str, compress: bool = False):
+    """打开导出文件 (可选 gzip)"""
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _write_export_rows(f, format: str, columns: List[str], rows) -> int:
+    """把元组行写入已打开的文件，返回写出的行数
+
+    json 格式只写数组元素 (元素之间用逗号分隔)，不写外层方括号。
+    """
+    count = 0
+    if format == "csv":
+        writer = csv.writer(f)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    elif format == "jsonl":
+        for row in rows:
+            f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str))
+            f.write("\n")
+            count += 1
+    elif format == "json":
+        for row in rows:
+            f.write(",\n  " if count else "\n  ")
+            f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str))
+            count += 1
+    return count
+
+
+def _export_partition_job(db_url: str, query: str, params: tuple, format: str,
+                          columns: List[str], part_path: str, compress: bool,
+                          batch_size: int) -> int:
+    """进程池任务: 用独立连接导出一个主键范围"""
+    with SmartDatabaseTool(db_url) as tool:
+        rows, _ = tool.iter_query(query, params, batch_size=batch_size, as_tuples=True)
+        with _open_export_file(part_path, compress) as f:
+            return _write_export_rows(f, format, columns, rows)
+
+
 # ==================== CLI 界面 ====================
 
 def main():
@@ -773,11 +1821,14 @@ def main():
   # 导出表数据
   python smart_database_tool.py --export --db sqlite:///test.db --table users --format csv
   
+  # 大表并行导出为压缩的 JSON Lines
+  python smart_database_tool.py --export --db sqlite:///big.db --table events --format jsonl --gzip --workers 4
+  
   # 备份数据库
   python smart_database_tool.py --backup --db sqlite:///test.db --output ./backups/
   
-  # 分析性能
-  python smart_database_tool.py --analyze --db sqlite:///test.db
+  # 分析性能 (回放 SQL 负载，给出经验证的索引建议)
+  python smart_database_tool.py --analyze --db sqlite:///test.db --workload queries.sql --slow-ms 5
   
   # 生成 ER 图
   python smart_database_tool.py --er --db sqlite:///test.db
@@ -788,11 +1839,18 @@ def main():
     parser.add_argument("--query", help="要执行的 SQL 查询")
     parser.add_argument("--export", action="store_true", help="导出数据模式")
     parser.add_argument("--table", help="导出/导入的表名")
-    parser.add_argument("--format", default="csv", choices=["csv", "json", "sql"], help="导出格式")
+    parser.add_argument("--format", default="csv", choices=["csv", "json", "jsonl", "sql"], help="导出格式")
+    parser.add_argument("--gzip", action="store_true", help="导出时 gzip 压缩")
+    parser.add_argument("--workers", type=int, default=1, help="按主键范围并行导出的进程数")
     parser.add_argument("--output", default=".", help="输出目录")
     parser.add_argument("--import-file", help="导入数据文件")
+    parser.add_argument("--batch-size", type=int, default=10000, help="批量导入/导出每批行数")
+    parser.add_argument("--index", action="append", help="导入完成后为该列创建索引 (可多次指定)")
     parser.add_argument("--backup", action="store_true", help="备份数据库")
     parser.add_argument("--analyze", action="store_true", help="性能分析")
+    parser.add_argument("--workload", help="性能分析时回放的 SQL 负载文件")
+    parser.add_argument("--slow-ms", type=float, default=10.0, help="慢查询阈值 (毫秒)")
+    parser.add_argument("--no-verify", action="store_true", help="不在数据库副本上回放验证索引建议")
     parser.add_argument("--er", action="store_true", help="生成 ER 图")
     parser.add_argument("--info", action="store_true", help="显示数据库信息")
     parser.add_argument("--nl", help="自然语言转 SQL")
@@ -851,7 +1909,9 @@ def main():
                 if not args.table:
                     print("⛔ 请指定 --table 参数")
                     sys.exit(1)
-                filepath = db_tool.export_table(args.table, args.format, args.output)
+                filepath = db_tool.export_table(args.table, args.format, args.output,
+                                                compress=args.gzip, batch_size=args.batch_size,
+                                                workers=args.workers)
                 print(f"\n✅ 已导出到: {filepath}")
             
             # 导入数据
@@ -860,8 +1920,11 @@ def main():
                     print("⛔ 请指定 --table 参数")
                     sys.exit(1)
                 fmt = args.import_file.split('.')[-1].lower()
-                db_tool.import_data(args.table, args.import_file, fmt, create_table=True)
+                stats = db_tool.import_data(args.table, args.import_file, fmt, create_table=True,
+                                            batch_size=args.batch_size,
+                                            indexes=args.index or None)
                 print(f"\n✅ 已从 {args.import_file} 导入到 {args.table}")
+                print(f"   {stats}")
             
             # 备份
             elif args.backup:
@@ -870,13 +1933,31 @@ def main():
             
             # 性能分析
             elif args.analyze:
-                analysis = db_tool.analyze_performance()
+                db_tool.enable_profiling(args.slow_ms)
+                if args.workload:
+                    with open(args.workload, 'r', encoding='utf-8') as f:
+                        statements = [s.strip() for s in sqlparse.split(f.read()) if s.strip()]
+                    db_tool.profile_workload(statements)
+                analysis = db_tool.analyze_performance(verify=not args.no_verify)
                 print("\n📊 性能分析报告")
-                print(f": {len(   表统计analysis['table_stats'])} 个表")
+                print(f"   表统计: {len(analysis['table_stats'])} 个表")
+                if analysis['query_profile']:
+                    print(f"\n⏱️  查询指纹 (按总耗时):")
+                    for q in analysis['query_profile'][:10]:
+                        print(f"   {q['calls']:>6} 次  均值 {q['mean_ms']:.2f}ms  p95 {q['p95_ms']:.2f}ms  "
+                              f"{q['rows']} 行  {q['fingerprint'][:80]}")
+                for q in analysis['slow_queries'][:5]:
+                    print(f"\n🐢 慢查询: {q['fingerprint'][:100]}")
+                    for step in q['plan'] or []:
+                        print(f"      {step}")
+                if analysis.get('workload'):
+                    w = analysis['workload']
+                    print(f"\n🔁 负载回放: {w['before_ms']:.2f}ms -> {w['after_ms']:.2f}ms")
                 if analysis['missing_indexes']:
-                    print(f"   缺失索引: {len(analysis['missing_indexes'])} 个")
+                    print(f"\n   缺失索引: {len(analysis['missing_indexes'])} 个")
                     for idx in analysis['missing_indexes'][:5]:
-                        print(f"   - {idx['table']}: {idx['suggestion']}")
+                        speedup = f" (加速 {idx['speedup']}x)" if idx['speedup'] else ""
+                        print(f"   - {idx['table']}: {idx['suggestion']}{speedup}")
                 if analysis['recommendations']:
                     print("\n💡 优化建议:")
                     for rec in analysis['recommendations']:
@@ -20,20 +20,36 @@
 import time
 import cProfile
 import pstats
-import memory_profiler
 import dis
+import gc
 import inspect
+import math
+import platform
+import statistics
+import subprocess
 import linecache
+import os
 import re
+import signal
 import sys
 import json
+import argparse
+import threading
+import tracemalloc
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, Tuple
 from dataclasses import dataclass, field
-from collections import defaultdict
+from collections import Counter, defaultdict
+from datetime import datetime
 import io
 from contextlib import contextmanager
 
+try:
+    import memory_profiler
+    MEMORY_PROFILER_AVAILABLE = True
+except ImportError:
+    MEMORY_PROFILER_AVAILABLE = False
+
 
 @dataclass
 class FunctionStats:
@@ -62,12 +78,567 @@ class PerformanceReport:
     suggestions: List[str] = field(default_factory=list)
 
 
+class SamplingProfiler:
+    """
+    栈采样分析器
+    
+    按固定间隔抓取目标线程的调用栈并聚合为折叠栈（folded stacks），
+    开销与被测代码的调用次数无关，可以在生产环境长时间开启。
+    
+    - thread 模式: 后台线程通过 sys._current_frames() 采样，跨平台
+    - signal 模式: ITIMER_PROF 定时信号按 CPU 时间采样，仅限 Unix 主线程
+    """
+    
+    def __init__(self, interval: float = 0.005, mode: str = "thread",
+                 thread_id: Optional[int] = None):
+        if mode not in ("thread", "signal"):
+            raise ValueError(f"未知采样模式: {mode}")
+        if mode == "signal" and not hasattr(signal, "setitimer"):
+            raise RuntimeError("当前平台不支持 signal 采样模式")
+        self.interval = interval
+        self.mode = mode
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.sampler_time = 0.0
+        self.wall_time = 0.0
+        self._start_time = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._old_handler = None
+        self._labels: Dict[Any, str] = {}
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def start(self):
+        """开始采样"""
+        self._start_time = time.perf_counter()
+        if self.mode == "signal":
+            if threading.current_thread() is not threading.main_thread():
+                raise RuntimeError("signal 采样模式只能在主线程中启动")
+            self._old_handler = signal.signal(signal.SIGPROF, self._on_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            target = self.thread_id or threading.get_ident()
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, args=(target,),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        """停止采样"""
+        if self.mode == "signal":
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._old_handler or signal.SIG_DFL)
+        elif self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self.wall_time += time.perf_counter() - self._start_time
+    
+    def _run(self, target: int):
+        while not self._stop_event.wait(self.interval):
+            begin = time.perf_counter()
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                self._record(frame)
+            self.sampler_time += time.perf_counter() - begin
+    
+    def _on_signal(self, signum, frame):
+        begin = time.perf_counter()
+        if frame is not None:
+            self._record(frame)
+        self.sampler_time += time.perf_counter() - begin
+    
+    def _record(self, frame):
+        # 以 code 对象为键，导出时再格式化，采样路径上不做字符串拼接
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        self.stacks[tuple(codes)] += 1
+        self.samples += 1
+    
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+    
+    @property
+    def overhead(self) -> float:
+        """采样本身占用的时间比例"""
+        return self.sampler_time / self.wall_time if self.wall_time > 0 else 0.0
+    
+    def folded(self) -> str:
+        """flamegraph.pl / speedscope 兼容的折叠栈文本"""
+        lines = [
+            f"{';'.join(self._label(code) for code in stack)} {count}"
+            for stack, count in self.stacks.items()
+        ]
+        return '\n'.join(sorted(lines))
+    
+    def export_folded(self, output_path: str) -> str:
+        """导出折叠栈文件，可直接用 flamegraph.pl 生成火焰图"""
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(self.folded() + '\n')
+        return output_path
+    
+    def function_stats(self, limit: int = 20) -> List[FunctionStats]:
+        """按样本数估算每个函数的自身时间和累计时间"""
+        self_samples: Counter = Counter()
+        total_samples: Counter = Counter()
+        for stack, count in self.stacks.items():
+            self_samples[stack[-1]] += count
+            for code in set(stack):
+                total_samples[code] += count
+        
+        per_sample = self.wall_time / self.samples if self.samples else self.interval
+        functions = [
+            FunctionStats(
+                name=code.co_name,
+                file=code.co_filename,
+                line_number=code.co_firstlineno,
+                total_time=self_samples[code] * per_sample,
+                cumulative_time=count * per_sample
+            )
+            for code, count in total_samples.items()
+        ]
+        functions.sort(key=lambda f: (f.total_time, f.cumulative_time), reverse=True)
+        return functions[:limit]
+
+
+@dataclass
+class AllocationSite:
+    """一个内存分配位置"""
+    file: str
+    line_number: int
+    size: int
+    count: int
+    
+    @property
+    def size_kb(self) -> float:
+        return self.size / 1024
+
+
+class AllocationProfiler:
+    """
+    基于 tracemalloc 的内存分配分析器
+    
+    记录调用期间 Python 堆的真实峰值（而不是前后两次采样）。已跟踪内存的增量
+    超过 min_snapshot_bytes 且达到上次快照的 peak_growth 倍时拍一次快照，因此
+    分配位置反映的是接近峰值时的内存构成，临时对象也能被看到。默认只由后台
+    线程定时轮询，两次轮询之间分配又释放的短暂高峰看不到；显式传入
+    catch_bursts=True 时还会在调用线程的每个 profile 事件（函数调用/返回）检查
+    一次，此时局部变量仍然存活，短暂高峰也能捕获。已有其他 profile 钩子时只做轮询。
+    
+    tracemalloc 的开销随分配频率增长：计算密集的代码几乎无感，大量小对象分配
+    时会明显变慢，此时只适合短时间定位，不宜常驻；常驻请用 SamplingProfiler。
+    profile 钩子会让函数调用密集的代码慢几十倍，只在需要定位短暂高峰时开启。
+    nframes=1 时开销最低。
+    """
+    
+    def __init__(self, nframes: int = 1, top: int = 10, poll_interval: float = 0.01,
+                 peak_growth: float = 2.0, min_snapshot_bytes: int = 1024 * 1024,
+                 catch_bursts: bool = False):
+        self.nframes = nframes
+        self.catch_bursts = catch_bursts
+        self.top = top
+        self.poll_interval = poll_interval
+        self.peak_growth = peak_growth
+        self.min_snapshot_bytes = min_snapshot_bytes
+        self.start_size = 0
+        self.end_size = 0
+        self.peak_size = 0
+        self.sites: List[AllocationSite] = []
+        self._baseline = None
+        self._peak_snapshot = None
+        self._peak_snapshot_size = 0
+        self._next_snapshot_size = 0
+        self._snapshot_lock = threading.Lock()
+        self._owns_tracing = False
+        self._hook_thread: Optional[int] = None
+        self._stop_event = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def start(self):
+        """开始跟踪内存分配"""
+        self._owns_tracing = not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start(self.nframes)
+        self._peak_snapshot = None
+        self.start_size = tracemalloc.get_traced_memory()[0]
+        self._peak_snapshot_size = self.start_size
+        self._next_snapshot_size = self.start_size + self.min_snapshot_bytes - 1
+        self._baseline = tracemalloc.take_snapshot()
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch, name="allocation-profiler", daemon=True)
+        self._watcher.start()
+        if self.catch_bursts and sys.getprofile() is None:
+            self._hook_thread = threading.get_ident()
+            sys.setprofile(self._profile_hook)
+    
+    def _profile_hook(self, frame, event, arg):
+        if tracemalloc.get_traced_memory()[0] > self._next_snapshot_size:
+            self._take_peak_snapshot()
+    
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            if tracemalloc.get_traced_memory()[0] > self._next_snapshot_size:
+                self._take_peak_snapshot()
+    
+    def _take_peak_snapshot(self):
+        """内存创出新高时拍快照，并把下一次快照的门槛提高到 peak_growth 倍增量"""
+        with self._snapshot_lock:
+            size = tracemalloc.get_traced_memory()[0]
+            if size <= self._next_snapshot_size:
+                return
+            self._peak_snapshot = tracemalloc.take_snapshot()
+            self._peak_snapshot_size = size
+            growth = size - self.start_size
+            self._next_snapshot_size = self.start_size + max(self.min_snapshot_bytes - 1,
+                                                             int(growth * self.peak_growth))
+    
+    def stop(self):
+        """停止跟踪并汇总分配位置"""
+        if self._hook_thread is not None:
+            if self._hook_thread == threading.get_ident() and sys.getprofile() == self._profile_hook:
+                sys.setprofile(None)
+            self._hook_thread = None
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+        
+        snapshot = tracemalloc.take_snapshot()
+        self.end_size, self.peak_size = tracemalloc.get_traced_memory()
+        if self._owns_tracing:
+            tracemalloc.stop()
+        if self._peak_snapshot is not None and self._peak_snapshot_size > self.end_size:
+            snapshot = self._peak_snapshot
+        self._peak_snapshot = None
+        
+        # 先按行聚合再排除分析器自身，比 filter_traces 逐条过滤快得多
+        excluded = {tracemalloc.__file__, threading.__file__,
+                    os.path.join(os.path.dirname(threading.__file__), '_weakrefset.py')}
+        source, first_line = inspect.getsourcelines(AllocationProfiler)
+        own_lines = range(first_line, first_line + len(source))
+        baseline, self._baseline = self._baseline, None
+        
+        self.sites = []
+        for stat in snapshot.compare_to(baseline, 'lineno'):
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            if frame.filename in excluded or frame.filename.startswith('<frozen importlib'):
+                continue
+            if frame.filename == __file__ and frame.lineno in own_lines:
+                continue
+            self.sites.append(AllocationSite(
+                file=frame.filename,
+                line_number=frame.lineno,
+                size=stat.size_diff,
+                count=stat.count_diff
+            ))
+            if len(self.sites) >= self.top:
+                break
+    
+    @property
+    def peak_increase(self) -> int:
+        """调用期间相对起点的峰值增量（字节）"""
+        return max(0, self.peak_size - self.start_size)
+
+
+# 基准测试默认参数
+BENCHMARK_MIN_TIME = 0.2           # 每个样本至少持续的秒数（自动校准迭代次数）
+BENCHMARK_REPEATS = 15
+BENCHMARK_WARMUP = 3
+BENCHMARK_HISTORY_FILE = ".benchmark_history.json"
+
+
+def _median_confidence_interval(samples: List[float], z: float = 1.96) -> Tuple[float, float]:
+    """基于次序统计量的中位数置信区间（不假设分布）"""
+    ordered = sorted(samples)
+    n = len(ordered)
+    if n < 3:
+        return ordered[0], ordered[-1]
+    half_width = z * math.sqrt(n) / 2
+    low = max(0, int(math.floor(n / 2 - half_width)))
+    high = min(n - 1, int(math.ceil(n / 2 + half_width)) - 1)
+    return ordered[low], ordered[high]
+
+
+def mann_whitney_u(a: List[float], b: List[float]) -> float:
+    """
+    Mann-Whitney U 检验（正态近似，含并列修正），返回双侧 p 值
+    
+    计时样本往往有长尾，秩检验比 t 检验更不容易被个别慢样本误导。
+    """
+    n1, n2 = len(a), len(b)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    
+    combined = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    n = n1 + n2
+    ranks = [0.0] * n
+    tie_term = 0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        rank = (i + j) / 2 + 1
+        for k in range(i, j + 1):
+            ranks[k] = rank
+        t = j - i + 1
+        tie_term += t ** 3 - t
+        i = j + 1
+    
+    rank_sum = sum(r for r, (_, group) in zip(ranks, combined) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    mu = n1 * n2 / 2
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    if sigma == 0:
+        return 1.0
+    z = (abs(u - mu) - 0.5) / sigma
+    return max(0.0, min(1.0, math.erfc(max(z, 0) / math.sqrt(2))))
+
+
+@dataclass
+class BenchmarkResult:
+    """一个基准测试的结果（时间单位：秒/次）"""
+    name: str
+    samples: List[float]
+    iterations: int
+    warmup: int
+    median: float = 0.0
+    mean: float = 0.0
+    stdev: float = 0.0
+    iqr: float = 0.0
+    ci_low: float = 0.0
+    ci_high: float = 0.0
+    
+    def __post_init__(self):
+        if self.samples and not self.median:
+            self.median = statistics.median(self.samples)
+            self.mean = statistics.fmean(self.samples)
+            self.stdev = statistics.stdev(self.samples) if len(self.samples) > 1 else 0.0
+            if len(self.samples) > 1:
+                q1, _, q3 = statistics.quantiles(self.samples, n=4)
+                self.iqr = q3 - q1
+            self.ci_low, self.ci_high = _median_confidence_interval(self.samples)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'samples': self.samples,
+            'iterations': self.iterations,
+            'warmup': self.warmup,
+            'median': self.median,
+            'mean': self.mean,
+            'stdev': self.stdev,
+            'iqr': self.iqr,
+            'ci_low': self.ci_low,
+            'ci_high': self.ci_high
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BenchmarkResult":
+        return cls(**data)
+    
+    def format(self) -> str:
+        return (f"{self.name}: 中位数 {_format_seconds(self.median)} "
+                f"(95% CI {_format_seconds(self.ci_low)} ~ {_format_seconds(self.ci_high)}, "
+                f"IQR {_format_seconds(self.iqr)}, {len(self.samples)}×{self.iterations} 次)")
+
+
+@dataclass
+class BenchmarkComparison:
+    """两次运行中同名基准的对比"""
+    name: str
+    baseline_median: float
+    current_median: float
+    change: float              # 相对变化，0.1 表示慢了 10%
+    p_value: float
+    status: str                # regression / improvement / unchanged
+    
+    def format(self) -> str:
+        icon = {'regression': '🔴', 'improvement': '🟢'}.get(self.status, '⚪')
+        return (f"{icon} {self.name}: {_format_seconds(self.baseline_median)} -> "
+                f"{_format_seconds(self.current_median)} ({self.change:+.1%}, p={self.p_value:.4f})")
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def run_benchmark(func: Callable[[], Any], name: Optional[str] = None,
+                  repeats: int = BENCHMARK_REPEATS, warmup: int = BENCHMARK_WARMUP,
+                  min_time: float = BENCHMARK_MIN_TIME, disable_gc: bool = True) -> BenchmarkResult:
+    """
+    对无参函数做基准测试
+    
+    先预热，再逐步增加迭代次数直到单个样本耗时不少于 min_time，
+    最后采集 repeats 个样本，每个样本为平均每次调用的耗时。
+    """
+    name = name or getattr(func, '__name__', 'benchmark')
+    for _ in range(warmup):
+        func()
+    
+    def measure(iterations: int) -> float:
+        gc_was_enabled = gc.isenabled()
+        if disable_gc:
+            gc.disable()
+        try:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            return time.perf_counter() - start
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    
+    iterations = 1
+    while True:
+        elapsed = measure(iterations)
+        if elapsed >= min_time:
+            break
+        # 根据已测耗时估算所需次数，每轮最多放大 10 倍
+        if elapsed > 0:
+            estimate = int(iterations * min_time / elapsed * 1.1) + 1
+            if estimate <= iterations * 10:
+                iterations = estimate
+                continue
+        iterations *= 10
+    
+    samples = [measure(iterations) / iterations for _ in range(repeats)]
+    return BenchmarkResult(name=name, samples=samples, iterations=iterations, warmup=warmup)
+
+
+def compare_benchmarks(baseline: Dict[str, BenchmarkResult], current: Dict[str, BenchmarkResult],
+                       alpha: float = 0.01, threshold: float = 0.05) -> List[BenchmarkComparison]:
+    """
+    对比两次运行
+    
+    只有秩检验显著（p < alpha）且中位数变化超过 threshold 时才判定为回归/提升，
+    避免把噪声当成性能变化。
+    """
+    comparisons = []
+    for name in sorted(set(baseline) & set(current)):
+        base, cur = baseline[name], current[name]
+        change = cur.median / base.median - 1 if base.median > 0 else 0.0
+        p_value = mann_whitney_u(base.samples, cur.samples)
+        status = 'unchanged'
+        if p_value < alpha and abs(change) > threshold:
+            status = 'regression' if change > 0 else 'improvement'
+        comparisons.append(BenchmarkComparison(
+            name=name,
+            baseline_median=base.median,
+            current_median=cur.median,
+            change=change,
+            p_value=p_value,
+            status=status
+        ))
+    return comparisons
+
+
+def _git_revision(cwd: Optional[str] = None) -> Optional[str]:
+    try:
+        proc = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=cwd,
+                              capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if proc.returncode != 0:
+        return None
+    return proc.stdout.strip() or None
+
+
+class BenchmarkHistory:
+    """
+    本地基准测试历史（JSON 文件）
+    
+    每次运行记录时间、git 提交和解释器版本，可按序号、提交或 latest/previous 取出。
+    """
+    
+    def __init__(self, path: str = BENCHMARK_HISTORY_FILE):
+        self.path = Path(path)
+        self.runs: List[Dict[str, Any]] = []
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.runs = json.load(f).get('runs', [])
+    
+    def record(self, results: List[BenchmarkResult], label: Optional[str] = None) -> Dict[str, Any]:
+        """追加一次运行并写回文件"""
+        run = {
+            'id': len(self.runs) + 1,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_revision(),
+            'label': label,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': {r.name: r.to_dict() for r in results}
+        }
+        self.runs.append(run)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'runs': self.runs}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        return run
+    
+    def get(self, ref: str = 'latest') -> Dict[str, Any]:
+        """按 latest / previous / 序号 / 提交 / 标签查找运行"""
+        if not self.runs:
+            raise KeyError("基准测试历史为空")
+        if ref == 'latest':
+            return self.runs[-1]
+        if ref == 'previous':
+            if len(self.runs) < 2:
+                raise KeyError("历史中只有一次运行")
+            return self.runs[-2]
+        for run in reversed(self.runs):
+            if str(run['id']) == ref or run.get('label') == ref or (
+                    run.get('commit') and run['commit'].startswith(ref)):
+                return run
+        raise KeyError(f"找不到基准运行: {ref}")
+    
+    def results(self, ref: str = 'latest') -> Dict[str, BenchmarkResult]:
+        return {name: BenchmarkResult.from_dict(data) for name, data in self.get(ref)['results'].items()}
+    
+    def compare(self, baseline: str = 'previous', current: str = 'latest',
+                alpha: float = 0.01, threshold: float = 0.05) -> List[BenchmarkComparison]:
+        return compare_benchmarks(self.results(baseline), self.results(current), alpha, threshold)
+
+
 class CodePerformanceAnalyzer:
     """代码性能分析器主类"""
     
-    def __init__(self):
+    def __init__(self, sample_interval: float = 0.005, sampling_mode: str = "thread",
+                 trace_frames: int = 1):
         self.reports_dir = Path("performance_reports")
         self.reports_dir.mkdir(exist_ok=True)
+        self.sample_interval = sample_interval
+        self.sampling_mode = sampling_mode
+        self.trace_frames = trace_frames
     
     def profile_function(self, func: Callable, *args, **kwargs) -> Dict[str, Any]:
         """
@@ -119,34 +690,113 @@ class CodePerformanceAnalyzer:
             'profiler_stats': stats
         }
     
+    def profile_sampling(self, func: Callable, *args, **kwargs) -> Dict[str, Any]:
+        """
+        用栈采样分析函数性能
+        
+        与 cProfile 不同，被测代码不会因每次调用都被拦截而变慢，
+        热循环的耗时比例更接近真实情况。
+        
+        Args:
+            func: 要分析的函数
+            *args: 函数的位置参数
+            **kwargs: 函数的关键字参数
+            
+        Returns:
+            采样结果字典（含折叠栈，可导出为火焰图）
+        """
+        profiler = SamplingProfiler(interval=self.sample_interval, mode=self.sampling_mode)
+        
+        profiler.start()
+        try:
+            start_time = time.perf_counter()
+            result = func(*args, **kwargs)
+            end_time = time.perf_counter()
+        finally:
+            profiler.stop()
+        
+        return {
+            'result': result,
+            'execution_time': end_time - start_time,
+            'samples': profiler.samples,
+            'overhead': profiler.overhead,
+            'functions': profiler.function_stats(),
+            'folded': profiler.folded(),
+            'profiler': profiler
+        }
+    
     def profile_memory(self, func: Callable, *args, **kwargs) -> Dict[str, Any]:
         """
         分析函数的内存使用
         
+        峰值来自 tracemalloc 在调用期间记录的最高点，并列出新增分配最多的代码行。
+        安装了 memory_profiler 时起始内存为进程 RSS，否则为已跟踪的 Python 堆。
+        
         Args:
             func: 要分析的函数
             *args: 函数的位置参数
             **kwargs: 函数的关键字参数
             
         Returns:
-            内存分析结果
+            内存分析结果（单位 MB）
         """
-        start_memory = memory_profiler.memory_usage()[0]
+        allocations = AllocationProfiler(nframes=self.trace_frames)
         
-        start_time = time.perf_counter()
-        result = func(*args, **kwargs)
-        end_time = time.perf_counter()
+        allocations.start()
+        if MEMORY_PROFILER_AVAILABLE:
+            start_memory = memory_profiler.memory_usage()[0]
+        else:
+            start_memory = allocations.start_size / 1024 / 1024
+        try:
+            start_time = time.perf_counter()
+            result = func(*args, **kwargs)
+            end_time = time.perf_counter()
+        finally:
+            allocations.stop()
         
-        peak_memory = memory_profiler.memory_usage()[0]
+        memory_increase = allocations.peak_increase / 1024 / 1024
         
         return {
             'result': result,
             'execution_time': end_time - start_time,
             'start_memory': start_memory,
-            'peak_memory': peak_memory,
-            'memory_increase': peak_memory - start_memory
+            'peak_memory': start_memory + memory_increase,
+            'memory_increase': memory_increase,
+            'retained_memory': (allocations.end_size - allocations.start_size) / 1024 / 1024,
+            'top_allocations': allocations.sites
         }
     
+    def benchmark(self, func: Callable, *args, **kwargs) -> BenchmarkResult:
+        """
+        对函数做多次重复的基准测试（预热、自动校准迭代次数、统计中位数/IQR/置信区间）
+        
+        Args:
+            func: 要测试的函数
+            *args: 函数的位置参数
+            **kwargs: 函数的关键字参数
+            
+        Returns:
+            基准测试结果
+        """
+        return run_benchmark(lambda: func(*args, **kwargs), name=func.__name__)
+    
+    def benchmark_code_string(self, code: str, setup: str = "", name: str = "code") -> BenchmarkResult:
+        """
+        对代码字符串做基准测试，setup 只执行一次
+        
+        Args:
+            code: 要测试的Python代码
+            setup: 设置代码（用于导入）
+            name: 结果名称
+            
+        Returns:
+            基准测试结果
+        """
+        namespace: Dict[str, Any] = {}
+        exec(setup, namespace)
+        compiled = compile(code, f"<benchmark:{name}>", "exec")
+        return run_benchmark(lambda: exec(compiled, namespace), name=name)
+    
     def profile_code_string(self, code: str, setup: str = "") -> PerformanceReport:
         """
         分析代码字符串的性能
@@ -434,8 +1084,8 @@ def example_with_loop():
     return total
 
 
-def main():
-    """主函数：演示性能分析器的使用"""
+def demo():
+    """演示性能分析器的使用"""
     print("🚀 智能代码性能分析器演示")
     print("=" * 50)
     
@@ -460,6 +1110,12 @@ def main():
     print(f"峰值内存: {mem_result['peak_memory']:.2f} MB")
     print(f"内存增量: {mem_result['memory_increase']:.2f} MB")
     
+    build_result = analyzer.profile_memory(lambda: [list(range(100)) for _ in range(2000)])
+    print(f"构建列表峰值增量: {build_result['memory_increase']:.2f} MB "
+          f"(结束时保留 {build_result['retained_memory']:.2f} MB)")
+    for site in build_result['top_allocations'][:3]:
+        print(f"   {Path(site.file).name}:{site.line_number}  {site.size_kb:.1f} KB / {site.count} 块")
+    
     # 示例3: 分析代码字符串
     print("\n🔍 示例3: 分析代码字符串")
     print("-" * 50)
@@ -494,9 +1150,110 @@ def fast_function(n):
     print(f"循环数量: {analysis['loops']}")
     print(f"复杂度评分: {analysis['complexity_score']:.2f}")
     
+    # 示例5: 栈采样分析
+    print("\n🔥 示例5: 栈采样分析")
+    print("-" * 50)
+    
+    sampled = analyzer.profile_sampling(lambda: [example_function() for _ in range(30)])
+    print(f"样本数: {sampled['samples']}, 采样开销: {sampled['overhead']:.2%}")
+    for func in sampled['functions'][:3]:
+        print(f"   {func.name}: 自身 {func.total_time:.4f}s / 累计 {func.cumulative_time:.4f}s")
+    folded_path = sampled['profiler'].export_folded(str(analyzer.reports_dir / "example_function.folded"))
+    print(f"折叠栈已导出: {folded_path} (flamegraph.pl {folded_path} > flame.svg)")
+    
+    # 示例6: 基准测试
+    print("\n📏 示例6: 基准测试")
+    print("-" * 50)
+    
+    fast = analyzer.benchmark(example_with_loop)
+    print(fast.format())
+    slow = run_benchmark(lambda: [example_with_loop() for _ in range(2)], name=fast.name)
+    for comparison in compare_benchmarks({fast.name: fast}, {slow.name: slow}):
+        print(comparison.format())
+    
     print("\n✅ 性能分析完成!")
     print("=" * 50)
 
 
+def _load_benchmarks(file_path: str, prefix: str) -> Dict[str, Callable]:
+    """从文件中加载以 prefix 开头的无参函数"""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(Path(file_path).stem.replace('-', '_'), file_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return {
+        name: obj for name, obj in vars(module).items()
+        if name.startswith(prefix) and callable(obj) and getattr(obj, '__module__', None) == spec.name
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="智能代码性能分析器")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    subparsers.add_parser("demo", help="运行演示")
+    
+    bench_parser = subparsers.add_parser("bench", help="运行文件中的基准函数并记录历史")
+    bench_parser.add_argument("file", help="包含基准函数的Python文件")
+    bench_parser.add_argument("--prefix", default="bench_", help="基准函数名前缀")
+    bench_parser.add_argument("--repeats", type=int, default=BENCHMARK_REPEATS, help="样本数")
+    bench_parser.add_argument("--warmup", type=int, default=BENCHMARK_WARMUP, help="预热次数")
+    bench_parser.add_argument("--min-time", type=float, default=BENCHMARK_MIN_TIME, help="单个样本最短耗时(秒)")
+    bench_parser.add_argument("--label", help="本次运行的标签")
+    bench_parser.add_argument("--history", default=BENCHMARK_HISTORY_FILE, help="历史文件")
+    
+    compare_parser = subparsers.add_parser("compare", help="对比两次运行，发现显著回归时返回非零退出码")
+    compare_parser.add_argument("baseline", nargs="?", default="previous", help="基线 (序号/提交/标签/previous)")
+    compare_parser.add_argument("current", nargs="?", default="latest", help="当前 (序号/提交/标签/latest)")
+    compare_parser.add_argument("--alpha", type=float, default=0.01, help="显著性水平")
+    compare_parser.add_argument("--threshold", type=float, default=0.05, help="最小相对变化")
+    compare_parser.add_argument("--history", default=BENCHMARK_HISTORY_FILE, help="历史文件")
+    
+    history_parser = subparsers.add_parser("history", help="列出历史运行")
+    history_parser.add_argument("--history", default=BENCHMARK_HISTORY_FILE, help="历史文件")
+    
+    args = parser.parse_args()
+    
+    if args.command in (None, "demo"):
+        demo()
+    
+    elif args.command == "bench":
+        benchmarks = _load_benchmarks(args.file, args.prefix)
+        if not benchmarks:
+            print(f"❌ {args.file} 中没有以 {args.prefix} 开头的函数")
+            sys.exit(1)
+        results = []
+        for name, func in benchmarks.items():
+            result = run_benchmark(func, name=name, repeats=args.repeats,
+                                   warmup=args.warmup, min_time=args.min_time)
+            print(f"📏 {result.format()}")
+            results.append(result)
+        run = BenchmarkHistory(args.history).record(results, label=args.label)
+        print(f"💾 已记录为运行 #{run['id']} ({run['commit'] or '无git提交'})")
+    
+    elif args.command == "compare":
+        history = BenchmarkHistory(args.history)
+        try:
+            comparisons = history.compare(args.baseline, args.current,
+                                          alpha=args.alpha, threshold=args.threshold)
+        except KeyError as e:
+            print(f"❌ {e.args[0]}")
+            sys.exit(2)
+        for comparison in comparisons:
+            print(comparison.format())
+        regressions = [c for c in comparisons if c.status == 'regression']
+        if regressions:
+            print(f"\n🔴 {len(regressions)} 个基准出现显著回归")
+            sys.exit(1)
+        print("\n✅ 没有显著回归")
+    
+    elif args.command == "history":
+        for run in BenchmarkHistory(args.history).runs:
+            print(f"#{run['id']}  {run['timestamp']}  {run.get('commit') or '-':<10} "
+                  f"{run.get('label') or ''}  ({len(run['results'])} 个基准)")
+
+
 if __name__ == "__main__":
     main()
@@ -20,8 +20,10 @@ import os
 import re
 import json
 import ast
+import time
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from enum import Enum
 from collections import defaultdict
 from pathlib import Path
@@ -34,7 +36,7 @@ class ComplexityLevel(Enum):
     MODERATE = ("中等", 11-20)
     HIGH = ("较高", 21-30)
     VERY_HIGH = ("很高", 31-50)
-    CRITICAL = ("极高", 51+)
+    CRITICAL = ("极高", 51)
 
 
 @dataclass
@@ -85,6 +87,140 @@ class FileMetrics:
         return self.comment_lines / self.total_lines if self.total_lines > 0 else 0
 
 
+# 文件数达到该阈值才启用多进程，否则进程启动开销大于收益
+PARALLEL_MIN_FILES = 32
+
+_FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+@dataclass
+class _FunctionFrame:
+    """遍历过程中某个函数子树的累计计数（含嵌套函数）"""
+    node: ast.AST
+    index: int
+    branches: int = 0          # if/for/while/except 分支数
+    bool_and: int = 0          # and 表达式额外分支数
+    num_variables: int = 0
+    num_statements: int = 1    # 函数定义本身也是一条语句
+    has_loops: bool = False
+    has_exception: bool = False
+    called: set = field(default_factory=set)
+
+    def merge(self, child: "_FunctionFrame"):
+        """嵌套函数结束时把其计数并入外层函数"""
+        self.branches += child.branches
+        self.bool_and += child.bool_and
+        self.num_variables += child.num_variables
+        self.num_statements += child.num_statements
+        self.has_loops = self.has_loops or child.has_loops
+        self.has_exception = self.has_exception or child.has_exception
+        self.called |= child.called
+
+
+class ComplexityVisitor(ast.NodeVisitor):
+    """
+    单次遍历计算函数级、类级和文件级指标
+
+    每个节点只访问一次；嵌套函数的计数在其退出时并入外层函数，
+    因此外层函数的指标仍然覆盖整个子树，与逐个 ast.walk 的结果一致。
+    """
+
+    def __init__(self):
+        self.functions: List[Optional[FunctionMetrics]] = []
+        self.classes = 0
+        self.score_total = 0
+        self._frame: Optional[_FunctionFrame] = None
+
+    @property
+    def complexity_score(self) -> float:
+        """平均复杂度按函数数量的平方根加权"""
+        if not self.functions:
+            return 0
+        total_functions = len(self.functions)
+        avg_complexity = self.score_total / total_functions
+        return round(avg_complexity * total_functions ** 0.5, 2)
+
+    def visit(self, node):
+        frame = self._frame
+        if frame is not None and not isinstance(node, _FUNCTION_NODES):
+            if isinstance(node, ast.stmt):
+                frame.num_statements += 1
+            elif isinstance(node, ast.Name):
+                frame.num_variables += 1
+                return
+        return super().visit(node)
+
+    def _visit_function(self, node):
+        if isinstance(node, ast.FunctionDef):
+            self.classes += 1
+        outer = self._frame
+        # 先占位，保证函数列表按源码顺序排列
+        frame = _FunctionFrame(node=node, index=len(self.functions))
+        self.functions.append(None)
+        self._frame = frame
+        self.generic_visit(node)
+        self._frame = outer
+
+        self.score_total += 1 + frame.branches
+        self.functions[frame.index] = FunctionMetrics(
+            name=node.name,
+            line_start=node.lineno,
+            line_end=node.end_lineno or node.lineno,
+            cyclomatic_complexity=1 + frame.branches + frame.bool_and,
+            num_params=len(node.args.args),
+            num_variables=frame.num_variables,
+            num_statements=frame.num_statements,
+            has_recursion=node.name in frame.called,
+            has_loops=frame.has_loops,
+            has_exception=frame.has_exception
+        )
+        if outer is not None:
+            outer.merge(frame)
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def visit_ClassDef(self, node):
+        self.classes += 1
+        self.generic_visit(node)
+
+    def visit_If(self, node):
+        if self._frame is not None:
+            self._frame.branches += 1
+        self.generic_visit(node)
+
+    def _visit_loop(self, node):
+        if self._frame is not None:
+            self._frame.branches += 1
+            self._frame.has_loops = True
+        self.generic_visit(node)
+
+    visit_For = _visit_loop
+    visit_While = _visit_loop
+
+    def visit_Try(self, node):
+        if self._frame is not None:
+            self._frame.branches += len(node.handlers)
+            self._frame.has_exception = True
+        self.generic_visit(node)
+
+    def visit_BoolOp(self, node):
+        if self._frame is not None and isinstance(node.op, ast.And):
+            self._frame.bool_and += len(node.values) - 1
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        if self._frame is not None and isinstance(node.func, ast.Name):
+            self._frame.called.add(node.func.id)
+        self.generic_visit(node)
+
+
+def _analyze_files_job(file_paths: List[str]) -> List[FileMetrics]:
+    """子进程任务：分析一批文件"""
+    analyzer = ComplexityAnalyzer()
+    return [analyzer.analyze_file(path) for path in file_paths]
+
+
 class ComplexityAnalyzer:
     """代码复杂度分析器"""
     
@@ -97,8 +233,9 @@ class ComplexityAnalyzer:
         'async', 'await', 'global', 'nonlocal', 'del', 'struct', 'enum', 'match'
     }
     
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None):
         self.files: Dict[str, FileMetrics] = {}
+        self.workers = workers or os.cpu_count() or 1
     
     def analyze_file(self, file_path: str) -> FileMetrics:
         """分析单个文件"""
@@ -111,22 +248,37 @@ class ComplexityAnalyzer:
             return FileMetrics(path=file_path)
     
     def analyze_directory(self, directory: str, extensions: List[str] = None) -> Dict[str, FileMetrics]:
-        """分析整个目录"""
+        """分析整个目录，文件较多时分发到多个进程"""
         if extensions is None:
             extensions = ['.py', '.js', '.ts', '.java', '.cpp', '.c', '.go', '.rs']
         
         self.files = {}
         
+        file_paths = []
         for root, dirs, files in os.walk(directory):
             for file in files:
                 if any(file.endswith(ext) for ext in extensions):
-                    file_path = os.path.join(root, file)
-                    metrics = self.analyze_file(file_path)
-                    if metrics.total_lines > 0:
-                        self.files[file_path] = metrics
+                    file_paths.append(os.path.join(root, file))
+        
+        for metrics in self._analyze_many(file_paths):
+            if metrics.total_lines > 0:
+                self.files[metrics.path] = metrics
         
         return self.files
     
+    def _analyze_many(self, file_paths: List[str]) -> Iterator[FileMetrics]:
+        """按原顺序产出分析结果"""
+        if self.workers <= 1 or len(file_paths) < PARALLEL_MIN_FILES:
+            for file_path in file_paths:
+                yield self.analyze_file(file_path)
+            return
+        
+        chunk = max(4, len(file_paths) // (self.workers * 8))
+        chunks = [file_paths[i:i + chunk] for i in range(0, len(file_paths), chunk)]
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for part in executor.map(_analyze_files_job, chunks):
+                yield from part
+    
     def _analyze_content(self, file_path: str, content: str) -> FileMetrics:
         """分析文件内容"""
         metrics = FileMetrics(path=file_path)
@@ -168,95 +320,22 @@ class ComplexityAnalyzer:
         return metrics
     
     def _analyze_python_ast(self, file_path: str, content: str, metrics: FileMetrics) -> FileMetrics:
-        """使用AST分析Python文件"""
+        """使用AST分析Python文件（单次遍历）"""
         try:
             tree = ast.parse(content)
             
-            # 统计类
-            metrics.classes = sum(1 for node in ast.walk(tree) if isinstance(node, (ast.ClassDef, ast.FunctionDef)))
-            
-            # 分析函数
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
-                    func_metrics = self._analyze_function_ast(node)
-                    metrics.functions.append(func_metrics)
+            visitor = ComplexityVisitor()
+            visitor.visit(tree)
             
-            # 计算整体复杂度
-            metrics.complexity_score = self._calculate_ast_complexity(tree)
+            metrics.classes = visitor.classes
+            metrics.functions.extend(visitor.functions)
+            metrics.complexity_score = visitor.complexity_score
             
         except SyntaxError as e:
             print(f"Syntax error in {file_path}: {e}")
         
         return metrics
     
-    def _analyze_function_ast(self, node) -> FunctionMetrics:
-        """分析函数AST节点"""
-        # 计算圈复杂度
-        complexity = 1  # 基础复杂度
-        
-        for child in ast.walk(node):
-            if isinstance(child, ast.If):
-                complexity += 1
-            elif isinstance(child, ast.For):
-                complexity += 1
-            elif isinstance(child, ast.While):
-                complexity += 1
-            elif isinstance(child, ast.Try):
-                complexity += len(child.handlers)  # 每个except子句
-            elif isinstance(child, ast.BoolOp) and isinstance(child.op, ast.And):
-                complexity += len(child.values) - 1
-        
-        # 检测递归
-        has_recursion = False
-        func_name = node.name
-        
-        for child in ast.walk(node):
-            if isinstance(child, ast.Call) and hasattr(child.func, 'id') and child.func.id == func_name:
-                has_recursion = True
-                break
-        
-        # 检测循环和异常
-        has_loops = any(isinstance(child, (ast.For, ast.While)) for child in ast.walk(node))
-        has_exception = any(isinstance(child, ast.Try) for child in ast.walk(node))
-        
-        return FunctionMetrics(
-            name=node.name,
-            line_start=node.lineno,
-            line_end=node.end_lineno or node.lineno,
-            cyclomatic_complexity=complexity,
-            num_params=len(node.args.args),
-            num_variables=len([n for n in ast.walk(node) if isinstance(n, ast.Name)]),
-            num_statements=len([n for n in ast.walk(node) if isinstance(n, ast.stmt)]),
-            has_recursion=has_recursion,
-            has_loops=has_loops,
-            has_exception=has_exception
-        )
-    
-    def _calculate_ast_complexity(self, tree) -> float:
-        """计算整体复杂度分数"""
-        total_complexity = 0
-        total_functions = 0
-        
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                complexity = 1
-                for child in ast.walk(node):
-                    if isinstance(child, ast.If):
-                        complexity += 1
-                    elif isinstance(child, (ast.For, ast.While)):
-                        complexity += 1
-                    elif isinstance(child, ast.Try):
-                        complexity += len(child.handlers)
-                total_complexity += complexity
-                total_functions += 1
-        
-        # 加权计算
-        if total_functions == 0:
-            return 0
-        
-        avg_complexity = total_complexity / total_functions
-        return round(avg_complexity * total_functions ** 0.5, 2)
-    
     def _calculate_simple_complexity(self, content: str) -> float:
         """简单复杂度计算（非Python文件）"""
         complexity = 0
@@ -633,6 +712,106 @@ class ComplexityAnalyzer:
         return output_path
 
 
+def _multi_walk_metrics(tree) -> Tuple[int, List[FunctionMetrics], float]:
+    """旧实现：每个指标各做一次 ast.walk，仅作为基准测试的对照组"""
+    classes = sum(1 for node in ast.walk(tree) if isinstance(node, (ast.ClassDef, ast.FunctionDef)))
+    functions = []
+    total_complexity = 0
+    for node in ast.walk(tree):
+        if not isinstance(node, _FUNCTION_NODES):
+            continue
+        complexity = 1
+        score = 1
+        for child in ast.walk(node):
+            if isinstance(child, (ast.If, ast.For, ast.While)):
+                complexity += 1
+                score += 1
+            elif isinstance(child, ast.Try):
+                complexity += len(child.handlers)
+                score += len(child.handlers)
+            elif isinstance(child, ast.BoolOp) and isinstance(child.op, ast.And):
+                complexity += len(child.values) - 1
+        total_complexity += score
+        functions.append(FunctionMetrics(
+            name=node.name,
+            line_start=node.lineno,
+            line_end=node.end_lineno or node.lineno,
+            cyclomatic_complexity=complexity,
+            num_params=len(node.args.args),
+            num_variables=len([n for n in ast.walk(node) if isinstance(n, ast.Name)]),
+            num_statements=len([n for n in ast.walk(node) if isinstance(n, ast.stmt)]),
+            has_recursion=any(isinstance(n, ast.Call) and getattr(n.func, 'id', None) == node.name
+                              for n in ast.walk(node)),
+            has_loops=any(isinstance(n, (ast.For, ast.While)) for n in ast.walk(node)),
+            has_exception=any(isinstance(n, ast.Try) for n in ast.walk(node))
+        ))
+    score = round(total_complexity / len(functions) * len(functions) ** 0.5, 2) if functions else 0
+    return classes, functions, score
+
+
+def benchmark(directory: str, workers: Optional[int] = None, repeat: int = 3) -> Dict:
+    """
+    基准测试：对比多次 ast.walk 与单次遍历，以及串行与并行目录分析
+
+    单文件部分先解析好 AST，只计时指标计算本身，并校验两种实现结果一致。
+    """
+    file_paths = []
+    for root, dirs, files in os.walk(directory):
+        file_paths.extend(os.path.join(root, f) for f in files if f.endswith('.py'))
+
+    trees = []
+    for file_path in file_paths:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                trees.append(ast.parse(f.read()))
+        except (OSError, UnicodeDecodeError, SyntaxError, ValueError):
+            continue
+
+    def best_of(func) -> float:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def run_visitor():
+        results = []
+        for tree in trees:
+            visitor = ComplexityVisitor()
+            visitor.visit(tree)
+            results.append(visitor)
+        return results
+
+    # 结果一致性校验（函数顺序不同，按行号比较）
+    mismatches = 0
+    for tree, visitor in zip(trees, run_visitor()):
+        classes, functions, score = _multi_walk_metrics(tree)
+        key = lambda m: (m.line_start, m.name)
+        if (classes != visitor.classes or score != visitor.complexity_score
+                or sorted(functions, key=key) != sorted(visitor.functions, key=key)):
+            mismatches += 1
+
+    multi_walk = best_of(lambda: [_multi_walk_metrics(tree) for tree in trees])
+    single_pass = best_of(run_visitor)
+
+    workers = workers or os.cpu_count() or 1
+    serial = best_of(lambda: ComplexityAnalyzer(workers=1).analyze_directory(directory))
+    parallel = best_of(lambda: ComplexityAnalyzer(workers=workers).analyze_directory(directory))
+
+    return {
+        "python_files": len(trees),
+        "mismatches": mismatches,
+        "multi_walk_seconds": round(multi_walk, 4),
+        "single_pass_seconds": round(single_pass, 4),
+        "traversal_speedup": round(multi_walk / single_pass, 2) if single_pass else 0,
+        "workers": workers,
+        "serial_seconds": round(serial, 4),
+        "parallel_seconds": round(parallel, 4),
+        "parallel_speedup": round(serial / parallel, 2) if parallel else 0,
+    }
+
+
 def demo():
     """演示"""
     print("=" * 60)
@@ -752,6 +931,7 @@ class SampleClass:
     print("  python 2026-02-03_061_smart_complexity_analyzer.py demo")
     print("  python 2026-02-03_061_smart_complexity_analyzer.py analyze <path>")
     print("  python 2026-02-03_061_smart_complexity_analyzer.py report <path> --html")
+    print("  python 2026-02-03_061_smart_complexity_analyzer.py benchmark <path> [--workers N]")
 
 
 def main():
@@ -764,6 +944,13 @@ def main():
     
     command = sys.argv[1]
     
+    # 并行进程数: --workers N
+    workers = None
+    if "--workers" in sys.argv:
+        index = sys.argv.index("--workers")
+        if index + 1 < len(sys.argv):
+            workers = int(sys.argv[index + 1])
+    
     if command == "demo":
         demo()
     elif command == "analyze":
@@ -772,7 +959,7 @@ def main():
             return
         
         path = sys.argv[2]
-        analyzer = ComplexityAnalyzer()
+        analyzer = ComplexityAnalyzer(workers=workers)
         
         if os.path.isfile(path):
             metrics = analyzer.analyze_file(path)
@@ -797,7 +984,7 @@ def main():
         path = sys.argv[2]
         output_html = "--html" in sys.argv
         
-        analyzer = ComplexityAnalyzer()
+        analyzer = ComplexityAnalyzer(workers=workers)
         
         if os.path.isfile(path):
             metrics = analyzer.analyze_file(path)
@@ -814,9 +1001,24 @@ def main():
         if output_html:
             analyzer.generate_html_report()
     
+    elif command == "benchmark":
+        if len(sys.argv) < 3:
+            print("用法: benchmark <path> [--workers N]")
+            return
+        
+        result = benchmark(sys.argv[2], workers=workers)
+        print("\n" + "=" * 60)
+        print("⏱️ 复杂度分析基准测试")
+        print("=" * 60)
+        print(f"   Python文件: {result['python_files']} (结果不一致: {result['mismatches']})")
+        print(f"   多次遍历: {result['multi_walk_seconds']}s")
+        print(f"   单次遍历: {result['single_pass_seconds']}s  (加速 {result['traversal_speedup']}x)")
+        print(f"   串行目录分析: {result['serial_seconds']}s")
+        print(f"   并行目录分析({result['workers']}进程): {result['parallel_seconds']}s  (加速 {result['parallel_speedup']}x)")
+    
     else:
         print(f"未知命令: {command}")
-        print("可用命令: demo, analyze, report")
+        print("可用命令: demo, analyze, report, benchmark")
 
 
 if __name__ == "__main__":
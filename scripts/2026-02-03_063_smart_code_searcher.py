@@ -10,6 +10,7 @@
 - 📈 结果统计 (出现次数、上下文分析)
 - 🎨 多种输出格式 (终端、JSON、HTML报告)
 - 🧠 学习模式 (自动学习代码模式)
+- ⚡ 并发搜索 (线程池读文件、进程池解析 AST、按文件哈希缓存 AST、可提前停止)
 """
 
 import re
@@ -17,11 +18,16 @@ import json
 import ast
 import os
 import sys
+import time
+import hashlib
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Tuple, Any, Callable, Iterator
 from enum import Enum
 from pathlib import Path
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict
 from datetime import datetime
 from html import escape
 
@@ -59,6 +65,62 @@ class SearchStats:
     matches_by_file: Dict[str, int] = field(default_factory=dict)
     files_with_matches: List[str] = field(default_factory=list)
     search_time_ms: float = 0.0
+    ast_parsed: int = 0
+    ast_cache_hits: int = 0
+
+
+# 需要解析 Python AST 的搜索模式
+AST_MODES = {SearchMode.FUNCTIONS, SearchMode.CLASSES, SearchMode.IMPORTS}
+# 文件数少于该值时不启动进程池 (进程启动开销大于并行收益)
+PARALLEL_PARSE_MIN_FILES = 64
+# AST 缓存最多保留的文件数
+AST_CACHE_SIZE = 4096
+
+
+def parse_python_source(content: str) -> Dict[str, List[Dict]]:
+    """解析 Python 源码，提取函数、类和导入 (模块级函数，可在子进程中执行)"""
+    results = {
+        'functions': [],
+        'classes': [],
+        'imports': [],
+        'decorators': [],
+    }
+    
+    try:
+        tree = ast.parse(content)
+        
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
+                results['functions'].append({
+                    'name': node.name,
+                    'lineno': node.lineno,
+                    'col_offset': node.col_offset,
+                })
+            elif isinstance(node, ast.ClassDef):
+                results['classes'].append({
+                    'name': node.name,
+                    'lineno': node.lineno,
+                    'col_offset': node.col_offset,
+                })
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    results['imports'].append({
+                        'name': alias.name,
+                        'lineno': node.lineno,
+                        'type': 'import',
+                    })
+            elif isinstance(node, ast.ImportFrom):
+                for alias in node.names:
+                    results['imports'].append({
+                        'name': alias.name,
+                        'lineno': node.lineno,
+                        'type': 'from_import',
+                        'module': node.module,
+                    })
+    except (SyntaxError, ValueError):
+        pass
+    
+    return results
 
 
 class CodeSearcher:
@@ -68,6 +130,10 @@ class CodeSearcher:
         self.root_dir = Path(root_dir)
         self.results: List[SearchResult] = []
         self.stats = SearchStats()
+        self._ast_cache: "OrderedDict[str, Dict[str, List[Dict]]]" = OrderedDict()
+        self._ast_lock = threading.Lock()
+        # 线程局部的 AST 解析函数 (并行搜索时提交到进程池)
+        self._local = threading.local()
         
         # 常见编程语言的文件扩展名
         self.language_extensions = {
@@ -164,49 +230,30 @@ class CodeSearcher:
         except Exception:
             return None
     
-    def parse_python_ast(self, content: str) -> Dict[str, List[Dict]]:
-        """解析Python AST"""
-        results = {
-            'functions': [],
-            'classes': [],
-            'imports': [],
-            'decorators': [],
-        }
-        
-        try:
-            tree = ast.parse(content)
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
-                    results['functions'].append({
-                        'name': node.name,
-                        'lineno': node.lineno,
-                        'col_offset': node.col_offset,
-                    })
-                elif isinstance(node, ast.ClassDef):
-                    results['classes'].append({
-                        'name': node.name,
-                        'lineno': node.lineno,
-                        'col_offset': node.col_offset,
-                    })
-                elif isinstance(node, ast.Import):
-                    for alias in node.names:
-                        results['imports'].append({
-                            'name': alias.name,
-                            'lineno': node.lineno,
-                            'type': 'import',
-                        })
-                elif isinstance(node, ast.ImportFrom):
-                    for alias in node.names:
-                        results['imports'].append({
-                            'name': alias.name,
-                            'lineno': node.lineno,
-                            'type': 'from_import',
-                            'module': node.module,
-                        })
-        except SyntaxError:
-            pass
-        
+    def parse_python_ast(self, content: str,
+                         parser: Optional[Callable[[str], Dict[str, List[Dict]]]] = None
+                         ) -> Dict[str, List[Dict]]:
+        """
+        解析Python AST
+        
+        结果按内容哈希缓存，同一文件的重复查询 (以及不同的结构化模式) 不会重复解析。
+        parser 可替换为把解析提交到进程池的函数；未指定时使用当前线程设置的解析函数。
+        """
+        parser = parser or getattr(self._local, "parser", None) or parse_python_source
+        key = hashlib.sha1(content.encode('utf-8', 'surrogatepass')).hexdigest()
+        with self._ast_lock:
+            cached = self._ast_cache.get(key)
+            if cached is not None:
+                self._ast_cache.move_to_end(key)
+                self.stats.ast_cache_hits += 1
+                return cached
+        
+        results = parser(content)
+        with self._ast_lock:
+            self._ast_cache[key] = results
+            self.stats.ast_parsed += 1
+            if len(self._ast_cache) > AST_CACHE_SIZE:
+                self._ast_cache.popitem(last=False)
         return results
     
     def search_functions(self, content: str, pattern: str, 
@@ -447,63 +494,141 @@ class CodeSearcher:
         
         return result
     
-    def search(self, pattern: str, mode: SearchMode = SearchMode.REGEX,
-              extensions: Optional[List[str]] = None,
-              exclude_dirs: Optional[List[str]] = None,
-              context_lines: int = 2,
-              use_regex: bool = False) -> List[SearchResult]:
-        """主搜索函数"""
-        import time
+    def _search_file(self, file_path: Path, pattern: str, mode: SearchMode,
+                     context_lines: int, use_regex: bool,
+                     parse_pool: Optional[ProcessPoolExecutor] = None) -> List[SearchResult]:
+        """搜索单个文件 (在线程池中执行)"""
+        content = self.read_file_content(file_path)
+        if content is None:
+            return []
+        
+        if parse_pool is not None and mode in AST_MODES:
+            # 本线程的 AST 解析改为提交到进程池，缓存未命中时才真正提交
+            self._local.parser = lambda c: parse_pool.submit(parse_python_source, c).result()
+        try:
+            file_results = self._match_content(content, pattern, mode, use_regex)
+        finally:
+            self._local.parser = None
+        
+        # 设置文件路径和添加上下文 (整个文件只切分一次行)
+        lines = content.split('\n') if file_results else []
+        for result in file_results:
+            result.file_path = str(file_path)
+            start = max(0, result.line_number - 1 - context_lines)
+            end = min(len(lines), result.line_number - 1 + context_lines + 1)
+            result.context_before = lines[start:result.line_number - 1]
+            result.context_after = lines[result.line_number:end]
+        
+        return file_results
+    
+    def _match_content(self, content: str, pattern: str, mode: SearchMode,
+                       use_regex: bool) -> List[SearchResult]:
+        """按搜索模式匹配文件内容"""
+        file_results = []
+        
+        if mode == SearchMode.FUNCTIONS:
+            file_results = self.search_functions(content, pattern, use_regex)
+        elif mode == SearchMode.CLASSES:
+            file_results = self.search_classes(content, pattern, use_regex)
+        elif mode == SearchMode.COMMENTS:
+            file_results = self.search_comments(content, pattern, use_regex)
+        elif mode == SearchMode.STRINGS:
+            file_results = self.search_strings(content, pattern, use_regex)
+        elif mode == SearchMode.IMPORTS:
+            file_results = self.search_imports(content, pattern, use_regex)
+        elif mode == SearchMode.REGEX:
+            file_results = self.search_regex(content, pattern)
+        elif mode == SearchMode.FUZZY:
+            file_results = self.search_fuzzy(content, pattern)
+        elif mode == SearchMode.PATTERN:
+            file_results = self.search_pattern(content, pattern)
+        
+        return file_results
+    
+    def iter_search(self, pattern: str, mode: SearchMode = SearchMode.REGEX,
+                    extensions: Optional[List[str]] = None,
+                    exclude_dirs: Optional[List[str]] = None,
+                    context_lines: int = 2,
+                    use_regex: bool = False,
+                    max_results: Optional[int] = None,
+                    io_workers: int = 8,
+                    parse_workers: Optional[int] = None) -> Iterator[SearchResult]:
+        """
+        流式搜索: 按文件顺序逐个产出结果
+        
+        线程池提前读取并匹配后续文件，结构化模式 (函数/类/导入) 的 AST 解析交给进程池。
+        达到 max_results 或调用方停止迭代时，未开始的文件任务会被取消。
+        
+        Args:
+            max_results: 最多产出的结果数
+            io_workers: 读文件/匹配的线程数
+            parse_workers: AST 解析进程数，默认 CPU 核数；为 1 时在线程内解析
+        """
         start_time = time.time()
         
         files = self.get_files(extensions, exclude_dirs)
-        self.stats.total_files = len(files)
+        self.stats = SearchStats(total_files=len(files))
         self.results = []
+        if max_results is not None and max_results <= 0:
+            return
         
-        for file_path in files:
-            content = self.read_file_content(file_path)
-            if content is None:
-                continue
-            
-            file_results = []
-            
-            if mode == SearchMode.FUNCTIONS:
-                file_results = self.search_functions(content, pattern, use_regex)
-            elif mode == SearchMode.CLASSES:
-                file_results = self.search_classes(content, pattern, use_regex)
-            elif mode == SearchMode.COMMENTS:
-                file_results = self.search_comments(content, pattern, use_regex)
-            elif mode == SearchMode.STRINGS:
-                file_results = self.search_strings(content, pattern, use_regex)
-            elif mode == SearchMode.IMPORTS:
-                file_results = self.search_imports(content, pattern, use_regex)
-            elif mode == SearchMode.REGEX:
-                file_results = self.search_regex(content, pattern)
-            elif mode == SearchMode.FUZZY:
-                file_results = self.search_fuzzy(content, pattern)
-            elif mode == SearchMode.PATTERN:
-                file_results = self.search_pattern(content, pattern)
-            
-            # 设置文件路径和添加上下文
-            for result in file_results:
-                result.file_path = str(file_path)
-                self.add_context(result, content, context_lines)
-            
-            self.results.extend(file_results)
-            
-            # 统计
-            if file_results:
-                self.stats.files_with_matches.append(str(file_path))
-                self.stats.matches_by_file[str(file_path)] = len(file_results)
+        parse_workers = parse_workers or os.cpu_count() or 1
+        use_processes = (mode in AST_MODES and parse_workers > 1 and
+                         len(files) >= PARALLEL_PARSE_MIN_FILES)
+        io_pool = ThreadPoolExecutor(max_workers=io_workers)
+        parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if use_processes else None
         
-        # 计算统计
-        self.stats.total_matches = len(self.results)
-        for result in self.results:
-            self.stats.matches_by_type[result.match_type] = \
-                self.stats.matches_by_type.get(result.match_type, 0) + 1
+        # 只保持有限个文件在途，既能重叠 I/O 又能尽早停止
+        remaining = iter(files)
+        pending = deque()
         
-        self.stats.search_time_ms = (time.time() - start_time) * 1000
+        def submit(file_path):
+            pending.append(io_pool.submit(self._search_file, file_path, pattern, mode,
+                                          context_lines, use_regex, parse_pool))
         
+        try:
+            for file_path in itertools.islice(remaining, io_workers * 4):
+                submit(file_path)
+            
+            while pending:
+                file_results = pending.popleft().result()
+                next_file = next(remaining, None)
+                if next_file is not None:
+                    submit(next_file)
+                
+                if file_results:
+                    file_path = file_results[0].file_path
+                    self.stats.files_with_matches.append(file_path)
+                    self.stats.matches_by_file[file_path] = len(file_results)
+                
+                for result in file_results:
+                    self.results.append(result)
+                    self.stats.matches_by_type[result.match_type] = \
+                        self.stats.matches_by_type.get(result.match_type, 0) + 1
+                    yield result
+                    if max_results is not None and len(self.results) >= max_results:
+                        return
+        finally:
+            for future in pending:
+                future.cancel()
+            io_pool.shutdown(wait=False, cancel_futures=True)
+            if parse_pool is not None:
+                parse_pool.shutdown(wait=False, cancel_futures=True)
+            self.stats.total_matches = len(self.results)
+            self.stats.search_time_ms = (time.time() - start_time) * 1000
+    
+    def search(self, pattern: str, mode: SearchMode = SearchMode.REGEX,
+              extensions: Optional[List[str]] = None,
+              exclude_dirs: Optional[List[str]] = None,
+              context_lines: int = 2,
+              use_regex: bool = False,
+              max_results: Optional[int] = None,
+              io_workers: int = 8,
+              parse_workers: Optional[int] = None) -> List[SearchResult]:
+        """主搜索函数 (收集 iter_search 的全部结果)"""
+        for _ in self.iter_search(pattern, mode, extensions, exclude_dirs, context_lines,
+                                  use_regex, max_results, io_workers, parse_workers):
+            pass
         return self.results
     
     def get_stats(self) -> Dict[str, Any]:
@@ -516,6 +641,8 @@ class CodeSearcher:
                                           key=lambda x: x[1], reverse=True)[:10]),
             'files_with_matches': len(self.stats.files_with_matches),
             'search_time_ms': round(self.stats.search_time_ms, 2),
+            'ast_parsed': self.stats.ast_parsed,
+            'ast_cache_hits': self.stats.ast_cache_hits,
         }
     
     def print_results(self, results: Optional[List[SearchResult]] = None,
@@ -617,7 +744,7 @@ class CodeSearcher:
                 <div class="label">匹配结果数</div>
             </div>
             <div class="stat-box">
-                <div class="value">{len(stats['files_with_matches'])}</div>
+                <div class="value">{stats['files_with_matches']}</div>
                 <div class="label">含匹配文件数</div>
             </div>
             <div class="stat-box">
@@ -715,11 +842,24 @@ def demo():
     print(f"  ✅ 扫描 {stats['total_files']} 个文件")
     print(f"  📝 找到 {stats['total_matches']} 个异步函数")
     
+    print("\n" + "-" * 60)
+    print("🔍 搜索演示: 重复的结构化查询命中 AST 缓存...")
+    searcher.search("search", mode=SearchMode.FUNCTIONS)
+    stats = searcher.get_stats()
+    print(f"  📝 找到 {stats['total_matches']} 个函数, 解析 {stats['ast_parsed']} 个文件, "
+          f"缓存命中 {stats['ast_cache_hits']} 次, 耗时 {stats['search_time_ms']}ms")
+    
+    print("\n" + "-" * 60)
+    print("🔍 搜索演示: 流式搜索, 拿到 5 个结果后立即停止...")
+    for result in searcher.iter_search(r"TODO|FIXME", mode=SearchMode.REGEX, max_results=5):
+        print(f"  {result.file_path}:{result.line_number}")
+    print(f"  ⏱️ 耗时 {searcher.get_stats()['search_time_ms']}ms")
+    
     print("\n" + "-" * 60)
     print("📁 导出示例...")
     searcher.search("def ", mode=SearchMode.FUNCTIONS)
-    searcher.export_json("search_demo.json")
-    searcher.export_html("search_demo.html")
+    searcher.export_json(output_path="search_demo.json")
+    searcher.export_html(output_path="search_demo.html")
     
     print("\n" + "=" * 60)
     print("✅ 演示完成!")
@@ -754,6 +894,9 @@ def cli():
     search_parser.add_argument('--exclude', help='排除目录(逗号分隔)')
     search_parser.add_argument('--context', type=int, default=2, help='上下文行数')
     search_parser.add_argument('--limit', type=int, default=50, help='显示数量限制')
+    search_parser.add_argument('--max-results', type=int, help='找到这么多结果后停止搜索')
+    search_parser.add_argument('--workers', type=int, default=8, help='读文件的线程数')
+    search_parser.add_argument('--parse-workers', type=int, help='解析 AST 的进程数 (默认 CPU 核数)')
     
     # stats命令
     stats_parser = subparsers.add_parser('stats', help='显示统计')
@@ -788,6 +931,9 @@ def cli():
             extensions=extensions,
             exclude_dirs=exclude_dirs,
             context_lines=args.context,
+            max_results=args.max_results,
+            io_workers=args.workers,
+            parse_workers=args.parse_workers,
         )
         
         # 显示结果
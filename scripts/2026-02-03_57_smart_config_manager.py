@@ -30,11 +30,14 @@
 
 import json
 import os
+import copy
 import hashlib
 import base64
 import subprocess
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union, Callable
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Union, Callable, Iterator, Mapping
 from dataclasses import dataclass, field
 from enum import Enum
 import threading
@@ -77,9 +80,100 @@ class ConfigHistoryEntry:
 
 class ConfigChangeCallback:
     """配置变更回调"""
-    def __init__(self, path_pattern: str, callback: Callable):
+    def __init__(self, path_pattern: str, callback: Callable, order: int = 0):
         self.pattern = re.compile(path_pattern)
+        self.prefix = _literal_prefix(path_pattern)
         self.callback = callback
+        self.order = order
+
+
+# 正则元字符
+_REGEX_META = set(".^$*+?{}[]()|\\")
+# 回调分发缓存的上限
+_DISPATCH_CACHE_SIZE = 10000
+
+
+def _literal_prefix(pattern: str) -> str:
+    """
+    正则开头的字面量前缀
+
+    回调按前缀建立索引，只有前缀匹配的回调才需要执行正则；无法确定前缀时
+    返回空串，该回调对所有键都参与匹配。
+    """
+    if "|" in pattern:
+        return ""
+    prefix = []
+    i = 1 if pattern.startswith("^") else 0
+    while i < len(pattern):
+        ch = pattern[i]
+        step = 1
+        if ch == "\\":
+            # \. 之类的转义是字面量，\d、\w 等是字符类
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                break
+            ch = pattern[i + 1]
+            step = 2
+        elif ch in _REGEX_META:
+            break
+        quantifier = pattern[i + step:i + step + 1]
+        if quantifier and quantifier in "*?{":
+            break
+        prefix.append(ch)
+        if quantifier == "+":
+            break
+        i += step
+    return "".join(prefix)
+
+
+class _FrozenList(tuple):
+    """快照中 list 的只读形式，与配置里原本就是 tuple 的值区分开"""
+    pass
+
+
+def _freeze(value: Any) -> Any:
+    """只读副本：dict 转为 MappingProxyType，list 转为 _FrozenList"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return _FrozenList(_freeze(v) for v in value)
+    return value
+
+
+# get 返回前需要还原成普通容器的只读类型
+_FROZEN_TYPES = (MappingProxyType, _FrozenList)
+
+
+def _thaw(value: Any) -> Any:
+    """把快照中的只读值还原为普通 dict / list 副本"""
+    if type(value) is MappingProxyType:
+        return {k: _thaw(v) for k, v in value.items()}
+    if type(value) is _FrozenList:
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _flatten_config(data: Dict) -> Dict[str, Any]:
+    """
+    把嵌套配置展开为 "a.b.c" -> 值 的扁平映射
+
+    中间节点也有条目，值为只读副本；每个子树只复制一次，父节点与子节点的条目
+    共享同一个只读对象。
+    """
+    flat: Dict[str, Any] = {}
+
+    def visit(value: Any, path: str) -> Any:
+        if isinstance(value, dict):
+            frozen = MappingProxyType({
+                k: visit(v, f"{path}.{k}" if path else str(k)) for k, v in value.items()
+            })
+        else:
+            frozen = _freeze(value)
+        if path:
+            flat[path] = frozen
+        return frozen
+
+    visit(data, "")
+    return flat
 
 
 class ConfigManager:
@@ -95,6 +189,7 @@ class ConfigManager:
         history: 配置变更历史
         _lock: 线程锁
         _watchers: 文件监听器列表
+        _snapshot: 扁平只读快照，get 直接查表；每次变更后整体重建并替换
     """
     
     def __init__(
@@ -103,7 +198,8 @@ class ConfigManager:
         env: str = "development",
         schema: Optional[Dict] = None,
         auto_save: bool = True,
-        secret_key: Optional[str] = None
+        secret_key: Optional[str] = None,
+        save_delay: float = 0.0
     ):
         """
         初始化配置管理器
@@ -114,15 +210,30 @@ class ConfigManager:
             schema: JSON Schema 验证定义
             auto_save: 是否自动保存
             secret_key: 加密密钥 (用于敏感信息)
+            save_delay: 自动保存的合并窗口（秒），窗口内的多次写入只保存一次；
+                0 表示每次写入立即保存
         """
         self.config_path = Path(config_path)
         self.env = env
         self.auto_save = auto_save
+        self.save_delay = save_delay
         self.schema = schema
         self.history: List[ConfigHistoryEntry] = []
         self._lock = threading.RLock()
         self._watchers: List[threading.Thread] = []
         self._change_callbacks: List[ConfigChangeCallback] = []
+        self._callback_index: Dict[str, List[ConfigChangeCallback]] = {}
+        self._prefix_lengths: List[int] = []
+        self._dispatch_cache: Dict[str, List[ConfigChangeCallback]] = {}
+        
+        # 快照与批量写入状态
+        self._snapshot: Dict[str, Any] = {}
+        self._batch_depth = 0
+        self._batch_owner: Optional[int] = None
+        self._dirty = False
+        self._save_pending = False
+        self._pending_changes: Dict[str, Any] = {}
+        self._save_timer: Optional[threading.Timer] = None
         
         # 加密器设置
         self._secret_key = secret_key
@@ -140,9 +251,12 @@ class ConfigManager:
             self._load()
         else:
             self._create_default()
+            if self.auto_save:
+                self._save()
         
         # 环境特定配置
         self._apply_env_overrides()
+        self._rebuild_snapshot()
         
         # 应用敏感信息解密
         if self._fernet:
@@ -237,8 +351,6 @@ class ConfigManager:
                 "production": {}
             }
         }
-        if self.auto_save:
-            self._save()
     
     def _apply_env_overrides(self) -> None:
         """应用环境特定的配置覆盖"""
@@ -254,6 +366,44 @@ class ConfigManager:
             else:
                 base[key] = value
     
+    def _rebuild_snapshot(self) -> None:
+        """从 config_data 重建扁平快照，整体替换引用，读取方总是看到完整的某个版本"""
+        self._snapshot = _flatten_config(self.config_data)
+    
+    def _commit_write(self) -> bool:
+        """
+        写入后的处理（调用方持有锁）
+        
+        批量写入中只做标记，留到结束时统一重建快照和保存；否则立即处理。
+        
+        Returns:
+            是否已立即提交
+        """
+        if self._batch_depth:
+            self._dirty = True
+            self._save_pending = self._save_pending or self.auto_save
+            return False
+        self._rebuild_snapshot()
+        if self.auto_save:
+            self._request_save()
+        return True
+    
+    def _request_save(self) -> None:
+        """保存配置；设置了 save_delay 时合并窗口内的多次保存"""
+        if self.save_delay <= 0:
+            self._save()
+        elif self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.start()
+    
+    def flush(self) -> None:
+        """立即写出尚在合并窗口内的保存"""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+            if timer is not None:
+                timer.cancel()
+                self._save()
+    
     def _save(self) -> None:
         """保存配置文件"""
         with self._lock:
@@ -299,8 +449,8 @@ class ConfigManager:
         import configparser
         parser = configparser.ConfigParser()
         for section, values in self.config_data.items():
-            parser[section] = open(self.config_path values
-        with, 'w', encoding='utf-8') as f:
+            parser[section] = values
+        with open(self.config_path, 'w', encoding='utf-8') as f:
             parser.write(f)
     
     def _save_env(self) -> None:
@@ -325,7 +475,32 @@ class ConfigManager:
         Examples:
             config.get("database.host")
             config.get("app.debug", False)
+        
+        Note:
+            直接查扁平快照，标量值 O(1)；dict / list 返回普通副本，修改副本
+            不影响配置。批量写入中，发起批量的线程会读到尚未提交的写入，
+            其他线程仍读旧快照。
         """
+        if self._dirty and self._batch_owner == threading.get_ident():
+            return copy.deepcopy(self._walk(key, default))
+        value = self._snapshot.get(key)
+        if value is None:
+            return default
+        if type(value) in _FROZEN_TYPES:
+            return _thaw(value)
+        return value
+    
+    def snapshot(self) -> Mapping[str, Any]:
+        """
+        当前配置的只读扁平视图
+        
+        同一视图内的多次读取保证来自同一版本，适合在一次请求处理中使用。
+        嵌套节点是只读的 MappingProxyType，list 是 tuple 子类，读取不复制。
+        """
+        return MappingProxyType(self._snapshot)
+    
+    def _walk(self, key: str, default: Any = None) -> Any:
+        """沿嵌套字典逐级查找"""
         keys = key.split('.')
         value = self.config_data
         
@@ -353,33 +528,34 @@ class ConfigManager:
             config.set("database.port", 5432)
         """
         keys = key.split('.')
-        target = self.config_data
-        
-        # 记录历史
-        old_value = self.get(key)
-        history_entry = ConfigHistoryEntry(
-            timestamp=self._get_timestamp(),
-            path=key,
-            old_value=old_value,
-            new_value=value,
-            source=source
-        )
-        self.history.append(history_entry)
-        
-        # 设置值
-        for k in keys[:-1]:
-            if k not in target:
-                target[k] = {}
-            target = target[k]
         
-        target[keys[-1]] = value
-        
-        # 自动保存
-        if self.auto_save:
-            self._save()
+        with self._lock:
+            target = self.config_data
+            for k in keys[:-1]:
+                if k not in target:
+                    target[k] = {}
+                target = target[k]
+            
+            # 记录历史
+            history_entry = ConfigHistoryEntry(
+                timestamp=self._get_timestamp(),
+                path=key,
+                old_value=target.get(keys[-1]),
+                new_value=value,
+                source=source
+            )
+            self.history.append(history_entry)
+            
+            # 设置值
+            target[keys[-1]] = value
+            
+            committed = self._commit_write()
+            if not committed:
+                self._pending_changes[key] = value
         
         # 触发回调
-        self._trigger_callbacks(key, value)
+        if committed:
+            self._trigger_callbacks(key, value)
     
     def delete(self, key: str) -> bool:
         """
@@ -392,19 +568,19 @@ class ConfigManager:
             是否成功删除
         """
         keys = key.split('.')
-        target = self.config_data
         
-        for k in keys[:-1]:
-            if k not in target:
-                return False
-            target = target[k]
-        
-        if keys[-1] in target:
-            del target[keys[-1]]
-            if self.auto_save:
-                self._save()
-            return True
-        return False
+        with self._lock:
+            target = self.config_data
+            for k in keys[:-1]:
+                if k not in target:
+                    return False
+                target = target[k]
+            
+            if keys[-1] in target:
+                del target[keys[-1]]
+                self._commit_write()
+                return True
+            return False
     
     def has(self, key: str) -> bool:
         """
@@ -454,19 +630,87 @@ class ConfigManager:
             other_config: 其他配置字典
             overwrite: 是否覆盖已有值
         """
-        if overwrite:
-            self.config_data.update(other_config)
-        else:
-            self._merge_dict(self.config_data, other_config)
-        
-        if self.auto_save:
-            self._save()
+        with self._lock:
+            if overwrite:
+                self.config_data.update(other_config)
+            else:
+                self._merge_dict(self.config_data, other_config)
+            self._commit_write()
     
     def reset(self) -> None:
         """重置为默认配置"""
-        self.config_data = {}
-        self.history = []
-        self._create_default()
+        with self._lock:
+            self.config_data = {}
+            self.history = []
+            self._create_default()
+            self._commit_write()
+    
+    # ==================== 批量写入 ====================
+    
+    @contextmanager
+    def transaction(self, rollback: bool = True) -> Iterator['ConfigManager']:
+        """
+        批量写入上下文
+        
+        块内的写入在结束时统一重建一次快照、保存一次文件，变更回调也在结束时
+        按键合并后触发（同一键只通知最终值）。块内出现异常时回滚全部写入。
+        可以嵌套，最外层结束时才提交。
+        
+        整个块都持有 self._lock：其他线程的 set / delete / merge 等写入会阻塞到
+        块结束，读取不受影响（继续读旧快照）。块内不要做耗时操作或等待其他
+        写配置的线程，否则会阻塞甚至死锁。
+        
+        Args:
+            rollback: 出现异常时是否回滚
+            
+        Examples:
+            with config.transaction():
+                for key, value in updates.items():
+                    config.set(key, value)
+        """
+        changes: Dict[str, Any] = {}
+        try:
+            with self._lock:
+                if self._batch_depth == 0:
+                    self._batch_owner = threading.get_ident()
+                self._batch_depth += 1
+                backup = None
+                if rollback:
+                    backup = (copy.deepcopy(self.config_data), len(self.history),
+                              dict(self._pending_changes), self._dirty, self._save_pending)
+                try:
+                    yield self
+                except BaseException:
+                    if backup is not None:
+                        (self.config_data, history_length, self._pending_changes,
+                         self._dirty, self._save_pending) = backup
+                        del self.history[history_length:]
+                    raise
+                finally:
+                    self._batch_depth -= 1
+                    if self._batch_depth == 0:
+                        changes = self._end_batch()
+        finally:
+            for key, value in changes.items():
+                self._trigger_callbacks(key, value)
+    
+    @contextmanager
+    def batch(self) -> Iterator['ConfigManager']:
+        """只合并写入、不回滚的 transaction"""
+        with self.transaction(rollback=False):
+            yield self
+    
+    def _end_batch(self) -> Dict[str, Any]:
+        """提交批量写入，返回待通知的变更（调用方持有锁）"""
+        if self._dirty:
+            self._rebuild_snapshot()
+            self._dirty = False
+        if self._save_pending:
+            self._save_pending = False
+            self._request_save()
+        self._batch_owner = None
+        changes, self._pending_changes = self._pending_changes, {}
+        return changes
     
     # ==================== 环境管理 ====================
     
@@ -477,11 +721,10 @@ class ConfigManager:
         Args:
             env: 环境名称
         """
-        self.env = env
-        self._apply_env_overrides()
-        
-        if self.auto_save:
-            self._save()
+        with self._lock:
+            self.env = env
+            self._apply_env_overrides()
+            self._commit_write()
     
     def get_env(self) -> str:
         """获取当前环境"""
@@ -610,15 +853,16 @@ class ConfigManager:
         if not self._fernet:
             return
         
-        for key in self.keys():
-            if key.endswith("_encrypted") or key.endswith("_secret"):
-                try:
-                    decrypted = self.decrypt_sensitive(key)
-                    clean_key = key.rsplit("_", 1)[0]
-                    self.set(clean_key, decrypted)
-                    self.delete(key)
-                except Exception:
-                    pass
+        with self.batch():
+            for key in self.keys():
+                if key.endswith("_encrypted") or key.endswith("_secret"):
+                    try:
+                        decrypted = self.decrypt_sensitive(key)
+                        clean_key = key.rsplit("_", 1)[0]
+                        self.set(clean_key, decrypted)
+                        self.delete(key)
+                    except Exception:
+                        pass
     
     def mark_sensitive(self, key: str) -> None:
         """
@@ -679,20 +923,43 @@ class ConfigManager:
             callback: 回调函数 (key, new_value)
             path_pattern: 匹配的路径模式
         """
-        if path_pattern:
-            self._change_callbacks.append(ConfigChangeCallback(path_pattern, callback))
-        else:
+        with self._lock:
             # 无模式匹配所有变更
-            self._change_callbacks.append(ConfigChangeCallback(r".*", callback))
+            cb = ConfigChangeCallback(path_pattern or r".*", callback,
+                                      order=len(self._change_callbacks))
+            self._change_callbacks.append(cb)
+            self._callback_index.setdefault(cb.prefix, []).append(cb)
+            self._prefix_lengths = sorted({len(prefix) for prefix in self._callback_index})
+            self._dispatch_cache = {}
+    
+    def _callbacks_for(self, key: str) -> List[ConfigChangeCallback]:
+        """
+        匹配某个键的回调
+        
+        先用键的各个前缀查索引得到候选，再对候选执行正则；结果按键缓存，
+        注册新回调时清空。
+        """
+        callbacks = self._dispatch_cache.get(key)
+        if callbacks is None:
+            candidates = []
+            for length in self._prefix_lengths:
+                if length > len(key):
+                    break
+                candidates.extend(self._callback_index.get(key[:length], ()))
+            candidates.sort(key=lambda cb: cb.order)
+            callbacks = [cb for cb in candidates if cb.pattern.match(key)]
+            if len(self._dispatch_cache) >= _DISPATCH_CACHE_SIZE:
+                self._dispatch_cache = {}
+            self._dispatch_cache[key] = callbacks
+        return callbacks
     
     def _trigger_callbacks(self, key: str, value: Any) -> None:
         """触发变更回调"""
-        for cb in self._change_callbacks:
-            if cb.pattern.match(key):
-                try:
-                    cb.callback(key, value)
-                except Exception:
-                    pass
+        for cb in self._callbacks_for(key):
+            try:
+                cb.callback(key, value)
+            except Exception:
+                pass
     
     def start_watching(self, interval: float = 1.0) -> None:
         """
@@ -707,10 +974,11 @@ class ConfigManager:
         last_hash = self._get_file_hash()
         
         def watcher():
+            nonlocal last_hash
             while True:
                 current_hash = self._get_file_hash()
                 if current_hash != last_hash:
-                    self._load()
+                    self._reload()
                     last_hash = current_hash
                 import time
                 time.sleep(interval)
@@ -719,6 +987,15 @@ class ConfigManager:
         thread.start()
         self._watchers.append(thread)
     
+    def _reload(self) -> None:
+        """重新加载配置文件并重建快照（不回写文件）"""
+        with self._lock:
+            self._load()
+            if self._batch_depth:
+                self._dirty = True
+            else:
+                self._rebuild_snapshot()
+    
     def stop_watching(self) -> None:
         """停止监听"""
         self._watchers.clear()
@@ -900,7 +1177,7 @@ def demo():
     # 设置配置值
     print("\n4. 设置配置值")
     config.set("app.debug", False, source="demo")
-    print(f   "app.debug: {config.get('app.debug')}")
+    print(f"   app.debug: {config.get('app.debug')}")
     
     # 验证配置
     print("\n5. 验证配置")
@@ -937,14 +1214,22 @@ def demo():
     for entry in config.get_history():
         print(f"   - {entry.timestamp}: {entry.path} = {entry.new_value}")
     
+    # 批量写入
+    print("\n8. 批量写入 (只保存一次，回调按键合并)")
+    config.watch(lambda k, v: print(f"   回调: {k} = {v}"), r"feature\.flag_1\d$")
+    with config.transaction():
+        for i in range(200):
+            config.set(f"feature.flag_{i}", i % 2 == 0, source="bulk")
+    print(f"   feature.flag_199: {config.get('feature.flag_199')}")
+    
     # 使用配置构建器
-    print("\n8. 使用配置构建器管理多个配置")
+    print("\n9. 使用配置构建器管理多个配置")
     builder = ConfigBuilder()
     builder.add_config("main", "demo_config.json")
     print(f"   app.name: {builder.get('main', 'app.name')}")
     
     # 清理
-    print("\n9. 清理演示文件")
+    print("\n10. 清理演示文件")
     config_file.unlink()
     print("   已删除 demo_config.json")
     
@@ -11,6 +11,7 @@
 - 📊 搜索统计和可视化
 - 💾 结果导出（JSON/CSV/Markdown）
 - 🔗 跨目录搜索和目录树浏览
+- ⚡ 磁盘持久化的三元组索引 (SQLite FTS5)，增量更新
 """
 
 import os
@@ -103,20 +104,105 @@ class SearchConfig:
             self.exclude_dirs = ['.git', '__pycache__', 'node_modules', '.venv', 'venv', '.idea', '.vscode']
 
 
+# 默认的磁盘索引文件 (位于当前目录，索引时自动跳过)
+DEFAULT_INDEX_FILE = '.smart_code_index.db'
+# 索引表结构版本，不一致时重建索引
+INDEX_SCHEMA_VERSION = 2
+# 判断二进制文件时检查的字节数
+BINARY_SNIFF_BYTES = 8192
+# 与 FileInfo 字段一一对应的列
+FILE_INFO_COLUMNS = 'path, name, extension, size, modified_time, line_count, content_hash'
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+def _fts_phrase(text: str) -> str:
+    """把字面量转成 FTS5 短语 (trigram 分词下即子串匹配)"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _regex_fts_query(pattern: str, flags: int = 0) -> Optional[str]:
+    """
+    从正则表达式中提取必须出现的字面量，生成 FTS5 查询
+
+    顺序串联的字面量取 AND，分支取 OR；长度不足 3 的片段无法用三元组索引，
+    整个表达式无法约束时返回 None (需要扫描全部文件)。
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except (re.error, TypeError):
+        return None
+
+    def build(sequence) -> Optional[str]:
+        terms, run = [], []
+
+        def flush():
+            if len(run) >= 3:
+                terms.append(_fts_phrase(''.join(run)))
+            run.clear()
+
+        for op, av in sequence:
+            if op == sre_parse.LITERAL:
+                run.append(chr(av))
+                continue
+            flush()
+            if op == sre_parse.SUBPATTERN:
+                sub = build(av[-1])
+                if sub:
+                    terms.append(sub)
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+                sub = build(av[2])
+                if sub:
+                    terms.append(sub)
+            elif op == sre_parse.BRANCH:
+                alternatives = [build(branch) for branch in av[1]]
+                if all(alternatives):
+                    terms.append('(' + ' OR '.join(alternatives) + ')')
+        flush()
+        return ' AND '.join(terms) or None
+
+    return build(parsed)
+
+
+def _glob_fts_query(pattern: str) -> Optional[str]:
+    """从通配符模式中提取字面量片段生成 FTS5 查询"""
+    pieces = [p for p in re.split(r'\*|\?|\[[^\]]*\]', pattern) if len(p) >= 3]
+    return ' AND '.join(_fts_phrase(p) for p in pieces) or None
+
+
 class SmartCodeSearcher:
     """智能代码搜索器"""
     
-    def __init__(self):
+    def __init__(self, index_path: str = DEFAULT_INDEX_FILE):
+        """
+        Args:
+            index_path: 索引数据库路径；':memory:' 表示不持久化
+        """
+        self.index_path = index_path
         self.index_db = None
+        self.fts_enabled = False
+        self.last_index_stats: Dict[str, int] = {}
         self._init_database()
     
     def _init_database(self):
-        """初始化索引数据库"""
-        self.index_db = sqlite3.connect(':memory:')
+        """初始化索引数据库 (文件完整内容 + FTS5 三元组倒排索引)"""
+        self.index_db = sqlite3.connect(self.index_path)
         cursor = self.index_db.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        if version != INDEX_SCHEMA_VERSION:
+            for statement in ('DROP TABLE IF EXISTS file_fts', 'DROP TABLE IF EXISTS file_index'):
+                cursor.execute(statement)
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS file_index (
-                path TEXT PRIMARY KEY,
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE,
                 name TEXT,
                 extension TEXT,
                 size INTEGER,
@@ -137,6 +223,31 @@ class SmartCodeSearcher:
         ''')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_extension ON file_index(extension)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_modified ON file_index(modified_time)')
+        
+        try:
+            # 外部内容表: 倒排索引只存三元组，文件内容只在 file_index 中保存一份
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS file_fts USING fts5(
+                    content, content='file_index', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+            cursor.executescript('''
+                CREATE TRIGGER IF NOT EXISTS file_index_ai AFTER INSERT ON file_index BEGIN
+                    INSERT INTO file_fts(rowid, content) VALUES (new.id, new.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS file_index_ad AFTER DELETE ON file_index BEGIN
+                    INSERT INTO file_fts(file_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS file_index_au AFTER UPDATE OF content ON file_index BEGIN
+                    INSERT INTO file_fts(file_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                    INSERT INTO file_fts(rowid, content) VALUES (new.id, new.content);
+                END;
+            ''')
+            self.fts_enabled = True
+        except sqlite3.OperationalError:
+            print("⚠️  当前 SQLite 不支持 FTS5 trigram 分词 (需要 3.34+)，内容搜索将扫描全部文件")
+        
+        cursor.execute(f'PRAGMA user_version = {INDEX_SCHEMA_VERSION}')
         self.index_db.commit()
     
     def _calculate_relevance(self, match_text: str, patterns: List[str], mode: SearchMode) -> float:
@@ -207,43 +318,124 @@ class SmartCodeSearcher:
         except (IOError, OSError):
             return None
     
-    def index_directory(self, path: str, extensions: Optional[List[str]] = None) -> int:
-        """索引目录中的文件"""
+    def _iter_files(self, path: str) -> Generator[os.DirEntry, None, None]:
+        """遍历目录 (scandir 自带 stat 信息，避免逐个 os.stat)"""
+        skip_dirs = {'.git', '__pycache__', 'node_modules', '.venv', 'venv', '.idea', '.vscode'}
+        index_name = os.path.basename(self.index_path)
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            try:
+                entries = list(os.scandir(current))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in skip_dirs:
+                            stack.append(entry.path)
+                    elif entry.is_file() and not entry.name.startswith(index_name):
+                        yield entry
+                except OSError:
+                    continue
+    
+    def index_directory(self, path: str, extensions: Optional[List[str]] = None,
+                        batch_size: int = 1000) -> int:
+        """
+        增量索引目录中的文件
+        
+        大小和修改时间都没变的文件直接跳过 (不读取)；变化的文件读取后比较内容哈希，
+        哈希相同只更新元数据。目录下已删除的文件会从索引中移除。
+        各类文件数量记录在 last_index_stats 中。
+        
+        Args:
+            path: 要索引的目录
+            extensions: 只索引这些扩展名 (如 ['.py'])
+            batch_size: 每批提交的文件数
+            
+        Returns:
+            int: 当前目录下已索引的文件数
+        """
         cursor = self.index_db.cursor()
-        indexed_count = 0
+        stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'skipped': 0}
+        
+        prefix = os.path.join(path, '')
+        cursor.execute(
+            'SELECT path, id, size, modified_time, content_hash FROM file_index WHERE substr(path, 1, ?) = ?',
+            (len(prefix), prefix)
+        )
+        known = {row[0]: row[1:] for row in cursor.fetchall()}
+        seen = set()
+        pending = 0
         
-        for root, dirs, files in os.walk(path):
-            # 过滤目录
-            dirs[:] = [d for d in dirs if d not in ['.git', '__pycache__', 'node_modules', '.venv', 'venv', '.idea', '.vscode']]
+        for entry in self._iter_files(path):
+            file_path = entry.path
+            ext = os.path.splitext(entry.name)[1].lower()
             
-            for file in files:
-                file_path = os.path.join(root, file)
-                ext = os.path.splitext(file)[1].lower()
-                
-                # 过滤扩展名
-                if extensions and ext not in extensions:
+            # 过滤扩展名
+            if extensions and ext not in extensions:
+                continue
+            
+            try:
+                stat = entry.stat()
+                previous = known.get(file_path)
+                if previous and previous[1] == stat.st_size and previous[2] == stat.st_mtime:
+                    seen.add(file_path)
+                    stats['unchanged'] += 1
                     continue
                 
-                try:
-                    stat = os.stat(file_path)
-                    content = self._read_file_content(file_path)
-                    if content is None:
-                        continue
-                    
-                    content_hash = self._get_file_hash(content.encode('utf-8'))
-                    line_count = content.count('\n') + 1
-                    
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO file_index 
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (file_path, file, ext, stat.st_size, stat.st_mtime, line_count, content_hash, content[:10000]))
-                    
-                    indexed_count += 1
-                except (IOError, OSError):
-                    continue
+                with open(file_path, 'rb') as f:
+                    raw = f.read()
+            except (IOError, OSError):
+                continue
+            
+            if b'\0' in raw[:BINARY_SNIFF_BYTES]:
+                stats['skipped'] += 1
+                continue
+            seen.add(file_path)
+            
+            content_hash = self._get_file_hash(raw)
+            if previous and previous[3] == content_hash:
+                cursor.execute('UPDATE file_index SET size = ?, modified_time = ? WHERE id = ?',
+                               (stat.st_size, stat.st_mtime, previous[0]))
+                stats['unchanged'] += 1
+                continue
+            
+            content = raw.decode('utf-8', errors='ignore')
+            line_count = content.count('\n') + 1
+            if previous:
+                cursor.execute('''
+                    UPDATE file_index SET size = ?, modified_time = ?, line_count = ?,
+                        content_hash = ?, content = ?
+                    WHERE id = ?
+                ''', (stat.st_size, stat.st_mtime, line_count, content_hash, content, previous[0]))
+                stats['updated'] += 1
+            else:
+                cursor.execute('''
+                    INSERT INTO file_index (path, name, extension, size, modified_time,
+                                            line_count, content_hash, content)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (file_path, entry.name, ext, stat.st_size, stat.st_mtime, line_count,
+                      content_hash, content))
+                stats['added'] += 1
+            
+            pending += 1
+            if pending >= batch_size:
+                self.index_db.commit()
+                pending = 0
+        
+        # 清理已删除 (或不再符合条件) 的文件
+        removed = [
+            (file_id,) for file_path, (file_id, *_) in known.items()
+            if file_path not in seen and
+            (not extensions or os.path.splitext(file_path)[1].lower() in extensions)
+        ]
+        cursor.executemany('DELETE FROM file_index WHERE id = ?', removed)
+        stats['removed'] = len(removed)
         
         self.index_db.commit()
-        return indexed_count
+        self.last_index_stats = stats
+        return len(seen)
     
     def search(self, config: SearchConfig) -> List[SearchResult]:
         """执行搜索"""
@@ -280,24 +472,63 @@ class SmartCodeSearcher:
         
         where_clause = ' AND '.join(query_conditions) if query_conditions else '1=1'
         
-        cursor.execute(f'SELECT * FROM file_index WHERE {where_clause}', params)
+        cursor.execute(f'SELECT {FILE_INFO_COLUMNS} FROM file_index WHERE {where_clause}', params)
         
         for row in cursor.fetchall():
-            path, name, ext, size, modified, line_count, content_hash, _ = row
+            path, name, ext, size, modified, line_count, content_hash = row
             score = self._calculate_relevance(name, config.patterns, SearchMode.FILENAME)
             results.append(SearchResult(path, None, None, 0, 0, score))
         
         return self._sort_results(results, config.sort_by, config.reverse)[:config.max_results]
     
+    def _content_fts_query(self, config: SearchConfig) -> Optional[str]:
+        """
+        根据搜索模式生成缩小候选文件范围的 FTS5 查询
+        
+        返回 None 表示无法用索引约束 (如模式短于 3 个字符)，需要检查全部文件。
+        三元组索引不区分大小写，得到的是候选超集，最终仍逐行验证。
+        """
+        if not self.fts_enabled:
+            return None
+        
+        terms = []
+        for pattern in config.patterns:
+            if config.mode == SearchMode.CONTENT:
+                term = _fts_phrase(pattern) if len(pattern) >= 3 else None
+            elif config.mode == SearchMode.REGEX:
+                term = _regex_fts_query(pattern, 0 if config.case_sensitive else re.IGNORECASE)
+            elif config.mode == SearchMode.GLOB:
+                term = _glob_fts_query(pattern)
+            else:
+                term = None
+            
+            if term is None:
+                # 逐行验证时任一模式命中即可，所以有一个模式无法约束就只能全量检查
+                return None
+            terms.append(f'({term})')
+        
+        return ' OR '.join(terms) or None
+    
+    def _candidate_files(self, config: SearchConfig) -> Generator[Tuple[str, str], None, None]:
+        """逐个产出需要验证的 (路径, 内容)"""
+        cursor = self.index_db.cursor()
+        fts_query = self._content_fts_query(config)
+        
+        if fts_query:
+            cursor.execute('''
+                SELECT path, content FROM file_index
+                WHERE id IN (SELECT rowid FROM file_fts WHERE file_fts MATCH ?)
+            ''', (fts_query,))
+        else:
+            cursor.execute('SELECT path, content FROM file_index')
+        
+        yield from cursor
+    
     def _search_content(self, config: SearchConfig) -> List[SearchResult]:
         """内容搜索"""
         results = []
-        cursor = self.index_db.cursor()
-        
-        # 获取所有文件
-        cursor.execute('SELECT path, content FROM file_index')
         
-        for path, content in cursor.fetchall():
+        for path, content in self._candidate_files(config):
             if not content:
                 continue
             
@@ -453,11 +684,11 @@ class SmartCodeSearcher:
         """查找大文件"""
         min_size = int(min_size_mb * 1024 * 1024)
         cursor = self.index_db.cursor()
-        cursor.execute('SELECT * FROM file_index WHERE size >= ?', (min_size,))
+        cursor.execute(f'SELECT {FILE_INFO_COLUMNS} FROM file_index WHERE size >= ?', (min_size,))
         
         results = []
         for row in cursor.fetchall():
-            path, name, ext, size, modified, line_count, content_hash, _ = row
+            path, name, ext, size, modified, line_count, content_hash = row
             results.append(FileInfo(path, name, ext, size, modified, line_count, content_hash))
         
         return sorted(results, key=lambda x: x.size, reverse=True)
@@ -482,11 +713,11 @@ class SmartCodeSearcher:
         for ext, count in cursor.fetchall():
             stats['by_extension'][ext] = count
         
-        cursor.execute('SELECT * FROM file_index ORDER BY modified_time DESC LIMIT 10')
+        cursor.execute(f'SELECT {FILE_INFO_COLUMNS} FROM file_index ORDER BY modified_time DESC LIMIT 10')
         for row in cursor.fetchall():
             stats['recent_files'].append(FileInfo(*row))
         
-        cursor.execute('SELECT * FROM file_index ORDER BY size DESC LIMIT 10')
+        cursor.execute(f'SELECT {FILE_INFO_COLUMNS} FROM file_index ORDER BY size DESC LIMIT 10')
         for row in cursor.fetchall():
             stats['largest_files'].append(FileInfo(*row))
         
@@ -533,6 +764,12 @@ class SmartCodeSearcher:
         cursor.execute('SELECT * FROM search_history ORDER BY timestamp DESC LIMIT 20')
         return [{'query': row[1], 'path': row[2], 'count': row[3], 'time': row[4]} for row in cursor.fetchall()]
     
+    def close(self):
+        """关闭索引数据库"""
+        if self.index_db:
+            self.index_db.close()
+            self.index_db = None
+    
     def clear_index(self):
         """清空索引"""
         cursor = self.index_db.cursor()
@@ -559,8 +796,12 @@ def demo():
     
     # 示例1: 索引当前目录
     print("\n📂 索引当前目录...")
+    start = time.time()
     count = searcher.index_directory(".", ['.py', '.txt', '.md', '.js', '.json'])
-    print(f"✅ 已索引 {count} 个文件")
+    print(f"✅ 已索引 {count} 个文件 ({time.time() - start:.2f}s) {searcher.last_index_stats}")
+    start = time.time()
+    searcher.index_directory(".", ['.py', '.txt', '.md', '.js', '.json'])
+    print(f"   增量重建: {time.time() - start:.2f}s {searcher.last_index_stats}")
     
     # 示例2: 搜索Python文件
     print("\n🐍 查找Python文件...")
@@ -579,6 +820,12 @@ def demo():
     for r in results:
         print(f"  📄 {os.path.basename(r.file_path)} (分数: {r.relevance_score:.2f})")
     
+    # 正则搜索: 先用正则中的字面量在三元组索引里缩小候选文件
+    print("\n🧩 正则搜索 r'def \\w+_index\\(' ...")
+    start = time.time()
+    regex_results = searcher.search(SearchConfig(patterns=[r'def \w+_index\('], mode=SearchMode.REGEX))
+    print(f"  {len(regex_results)} 个文件 ({(time.time() - start) * 1000:.1f}ms)")
+    
     # 示例4: 统计信息
     print("\n📊 目录统计:")
     stats = searcher.get_statistics(".")
@@ -624,7 +871,7 @@ def interactive_mode():
   stats               - 显示统计信息
   tree                - 显示目录树
   history             - 显示搜索历史
-  index               - 重新索引
+  index               - 增量更新索引
   clear               - 清空索引
   export <fmt>        - 导出结果 (json/csv/markdown)
   exit                - 退出
@@ -670,9 +917,8 @@ def interactive_mode():
                     print(f"  {h['query']} -> {h['count']} 结果")
             
             elif command == 'index':
-                searcher.clear_index()
                 count = searcher.index_directory(".", ['.py', '.txt', '.md', '.js', '.json', '.html', '.css'])
-                print(f"✅ 已索引 {count} 个文件")
+                print(f"✅ 已索引 {count} 个文件 {searcher.last_index_stats}")
             
             elif command == 'clear':
                 searcher.clear_index()
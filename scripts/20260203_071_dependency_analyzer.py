@@ -6,6 +6,8 @@ Project Dependency Analyzer
 
 import ast
 import os
+import re
+import sys
 import json
 import subprocess
 from collections import defaultdict
@@ -26,6 +28,133 @@ class Dependency:
     from_imports: List[str] = field(default_factory=list)
 
 
+@dataclass
+class ImportSite:
+    """模块中的一条import语句"""
+    module: str                     # 绝对模块名（相对导入已展开）
+    names: List[str]                # from X import a, b 中的 a, b
+    lineno: int
+    deferred: bool = False          # 位于函数体或 TYPE_CHECKING 块内，导入时不执行
+
+
+@dataclass
+class ModuleNode:
+    """项目内部模块"""
+    name: str
+    path: str
+    is_package: bool = False
+    sites: List[ImportSite] = field(default_factory=list)
+
+
+@dataclass
+class ImportCost:
+    """python -X importtime 的一行记录（微秒）"""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+    parent: Optional[str] = None
+
+
+@dataclass
+class DeferCandidate:
+    """建议改为延迟导入的import语句"""
+    importer: str
+    target: str
+    path: str
+    lineno: int
+    saved_us: int
+    entry: str
+    in_cycle: bool = False
+    
+    def to_dict(self) -> Dict:
+        return {
+            'importer': self.importer,
+            'target': self.target,
+            'location': f"{self.path}:{self.lineno}",
+            'saved_ms': round(self.saved_us / 1000, 2),
+            'entry': self.entry,
+            'in_cycle': self.in_cycle
+        }
+
+
+IMPORTTIME_PATTERN = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)')
+
+
+def _is_type_checking(test: ast.expr) -> bool:
+    """判断 if 条件是否为 TYPE_CHECKING / typing.TYPE_CHECKING"""
+    if isinstance(test, ast.Name):
+        return test.id == 'TYPE_CHECKING'
+    return isinstance(test, ast.Attribute) and test.attr == 'TYPE_CHECKING'
+
+
+def _resolve_relative(package: str, module: Optional[str], level: int) -> Optional[str]:
+    """把相对导入展开为绝对模块名，越过顶层时返回None"""
+    if level == 0:
+        return module
+    parts = package.split('.') if package else []
+    if level - 1 > len(parts):
+        return None
+    base = parts[:len(parts) - (level - 1)]
+    if module:
+        base.extend(module.split('.'))
+    return '.'.join(base)
+
+
+def collect_import_sites(tree: ast.AST, module_name: str, is_package: bool = False) -> List[ImportSite]:
+    """收集模块中的import语句，并标记哪些不会在导入时执行"""
+    package = module_name if is_package else module_name.rpartition('.')[0]
+    sites: List[ImportSite] = []
+    
+    def visit(nodes, deferred: bool):
+        for node in nodes:
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    sites.append(ImportSite(alias.name, [], node.lineno, deferred))
+            elif isinstance(node, ast.ImportFrom):
+                base = _resolve_relative(package, node.module, node.level)
+                if base is not None:
+                    names = [alias.name for alias in node.names if alias.name != '*']
+                    sites.append(ImportSite(base, names, node.lineno, deferred))
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                visit(node.body, True)
+            elif isinstance(node, ast.If) and _is_type_checking(node.test):
+                visit(node.body, True)
+                visit(node.orelse, deferred)
+            elif isinstance(node, (ast.stmt, ast.excepthandler)) or type(node).__name__ == 'match_case':
+                visit(ast.iter_child_nodes(node), deferred)
+    
+    visit(tree.body, False)
+    return sites
+
+
+def parse_importtime(stderr: str) -> List[ImportCost]:
+    """
+    解析 -X importtime 输出
+    
+    输出按模块完成顺序（子模块在前）逐行打印，缩进表示嵌套深度；
+    逆序遍历即可还原每个模块是被谁导入的。
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            entries.append(ImportCost(
+                module=match.group(4),
+                self_us=int(match.group(1)),
+                cumulative_us=int(match.group(2)),
+                depth=max(0, (len(match.group(3)) - 1) // 2)
+            ))
+    
+    stack: List[ImportCost] = []
+    for entry in reversed(entries):
+        while stack and stack[-1].depth >= entry.depth:
+            stack.pop()
+        entry.parent = stack[-1].module if stack else None
+        stack.append(entry)
+    return entries
+
+
 class DependencyAnalyzer:
     """依赖分析器"""
     
@@ -58,6 +187,11 @@ class DependencyAnalyzer:
         self.dependencies: Dict[str, Dependency] = {}
         self.files_analyzed = 0
         self.errors = []
+        # 模块级导入图
+        self.modules: Dict[str, ModuleNode] = {}
+        self.import_graph: Dict[str, Dict[str, int]] = {}      # 导入时执行的边: 目标 -> 行号
+        self.deferred_imports: Dict[str, Dict[str, int]] = {}  # 函数内/TYPE_CHECKING 中的边
+        self.startup_costs: Dict[str, int] = {}                # 入口模块 -> 冷启动导入耗时(us)
     
     def analyze(self) -> Dict:
         """执行完整分析"""
@@ -90,6 +224,7 @@ class DependencyAnalyzer:
             rel_path = str(file_path.relative_to(self.project_path))
             
             tree = ast.parse(content)
+            self._register_module(file_path, tree)
             
             for node in ast.walk(tree):
                 if isinstance(node, ast.Import):
@@ -107,6 +242,262 @@ class DependencyAnalyzer:
         except Exception as e:
             self.errors.append(f"{file_path}: {str(e)}")
     
+    def _register_module(self, file_path: Path, tree: ast.AST):
+        """记录内部模块及其import语句，供构建导入图使用"""
+        parts = list(file_path.relative_to(self.project_path).with_suffix('').parts)
+        is_package = parts[-1] == '__init__'
+        if is_package:
+            parts.pop()
+        if not parts:
+            return
+        name = '.'.join(parts)
+        self.modules[name] = ModuleNode(
+            name=name,
+            path=str(file_path.relative_to(self.project_path)),
+            is_package=is_package,
+            sites=collect_import_sites(tree, name, is_package)
+        )
+    
+    def _resolve_import(self, module: str) -> str:
+        """返回最长的内部模块前缀；外部模块归并到顶级包名"""
+        parts = module.split('.')
+        for i in range(len(parts), 0, -1):
+            candidate = '.'.join(parts[:i])
+            if candidate in self.modules:
+                return candidate
+        return parts[0]
+    
+    def _ancestors(self, module: str) -> List[str]:
+        """内部模块的上级包（导入子模块时会先执行它们的 __init__）"""
+        parts = module.split('.')
+        return [a for a in ('.'.join(parts[:i]) for i in range(1, len(parts))) if a in self.modules]
+    
+    def build_import_graph(self) -> Dict[str, Dict[str, int]]:
+        """解析内部导入，构建模块级导入图"""
+        if not self.modules:
+            self._scan_project()
+        
+        self.import_graph = {name: {} for name in self.modules}
+        self.deferred_imports = {name: {} for name in self.modules}
+        
+        for name, node in self.modules.items():
+            # 导入本模块时上级包已经加载，指向它们的边没有额外开销
+            loaded = set(self._ancestors(name))
+            for site in node.sites:
+                targets = []
+                if site.names and (not site.module or site.module in self.modules):
+                    # from pkg import sub: sub 可能是子模块
+                    for imported in site.names:
+                        sub = f"{site.module}.{imported}" if site.module else imported
+                        if sub in self.modules:
+                            targets.append(sub)
+                if site.module:
+                    targets.append(self._resolve_import(site.module))
+                
+                edges = self.deferred_imports[name] if site.deferred else self.import_graph[name]
+                for target in targets:
+                    if target != name and target not in loaded:
+                        edges.setdefault(target, site.lineno)
+        
+        return self.import_graph
+    
+    def find_cycles(self) -> List[List[str]]:
+        """Tarjan 算法求强连通分量，返回包含循环导入的分量"""
+        if not self.import_graph:
+            self.build_import_graph()
+        
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+        cycles: List[List[str]] = []
+        counter = 0
+        
+        for root in self.modules:
+            if root in index:
+                continue
+            work = [(root, iter(self.import_graph[root]))]
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            
+            while work:
+                node, children = work[-1]
+                advanced = False
+                for child in children:
+                    if child not in self.modules:
+                        continue
+                    if child not in index:
+                        index[child] = lowlink[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.import_graph[child])))
+                        advanced = True
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index[child])
+                if advanced:
+                    continue
+                
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1:
+                        cycles.append(sorted(component))
+        
+        return cycles
+    
+    def _graph_roots(self) -> List[str]:
+        """没有被其他内部模块在导入时引用的模块，视为入口"""
+        imported = {t for edges in self.import_graph.values() for t in edges}
+        return sorted(name for name in self.modules if name not in imported)
+    
+    def measure_import_costs(self, entry: str, repeat: int = 3, timeout: float = 60) -> Dict[str, int]:
+        """
+        在子进程中用 python -X importtime 导入入口模块，返回图中每个节点的耗时(us)
+        
+        内部模块取自身耗时；外部包取其顶层出现处的累计耗时（含其全部依赖）。
+        多次运行取最小值，以排除首次编译 .pyc 等噪声。注意这会执行模块的顶层代码。
+        """
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(self.project_path), env.get('PYTHONPATH')]))
+        code = f"import importlib; importlib.import_module({entry!r})"
+        
+        best: Dict[str, int] = {}
+        for _ in range(repeat):
+            try:
+                proc = subprocess.run(
+                    [sys.executable, '-X', 'importtime', '-c', code],
+                    cwd=str(self.project_path), env=env,
+                    capture_output=True, text=True, timeout=timeout
+                )
+            except subprocess.TimeoutExpired:
+                self.errors.append(f"importtime {entry}: 超时")
+                return {}
+            if proc.returncode != 0:
+                lines = [l for l in proc.stderr.splitlines() if not l.startswith('import time:')]
+                self.errors.append(f"importtime {entry}: {lines[-1] if lines else proc.returncode}")
+                return {}
+            
+            costs: Dict[str, int] = {}
+            for item in parse_importtime(proc.stderr):
+                if item.module in self.modules:
+                    costs[item.module] = item.self_us
+                    continue
+                top = item.module.split('.')[0]
+                if item.parent is None or item.parent.split('.')[0] != top:
+                    costs[top] = costs.get(top, 0) + item.cumulative_us
+            
+            for node, cost in costs.items():
+                best[node] = min(best.get(node, cost), cost)
+        
+        return best
+    
+    def _reachable(self, entry: str, skip_edge: Optional[tuple] = None) -> Set[str]:
+        """导入入口模块时会被执行的全部节点"""
+        seen: Set[str] = set()
+        stack = [entry]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            # 导入子模块前会先执行上级包
+            seen.add(node)
+            stack.extend(self._ancestors(node))
+            for target in self.import_graph.get(node, ()):
+                if target not in seen and (node, target) != skip_edge:
+                    stack.append(target)
+        return seen
+    
+    def rank_deferrals(self, entries: Optional[List[str]] = None, repeat: int = 3,
+                       top: int = 20) -> List[DeferCandidate]:
+        """
+        按可节省的冷启动时间为导入边排序
+        
+        对每条导入时执行的边，计算去掉它后入口不再可达的节点耗时之和，
+        即把这条import移入函数内部后能省下的时间。
+        """
+        if not self.import_graph:
+            self.build_import_graph()
+        
+        cycle_members = {m for cycle in self.find_cycles() for m in cycle}
+        candidates: Dict[tuple, DeferCandidate] = {}
+        
+        for entry in entries or self._graph_roots():
+            costs = self.measure_import_costs(entry, repeat=repeat)
+            if not costs:
+                continue
+            reachable = self._reachable(entry)
+            total = sum(costs.get(n, 0) for n in reachable)
+            self.startup_costs[entry] = total
+            
+            for importer in reachable:
+                for target, lineno in self.import_graph.get(importer, {}).items():
+                    remaining = self._reachable(entry, skip_edge=(importer, target))
+                    saved = total - sum(costs.get(n, 0) for n in remaining)
+                    key = (importer, target)
+                    if saved <= 0 or (key in candidates and candidates[key].saved_us >= saved):
+                        continue
+                    candidates[key] = DeferCandidate(
+                        importer=importer,
+                        target=target,
+                        path=self.modules[importer].path,
+                        lineno=lineno,
+                        saved_us=saved,
+                        entry=entry,
+                        in_cycle=importer in cycle_members and target in cycle_members
+                    )
+        
+        ranked = sorted(candidates.values(), key=lambda c: c.saved_us, reverse=True)
+        return ranked[:top]
+    
+    def get_graph_report(self) -> Dict:
+        """导入图摘要"""
+        if not self.import_graph:
+            self.build_import_graph()
+        internal_edges = sum(1 for edges in self.import_graph.values() for t in edges if t in self.modules)
+        return {
+            'modules': len(self.modules),
+            'internal_edges': internal_edges,
+            'external_edges': sum(len(edges) for edges in self.import_graph.values()) - internal_edges,
+            'deferred_edges': sum(len(edges) for edges in self.deferred_imports.values()),
+            'cycles': self.find_cycles(),
+            'entries': self._graph_roots()
+        }
+    
+    def print_startup_report(self, candidates: List[DeferCandidate]):
+        """打印冷启动耗时与延迟导入建议"""
+        print("\n" + "=" * 50)
+        print("🚀 冷启动导入分析")
+        print("=" * 50)
+        for entry, cost in sorted(self.startup_costs.items(), key=lambda x: x[1], reverse=True):
+            print(f"  {entry}: {cost / 1000:.2f} ms")
+        
+        cycles = self.find_cycles()
+        if cycles:
+            print(f"\n🔁 循环导入 ({len(cycles)}):")
+            for cycle in cycles:
+                print(f"  • {' -> '.join(cycle)}")
+        
+        if candidates:
+            print("\n💡 建议延迟导入:")
+            for c in candidates:
+                flag = " [循环]" if c.in_cycle else ""
+                print(f"  • {c.path}:{c.lineno} {c.importer} -> {c.target}: "
+                      f"节省 {c.saved_us / 1000:.2f} ms (入口 {c.entry}){flag}")
+        print()
+    
     def _add_dependency(self, name: str, file_path: str, 
                        alias: Optional[str] = None,
                        from_imports: Optional[List[str]] = None):
@@ -220,8 +611,11 @@ class DependencyAnalyzer:
         
         print()
     
-    def generate_dot_graph(self) -> str:
-        """生成DOT格式的依赖图"""
+    def generate_dot_graph(self, modules: bool = False) -> str:
+        """生成DOT格式的依赖图，modules=True 时输出内部模块导入图"""
+        if modules:
+            return self._generate_module_dot_graph()
+        
         lines = [
             'digraph Dependencies {',
             '  rankdir=LR;',
@@ -243,6 +637,30 @@ class DependencyAnalyzer:
         
         lines.append('}')
         return '\n'.join(lines)
+    
+    def _generate_module_dot_graph(self) -> str:
+        """内部模块导入图，循环导入中的模块和边标红"""
+        if not self.import_graph:
+            self.build_import_graph()
+        cycle_of = {m: i for i, cycle in enumerate(self.find_cycles()) for m in cycle}
+        
+        lines = [
+            'digraph Modules {',
+            '  rankdir=LR;',
+            '  node [shape=box, style=filled, fillcolor="#2196F3"];',
+            ''
+        ]
+        for name in self.modules:
+            color = ', fillcolor="#F44336"' if name in cycle_of else ''
+            lines.append(f'  "{name}" [label="{name}"{color}];')
+        for name, edges in self.import_graph.items():
+            for target in edges:
+                if target not in self.modules:
+                    continue
+                in_cycle = name in cycle_of and cycle_of[name] == cycle_of.get(target)
+                lines.append(f'  "{name}" -> "{target}"' + (' [color="#F44336"];' if in_cycle else ';'))
+        lines.append('}')
+        return '\n'.join(lines)
 
 
 def main():
@@ -251,12 +669,25 @@ def main():
     parser.add_argument('--json', action='store_true', help='输出JSON格式')
     parser.add_argument('--dot', action='store_true', help='生成DOT格式依赖图')
     parser.add_argument('--output', '-o', help='输出文件路径')
+    parser.add_argument('--modules', action='store_true', help='分析内部模块导入图（循环导入检测）')
+    parser.add_argument('--importtime', action='store_true',
+                        help='用 python -X importtime 测量导入耗时并给出延迟导入建议')
+    parser.add_argument('--entry', action='append', help='入口模块（可多次指定，默认取导入图的根）')
+    parser.add_argument('--repeat', type=int, default=3, help='importtime 重复次数')
+    parser.add_argument('--top', type=int, default=20, help='延迟导入建议数量')
     
     args = parser.parse_args()
     
     analyzer = DependencyAnalyzer(args.path)
     report = analyzer.analyze()
     
+    if args.modules or args.importtime:
+        report['import_graph'] = analyzer.get_graph_report()
+    if args.importtime:
+        candidates = analyzer.rank_deferrals(args.entry, repeat=args.repeat, top=args.top)
+        report['startup_costs_ms'] = {k: round(v / 1000, 2) for k, v in analyzer.startup_costs.items()}
+        report['defer_candidates'] = [c.to_dict() for c in candidates]
+    
     if args.json:
         output = json.dumps(report, indent=2, ensure_ascii=False)
         if args.output:
@@ -266,7 +697,7 @@ def main():
             print(output)
     
     elif args.dot:
-        dot_output = analyzer.generate_dot_graph()
+        dot_output = analyzer.generate_dot_graph(modules=args.modules)
         if args.output:
             with open(args.output, 'w') as f:
                 f.write(dot_output)
@@ -275,6 +706,13 @@ def main():
     
     else:
         analyzer.print_summary()
+        if args.importtime:
+            analyzer.print_startup_report(candidates)
+        elif args.modules:
+            graph = report['import_graph']
+            print(f"🧩 内部模块: {graph['modules']}, 内部导入边: {graph['internal_edges']}")
+            for cycle in graph['cycles']:
+                print(f"🔁 循环导入: {' -> '.join(cycle)}")
 
 
 if __name__ == '__main__':
@@ -11,6 +11,7 @@ Features:
 - Function/class detection
 - Code complexity estimation
 - Multiple language support
+- Parallel analysis with a persistent per-file cache
 
 Author: AI Code Journey
 Date: 2026-02-04
@@ -18,10 +19,12 @@ Date: 2026-02-04
 
 import os
 import re
+import json
 from collections import defaultdict
-from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 
 @dataclass
@@ -168,13 +171,173 @@ class LanguageConfig:
     }
 
 
+# Keywords counted (as substrings of the lowercased line) for the complexity estimate
+COMPLEXITY_KEYWORDS = ('if', 'elif', 'else', 'for', 'while', 'case', '&&', '||', '?', 'catch', 'except')
+
+# Default cache file name, created in the analyzed root directory
+CACHE_FILE_NAME = '.code_stats_cache.json'
+# Bump when the line classification rules change so stale cache entries are dropped
+CACHE_VERSION = 1
+
+# Below this many files to analyze, a process pool costs more than it saves
+PARALLEL_MIN_FILES = 200
+
+
+class LineClassifier:
+    """Precompiled line classifier for one language."""
+    
+    def __init__(self, language: str):
+        self.language = language
+        self.single_comment, self.ml_start, self.ml_end = \
+            LanguageConfig.COMMENT_PATTERNS.get(language, ('', '', ''))
+        patterns = LanguageConfig.PATTERNS.get(language, {})
+        self.function_search = re.compile(patterns['function']).search if patterns.get('function') else None
+        self.class_search = re.compile(patterns['class']).search if patterns.get('class') else None
+    
+    def classify(self, lines: List[str], stat: FileStatistics) -> FileStatistics:
+        """Count blank/comment/code lines, functions, classes and complexity into ``stat``."""
+        single_comment = self.single_comment
+        ml_start, ml_end = self.ml_start, self.ml_end
+        has_multiline = bool(ml_start and ml_end)
+        function_search, class_search = self.function_search, self.class_search
+        keywords = COMPLEXITY_KEYWORDS
+        
+        in_multiline_comment = False
+        blank = comment = code = functions = classes = complexity = 0
+        
+        for line in lines:
+            stripped = line.strip()
+            
+            if not stripped:
+                blank += 1
+                continue
+            
+            if has_multiline:
+                if in_multiline_comment:
+                    comment += 1
+                    if ml_end in stripped:
+                        in_multiline_comment = False
+                    continue
+                if stripped.startswith(ml_start):
+                    in_multiline_comment = True
+                    comment += 1
+                    continue
+            
+            if single_comment and stripped.startswith(single_comment):
+                comment += 1
+                continue
+            
+            code += 1
+            if function_search and function_search(line):
+                functions += 1
+            if class_search and class_search(line):
+                classes += 1
+            
+            lowered = line.lower()
+            for keyword in keywords:
+                if keyword in lowered:
+                    complexity += 1
+        
+        stat.total_lines = len(lines)
+        stat.blank_lines += blank
+        stat.comment_lines += comment
+        stat.code_lines += code
+        stat.functions += functions
+        stat.classes += classes
+        stat.complexity_score += complexity
+        return stat
+
+
+_CLASSIFIERS: Dict[str, LineClassifier] = {}
+
+
+def get_classifier(language: str) -> LineClassifier:
+    """Return the (per-process) cached classifier for a language."""
+    classifier = _CLASSIFIERS.get(language)
+    if classifier is None:
+        classifier = _CLASSIFIERS[language] = LineClassifier(language)
+    return classifier
+
+
+def analyze_file(path: str, language: str) -> FileStatistics:
+    """Analyze one file. Module-level so it can run in worker processes."""
+    stat = FileStatistics(path=path, language=language)
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            lines = f.readlines()
+    except Exception:
+        return stat
+    return get_classifier(language).classify(lines, stat)
+
+
+def _analyze_files_job(jobs: List[Tuple[str, str]]) -> List[FileStatistics]:
+    """Worker task: analyze a chunk of (path, language) pairs."""
+    return [analyze_file(path, language) for path, language in jobs]
+
+
+class StatsCache:
+    """
+    Persistent per-file statistics cache.
+    
+    Entries are keyed by path and are valid only while the file's size and
+    mtime (in nanoseconds) are unchanged.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, list] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self.entries = data.get('files', {})
+        except (OSError, ValueError):
+            pass
+    
+    def get(self, path: str, size: int, mtime_ns: int) -> Optional[FileStatistics]:
+        entry = self.entries.get(path)
+        if entry and entry[0] == size and entry[1] == mtime_ns:
+            self.hits += 1
+            return FileStatistics(**entry[2])
+        self.misses += 1
+        return None
+    
+    def put(self, stat: FileStatistics, size: int, mtime_ns: int):
+        self.entries[stat.path] = [size, mtime_ns, asdict(stat)]
+        self._dirty = True
+    
+    def prune(self, live_paths: set):
+        """Drop entries for files that no longer exist in the analyzed tree."""
+        stale = [path for path in self.entries if path not in live_paths]
+        for path in stale:
+            del self.entries[path]
+        self._dirty = self._dirty or bool(stale)
+    
+    def save(self):
+        if not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'files': self.entries}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
 class CodeStatisticsAnalyzer:
     """Main analyzer class for code statistics."""
     
-    def __init__(self, root_path: str = '.'):
+    def __init__(self, root_path: str = '.', workers: Optional[int] = None,
+                 cache_path: Optional[str] = None, use_cache: bool = True):
         self.root_path = Path(root_path)
         self.config = LanguageConfig()
         self.stats = RepositoryStatistics()
+        self.workers = workers or os.cpu_count() or 1
+        self.use_cache = use_cache
+        self.cache_path = cache_path or str(self.root_path / CACHE_FILE_NAME)
+        self.cache: Optional[StatsCache] = None
         
     def detect_language(self, file_path: Path) -> str:
         """Detect programming language from file extension."""
@@ -192,99 +355,95 @@ class CodeStatisticsAnalyzer:
     
     def count_lines_in_file(self, file_path: Path) -> FileStatistics:
         """Count statistics for a single file."""
-        stat = FileStatistics(path=str(file_path), language=self.detect_language(file_path))
-        
-        if self.is_binary_file(file_path):
-            return stat
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-        except Exception:
-            return stat
-        
-        stat.total_lines = len(lines)
-        lang = stat.language
-        patterns = self.config.PATTERNS.get(lang, {})
-        
-        single_comment = self.config.COMMENT_PATTERNS.get(lang, ('', '', ''))[0]
-        ml_start = self.config.COMMENT_PATTERNS.get(lang, ('', '', ''))[1]
-        ml_end = self.config.COMMENT_PATTERNS.get(lang, ('', '', ''))[2]
-        
-        in_multiline_comment = False
-        
-        for line in lines:
-            stripped = line.strip()
-            
-            # Skip empty lines
-            if not stripped:
-                stat.blank_lines += 1
+        return analyze_file(str(file_path), self.detect_language(file_path))
+    
+    def _iter_files(self, directory: Path, exclude_dirs: List[str]) -> Iterator[os.DirEntry]:
+        """Walk the tree with scandir, pruning excluded directories as they are reached."""
+        excluded = set(exclude_dirs)
+        cache_name = os.path.basename(self.cache_path)
+        stack = [str(directory)]
+        while stack:
+            current = stack.pop()
+            try:
+                entries = list(os.scandir(current))
+            except OSError:
                 continue
-            
-            # Check for multi-line comment start/end
-            if ml_start and ml_end:
-                if f'{ml_end}' in stripped and in_multiline_comment:
-                    in_multiline_comment = False
-                    stat.comment_lines += 1
-                    continue
-                if stripped.startswith(ml_start) and not in_multiline_comment:
-                    in_multiline_comment = True
-                    stat.comment_lines += 1
+            for entry in entries:
+                if entry.name in excluded:
                     continue
-                if in_multiline_comment:
-                    stat.comment_lines += 1
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and not entry.name.startswith(cache_name):
+                        yield entry
+                except OSError:
                     continue
-            
-            # Check for single-line comments
-            if single_comment and stripped.startswith(single_comment):
-                stat.comment_lines += 1
-                continue
-            
-            # Count as code line
-            stat.code_lines += 1
-            
-            # Detect functions
-            if 'function' in patterns.get('function', ''):
-                if re.search(patterns['function'], line):
-                    stat.functions += 1
-            elif patterns.get('function') and re.search(patterns['function'], line):
-                stat.functions += 1
-            
-            # Detect classes
-            if patterns.get('class') and re.search(patterns['class'], line):
-                stat.classes += 1
-            
-            # Simple complexity estimation (based on keywords)
-            complexity_keywords = ['if', 'elif', 'else', 'for', 'while', 'case', '&&', '||', '?', 'catch', 'except']
-            for keyword in complexity_keywords:
-                if keyword in line.lower():
-                    stat.complexity_score += 1
-        
-        return stat
     
     def analyze_directory(self, directory: Path = None, exclude_dirs: List[str] = None) -> RepositoryStatistics:
-        """Analyze all files in a directory tree."""
+        """
+        Analyze all files in a directory tree.
+        
+        Files whose (path, size, mtime) match the persistent cache are not
+        re-read; the rest are classified in a process pool when there are
+        enough of them.
+        """
         if directory is None:
             directory = self.root_path
         if exclude_dirs is None:
             exclude_dirs = ['.git', '__pycache__', 'node_modules', '.venv', 'venv', 'dist', 'build']
         
-        for file_path in directory.rglob('*'):
-            if file_path.is_file():
-                # Check if file is in excluded directory
-                should_exclude = False
-                for excl in exclude_dirs:
-                    if excl in file_path.parts:
-                        should_exclude = True
-                        break
-                
-                if not should_exclude:
-                    file_stat = self.count_lines_in_file(file_path)
-                    self.stats.files.append(file_stat)
+        self.stats = RepositoryStatistics()
+        self.cache = StatsCache(self.cache_path) if self.use_cache else None
+        
+        results: List[Optional[FileStatistics]] = []
+        pending: List[Tuple[int, str, str, int, int]] = []
+        live_paths = set()
+        
+        for entry in self._iter_files(Path(directory), exclude_dirs):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            path = os.path.normpath(entry.path)
+            live_paths.add(path)
+            cached = self.cache.get(path, st.st_size, st.st_mtime_ns) if self.cache else None
+            if cached is not None:
+                results.append(cached)
+            else:
+                results.append(None)
+                language = self.config.EXTENSIONS.get(os.path.splitext(entry.name)[1].lower(), 'Plain Text')
+                pending.append((len(results) - 1, path, language, st.st_size, st.st_mtime_ns))
+        
+        for (index, _, _, size, mtime_ns), file_stat in zip(pending, self._analyze_pending(pending)):
+            results[index] = file_stat
+            if self.cache:
+                self.cache.put(file_stat, size, mtime_ns)
+        
+        if self.cache:
+            self.cache.prune(live_paths)
+            try:
+                self.cache.save()
+            except OSError:
+                pass
         
+        self.stats.files = results
         self._aggregate_statistics()
         return self.stats
     
+    def _analyze_pending(self, pending: List[Tuple[int, str, str, int, int]]) -> Iterator[FileStatistics]:
+        """Classify uncached files, fanning out to worker processes for large batches."""
+        jobs = [(path, language) for _, path, language, _, _ in pending]
+        if self.workers <= 1 or len(jobs) < PARALLEL_MIN_FILES:
+            for path, language in jobs:
+                yield analyze_file(path, language)
+            return
+        
+        chunk = max(16, len(jobs) // (self.workers * 8))
+        chunks = [jobs[i:i + chunk] for i in range(0, len(jobs), chunk)]
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for part in executor.map(_analyze_files_job, chunks):
+                yield from part
+    
     def _aggregate_statistics(self):
         """Aggregate statistics from all files."""
         self.stats.total_files = len(self.stats.files)
@@ -417,6 +576,11 @@ def main():
     parser.add_argument("--json", "-j", dest="json_output", help="Export to JSON file")
     parser.add_argument("--exclude", "-e", dest="exclude", default=".git,__pycache__,node_modules",
                        help="Comma-separated directories to exclude")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                       help="Worker processes for uncached files (default: CPU count)")
+    parser.add_argument("--cache", dest="cache_path", default=None,
+                       help=f"Per-file stats cache path (default: <path>/{CACHE_FILE_NAME})")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the per-file stats cache")
     
     args = parser.parse_args()
     
@@ -426,8 +590,12 @@ def main():
     print(f"🚫 Excluding: {', '.join(exclude_dirs)}")
     print()
     
-    analyzer = CodeStatisticsAnalyzer(args.path)
+    analyzer = CodeStatisticsAnalyzer(args.path, workers=args.workers,
+                                      cache_path=args.cache_path, use_cache=not args.no_cache)
     analyzer.analyze_directory(exclude_dirs=exclude_dirs)
+    if analyzer.cache:
+        print(f"🗄️  Cache: {analyzer.cache.hits:,} hits, {analyzer.cache.misses:,} analyzed")
+        print()
     analyzer.print_report()
     
     if args.json_output:
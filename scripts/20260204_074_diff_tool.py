@@ -9,17 +9,22 @@ Code Diff Tool - 代码差异对比工具
 - 多种diff格式输出 (unified, side-by-side, minimal)
 - 相似度计算
 - 变更统计
+- 目录对比 (相同文件按大小/哈希跳过，多进程并行)
 
 Author: MarsAssistant-Code-Journey
 Date: 2026-02-04
 """
 
 import difflib
+import hashlib
+import json
 import os
 import sys
-from dataclasses import dataclass
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Optional, Tuple, Callable
+from typing import Dict, Iterator, List, Optional, Tuple, Callable
 
 
 class DiffFormat(Enum):
@@ -57,6 +62,95 @@ class DiffResult:
     similarity: float         # 相似度 (0-1)
 
 
+@dataclass
+class DirectoryDiffResult:
+    """目录对比结果"""
+    report_path: str
+    counts: Dict[str, int] = field(default_factory=dict)   # 状态 -> 文件数
+    added_lines: int = 0
+    deleted_lines: int = 0
+    elapsed: float = 0.0
+
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def _file_hash(path: str) -> str:
+    """分块计算文件哈希"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _scan_files(root: str) -> Dict[str, int]:
+    """递归收集目录下的文件: {相对路径: 大小}"""
+    files = {}
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(root, rel_dir)) as entries:
+                for entry in entries:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(rel_path)
+                    elif entry.is_file(follow_symlinks=False):
+                        files[rel_path] = entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+    return files
+
+
+def _diff_file_pair(job: Tuple[str, str, str, bool]) -> dict:
+    """子进程任务: 大小相同先比哈希，不同才做行级对比"""
+    rel_path, path_a, path_b, same_size = job
+    try:
+        if same_size and _file_hash(path_a) == _file_hash(path_b):
+            return {'path': rel_path, 'status': 'identical'}
+        try:
+            with open(path_a, 'r', encoding='utf-8') as f:
+                lines_a = f.read().splitlines()
+            with open(path_b, 'r', encoding='utf-8') as f:
+                lines_b = f.read().splitlines()
+        except UnicodeDecodeError:
+            return {'path': rel_path, 'status': 'binary'}
+        
+        tool = DiffTool(colorize=False)
+        result = tool.diff_text(lines_a, lines_b)
+        if result.stats['added_lines'] == 0 and result.stats['deleted_lines'] == 0:
+            return {'path': rel_path, 'status': 'identical'}
+        return {
+            'path': rel_path,
+            'status': 'modified',
+            'similarity': result.similarity,
+            'added_lines': result.stats['added_lines'],
+            'deleted_lines': result.stats['deleted_lines'],
+            'diff': tool.format_unified(result, f"a/{rel_path}", f"b/{rel_path}")
+        }
+    except OSError as e:
+        return {'path': rel_path, 'status': 'error', 'error': str(e)}
+
+
+def _run_pool(jobs, workers: int) -> Iterator[dict]:
+    """进程池执行，在途任务数有上限，结果按完成顺序返回"""
+    if workers <= 1:
+        for job in jobs:
+            yield _diff_file_pair(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for job in jobs:
+            pending.add(executor.submit(_diff_file_pair, job))
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+
+
 class DiffTool:
     """代码差异对比工具"""
     
@@ -195,12 +289,56 @@ class DiffTool:
     def diff_text(self, text_a: List[str], text_b: List[str], 
                   name_a: str = "A", name_b: str = "B") -> DiffResult:
         """对比两段文本"""
+        if text_a == text_b:
+            # 内容相同时无需匹配
+            lines = [
+                DiffLine(line_num_a=i, line_num_b=i, content=line,
+                         change_type=ChangeType.UNCHANGED, prefix='  ')
+                for i, line in enumerate(text_a, 1)
+            ]
+            return DiffResult(lines=lines, stats=self._calculate_stats(lines), similarity=1.0)
+        
         lines = self._detect_changes(text_a, text_b)
         stats = self._calculate_stats(lines)
         similarity = self._calculate_similarity(text_a, text_b)
         
         return DiffResult(lines=lines, stats=stats, similarity=similarity)
     
+    def diff_directories(self, dir_a: str, dir_b: str, report_path: str = "diff_report.jsonl",
+                         workers: Optional[int] = None) -> DirectoryDiffResult:
+        """对比两个目录
+        
+        按相对路径配对文件；大小和哈希都相同的直接判定为相同，其余在进程池中做行级对比。
+        每个文件的结果一完成就作为一行 JSON 写入 report_path，内存占用不随文件数增长。
+        """
+        start = time.perf_counter()
+        files_a = _scan_files(dir_a)
+        files_b = _scan_files(dir_b)
+        result = DirectoryDiffResult(report_path=report_path)
+        
+        with open(report_path, 'w', encoding='utf-8') as report:
+            def emit(record: dict):
+                result.counts[record['status']] = result.counts.get(record['status'], 0) + 1
+                result.added_lines += record.get('added_lines', 0)
+                result.deleted_lines += record.get('deleted_lines', 0)
+                report.write(json.dumps(record, ensure_ascii=False) + '\n')
+            
+            for rel_path in sorted(files_a.keys() - files_b.keys()):
+                emit({'path': rel_path, 'status': 'deleted'})
+            for rel_path in sorted(files_b.keys() - files_a.keys()):
+                emit({'path': rel_path, 'status': 'added'})
+            
+            jobs = (
+                (rel_path, os.path.join(dir_a, rel_path), os.path.join(dir_b, rel_path),
+                 files_a[rel_path] == files_b[rel_path])
+                for rel_path in sorted(files_a.keys() & files_b.keys())
+            )
+            for record in _run_pool(jobs, workers or os.cpu_count() or 1):
+                emit(record)
+        
+        result.elapsed = time.perf_counter() - start
+        return result
+    
     def format_unified(self, result: DiffResult, name_a: str = "A", 
                        name_b: str = "B", context: int = 3) -> str:
         """统一格式输出 (类似git diff)"""
@@ -396,6 +534,17 @@ def file_diff(path_a: str, path_b: str,
 
 # 使用示例
 if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == '--dir':
+        # 目录对比: --dir <目录A> <目录B> [报告文件]
+        report_path = sys.argv[4] if len(sys.argv) > 4 else "diff_report.jsonl"
+        summary = DiffTool().diff_directories(sys.argv[2], sys.argv[3], report_path)
+        print(f"📁 {sys.argv[2]} → {sys.argv[3]}  ({summary.elapsed:.2f}s)")
+        for status, count in sorted(summary.counts.items()):
+            print(f"  {status}: {count}")
+        print(f"  +{summary.added_lines} -{summary.deleted_lines} 行")
+        print(f"报告已保存到: {summary.report_path}")
+        sys.exit(0)
+    
     # 示例1: 文本对比
     print("\n" + "="*60)
     print("示例1: 文本对比")
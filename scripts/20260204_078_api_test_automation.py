@@ -10,25 +10,50 @@ A powerful tool for automated API testing with:
 - Environment variable management
 - Report generation (JSON/HTML)
 - Request/Response logging
+- Parallel execution with dependencies, ordering groups and per-host connection limits
+- Load testing (open/closed model) with HDR-style, coordinated-omission-corrected latency
 
 Author: MarsAssistant
 Date: 2026-02-04
 """
 
 import json
+import math
 import time
 import uuid
 import yaml
+import heapq
+import asyncio
 import hashlib
+import argparse
+import itertools
+import threading
 import re
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Dict, List, Any, Optional, Callable
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 from urllib.parse import urljoin
 import requests
+from requests.adapters import HTTPAdapter
 from jsonschema import validate, ValidationError as JSONSchemaError
 
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+
+# 并发运行时每个主机的最大连接数
+DEFAULT_MAX_PER_HOST = 10
+
+# 延迟直方图每个数量级内的子桶位数，11 位约等于 3 位有效数字的精度
+HISTOGRAM_SUB_BUCKET_BITS = 11
+DEFAULT_PERCENTILES = (50.0, 90.0, 95.0, 99.0, 99.9)
+
 
 class HTTPMethod(Enum):
     """HTTP请求方法枚举"""
@@ -151,6 +176,9 @@ class TestCase:
     enabled: bool = True
     retry_count: int = 0
     retry_delay: int = 1
+    depends_on: List[str] = field(default_factory=list)  # 依赖的用例名称，全部通过后才运行
+    group: Optional[str] = None  # 顺序组，同组用例按声明顺序逐个运行
+    weight: int = 1  # 压测时在场景中的请求占比
     
     def get_id(self) -> str:
         """生成测试用例ID"""
@@ -255,7 +283,10 @@ class Environment:
 class APITestRunner:
     """API测试运行器"""
     
-    def __init__(self, environment: Optional[Environment] = None):
+    def __init__(self,
+                 environment: Optional[Environment] = None,
+                 max_workers: int = 1,
+                 max_per_host: int = DEFAULT_MAX_PER_HOST):
         self.environment = environment or Environment(
             name="default",
             base_url=""
@@ -264,11 +295,18 @@ class APITestRunner:
         self.results: List[TestResultInfo] = []
         self.session = requests.Session()
         self.global_headers: Dict[str, str] = {}
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
         
         # 配置会话
         self.session.timeout = self.environment.timeout
         self.session.verify = True
         
+        # 每个主机一个连接池，pool_block 使超出上限的请求等待空闲连接而不是新建连接
+        adapter = HTTPAdapter(pool_maxsize=max_per_host, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
         # 添加环境默认头
         for header in self.environment.headers:
             self.global_headers[header.name] = header.value
@@ -320,13 +358,22 @@ class APITestRunner:
             allow_redirects=request.allow_redirects
         )
     
-    def _execute_request(self, request: RequestConfig) -> requests.Response:
-        """执行HTTP请求"""
-        # 合并请求头
+    def _merge_headers(self, request: RequestConfig) -> Dict[str, str]:
+        """合并全局请求头与用例请求头"""
         headers = self.global_headers.copy()
         for h in request.get_headers_dict():
             headers[h] = self.environment.interpolate(str(headers.get(h, "")))
             headers[h] = self.environment.interpolate(str(request.get_headers_dict()[h]))
+        return headers
+    
+    def _execute_request(self,
+                         request: RequestConfig,
+                         session: Optional[requests.Session] = None) -> requests.Response:
+        """执行HTTP请求，session 默认为运行器自身的会话"""
+        session = session or self.session
+        
+        # 合并请求头
+        headers = self._merge_headers(request)
         
         # 准备请求体
         body = request.prepare_body()
@@ -335,7 +382,7 @@ class APITestRunner:
         method = request.get_method()
         
         if method == "GET":
-            response = self.session.get(
+            response = session.get(
                 request.url,
                 params=request.get_params(),
                 headers=headers,
@@ -346,7 +393,7 @@ class APITestRunner:
         elif method == "POST":
             if request.get_body_type() == "json":
                 headers["Content-Type"] = headers.get("Content-Type", "application/json")
-                response = self.session.post(
+                response = session.post(
                     request.url,
                     params=request.get_params(),
                     headers=headers,
@@ -356,7 +403,7 @@ class APITestRunner:
                     allow_redirects=request.allow_redirects
                 )
             else:
-                response = self.session.post(
+                response = session.post(
                     request.url,
                     params=request.get_params(),
                     headers=headers,
@@ -366,7 +413,7 @@ class APITestRunner:
                     allow_redirects=request.allow_redirects
                 )
         elif method == "PUT":
-            response = self.session.put(
+            response = session.put(
                 request.url,
                 params=request.get_params(),
                 headers=headers,
@@ -376,7 +423,7 @@ class APITestRunner:
                 allow_redirects=request.allow_redirects
             )
         elif method == "PATCH":
-            response = self.session.patch(
+            response = session.patch(
                 request.url,
                 params=request.get_params(),
                 headers=headers,
@@ -386,7 +433,7 @@ class APITestRunner:
                 allow_redirects=request.allow_redirects
             )
         elif method == "DELETE":
-            response = self.session.delete(
+            response = session.delete(
                 request.url,
                 params=request.get_params(),
                 headers=headers,
@@ -395,7 +442,7 @@ class APITestRunner:
                 allow_redirects=request.allow_redirects
             )
         elif method == "HEAD":
-            response = self.session.head(
+            response = session.head(
                 request.url,
                 params=request.get_params(),
                 headers=headers,
@@ -404,7 +451,7 @@ class APITestRunner:
                 allow_redirects=request.allow_redirects
             )
         elif method == "OPTIONS":
-            response = self.session.options(
+            response = session.options(
                 request.url,
                 params=request.get_params(),
                 headers=headers,
@@ -501,7 +548,8 @@ class APITestRunner:
             passed = False
             msg = f"JSON schema validation failed: {str(e)}"
         except Exception as e:
-            passed = False            msg = f"Assertion error: {str(e)}"
+            passed = False
+            msg = f"Assertion error: {str(e)}"
         
         return passed, msg
     
@@ -583,14 +631,10 @@ class APITestRunner:
             details=details
         )
     
-    def run_all(self, 
-               tags: Optional[List[str]] = None,
-               name_filter: Optional[str] = None,
-               stop_on_failure: bool = False) -> List[TestResultInfo]:
-        """运行所有测试用例"""
-        self.results = []
-        
-        # 过滤测试用例
+    def _filter_cases(self,
+                      tags: Optional[List[str]] = None,
+                      name_filter: Optional[str] = None) -> List[TestCase]:
+        """按启用状态、标签和名称过滤测试用例"""
         filtered_cases = []
         for tc in self.test_cases:
             if not tc.enabled:
@@ -604,41 +648,166 @@ class APITestRunner:
                 continue
             
             filtered_cases.append(tc)
+        return filtered_cases
+    
+    def _check_ready(self,
+                     index: int,
+                     cases: List[TestCase],
+                     positions: Dict[str, int],
+                     group_prev: Dict[int, int],
+                     finished: Dict[int, TestResultInfo]) -> tuple[bool, Optional[str]]:
+        """检查用例能否运行，返回 (是否就绪, 跳过原因)"""
+        prev = group_prev.get(index)
+        if prev is not None and prev not in finished:
+            return False, None
         
-        # 运行测试
-        for i, test_case in enumerate(filtered_cases):
-            print(f"[{i+1}/{len(filtered_cases)}] Running: {test_case.name}")
-            
-            # 重试逻辑
-            for attempt in range(tc.retry_count + 1):
-                result = self.run_test_case(test_case)
+        for name in cases[index].depends_on:
+            dep = positions.get(name)
+            if dep is None:
+                return True, f"Dependency '{name}' is not part of this run"
+            if dep not in finished:
+                return False, None
+            if finished[dep].result != TestResult.PASS:
+                return True, f"Dependency '{name}' did not pass ({finished[dep].result.value})"
+        
+        return True, None
+    
+    def _print_result(self, result: TestResultInfo, done: int, total: int) -> None:
+        """打印单个用例的结果"""
+        status_symbol = "✅" if result.result == TestResult.PASS else ("❌" if result.result == TestResult.FAIL else "⚠️")
+        print(f"[{done}/{total}] {status_symbol} {result.result.value} {result.test_case.name} ({result.get_duration():.2f}s)")
+        
+        if result.result != TestResult.PASS and result.error_message:
+            print(f"    Error: {result.error_message}")
+        
+        if result.assertions_failed > 0:
+            for detail in result.details:
+                if not detail["passed"]:
+                    print(f"    ❌ {detail['message']}")
+    
+    def run_all(self, 
+               tags: Optional[List[str]] = None,
+               name_filter: Optional[str] = None,
+               stop_on_failure: bool = False,
+               workers: Optional[int] = None,
+               on_result: Optional[Callable[[TestResultInfo], None]] = None,
+               stream_path: Optional[str] = None) -> List[TestResultInfo]:
+        """
+        运行所有测试用例
+        
+        用例在线程池中并发执行，workers=1 时等价于按声明顺序串行执行：
+        - depends_on 中的用例全部通过后才运行，任一依赖未通过则记为 SKIP
+        - 同一 group 的用例按声明顺序逐个运行（只要求前一个完成，不要求通过）
+        - 重试在 retry_delay 之后重新调度，等待期间不占用工作线程
+        
+        每个用例完成后立即打印进度、调用 on_result，并追加到 stream_path (JSON Lines)。
+        这些都在调用线程中执行，回调无需考虑线程安全。返回结果按声明顺序排列。
+        """
+        self.results = []
+        cases = self._filter_cases(tags, name_filter)
+        total = len(cases)
+        workers = max(1, workers or self.max_workers)
+        positions = {tc.name: i for i, tc in enumerate(cases)}
+        
+        group_prev: Dict[int, int] = {}
+        last_in_group: Dict[str, int] = {}
+        for i, tc in enumerate(cases):
+            if tc.group is not None:
+                if tc.group in last_in_group:
+                    group_prev[i] = last_in_group[tc.group]
+                last_in_group[tc.group] = i
+        
+        finished: Dict[int, TestResultInfo] = {}
+        pending = list(range(total))          # 尚未调度，保持声明顺序
+        retries: List[tuple] = []             # 堆: (可重试时间, 序号, 下次尝试次数)
+        running: Dict[Any, tuple] = {}        # future -> (序号, 尝试次数)
+        stopping = False
+        stream = open(stream_path, 'w', encoding='utf-8') if stream_path else None
+        
+        def finish(i: int, result: TestResultInfo) -> None:
+            finished[i] = result
+            self._print_result(result, len(finished), total)
+            if stream:
+                stream.write(json.dumps(result.to_dict(), ensure_ascii=False, default=str) + "\n")
+                stream.flush()
+            if on_result:
+                on_result(result)
+        
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            while running or retries or (pending and not stopping):
+                now = time.monotonic()
                 
-                if result.result == TestResult.PASS:
-                    break
+                # 到期的重试优先占用空闲线程
+                while retries and retries[0][0] <= now and len(running) < workers:
+                    _, i, attempt = heapq.heappop(retries)
+                    running[executor.submit(self.run_test_case, cases[i])] = (i, attempt)
                 
-                if attempt < tc.retry_count:
-                    print(f"  Retry {attempt + 1}/{tc.retry_count}...")
-                    time.sleep(tc.retry_delay)
-            
-            self.results.append(result)
-            
-            # 打印结果
-            status_symbol = "✅" if result.result == TestResult.PASS else ("❌" if result.result == TestResult.FAIL else "⚠️")
-            print(f"  {status_symbol} {result.result.value} ({result.get_duration():.2f}s)")
-            
-            if result.result != TestResult.PASS and error_message := result.error_message:
-                print(f"    Error: {error_message}")
-            
-            if result.assertions_failed > 0:
-                for detail in result.details:
-                    if not detail["passed"]:
-                        print(f"    ❌ {detail['message']}")
-            
-            # 失败时停止
-            if stop_on_failure and result.result == TestResult.FAIL:
-                print("Stopping due to failure...")
-                break
+                if not stopping:
+                    waiting = []
+                    for i in pending:
+                        if len(running) >= workers:
+                            waiting.append(i)
+                            continue
+                        ready, skip_reason = self._check_ready(i, cases, positions, group_prev, finished)
+                        if not ready:
+                            waiting.append(i)
+                        elif skip_reason:
+                            skipped_at = datetime.now()
+                            finish(i, TestResultInfo(
+                                test_case=cases[i],
+                                result=TestResult.SKIP,
+                                start_time=skipped_at,
+                                end_time=skipped_at,
+                                error_message=skip_reason
+                            ))
+                        else:
+                            running[executor.submit(self.run_test_case, cases[i])] = (i, 0)
+                    pending = waiting
+                
+                if not running:
+                    if retries:
+                        time.sleep(max(0.0, retries[0][0] - time.monotonic()))
+                        continue
+                    if pending and not stopping:
+                        # 没有运行中的用例却仍有用例无法就绪，说明依赖成环
+                        skipped_at = datetime.now()
+                        for i in pending:
+                            finish(i, TestResultInfo(
+                                test_case=cases[i],
+                                result=TestResult.SKIP,
+                                start_time=skipped_at,
+                                end_time=skipped_at,
+                                error_message="Dependency cycle detected"
+                            ))
+                        pending = []
+                    continue
+                
+                timeout = max(0.0, retries[0][0] - time.monotonic()) if retries else None
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    i, attempt = running.pop(future)
+                    test_case = cases[i]
+                    result = future.result()
+                    
+                    if result.result != TestResult.PASS and attempt < test_case.retry_count:
+                        print(f"  Retry {attempt + 1}/{test_case.retry_count}: {test_case.name}")
+                        heapq.heappush(retries, (time.monotonic() + test_case.retry_delay, i, attempt + 1))
+                        continue
+                    
+                    finish(i, result)
+                    
+                    # 失败时停止调度新用例，已在运行的用例照常完成
+                    if stop_on_failure and result.result == TestResult.FAIL and not stopping:
+                        print("Stopping due to failure...")
+                        stopping = True
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if stream:
+                stream.close()
         
+        self.results = [finished[i] for i in sorted(finished)]
         return self.results
     
     def get_summary(self) -> Dict:
@@ -864,6 +1033,624 @@ class APITestRunner:
         return html
 
 
+# ==================== 测试套件文件 ====================
+
+def _parse_headers(raw: Any) -> List[Header]:
+    """解析 {名称: 值} 或 [{name, value}] 两种请求头写法"""
+    if isinstance(raw, dict):
+        return [Header(str(k), str(v)) for k, v in raw.items()]
+    return [Header(**h) for h in raw or []]
+
+
+def load_test_suite(path: str) -> tuple[Optional[Environment], List[TestCase]]:
+    """
+    从 YAML/JSON 文件加载测试套件
+    
+    文件可以是用例列表，也可以是 {"environment": {...}, "tests": [...]}；
+    用例的请求字段可以平铺，也可以放在 request 子键中。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    
+    if isinstance(data, list):
+        data = {"tests": data}
+    
+    environment = None
+    env_data = data.get("environment")
+    if env_data:
+        environment = Environment(
+            name=env_data.get("name", "default"),
+            base_url=env_data.get("base_url", ""),
+            variables=env_data.get("variables", {}),
+            headers=_parse_headers(env_data.get("headers")),
+            timeout=env_data.get("timeout", 30)
+        )
+    
+    test_cases = []
+    for item in data.get("tests", []):
+        req = item.get("request", item)
+        request = RequestConfig(
+            method=HTTPMethod(req.get("method", "GET").upper()),
+            url=req["url"],
+            headers=_parse_headers(req.get("headers")),
+            params=req.get("params", {}),
+            body=req.get("body"),
+            body_type=req.get("body_type", "json"),
+            timeout=req.get("timeout", 30),
+            verify_ssl=req.get("verify_ssl", True),
+            allow_redirects=req.get("allow_redirects", True)
+        )
+        assertions = [
+            Assertion(
+                type=AssertionType(a["type"]),
+                expected=a.get("expected"),
+                json_path=a.get("json_path"),
+                message=a.get("message")
+            )
+            for a in item.get("assertions", [])
+        ]
+        test_cases.append(TestCase(
+            name=item["name"],
+            request=request,
+            assertions=assertions,
+            tags=item.get("tags", []),
+            enabled=item.get("enabled", True),
+            retry_count=item.get("retry_count", 0),
+            retry_delay=item.get("retry_delay", 1),
+            depends_on=item.get("depends_on", []),
+            group=item.get("group"),
+            weight=item.get("weight", 1)
+        ))
+    
+    return environment, test_cases
+
+
+# ==================== 压测 ====================
+
+class LatencyHistogram:
+    """
+    HDR 风格的延迟直方图（对数-线性分桶，单位微秒）
+    
+    小于 2^bits 的值精确记录；更大的值按二进制数量级分段，每段再细分为
+    2^(bits-1) 个子桶，相对误差不超过 2^-(bits-1)。计数存放在稀疏字典中，
+    记录是 O(1)，内存只与出现过的桶数有关，与样本数无关。
+    """
+    
+    def __init__(self, sub_bucket_bits: int = HISTOGRAM_SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts: Dict[int, int] = {}
+        self.total_count = 0
+        self.total_value = 0
+        self.min_value: Optional[int] = None
+        self.max_value = 0
+    
+    def _bucket_key(self, value: int) -> int:
+        """桶编号随数值单调递增：高位是数量级，低位是子桶"""
+        shift = value.bit_length() - self.sub_bucket_bits
+        if shift <= 0:
+            return value
+        return (shift << self.sub_bucket_bits) | (value >> shift)
+    
+    def _highest_equivalent(self, key: int) -> int:
+        """桶内可表示的最大值"""
+        shift = key >> self.sub_bucket_bits
+        if shift == 0:
+            return key
+        sub_bucket = key & ((1 << self.sub_bucket_bits) - 1)
+        return ((sub_bucket + 1) << shift) - 1
+    
+    def record(self, value_us: float, count: int = 1) -> None:
+        """记录一个延迟值（微秒）"""
+        value = max(0, int(value_us))
+        key = self._bucket_key(value)
+        self.counts[key] = self.counts.get(key, 0) + count
+        self.total_count += count
+        self.total_value += value * count
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if value > self.max_value:
+            self.max_value = value
+    
+    def merge(self, other: 'LatencyHistogram') -> None:
+        """合并另一个直方图（子桶位数必须相同）"""
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("Cannot merge histograms with different precision")
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.total_count += other.total_count
+        self.total_value += other.total_value
+        if other.min_value is not None and (self.min_value is None or other.min_value < self.min_value):
+            self.min_value = other.min_value
+        self.max_value = max(self.max_value, other.max_value)
+    
+    def percentiles(self, percentiles: tuple = DEFAULT_PERCENTILES) -> Dict[float, int]:
+        """一次遍历计算多个百分位，返回 {百分位: 微秒}"""
+        if not self.total_count:
+            return {p: 0 for p in percentiles}
+        
+        targets = [(p, max(1, math.ceil(p / 100.0 * self.total_count))) for p in sorted(percentiles)]
+        result = {}
+        cumulative = 0
+        for key in sorted(self.counts):
+            cumulative += self.counts[key]
+            while targets and cumulative >= targets[0][1]:
+                result[targets.pop(0)[0]] = min(self._highest_equivalent(key), self.max_value)
+            if not targets:
+                break
+        return result
+    
+    def value_at_percentile(self, percentile: float) -> int:
+        """获取单个百分位的值（微秒）"""
+        return self.percentiles((percentile,))[percentile]
+    
+    @property
+    def mean(self) -> float:
+        return self.total_value / self.total_count if self.total_count else 0.0
+    
+    def summary_ms(self, percentiles: tuple = DEFAULT_PERCENTILES) -> Dict[str, float]:
+        """以毫秒为单位的统计摘要"""
+        summary = {
+            "count": self.total_count,
+            "min_ms": round((self.min_value or 0) / 1000, 3),
+            "mean_ms": round(self.mean / 1000, 3),
+            "max_ms": round(self.max_value / 1000, 3)
+        }
+        for p, value in self.percentiles(percentiles).items():
+            summary[f"p{p:g}_ms"] = round(value / 1000, 3)
+        return summary
+
+
+@dataclass
+class LoadTestConfig:
+    """压测配置"""
+    model: str = "open"               # open: 按目标 RPS 发送; closed: 固定数量的虚拟用户循环发送
+    rate: float = 10.0                # 开放模型的目标 RPS
+    users: int = 10                   # 闭合模型的虚拟用户数
+    duration: float = 10.0            # 持续时间（秒）
+    max_concurrency: int = 100        # 开放模型最多同时在途的请求数
+    pacing: Optional[float] = None    # 闭合模型中每个用户相邻两次请求开始的间隔（秒）
+    think_time: float = 0.0           # 闭合模型中每次请求完成后的等待（秒）
+    engine: str = "thread"            # thread 或 asyncio
+    check_assertions: bool = True     # 按用例断言判定成功，否则只看状态码 < 400
+    timeline_interval: float = 1.0    # 时间线的统计粒度（秒）
+    
+    def __post_init__(self):
+        if self.model not in ("open", "closed"):
+            raise ValueError(f"Unknown load model: {self.model}")
+        if self.engine not in ("thread", "asyncio"):
+            raise ValueError(f"Unknown load engine: {self.engine}")
+        if self.model == "open" and self.rate <= 0:
+            raise ValueError("Open model requires a positive rate")
+    
+    def concurrency(self) -> int:
+        """同时在途请求数的上限，也是连接池大小"""
+        return self.max_concurrency if self.model == "open" else self.users
+
+
+@dataclass
+class _TimelineSlot:
+    """时间线中一个统计区间"""
+    requests: int = 0
+    errors: int = 0
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+
+class _LoadRecorder:
+    """线程安全的压测数据收集器"""
+    
+    def __init__(self, start: float, interval: float):
+        self.start = start
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.latency = LatencyHistogram()
+        self.corrected = LatencyHistogram()
+        self.slots: Dict[int, _TimelineSlot] = {}
+        self.errors_by_type: Dict[str, int] = {}
+        self.requests = 0
+        self.errors = 0
+    
+    def record(self, intended: float, started: float, ended: float, error: Optional[str]) -> None:
+        slot_index = max(0, int((ended - self.start) / self.interval))
+        with self.lock:
+            self.requests += 1
+            self.latency.record((ended - started) * 1e6)
+            self.corrected.record((ended - intended) * 1e6)
+            
+            slot = self.slots.get(slot_index)
+            if slot is None:
+                slot = self.slots[slot_index] = _TimelineSlot()
+            slot.requests += 1
+            slot.histogram.record((ended - intended) * 1e6)
+            
+            if error is not None:
+                self.errors += 1
+                slot.errors += 1
+                self.errors_by_type[error] = self.errors_by_type.get(error, 0) + 1
+    
+    def timeline(self) -> List[Dict]:
+        rows = []
+        for index in range(max(self.slots) + 1 if self.slots else 0):
+            slot = self.slots.get(index) or _TimelineSlot()
+            rows.append({
+                "time": round(index * self.interval, 3),
+                "requests": slot.requests,
+                "rps": round(slot.requests / self.interval, 2),
+                "errors": slot.errors,
+                "error_rate": round(slot.errors / slot.requests, 4) if slot.requests else 0.0,
+                "p99_ms": round(slot.histogram.value_at_percentile(99.0) / 1000, 3)
+            })
+        return rows
+
+
+@dataclass
+class LoadTestReport:
+    """压测报告"""
+    config: LoadTestConfig
+    elapsed: float
+    total_requests: int
+    errors: int
+    errors_by_type: Dict[str, int]
+    latency: LatencyHistogram       # 服务时间：实际发出 → 完成
+    corrected: LatencyHistogram     # 修正协调遗漏：计划发出 → 完成
+    timeline: List[Dict]
+    
+    @property
+    def throughput(self) -> float:
+        return self.total_requests / self.elapsed if self.elapsed > 0 else 0.0
+    
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.total_requests if self.total_requests else 0.0
+    
+    def to_dict(self) -> Dict:
+        """转换为字典"""
+        return {
+            "config": asdict(self.config),
+            "elapsed": round(self.elapsed, 3),
+            "total_requests": self.total_requests,
+            "throughput": round(self.throughput, 2),
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 4),
+            "errors_by_type": self.errors_by_type,
+            "latency": self.latency.summary_ms(),
+            "corrected_latency": self.corrected.summary_ms(),
+            "timeline": self.timeline
+        }
+    
+    def format(self) -> str:
+        """生成文本报告"""
+        config = self.config
+        if config.model == "open":
+            target = f"target {config.rate:g} rps, max {config.max_concurrency} in flight"
+        else:
+            target = f"{config.users} users" + (f", pacing {config.pacing:g}s" if config.pacing else "")
+        lines = [
+            f"Load test: {config.model} model, {target}, {config.duration:g}s, engine={config.engine}",
+            f"Requests: {self.total_requests} ({self.throughput:.1f} rps), "
+            f"errors: {self.errors} ({self.error_rate * 100:.2f}%)",
+            "",
+            f"{'latency (ms)':<16}" + "".join(f"{f'p{p:g}':>10}" for p in DEFAULT_PERCENTILES) + f"{'max':>10}"
+        ]
+        for label, histogram in (("service", self.latency), ("corrected", self.corrected)):
+            values = histogram.percentiles()
+            lines.append(f"{label:<16}" + "".join(f"{values[p] / 1000:>10.2f}" for p in DEFAULT_PERCENTILES)
+                         + f"{histogram.max_value / 1000:>10.2f}")
+        
+        if self.errors_by_type:
+            lines.append("")
+            lines.append("Errors: " + ", ".join(f"{k}={v}" for k, v in sorted(self.errors_by_type.items())))
+        
+        lines.append("")
+        lines.append(f"{'t(s)':>8}{'rps':>10}{'err%':>8}{'p99(ms)':>10}")
+        for row in self.timeline:
+            lines.append(f"{row['time']:>8g}{row['rps']:>10.1f}{row['error_rate'] * 100:>8.2f}{row['p99_ms']:>10.2f}")
+        return "\n".join(lines)
+
+
+@dataclass
+class _LoadResponse:
+    """异步引擎的响应，提供断言所需的 requests.Response 同名属性"""
+    status_code: int
+    headers: Any
+    elapsed: timedelta
+    content: bytes
+    url: str = ""
+    
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+    
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+# 需要解析响应体的断言类型
+_BODY_ASSERTIONS = {AssertionType.JSON_SCHEMA, AssertionType.JSON_PATH, AssertionType.CUSTOM}
+
+
+class LoadTestRunner:
+    """
+    压测运行器：把功能测试用例当作压测场景复用
+    
+    开放模型按目标 RPS 预先确定每个请求的计划发出时间，服务变慢也不会减速；
+    闭合模型由固定数量的虚拟用户循环发送请求。用例按 weight 混合，
+    depends_on/group 只影响功能测试，压测时忽略。
+    
+    每个请求同时记录服务时间（实际发出 → 完成）和修正协调遗漏后的响应时间
+    （计划发出 → 完成）。在途请求已满或服务卡顿时，发送端被推迟的时间只计入
+    后者；只看服务时间会让卡顿期间"没来得及发出"的请求从统计中消失，
+    尾延迟被严重低估。闭合模型只有设置 pacing 才有计划时间，否则两者相同。
+    """
+    
+    def __init__(self, runner: APITestRunner):
+        self.runner = runner
+    
+    def _prepare(self, cases: List[TestCase]) -> List[tuple]:
+        """按权重展开场景，预先构建请求，环境变量插值只做一次"""
+        schedule = []
+        for test_case in cases:
+            prepared = (test_case, self.runner._build_request(test_case))
+            schedule.extend([prepared] * max(1, test_case.weight))
+        return schedule
+    
+    def _check_response(self, test_case: TestCase, response: Any, check_assertions: bool) -> Optional[str]:
+        """判定一次请求是否成功，返回错误类型，成功时返回 None"""
+        if not (check_assertions and test_case.assertions):
+            return f"http_{response.status_code}" if response.status_code >= 400 else None
+        
+        response_data = None
+        if any(a.type in _BODY_ASSERTIONS for a in test_case.assertions):
+            if "application/json" in response.headers.get("Content-Type", ""):
+                try:
+                    response_data = response.json()
+                except ValueError:
+                    response_data = None
+        
+        for assertion in test_case.assertions:
+            passed, _ = self.runner._evaluate_assertion(assertion, response, response_data)
+            if not passed:
+                if assertion.type == AssertionType.STATUS_CODE:
+                    return f"http_{response.status_code}"
+                return f"assertion_{assertion.type.value}"
+        return None
+    
+    def run(self,
+            config: LoadTestConfig,
+            cases: Optional[List[TestCase]] = None,
+            tags: Optional[List[str]] = None,
+            name_filter: Optional[str] = None) -> LoadTestReport:
+        """运行压测，cases 为空时使用运行器中过滤后的用例"""
+        if cases is None:
+            cases = self.runner._filter_cases(tags, name_filter)
+        if not cases:
+            raise ValueError("No test cases to run")
+        
+        schedule = self._prepare(cases)
+        start = time.monotonic()
+        end = start + config.duration
+        recorder = _LoadRecorder(start, config.timeline_interval)
+        
+        if config.engine == "asyncio":
+            if not AIOHTTP_AVAILABLE:
+                raise RuntimeError("The asyncio engine requires aiohttp: pip install aiohttp")
+            asyncio.run(self._run_asyncio(schedule, config, recorder, start, end))
+        else:
+            self._run_threads(schedule, config, recorder, start, end)
+        
+        return LoadTestReport(
+            config=config,
+            elapsed=time.monotonic() - start,
+            total_requests=recorder.requests,
+            errors=recorder.errors,
+            errors_by_type=recorder.errors_by_type,
+            latency=recorder.latency,
+            corrected=recorder.corrected,
+            timeline=recorder.timeline()
+        )
+    
+    def _run_threads(self, schedule: List[tuple], config: LoadTestConfig,
+                     recorder: _LoadRecorder, start: float, end: float) -> None:
+        """线程引擎：每个线程同一时刻只有一个在途请求"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=config.concurrency(), pool_block=True)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        sequence = itertools.count()
+        
+        def send(index: int, intended: float) -> None:
+            test_case, request = schedule[index % len(schedule)]
+            started = time.monotonic()
+            try:
+                response = self.runner._execute_request(request, session)
+                error = self._check_response(test_case, response, config.check_assertions)
+            except requests.exceptions.RequestException as e:
+                error = type(e).__name__
+            recorder.record(intended, started, time.monotonic(), error)
+        
+        def open_worker() -> None:
+            while True:
+                index = next(sequence)
+                intended = start + index / config.rate
+                if intended >= end:
+                    return
+                delay = intended - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                send(index, intended)
+        
+        def closed_worker(user: int) -> None:
+            offset = user * config.pacing / config.users if config.pacing else 0.0
+            iteration = 0
+            while True:
+                now = time.monotonic()
+                intended = start + offset + iteration * config.pacing if config.pacing else now
+                if intended >= end:
+                    return
+                if intended > now:
+                    time.sleep(intended - now)
+                send(user + iteration, intended)
+                iteration += 1
+                if config.think_time:
+                    time.sleep(config.think_time)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=config.concurrency()) as executor:
+                if config.model == "open":
+                    futures = [executor.submit(open_worker) for _ in range(config.max_concurrency)]
+                else:
+                    futures = [executor.submit(closed_worker, user) for user in range(config.users)]
+                for future in futures:
+                    future.result()
+        finally:
+            session.close()
+    
+    async def _async_request(self, session: Any, request: RequestConfig) -> _LoadResponse:
+        """用 aiohttp 发送 RequestConfig 描述的请求"""
+        headers = self.runner._merge_headers(request)
+        body = request.prepare_body()
+        if body is not None and request.get_body_type() == "json":
+            headers.setdefault("Content-Type", "application/json")
+        
+        started = time.monotonic()
+        async with session.request(
+            request.get_method(),
+            request.url,
+            params=request.get_params() or None,
+            headers=headers,
+            data=body,
+            timeout=aiohttp.ClientTimeout(total=request.timeout),
+            ssl=None if request.verify_ssl else False,
+            allow_redirects=request.allow_redirects
+        ) as response:
+            content = await response.read()
+            return _LoadResponse(
+                status_code=response.status,
+                headers=response.headers,
+                elapsed=timedelta(seconds=time.monotonic() - started),
+                content=content,
+                url=str(response.url)
+            )
+    
+    async def _run_asyncio(self, schedule: List[tuple], config: LoadTestConfig,
+                           recorder: _LoadRecorder, start: float, end: float) -> None:
+        """asyncio 引擎：单线程驱动全部在途请求"""
+        limit = config.concurrency()
+        connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit)
+        
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async def send(index: int, intended: float) -> None:
+                test_case, request = schedule[index % len(schedule)]
+                started = time.monotonic()
+                try:
+                    response = await self._async_request(session, request)
+                    error = self._check_response(test_case, response, config.check_assertions)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = type(e).__name__
+                recorder.record(intended, started, time.monotonic(), error)
+            
+            if config.model == "open":
+                semaphore = asyncio.Semaphore(config.max_concurrency)
+                in_flight = set()
+                
+                async def bounded(index: int, intended: float) -> None:
+                    async with semaphore:
+                        await send(index, intended)
+                
+                index = 0
+                while True:
+                    intended = start + index / config.rate
+                    if intended >= end:
+                        break
+                    delay = intended - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    task = asyncio.create_task(bounded(index, intended))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                    index += 1
+                if in_flight:
+                    await asyncio.gather(*in_flight)
+            else:
+                async def user_loop(user: int) -> None:
+                    offset = user * config.pacing / config.users if config.pacing else 0.0
+                    iteration = 0
+                    while True:
+                        now = time.monotonic()
+                        intended = start + offset + iteration * config.pacing if config.pacing else now
+                        if intended >= end:
+                            return
+                        if intended > now:
+                            await asyncio.sleep(intended - now)
+                        await send(user + iteration, intended)
+                        iteration += 1
+                        if config.think_time:
+                            await asyncio.sleep(config.think_time)
+                
+                await asyncio.gather(*(user_loop(user) for user in range(config.users)))
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """本地桩服务：固定延迟返回 JSON，可周期性卡顿以模拟 GC 停顿"""
+    
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.005
+    stall_every = 0.0
+    stall_duration = 0.0
+    started = 0.0
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _respond(self) -> None:
+        # 读掉请求体，否则长连接上的下一个请求会解析错位
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        
+        delay = self.latency
+        if self.stall_every:
+            phase = (time.monotonic() - self.started) % self.stall_every
+            if phase < self.stall_duration:
+                delay += self.stall_duration - phase
+        time.sleep(delay)
+        
+        status = 500 if self.path.startswith("/error") else 200
+        body = json.dumps({"path": self.path, "ok": status == 200}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _respond
+
+
+def start_stub_server(latency: float = 0.005,
+                      stall_every: float = 0.0,
+                      stall_duration: float = 0.0,
+                      port: int = 0) -> ThreadingHTTPServer:
+    """
+    在后台线程启动本地桩服务，返回的服务器用 shutdown() 停止
+    
+    每隔 stall_every 秒，服务会整体卡顿 stall_duration 秒，
+    用于观察协调遗漏修正前后尾延迟的差异。
+    """
+    handler = type("StubHandler", (_StubHandler,), {
+        "latency": latency,
+        "stall_every": stall_every,
+        "stall_duration": stall_duration,
+        "started": time.monotonic()
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
 def create_sample_test() -> APITestRunner:
     """创建示例测试"""
     # 创建环境
@@ -875,7 +1662,7 @@ def create_sample_test() -> APITestRunner:
         }
     )
     
-    runner = APITestRunner(env)
+    runner = APITestRunner(env, max_workers=4)
     
     # 测试用例1: 获取用户列表
     runner.add_test_case(TestCase(
@@ -1017,5 +1804,121 @@ def run_demo():
     print("\n✨ Demo completed!")
 
 
+def run_load_demo():
+    """对本地桩服务运行压测示例"""
+    print("🚀 Starting Load Test Demo...")
+    print("=" * 50)
+    
+    # 桩服务每 2 秒卡顿 0.3 秒，用来观察协调遗漏修正的效果
+    server = start_stub_server(latency=0.005, stall_every=2.0, stall_duration=0.3)
+    env = Environment(name="stub", base_url=f"http://127.0.0.1:{server.server_address[1]}")
+    runner = APITestRunner(env)
+    runner.add_test_case(TestCase(
+        name="List Items",
+        request=RequestConfig(method=HTTPMethod.GET, url="/items", timeout=5),
+        assertions=[Assertion(type=AssertionType.STATUS_CODE, expected=200)],
+        weight=3
+    ))
+    runner.add_test_case(TestCase(
+        name="Create Item",
+        request=RequestConfig(method=HTTPMethod.POST, url="/items", body={"name": "demo"}, timeout=5),
+        assertions=[Assertion(type=AssertionType.STATUS_CODE, expected=200)]
+    ))
+    
+    load_runner = LoadTestRunner(runner)
+    try:
+        print("\n📈 Open model, thread engine:")
+        report = load_runner.run(LoadTestConfig(model="open", rate=200, duration=5, max_concurrency=20))
+        print(report.format())
+        
+        if AIOHTTP_AVAILABLE:
+            print("\n👥 Closed model, asyncio engine:")
+            report = load_runner.run(LoadTestConfig(model="closed", users=20, pacing=0.1,
+                                                    duration=5, engine="asyncio"))
+            print(report.format())
+    finally:
+        server.shutdown()
+    
+    print("\n✨ Demo completed!")
+
+
+def _runner_from_suite(args: argparse.Namespace) -> APITestRunner:
+    """根据命令行参数加载测试套件并创建运行器"""
+    environment, test_cases = load_test_suite(args.suite)
+    if args.base_url:
+        environment = environment or Environment(name="cli", base_url="")
+        environment.base_url = args.base_url
+    runner = APITestRunner(environment, max_workers=getattr(args, "workers", 1))
+    runner.add_test_suite(test_cases)
+    return runner
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="REST API Test Automation Tool")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("demo", help="运行功能测试示例")
+    subparsers.add_parser("load-demo", help="对本地桩服务运行压测示例")
+    
+    run_parser = subparsers.add_parser("run", help="运行 YAML/JSON 测试套件")
+    run_parser.add_argument("suite", help="测试套件文件")
+    run_parser.add_argument("--base-url", help="覆盖套件中的 base_url")
+    run_parser.add_argument("--tag", action="append", dest="tags", help="只运行带该标签的用例")
+    run_parser.add_argument("--workers", type=int, default=1, help="并发数")
+    run_parser.add_argument("--stream", help="逐条写出结果的 JSON Lines 文件")
+    run_parser.add_argument("--report", help="报告输出路径 (.json/.html)")
+    
+    load_parser = subparsers.add_parser("load", help="把测试套件作为压测场景运行")
+    load_parser.add_argument("suite", help="测试套件文件")
+    load_parser.add_argument("--base-url", help="覆盖套件中的 base_url")
+    load_parser.add_argument("--tag", action="append", dest="tags", help="只使用带该标签的用例")
+    load_parser.add_argument("--model", choices=["open", "closed"], default="open", help="流量模型")
+    load_parser.add_argument("--rate", type=float, default=10.0, help="开放模型的目标 RPS")
+    load_parser.add_argument("--users", type=int, default=10, help="闭合模型的虚拟用户数")
+    load_parser.add_argument("--duration", type=float, default=10.0, help="持续时间（秒）")
+    load_parser.add_argument("--concurrency", type=int, default=100, help="开放模型最多在途请求数")
+    load_parser.add_argument("--pacing", type=float, help="闭合模型每个用户的请求间隔（秒）")
+    load_parser.add_argument("--think-time", type=float, default=0.0, help="闭合模型请求后的等待（秒）")
+    load_parser.add_argument("--engine", choices=["thread", "asyncio"], default="thread", help="执行引擎")
+    load_parser.add_argument("--no-assertions", action="store_true", help="只按状态码判定成功")
+    load_parser.add_argument("--output", help="JSON 报告输出路径")
+    
+    args = parser.parse_args()
+    
+    if args.command == "run":
+        runner = _runner_from_suite(args)
+        results = runner.run_all(tags=args.tags, workers=args.workers, stream_path=args.stream)
+        if args.report:
+            runner.generate_report(format="html" if args.report.endswith(".html") else "json",
+                                   output_path=args.report)
+        failed = any(r.result in (TestResult.FAIL, TestResult.ERROR) for r in results)
+        return 1 if failed else 0
+    
+    if args.command == "load":
+        runner = _runner_from_suite(args)
+        config = LoadTestConfig(
+            model=args.model,
+            rate=args.rate,
+            users=args.users,
+            duration=args.duration,
+            max_concurrency=args.concurrency,
+            pacing=args.pacing,
+            think_time=args.think_time,
+            engine=args.engine,
+            check_assertions=not args.no_assertions
+        )
+        report = LoadTestRunner(runner).run(config, tags=args.tags)
+        print(report.format())
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report.to_dict(), f, indent=2, ensure_ascii=False)
+        return 0
+    
+    if args.command == "load-demo":
+        run_load_demo()
+    else:
+        run_demo()
+    return 0
+
+
 if __name__ == "__main__":
-    run_demo()
+    raise SystemExit(main())